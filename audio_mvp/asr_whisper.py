@@ -1,12 +1,18 @@
 # audio_mvp/asr_whisper.py:
 import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
 # MPS で未実装オペレーションがあった場合に CPU に自動フォールバックさせるヒント
 os.environ.setdefault("PYTORCH_ENABLE_MPS_FALLBACK", "1")
 
+import numpy as np
 import torch
 import whisper
 
+from audio_buffer import AudioBuffer
+
 
 def _detect_device() -> str:
     """
@@ -35,38 +41,86 @@ def _detect_device() -> str:
     return "cpu"
 
 
-def transcribe(audio_path: str, language: str = "ja", model_size: str = "small"):
+# (model_size, device) → (model, 実際に使っているデバイス)
+# 1 プロセス内で一度だけロードし、以降の transcribe() で使い回す
+_MODELS: Dict[Tuple[str, str], Tuple["whisper.Whisper", str]] = {}
+_MODEL_LOCKS: Dict[int, threading.Lock] = {}  # id(model) → lock
+_LOAD_LOCK = threading.Lock()
+_DEVICE: Optional[str] = None
+
+
+def _default_device() -> str:
+    """_detect_device() の結果をプロセス内でキャッシュする。"""
+    global _DEVICE
+    if _DEVICE is None:
+        _DEVICE = _detect_device()
+    return _DEVICE
+
+
+def load_model(model_size: str = "small", device: Optional[str] = None):
+    """
+    Whisper モデルを (model_size, device) ごとに 1 回だけロードして返す。
+
+    戻り値: (model, device)。MPS 初期化に失敗した場合は device="cpu" になる。
+    """
+    device = device or _default_device()
+    key = (model_size, device)
+    with _LOAD_LOCK:
+        if key in _MODELS:
+            return _MODELS[key]
+
+        print(f"[asr_whisper] loading Whisper model '{model_size}' on device='{device}'")
+        t0 = time.perf_counter()
+        model = None
+        used = device
+
+        # --- MPS のときはまず試して、ダメなら CPU へフォールバック ---
+        if device == "mps":
+            try:
+                model = whisper.load_model(model_size, device="mps")
+                print("[asr_whisper] MPS でのモデル初期化に成功しました")
+            except Exception as e:  # NotImplementedError, RuntimeError などまとめて捕まえる
+                print(f"[asr_whisper] WARNING: MPS 初期化に失敗しました ({e}). CPU にフォールバックします")
+                used = "cpu"
+
+        # MPS 以外、または MPS 失敗時
+        if model is None:
+            model = whisper.load_model(model_size, device=used)
+
+        print(f"[asr_whisper] model ready in {time.perf_counter() - t0:.1f}s")
+        _MODELS[key] = (model, used)
+        _MODEL_LOCKS[id(model)] = threading.Lock()
+        return _MODELS[key]
+
+
+def transcribe(audio, language: str = "ja", model_size: str = "small", device: Optional[str] = None):
     """
     Whisper で音声を書き起こし、audio_analyze.py から期待されている形式
     （start/end/text の dict のリスト）で返す。
-    """
-    device = _detect_device()
-    print(f"[asr_whisper] loading Whisper model '{model_size}' on device='{device}'")
 
-    model = None
+    audio はファイルパス、または AudioBuffer（チャンク解析の窓など）。
+    AudioBuffer の場合は 16kHz 版の波形をそのまま Whisper に渡す。
 
-    # --- MPS のときはまず試して、ダメなら CPU へフォールバック ---
-    if device == "mps":
-        try:
-            model = whisper.load_model(model_size, device="mps")
-            print("[asr_whisper] MPS でのモデル初期化に成功しました")
-        except Exception as e:  # NotImplementedError, RuntimeError などまとめて捕まえる
-            print(f"[asr_whisper] WARNING: MPS 初期化に失敗しました ({e}). CPU にフォールバックします")
-            device = "cpu"
-
-    # MPS 以外、または MPS 失敗時
-    if model is None:
-        model = whisper.load_model(model_size, device=device)
+    モデルは load_model() のキャッシュを使うため、同じプロセスで複数ファイルを
+    処理してもロードは 1 回だけ。
+    """
+    model, device = load_model(model_size, device)
 
     # CUDA のときだけ fp16 を使う（MPS や CPU は fp32）
     use_fp16 = device == "cuda"
 
-    result = model.transcribe(
-        audio_path,
-        language=language,
-        verbose=False,
-        fp16=use_fp16,
-    )
+    # Whisper の decode は KV キャッシュ用の hook をモデルに付け外しするため、
+    # 同じモデルを複数スレッドから同時に使わない
+    if isinstance(audio, AudioBuffer):
+        audio = np.ascontiguousarray(audio.resampled(16000).y, dtype=np.float32)
+
+    with _MODEL_LOCKS[id(model)]:
+        result = model.transcribe(
+            audio,
+            language=language,
+            verbose=False,
+            fp16=use_fp16,
+        )
 
     segs = []
     for s in result.get("segments", []):
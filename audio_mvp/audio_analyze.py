@@ -2,18 +2,21 @@ import os
 import sys
 import argparse
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
 import numpy as np
 import pandas as pd
-import librosa
 
 # ローカルモジュール
 sys.path.insert(0, os.path.dirname(__file__))
+from audio_buffer import AudioBuffer, AudioLike        # noqa: E402
 from diarize import diarize_two_speakers           # noqa: E402
 from asr_whisper import transcribe                 # noqa: E402
-from prosody import segment_prosody                # noqa: E402
-from pragmatics_ja import count_metrics, tokenize  # noqa: E402
+from prosody import ProsodyTrack, load_or_compute_track, track_segment_f0_rms, track_segment_prosody  # noqa: E402
+from pragmatics_ja import count_metrics, tokenize_batch  # noqa: E402
+from stream import analyze_stream                  # noqa: E402
+from intervals import IntervalIndex                # noqa: E402
+from near_dup import ShortTextMatcher              # noqa: E402
 from html_report import render_html                # noqa: E402
 
 ROLE_CHILD = "CHI"
@@ -81,27 +84,23 @@ def assign_speaker_to_asr(
 
     rows: List[SegRow] = []
     diags: List[Dict] = []
+    index = IntervalIndex([d["start"] for d in diar_pad], [d["end"] for d in diar_pad])
 
     for seg in asr:
         s0, s1 = float(seg["start"]), float(seg["end"])
         dur = max(1e-6, s1 - s0)
-
-        best = None
-        best_ol = -1.0
         mid = 0.5 * (s0 + s1)
 
-        for d in diar_pad:
-            ol = _overlap_len(s0, s1, d["start"], d["end"])
-            if ol > best_ol:
-                best_ol = ol
-                best = d
+        # 重なり最大の区間（区間を開始時刻でソートして二分探索）
+        bi, best_ol = index.best_overlap(s0, s1)
+        best = diar_pad[bi] if bi is not None else None
 
         ratio = (best_ol / dur) if dur > 0 else 0.0
         ok = (best is not None) and (ratio >= min_overlap_ratio or best_ol >= min_overlap_sec)
 
         # 安全網：重なりが小さくても、もっとも近い区間に必ず割当てる
         if not ok and diar_pad:
-            best = min(diar_pad, key=lambda d: abs(mid - 0.5 * (d["start"] + d["end"])))
+            best = diar_pad[index.nearest_mid(mid)]
             best_ol = _overlap_len(s0, s1, best["start"], best["end"])
             ratio = (best_ol / dur) if dur > 0 else 0.0
 
@@ -144,43 +143,25 @@ def assign_speaker_to_asr(
 
 
 # ---------- ASRのみ（F0クラスタ） ----------
-def assign_by_f0(audio_path: str, asr_segments: List[Dict]) -> List[SegRow]:
+def assign_by_f0(audio: AudioLike, asr_segments: List[Dict], track: Optional[ProsodyTrack] = None) -> List[SegRow]:
     """
     旧ロジック：pyannote を使わず、ASR セグメント単位で F0+RMS をクラスタリングして CHI/MOT を分ける。
+    F0 / RMS は録音全体のフレーム系列（track）から区間ごとに集計する。
     """
-    y, sr = librosa.load(audio_path, sr=None, mono=True)
-    hop = int(sr * 0.02)  # 20ms
+    if track is None:
+        track = load_or_compute_track(audio)
 
     feats = []  # (idx, f0_med, rms_mean)
     bounds = []  # (s0, s1)
 
     for i, seg in enumerate(asr_segments):
         s0, s1 = float(seg["start"]), float(seg["end"])
-        a, b = max(0, int(s0 * sr)), min(len(y), int(s1 * sr))
-        if b - a <= 0:
+        bounds.append((s0, s1))
+        if s1 <= s0 or s0 * track.sr >= track.n_samples:
             feats.append((i, 0.0, 0.0))
-            bounds.append((s0, s1))
             continue
-
-        yi = y[a:b]
-
-        # F0 (YIN)
-        try:
-            f0 = librosa.yin(yi, fmin=110.0, fmax=800.0, frame_length=1024, hop_length=hop)
-            f0 = np.nan_to_num(f0)
-            f0_med = float(np.median(f0[f0 > 0])) if np.any(f0 > 0) else 0.0
-        except Exception:
-            f0_med = 0.0
-
-        # RMS
-        try:
-            rms = librosa.feature.rms(y=yi, frame_length=1024, hop_length=hop).ravel()
-            rms_mean = float(np.mean(rms)) if len(rms) else 0.0
-        except Exception:
-            rms_mean = 0.0
-
+        f0_med, rms_mean = track_segment_f0_rms(track, s0, s1)
         feats.append((i, f0_med, rms_mean))
-        bounds.append((s0, s1))
 
     X = np.array([[f[1], f[2]] for f in feats], dtype=float)
 
@@ -230,11 +211,12 @@ def collapse_echo_pairs(
     sim_th: float = 0.92,
 ):
     """隣接する 2 発話が短いほぼ同一表現のとき、復唱とみなして 1 つにまとめる。"""
-    from difflib import SequenceMatcher
-
     out: List[SegRow] = []
     echoes: List[Dict] = []
     rows = list(rows or [])
+    # 正規化と文字シグネチャは最初に 1 回だけ（類似度は上界で足切りしてから計算）
+    matcher = ShortTextMatcher([_norm_text_simple(r.text) for r in rows])
+    norm, lens = matcher.texts, matcher.lens
     i = 0
 
     while i < len(rows):
@@ -242,10 +224,8 @@ def collapse_echo_pairs(
         if i + 1 < len(rows):
             n = rows[i + 1]
             if r.speaker != n.speaker and (n.start - r.end) <= max_gap:
-                a = _norm_text_simple(r.text)
-                b = _norm_text_simple(n.text)
-                if a and b and len(a) <= max_chars and len(b) <= max_chars:
-                    if SequenceMatcher(None, a, b).ratio() >= sim_th:
+                if norm[i] and norm[i + 1] and lens[i] <= max_chars and lens[i + 1] <= max_chars:
+                    if matcher.similar(i, i + 1, sim_th):
                         merged = SegRow(
                             start=r.start,
                             end=max(r.end, n.end),
@@ -283,22 +263,24 @@ def collapse_cross_speaker_near_dups(
     """
     少し離れた位置にある cross-speaker の near-duplicate をまとめる。
     """
-    from difflib import SequenceMatcher
-
     rows = list(rows or [])
     rows.sort(key=lambda r: r.start)
     drop = set()
     dups: List[Dict] = []
+    index = IntervalIndex.from_rows(rows)  # rows は開始時刻順なので、開始時刻の件数がそのまま位置の上限
+    matcher = ShortTextMatcher([_norm_text_simple(r.text) for r in rows])
+    norm, lens = matcher.texts, matcher.lens
 
     for i in range(len(rows)):
         if i in drop:
             continue
         a = rows[i]
-        ta = _norm_text_simple(a.text)
-        if not ta or len(ta) > max_chars:
+        if not norm[i] or lens[i] > max_chars:
             continue
 
-        for j in range(i + 1, min(i + 1 + lookahead, len(rows))):
+        # max_gap 以内に始まる行だけを見る（二分探索で打ち切り位置を求める）
+        j_end = min(i + 1 + lookahead, len(rows), index.count_starting_by(a.end + max_gap + 1e-9))
+        for j in range(i + 1, j_end):
             if j in drop:
                 continue
             b = rows[j]
@@ -306,10 +288,9 @@ def collapse_cross_speaker_near_dups(
                 break
             if a.speaker == b.speaker:
                 continue
-            tb = _norm_text_simple(b.text)
-            if not tb or len(tb) > max_chars:
+            if not norm[j] or lens[j] > max_chars:
                 continue
-            if SequenceMatcher(None, ta, tb).ratio() >= sim_th:
+            if matcher.similar(i, j, sim_th):
                 # a を残し、b を drop
                 rows[i] = SegRow(
                     start=a.start,
@@ -337,11 +318,11 @@ def collapse_cross_speaker_near_dups(
 
 def clip_rows(rows: List[SegRow], w0: float, w1: float) -> List[SegRow]:
     """指定した時間窓 [w0, w1] にクリップ。"""
+    rows = list(rows or [])
     out: List[SegRow] = []
-    for r in rows or []:
-        ns, ne = max(r.start, w0), min(r.end, w1)
-        if ne > ns:
-            out.append(SegRow(start=ns, end=ne, speaker=r.speaker, text=r.text))
+    for k in IntervalIndex.from_rows(rows).overlapping(w0, w1):
+        r = rows[k]
+        out.append(SegRow(start=max(r.start, w0), end=min(r.end, w1), speaker=r.speaker, text=r.text))
     return out
 
 
@@ -350,10 +331,8 @@ def make_turns(rows: List[SegRow], role: str) -> Dict:
     utts = [r for r in rows if r.speaker == role]
     n_utts = len(utts)
 
-    toks = []
-    for u in utts:
-        if u.text:
-            toks.extend(tokenize(u.text))
+    # 解析結果はキャッシュされ、make_pragmatics（count_metrics）でもそのまま再利用される
+    toks = [t for ts in tokenize_batch([u.text for u in utts if u.text]) for t in ts]
 
     n_tokens = len(toks)
     n_types = len({t["lemma"] for t in toks}) if toks else 0
@@ -397,8 +376,9 @@ def make_pragmatics(rows: List[SegRow], role: str) -> Dict:
     return m
 
 
-def make_prosody(audio_path: str, rows: List[SegRow], role: str) -> Dict:
-    y, sr = librosa.load(audio_path, sr=None, mono=True)
+def make_prosody(audio: AudioLike, rows: List[SegRow], role: str, track: Optional[ProsodyTrack] = None) -> Dict:
+    if track is None:
+        track = load_or_compute_track(audio)
     segs = [(r.start, r.end) for r in rows if r.speaker == role]
 
     def pause_p95(role_: str) -> float:
@@ -410,7 +390,7 @@ def make_prosody(audio_path: str, rows: List[SegRow], role: str) -> Dict:
         return float(np.percentile(gaps, 95)) if gaps else 0.0
 
     if segs:
-        stats = [segment_prosody(y, sr, s, e) for (s, e) in segs]
+        stats = [track_segment_prosody(track, s, e) for (s, e) in segs]
         f0_mean = float(np.mean([s["f0_mean"] for s in stats]))
         f0_sd = float(np.mean([s["f0_sd"] for s in stats]))
         energy_mean = float(np.mean([s["energy_mean"] for s in stats]))
@@ -429,12 +409,16 @@ def make_prosody(audio_path: str, rows: List[SegRow], role: str) -> Dict:
 
 
 # ---------- メイン ----------
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="audio_in", required=True)
-    ap.add_argument("--out", dest="outdir", required=True)
+def add_analysis_args(ap: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """入出力以外の解析オプション（batch_analyze.py と共有）。"""
     ap.add_argument("--lang", default="ja")
     ap.add_argument("--model", default="tiny")
+    ap.add_argument("--device", default=None, help="Whisper のデバイス（省略時は自動検出）")
+    ap.add_argument("--audio_cache_dir", default=None, help="デコード済み波形（float32 .npy）のキャッシュ先。2 回目以降は mmap で読む")
+
+    # 長尺録音のチャンク解析（0 = 録音全体を一括で解析）
+    ap.add_argument("--chunk_sec", type=float, default=0.0, help="窓の長さ（秒）。>0 で重なり付きの窓ごとに解析する")
+    ap.add_argument("--chunk_overlap_sec", type=float, default=15.0, help="窓の前後に付ける文脈（秒）")
     ap.add_argument("--auto_assign_child_by_f0", default="true")
     ap.add_argument("--assign_mode", choices=["diar", "f0"], default="diar")
 
@@ -452,26 +436,57 @@ def main():
     ap.add_argument("--near_max_gap", type=float, default=1.0)
     ap.add_argument("--near_lookahead", type=int, default=4)
     ap.add_argument("--near_sim_th", type=float, default=0.90)
+    return ap
 
-    a = ap.parse_args()
-    os.makedirs(a.outdir, exist_ok=True)
 
-    # 1) ダイアライズ（診断用に保存）
-    diar = diarize_two_speakers(a.audio_in) or []
-    if not diar:
-        # ダイアライズ失敗時は、1 話者全体区間を仮置き
-        y, sr = librosa.load(a.audio_in, sr=None, mono=True)
-        dur = librosa.get_duration(y=y, sr=sr)
-        diar = [{"start": 0.0, "end": float(dur), "f0": 0.0, "rms": 0.0, "speaker": "S1"}]
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="audio_in", required=True)
+    ap.add_argument("--out", dest="outdir", required=True)
+    return add_analysis_args(ap)
+
 
-    pd.DataFrame(diar).to_csv(os.path.join(a.outdir, "diarization.csv"), index=False)
+def analyze(a: argparse.Namespace) -> None:
+    """1 ファイル分の解析（a.audio_in → a.outdir）。"""
+    os.makedirs(a.outdir, exist_ok=True)
 
-    # 2) 役割マップ（S1/S2 → CHI/MOT）
     auto_assign = str(a.auto_assign_child_by_f0).lower() in ("1", "true", "yes")
-    role_map = assign_roles_by_f0_stats(diar, auto_assign_child_by_f0=auto_assign)
+    chunk_sec = float(getattr(a, "chunk_sec", 0.0) or 0.0)
+
+    if chunk_sec > 0:
+        # 0-3) チャンク解析：重なり付きの窓ごとにダイアライズ・ASR・プロソディ系列を計算して縫い合わせる
+        audio = None  # 録音全体の波形は持たない
+        diar, asr, track, _dur = analyze_stream(
+            a.audio_in,
+            diarize=diarize_two_speakers,
+            transcribe=lambda buf: transcribe(buf, language=a.lang, model_size=a.model, device=getattr(a, "device", None)),
+            chunk_sec=chunk_sec,
+            overlap_sec=float(getattr(a, "chunk_overlap_sec", 15.0)),
+            by_f0=auto_assign,
+        )
+        pd.DataFrame(diar).to_csv(os.path.join(a.outdir, "diarization.csv"), index=False)
+        role_map = assign_roles_by_f0_stats(diar, auto_assign_child_by_f0=auto_assign)
+        track.save(os.path.join(a.outdir, "prosody_track.npz"))
+    else:
+        # 0) デコードは 1 回だけ（以降のステージはすべてこのバッファを使う）
+        audio = AudioBuffer.load(a.audio_in, cache_dir=getattr(a, "audio_cache_dir", None))
 
-    # 3) ASR
-    asr = transcribe(a.audio_in, language=a.lang, model_size=a.model)
+        # 1) ダイアライズ（診断用に保存）
+        diar = diarize_two_speakers(audio) or []
+        if not diar:
+            # ダイアライズ失敗時は、1 話者全体区間を仮置き
+            diar = [{"start": 0.0, "end": audio.duration, "f0": 0.0, "rms": 0.0, "speaker": "S1"}]
+
+        pd.DataFrame(diar).to_csv(os.path.join(a.outdir, "diarization.csv"), index=False)
+
+        # 2) 役割マップ（S1/S2 → CHI/MOT）
+        role_map = assign_roles_by_f0_stats(diar, auto_assign_child_by_f0=auto_assign)
+
+        # 2.5) フレーム単位のプロソディ系列（役割割当・プロソディ集計で共有。segments.csv の隣にキャッシュ）
+        track = load_or_compute_track(audio, os.path.join(a.outdir, "prosody_track.npz"))
+
+        # 3) ASR
+        asr = transcribe(a.audio_in, language=a.lang, model_size=a.model, device=getattr(a, "device", None))
 
     # 4) 話者割当
     if a.assign_mode == "diar":
@@ -485,7 +500,7 @@ def main():
         )
         pd.DataFrame(diag).to_csv(os.path.join(a.outdir, "diagnostics.csv"), index=False)
     else:
-        rows = assign_by_f0(a.audio_in, asr)
+        rows = assign_by_f0(audio, asr, track=track)
         pd.DataFrame(
             {
                 "assigned": [r.speaker for r in rows],
@@ -535,7 +550,7 @@ def main():
     prag = [make_pragmatics(rows, ROLE_CHILD), make_pragmatics(rows, ROLE_MOTHER)]
     pd.DataFrame(prag).to_csv(os.path.join(a.outdir, "pragmatics.csv"), index=False)
 
-    pros = [make_prosody(a.audio_in, rows, ROLE_CHILD), make_prosody(a.audio_in, rows, ROLE_MOTHER)]
+    pros = [make_prosody(audio, rows, ROLE_CHILD, track), make_prosody(audio, rows, ROLE_MOTHER, track)]
     pd.DataFrame(pros).to_csv(os.path.join(a.outdir, "prosody.csv"), index=False)
 
     # 8) HTML
@@ -562,5 +577,9 @@ def main():
     print(f"Done. Wrote to {a.outdir}")
 
 
+def main():
+    analyze(build_parser().parse_args())
+
+
 if __name__ == "__main__":
     main()
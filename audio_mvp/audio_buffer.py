@@ -0,0 +1,123 @@
+# audio_mvp/audio_buffer.py
+"""
+1 回だけデコードした音声を各ステージ（ダイアライズ・役割割当・プロソディ）で共有する。
+
+audio_analyze.py は同じファイルを librosa.load で何度も読み直していたが、
+AudioBuffer.load() で 1 回だけデコードし、以降は
+  - buf.y / buf.sr          : ネイティブ SR のモノラル波形（float32）
+  - buf.resampled(16000)    : リサンプル結果（SR ごとに 1 回だけ計算）
+  - buf.duration            : 秒
+を使い回す。
+
+cache_dir を指定すると、デコード結果を float32 の .npy として保存し、
+2 回目以降は np.load(mmap_mode="r") でメモリマップする（デコード不要・
+ページキャッシュ経由なので長尺でもプロセスのメモリを圧迫しにくい）。
+キャッシュキーは (絶対パス, ファイルサイズ, mtime) と SR。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Dict, Optional, Union
+
+import librosa
+import numpy as np
+
+
+class AudioBuffer:
+    def __init__(self, y: np.ndarray, sr: int, path: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.y = y
+        self.sr = int(sr)
+        self.path = path
+        self.cache_dir = cache_dir
+        self._resampled: Dict[int, "AudioBuffer"] = {self.sr: self}
+
+    @property
+    def duration(self) -> float:
+        return float(len(self.y)) / float(self.sr) if self.sr else 0.0
+
+    @classmethod
+    def load(cls, path: str, sr: Optional[int] = None, cache_dir: Optional[str] = None) -> "AudioBuffer":
+        """
+        モノラルでデコードする（sr=None はネイティブ SR。librosa.load と同じ結果）。
+        cache_dir があれば .npy キャッシュを読み書きする。
+        """
+        if cache_dir:
+            target = sr if sr is not None else _native_sr(path)
+            cached = _cache_path(path, target, cache_dir) if target else None
+            if cached and os.path.exists(cached):
+                return cls(np.load(cached, mmap_mode="r"), target, path=path, cache_dir=cache_dir)
+
+        y, sr_out = librosa.load(path, sr=sr, mono=True)
+        y = np.asarray(y, dtype=np.float32)
+        if cache_dir:
+            y = _save_and_map(_cache_path(path, sr_out, cache_dir), y)
+        return cls(y, sr_out, path=path, cache_dir=cache_dir)
+
+    def resampled(self, sr: int) -> "AudioBuffer":
+        """sr にリサンプルした AudioBuffer（librosa.load(path, sr=sr) と同じ変換）。SR ごとに 1 回だけ計算する。"""
+        sr = int(sr)
+        if sr not in self._resampled:
+            cached = _cache_path(self.path, sr, self.cache_dir) if (self.cache_dir and self.path) else None
+            if cached and os.path.exists(cached):
+                y = np.load(cached, mmap_mode="r")
+            else:
+                y = librosa.resample(np.asarray(self.y), orig_sr=self.sr, target_sr=sr).astype(np.float32, copy=False)
+                if cached:
+                    y = _save_and_map(cached, y)
+            buf = AudioBuffer(y, sr, path=self.path, cache_dir=self.cache_dir)
+            buf._resampled = self._resampled
+            self._resampled[sr] = buf
+        return self._resampled[sr]
+
+    @property
+    def source_key(self) -> str:
+        """元ファイルの識別子（絶対パス・サイズ・mtime）。パスが無ければ空文字。"""
+        if not self.path or not os.path.exists(self.path):
+            return ""
+        return _source_key(self.path)
+
+    def segment(self, start: float, end: float) -> np.ndarray:
+        """[start, end) 秒の区間（コピーしないビュー）。"""
+        a = max(0, min(int(start * self.sr), len(self.y)))
+        b = max(0, min(int(end * self.sr), len(self.y)))
+        return self.y[a:b] if b > a else self.y[:0]
+
+
+AudioLike = Union[str, AudioBuffer]
+
+
+def as_buffer(audio: AudioLike) -> AudioBuffer:
+    """パスなら（ネイティブ SR で）デコードし、AudioBuffer ならそのまま返す。"""
+    if isinstance(audio, AudioBuffer):
+        return audio
+    return AudioBuffer.load(audio)
+
+
+def _native_sr(path: str) -> Optional[int]:
+    """ヘッダだけ読んでネイティブ SR を得る（読めない形式は None → キャッシュ探索しない）。"""
+    try:
+        return int(librosa.get_samplerate(path))
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _cache_path(path: str, sr: int, cache_dir: str) -> str:
+    """<cache_dir>/<stem>.<key>.sr<SR>.f32.npy（key は絶対パス・サイズ・mtime から作る）。"""
+    key = hashlib.sha1(_source_key(path).encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.{key}.sr{int(sr)}.f32.npy")
+
+
+def _source_key(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def _save_and_map(path: str, y: np.ndarray) -> np.ndarray:
+    """float32 .npy として原子的に保存し、メモリマップで開き直す。"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}.npy"
+    np.save(tmp, np.asarray(y, dtype=np.float32))
+    os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,156 @@
+# audio_mvp/batch_analyze.py
+"""
+複数セッションをまとめて解析するバッチ CLI。
+
+audio_analyze.py を 1 ファイルずつ起動すると、そのたびに Whisper モデルを
+ロードし直すことになる。ここではワーカープロセスごとに起動時に 1 回だけ
+モデルをロードし（asr_whisper.load_model のキャッシュ）、manifest に並んだ
+音声ファイルを順に処理する。
+
+manifest:
+  - CSV（ヘッダに audio 列、任意で out 列）
+  - もしくは 1 行 1 パスのテキスト（# で始まる行と空行は無視）
+
+out 列が無い場合は <out_root>/<音声ファイル名の stem> に出力する。
+処理結果（status / 所要時間 / エラー）は <out_root>/batch_summary.csv に保存する。
+
+Usage:
+  python audio_mvp/batch_analyze.py --manifest sessions.txt --out_root out/batch --model small --workers 2
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+def read_manifest(path: str, out_root: str) -> List[Tuple[str, str]]:
+    """manifest を読み、(audio_path, outdir) のリストを返す。"""
+    with open(path, newline="", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
+    if not lines:
+        return []
+
+    header = [c.strip() for c in next(csv.reader([lines[0]]))]
+    if "audio" in header:
+        rows = list(csv.DictReader(lines))
+        items = [((r.get("audio") or "").strip(), (r.get("out") or "").strip()) for r in rows]
+    else:
+        items = [(ln, "") for ln in lines]
+
+    out: List[Tuple[str, str]] = []
+    used = set()
+    for audio, outdir in items:
+        if not audio:
+            continue
+        if not outdir:
+            stem = os.path.splitext(os.path.basename(audio))[0]
+            outdir = os.path.join(out_root, stem)
+            k = 2
+            while outdir in used:  # 同名ファイルは連番で区別
+                outdir = os.path.join(out_root, f"{stem}_{k}")
+                k += 1
+        used.add(outdir)
+        out.append((audio, outdir))
+    return out
+
+
+def _init_worker(model_size: str, device: Optional[str]) -> None:
+    """ワーカー起動時に Whisper モデルを 1 回だけロードする。"""
+    from asr_whisper import load_model
+
+    load_model(model_size, device)
+
+
+def _analyze_one(audio: str, outdir: str, opts: Dict) -> Dict:
+    from audio_analyze import analyze  # torch / whisper を読み込むので遅延 import
+
+    t0 = time.perf_counter()
+    status, error = "ok", ""
+    try:
+        analyze(argparse.Namespace(audio_in=audio, outdir=outdir, **opts))
+    except Exception as e:  # noqa: BLE001  1 ファイルの失敗でバッチ全体を止めない
+        status, error = "failed", f"{type(e).__name__}: {e}"
+    return {
+        "audio": audio,
+        "outdir": outdir,
+        "status": status,
+        "wall_sec": round(time.perf_counter() - t0, 3),
+        "pid": os.getpid(),
+        "error": error,
+    }
+
+
+def run_batch(items: List[Tuple[str, str]], opts: Dict, workers: int = 1) -> List[Dict]:
+    """
+    items を解析し、manifest 順の結果リストを返す。
+
+    workers=1 のときは同一プロセスで順に処理する（モデルは最初の 1 回だけロード）。
+    workers>1 のときは spawn したワーカープロセスごとにモデルを 1 回ロードする。
+    """
+    results: List[Dict] = []
+
+    def _report(r: Dict) -> None:
+        msg = f"[batch] {len(results)}/{len(items)} {r['audio']}: {r['status']} ({r['wall_sec']:.1f}s)"
+        print(msg + (f" {r['error']}" if r["error"] else ""), flush=True)
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        _init_worker(opts["model"], opts.get("device"))
+        print(f"[batch] startup {time.perf_counter() - t0:.1f}s", flush=True)
+        for audio, outdir in items:
+            results.append(_analyze_one(audio, outdir, opts))
+            _report(results[-1])
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),  # torch / CUDA を fork しない
+        initializer=_init_worker,
+        initargs=(opts["model"], opts.get("device")),
+    ) as pool:
+        futs = [pool.submit(_analyze_one, audio, outdir, opts) for audio, outdir in items]
+        for fut in futs:
+            results.append(fut.result())
+            _report(results[-1])
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict]:
+    from audio_analyze import add_analysis_args
+
+    ap = argparse.ArgumentParser(description="audio_mvp バッチ解析")
+    ap.add_argument("--manifest", required=True, help="CSV（audio[,out] 列）または 1 行 1 パスのテキスト")
+    ap.add_argument("--out_root", required=True)
+    ap.add_argument("--workers", type=int, default=1, help="ワーカープロセス数（各プロセスがモデルを 1 回ロード）")
+    add_analysis_args(ap)
+    a = ap.parse_args(argv)
+
+    items = read_manifest(a.manifest, a.out_root)
+    opts = {k: v for k, v in vars(a).items() if k not in ("manifest", "out_root", "workers")}
+    print(f"[batch] {len(items)} files, workers={a.workers}, model={a.model}")
+
+    t0 = time.perf_counter()
+    results = run_batch(items, opts, workers=a.workers)
+    total = time.perf_counter() - t0
+
+    os.makedirs(a.out_root, exist_ok=True)
+    summary = os.path.join(a.out_root, "batch_summary.csv")
+    pd.DataFrame(results, columns=["audio", "outdir", "status", "wall_sec", "pid", "error"]).to_csv(summary, index=False)
+
+    n_ok = sum(r["status"] == "ok" for r in results)
+    print(f"[batch] done: {n_ok}/{len(results)} ok in {total:.1f}s → {summary}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ from typing import List, Dict
 import librosa
 import numpy as np
 
+from audio_buffer import AudioBuffer, AudioLike
+
 try:
     from pyannote.audio import Pipeline
 except Exception:
@@ -57,9 +59,9 @@ def _get_pipeline():
     return _PIPELINE
 
 
-def diarize_two_speakers(audio_path: str) -> List[Dict]:
+def diarize_two_speakers(audio: AudioLike) -> List[Dict]:
     """
-    入力: mp3/wav ファイルパス
+    入力: mp3/wav ファイルパス、または AudioBuffer（16kHz 版を共有して再デコードしない）
     出力: [{"start": float, "end": float, "speaker": "S1|S2", "f0": float, "rms": float}, ...]
     """
     pipeline = _get_pipeline()
@@ -68,8 +70,14 @@ def diarize_two_speakers(audio_path: str) -> List[Dict]:
 
     import torch
 
-    # ---- 1) librosa で 16kHz モノラル読み込み（pyannote 3.1/4.x の想定に合わせる）----
-    y, sr = librosa.load(audio_path, sr=16000, mono=True)
+    # ---- 1) 16kHz モノラル（pyannote 3.1/4.x の想定に合わせる）----
+    if isinstance(audio, AudioBuffer):
+        buf = audio.resampled(16000)
+    else:
+        buf = AudioBuffer.load(audio, sr=16000)
+    y, sr = buf.y, buf.sr
+    if not y.flags.writeable:  # mmap キャッシュは読み取り専用なので torch に渡す前にコピー
+        y = np.array(y)
     if y.ndim == 1:
         waveform = torch.from_numpy(y).unsqueeze(0)  # (1, time)
     else:
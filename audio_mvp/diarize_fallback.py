@@ -1,10 +1,12 @@
 # /Users/genfukuhara/cpsy/audio_mvp/diarize_fallback.py
 import numpy as np, librosa
+from audio_buffer import as_buffer
 
-def diarize_two_speakers(audio_path):
-    y, sr = librosa.load(audio_path, sr=None, mono=True)
+def diarize_two_speakers(audio):
+    buf = as_buffer(audio)  # パス or AudioBuffer
+    y, sr = buf.y, buf.sr
     # 中央12分だけに短縮（長尺対策）
-    dur = librosa.get_duration(y=y, sr=sr)
+    dur = buf.duration
     if dur > 12*60:
         start = max(0.0, dur/2 - 6*60)
         s = int(start*sr); e = s + int(12*60*sr)
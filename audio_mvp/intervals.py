@@ -0,0 +1,93 @@
+# audio_mvp/intervals.py
+"""
+区間の検索（開始時刻でソートした区間 + 二分探索）。
+
+assign_speaker_to_asr は ASR セグメントごとに全ダイアライズ区間を走査していた（O(n·m)）。
+ここでは区間を開始時刻でソートし、
+  - 重なり検索: start ∈ (s0 - 最大区間長, s1) の候補だけを見る
+  - 中点最近傍: ソート済み中点を二分探索して両隣を見る
+で O((n + m) log m)（+ 重なる候補数）にする。
+
+同点の扱いは旧実装（リスト順に走査し、厳密に大きいときだけ更新）と同じで、
+元のリストで先に出てくる区間を返す。
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+
+class IntervalIndex:
+    def __init__(self, starts: Sequence[float], ends: Sequence[float]):
+        n = len(starts)
+        self.n = n
+        order = sorted(range(n), key=lambda i: (float(starts[i]), i))
+        self._idx = order
+        self._starts = [float(starts[i]) for i in order]
+        self._ends = [float(ends[i]) for i in order]
+        self._max_len = max([0.0] + [float(ends[i]) - float(starts[i]) for i in range(n)])
+
+        mids = [0.5 * (float(starts[i]) + float(ends[i])) for i in range(n)]
+        m_order = sorted(range(n), key=lambda i: (mids[i], i))
+        self._mid_idx = m_order
+        self._mids = [mids[i] for i in m_order]
+
+    @classmethod
+    def from_rows(cls, rows) -> "IntervalIndex":
+        """.start / .end 属性を持つ行（SegRow など）から作る。"""
+        return cls([r.start for r in rows], [r.end for r in rows])
+
+    def _lo(self, s0: float) -> int:
+        # start <= s0 - 最大区間長 の区間は s0 より後ろに届かない（丸め誤差ぶん少し広めに取る）
+        return bisect_left(self._starts, s0 - self._max_len - 1e-9 * (1.0 + abs(s0) + self._max_len))
+
+    def overlapping(self, s0: float, s1: float) -> List[int]:
+        """[s0, s1] と正の長さで重なる区間の元インデックス（昇順）。"""
+        lo = self._lo(s0)
+        hi = bisect_left(self._starts, s1)
+        return sorted(
+            self._idx[k] for k in range(lo, hi) if min(s1, self._ends[k]) > max(s0, self._starts[k])
+        )
+
+    def best_overlap(self, s0: float, s1: float) -> Tuple[Optional[int], float]:
+        """
+        重なりが最大の区間 (元インデックス, 重なり秒)。
+        どれとも重ならないときは旧実装どおり先頭の区間（重なり 0）を返す。区間が無ければ (None, -1.0)。
+        """
+        if self.n == 0:
+            return None, -1.0
+        best, best_ol = 0, 0.0
+        lo = self._lo(s0)
+        hi = bisect_left(self._starts, s1)
+        for k in range(lo, hi):
+            ol = min(s1, self._ends[k]) - max(s0, self._starts[k])
+            i = self._idx[k]
+            if ol > best_ol or (ol == best_ol and ol > 0 and i < best):
+                best, best_ol = i, ol
+        return best, best_ol
+
+    def nearest_mid(self, x: float) -> Optional[int]:
+        """中点が x に最も近い区間の元インデックス（同距離なら元の順で先のもの）。"""
+        if self.n == 0:
+            return None
+        p = bisect_left(self._mids, x)
+        cands = []
+        if p > 0:
+            cands.append(p - 1)
+        if p < self.n:
+            cands.append(p)
+        d = min(abs(self._mids[k] - x) for k in cands)
+        best = None
+        for k in cands:
+            if abs(self._mids[k] - x) != d:
+                continue
+            # 同じ中点が連続していれば、その中で元インデックス最小のもの
+            v = self._mids[k]
+            a, b = bisect_left(self._mids, v), bisect_right(self._mids, v)
+            i = min(self._mid_idx[a:b])
+            best = i if best is None else min(best, i)
+        return best
+
+    def count_starting_by(self, t: float) -> int:
+        """start <= t の区間数（入力が開始時刻順なら、それがそのまま位置の上限になる）。"""
+        return bisect_right(self._starts, t)
@@ -0,0 +1,46 @@
+# audio_mvp/near_dup.py
+"""
+復唱・near-duplicate 判定用の短文類似度エンジン。
+
+collapse_echo_pairs / collapse_cross_speaker_near_dups は、隣接（近傍）発話ごとに
+正規化と difflib.SequenceMatcher を繰り返していた。ここでは
+  1) 全発話の正規化テキストと文字数・文字頻度シグネチャを最初に 1 回だけ作り、
+  2) SequenceMatcher.ratio() の上界で候補を落とし、
+       - 長さの上界      2*min(la, lb) / (la + lb)        （real_quick_ratio と同じ）
+       - 文字頻度の上界  2*|A ∩ B|（多重集合） / (la + lb) （quick_ratio と同じ）
+  3) 残ったペアだけ ratio() を正確に計算する（同じ文字列ペアはキャッシュ）。
+上界が閾値未満なら ratio() も閾値未満なので、判定結果は従来と完全に一致する。
+"""
+from __future__ import annotations
+
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import List, Sequence
+
+
+@lru_cache(maxsize=65536)
+def _ratio(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class ShortTextMatcher:
+    def __init__(self, norm_texts: Sequence[str]):
+        self.texts: List[str] = list(norm_texts)
+        self.lens: List[int] = [len(t) for t in self.texts]
+        self._counts: List[Counter] = [Counter(t) for t in self.texts]
+        self.n_exact = 0  # ratio() を実際に計算した回数
+
+    def similar(self, i: int, j: int, sim_th: float) -> bool:
+        """SequenceMatcher(None, texts[i], texts[j]).ratio() >= sim_th と同じ判定。"""
+        la, lb = self.lens[i], self.lens[j]
+        total = la + lb
+        if not total:
+            return 1.0 >= sim_th  # 空文字同士の ratio() は 1.0
+        if 2.0 * min(la, lb) / total < sim_th:
+            return False
+        common = sum((self._counts[i] & self._counts[j]).values())
+        if 2.0 * common / total < sim_th:
+            return False
+        self.n_exact += 1
+        return _ratio(self.texts[i], self.texts[j]) >= sim_th
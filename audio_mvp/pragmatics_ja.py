@@ -1,23 +1,45 @@
+import os
+import threading
+from functools import lru_cache
 from fugashi import Tagger
 tagger = Tagger()
+_tagger_lock = threading.Lock()  # fugashi の Tagger はスレッドセーフではない
 DM_TOKENS = set(["ね","よ","まあ","でも","その","えっと","あの","さ"])
 MENTAL_LEMMAS = set(["思う","考える","知る","分かる","感じる","欲しい","好きだ","嫌いだ","信じる","覚える","忘れる","気づく","願う"])
 FILLERS = set(["え","えー","えっと","あの","うーん","ま","その"])
+# 形態素解析結果のキャッシュ（テキスト → トークン列）。同じ発話を turns / pragmatics / レポートで何度も解析しない
+TOKEN_CACHE_SIZE = int(os.environ.get("PRAGMATICS_TOKEN_CACHE_SIZE", "65536"))
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _parse(text):
+    with _tagger_lock:
+        words = tagger(text)
+        out = []
+        for m in words:
+            surf = m.surface
+            lem = m.feature.lemma if hasattr(m.feature, "lemma") and m.feature.lemma else surf
+            pos = m.feature.pos1 if hasattr(m.feature, "pos1") else ""
+            out.append((surf, lem, pos))
+    return tuple(out)
+
 def tokenize(text):
-    tokens = []
-    for m in tagger(text):
-        surf = m.surface
-        lem = m.feature.lemma if hasattr(m.feature, "lemma") and m.feature.lemma else surf
-        pos = m.feature.pos1 if hasattr(m.feature, "pos1") else ""
-        tokens.append({"surface":surf, "lemma":lem, "pos":pos})
-    return tokens
+    # キャッシュ内の値を書き換えられないよう、呼び出しごとに新しい dict を返す
+    return [{"surface":s, "lemma":l, "pos":p} for s, l, p in _parse(text)]
+def tokenize_batch(texts):
+    """発話リストをまとめて解析する（同じテキストは 1 回だけ解析し、キャッシュも共有）。"""
+    parsed = {t: _parse(t) for t in dict.fromkeys(texts)}
+    return [[{"surface":s, "lemma":l, "pos":p} for s, l, p in parsed[t]] for t in texts]
+def tokenize_cache_info():
+    return _parse.cache_info()
+def clear_tokenize_cache():
+    _parse.cache_clear()
 def count_metrics(utterances):
     n_utts = len(utterances); all_tokens = []; n_questions = 0; dm_count = 0; mental_count = 0
-    for utt in utterances:
-        text = utt.strip()
+    texts = [utt.strip() for utt in utterances]
+    for text, toks in zip(texts, tokenize_batch(texts)):
         if not text: continue
         if text.endswith("？") or text.endswith("?"): n_questions += 1
-        toks = [t for t in tokenize(text) if t["surface"] not in FILLERS]
+        toks = [t for t in toks if t["surface"] not in FILLERS]
         all_tokens.extend(toks)
         dm_count += sum(1 for t in toks if t["surface"] in DM_TOKENS)
         mental_count += sum(1 for t in toks if t["lemma"] in MENTAL_LEMMAS)
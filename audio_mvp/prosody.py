@@ -1,7 +1,13 @@
 
+import os
+from dataclasses import dataclass
+from typing import Optional
+
 import numpy as np
 import librosa
 
+from audio_buffer import as_buffer
+
 def segment_prosody(y, sr, start, end):
     s = int(start * sr); e = int(end * sr)
     s = max(0, min(s, len(y))); e = max(0, min(e, len(y)))
@@ -41,3 +47,146 @@ def segment_prosody(y, sr, start, end):
         "energy_mean": energy_mean,
         "speech_rate": speech_rate,
     }
+
+
+# ---------- 録音全体のフレーム系列（1 回だけ計算） ----------
+HOP_SEC = 0.02          # 20ms（assign_by_f0 / diarize と同じ）
+FRAME_LENGTH = 1024     # YIN / RMS の窓長
+N_FFT = 2048            # onset 強度（メルスペクトログラム）の窓長
+F0_FMIN, F0_FMAX = 110.0, 800.0
+
+
+@dataclass
+class ProsodyTrack:
+    """
+    録音全体の F0 / RMS / onset 強度を固定 hop で並べたもの。
+    フレーム i の中心時刻は i * hop_length / sr（librosa の center=True と同じ）。
+    区間統計はこの配列をスライスして集計する（区間ごとに YIN を回さない）。
+    """
+    sr: int
+    hop_length: int
+    n_samples: int
+    f0: np.ndarray
+    rms: np.ndarray
+    onset: np.ndarray
+    source: str = ""
+
+    def __post_init__(self):
+        env = self.onset
+        self.peaks = np.zeros(len(env), dtype=bool)
+        if env.size >= 3:
+            self.peaks[1:-1] = (env[1:-1] > env[:-2]) & (env[1:-1] > env[2:])
+
+    def frames(self, start: float, end: float) -> slice:
+        """中心時刻が [start, end) に入るフレーム。区間が hop より短いときは最も近い 1 フレーム。"""
+        n = len(self.f0)
+        a = int(np.ceil(start * self.sr / self.hop_length))
+        b = int(np.ceil(end * self.sr / self.hop_length))
+        a, b = max(0, min(a, n)), max(0, min(b, n))
+        if b <= a and n:
+            a = max(0, min(int(round(0.5 * (start + end) * self.sr / self.hop_length)), n - 1))
+            b = a + 1
+        return slice(a, b)
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            sr=self.sr, hop_length=self.hop_length, n_samples=self.n_samples,
+            f0=self.f0, rms=self.rms, onset=self.onset, source=np.array(self.source),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ProsodyTrack":
+        with np.load(path) as z:
+            return cls(
+                sr=int(z["sr"]), hop_length=int(z["hop_length"]), n_samples=int(z["n_samples"]),
+                f0=z["f0"], rms=z["rms"], onset=z["onset"], source=str(z["source"]),
+            )
+
+
+def context_frames(hop: int) -> int:
+    """ブロック / チャンクの前後に必要な文脈フレーム数（窓の半分 + onset の lag 補正）。"""
+    return int(np.ceil(max(FRAME_LENGTH, N_FFT) / (2 * hop))) + 4
+
+
+def compute_prosody_track(y, sr, hop_sec: float = HOP_SEC, block_sec: float = 60.0, source: str = "") -> ProsodyTrack:
+    """
+    F0（YIN）・RMS・onset 強度を録音全体で 1 パス計算する。
+    長尺でもメモリが膨らまないよう block_sec ごとに前後の文脈付きで計算してつなぐ
+    （文脈が窓長より長いので、つなぎ目のフレームも一括計算と同じ値になる）。
+    """
+    hop = int(sr * hop_sec)
+    n = len(y)
+    n_frames = 1 + n // hop
+    ctx = context_frames(hop)
+    block = max(1, int(block_sec * sr / hop))
+
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    rms = np.zeros(n_frames, dtype=np.float32)
+    onset = np.zeros(n_frames, dtype=np.float32)
+
+    for a in range(0, n_frames, block):
+        b = min(n_frames, a + block)
+        g0 = max(0, a - ctx)
+        yb = np.asarray(y[g0 * hop:min(n, (b + ctx) * hop)], dtype=np.float32)
+        if yb.size == 0:
+            continue
+        f0_b = librosa.yin(yb, fmin=F0_FMIN, fmax=F0_FMAX, sr=sr, frame_length=FRAME_LENGTH, hop_length=hop)
+        rms_b = librosa.feature.rms(y=yb, frame_length=FRAME_LENGTH, hop_length=hop).ravel()
+        # power_to_db の top_db はブロック内最大値に依存するので使わない
+        S = librosa.power_to_db(librosa.feature.melspectrogram(y=yb, sr=sr, n_fft=N_FFT, hop_length=hop), top_db=None)
+        on_b = librosa.onset.onset_strength(S=S, sr=sr, n_fft=N_FFT, hop_length=hop)
+
+        k0, k1 = a - g0, b - g0
+        f0[a:b] = np.nan_to_num(f0_b[k0:k1])
+        rms[a:b] = rms_b[k0:k1]
+        onset[a:b] = on_b[k0:k1]
+
+    return ProsodyTrack(sr=int(sr), hop_length=hop, n_samples=n, f0=f0, rms=rms, onset=onset, source=source)
+
+
+def load_or_compute_track(audio, cache_path: Optional[str] = None) -> ProsodyTrack:
+    """cache_path（例: segments.csv と同じディレクトリの prosody_track.npz）があれば再利用する。"""
+    buf = as_buffer(audio)
+    hop = int(buf.sr * HOP_SEC)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            tr = ProsodyTrack.load(cache_path)
+            if (tr.sr, tr.hop_length, tr.n_samples, tr.source) == (buf.sr, hop, len(buf.y), buf.source_key):
+                return tr
+        except Exception:  # noqa: BLE001  壊れたキャッシュは作り直す
+            pass
+    tr = compute_prosody_track(buf.y, buf.sr, source=buf.source_key)
+    if cache_path:
+        tr.save(cache_path)
+    return tr
+
+
+def track_segment_prosody(track: ProsodyTrack, start, end):
+    """segment_prosody と同じキーの区間統計を、フレーム系列のスライスから求める。"""
+    s = max(0, min(int(start * track.sr), track.n_samples))
+    e = max(0, min(int(end * track.sr), track.n_samples))
+    if e <= s:
+        return {"f0_mean": 0.0, "f0_sd": 0.0, "energy_mean": 0.0, "speech_rate": 0.0}
+
+    sl = track.frames(start, end)
+    f0 = track.f0[sl]
+    rms = track.rms[sl]
+    dur = max(1e-6, (e - s) / track.sr)
+    return {
+        "f0_mean": float(f0.mean()) if f0.size else 0.0,
+        "f0_sd": float(f0.std()) if f0.size else 0.0,
+        "energy_mean": float(rms.mean()) if rms.size else 0.0,
+        "speech_rate": float(int(track.peaks[sl].sum()) / dur),
+    }
+
+
+def track_segment_f0_rms(track: ProsodyTrack, start, end):
+    """assign_by_f0 用: (有声フレームの F0 中央値, RMS 平均)。"""
+    sl = track.frames(start, end)
+    f0 = track.f0[sl]
+    rms = track.rms[sl]
+    f0_med = float(np.median(f0[f0 > 0])) if np.any(f0 > 0) else 0.0
+    return f0_med, (float(np.mean(rms)) if rms.size else 0.0)
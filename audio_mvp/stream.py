@@ -0,0 +1,263 @@
+# audio_mvp/stream.py
+"""
+長尺録音のチャンク（ストリーミング）解析。
+
+録音全体をメモリに載せず、重なり付きの窓を 1 つずつ読み込んで
+  - ダイアライズ（VAD を含む）
+  - ASR
+  - フレーム単位のプロソディ系列
+を窓ごとに計算し、つなぎ目で縫い合わせる。各窓は「コア区間」
+[k*chunk, (k+1)*chunk) を担当し、前後の overlap は文脈としてだけ使う。
+
+  - プロソディ系列: コア区間のフレームをそのまま連結（overlap が窓長より長いので一括計算と同値）
+  - ダイアライズ: コア区間にクリップし、つなぎ目で接する同話者区間を結合
+  - ASR: 中点がコア区間に入るセグメントを採用し、直前の採用セグメントと大きく重なるものは捨てる
+
+窓ごとの話者ラベルは互いに対応していないため、全窓のダイアライズが揃ってから
+録音全体の話者クラスタ（F0 の高い側 / 低い側）に対応づけ直す（align_speakers）。
+2 話者がともに有声の窓から両クラスタの F0 中心を求め、各窓のラベルは中心への
+距離で割り当てる。1 話者しかいない窓も窓内の順位ではなく距離で決まるので、
+母親だけが話す窓が子ども側に付くことはない。クラスタ名は by_f0=True なら F0 の
+高い方を S1、False なら録音全体で発話時間の長い方を S1 とし、その後は通常どおり
+assign_roles_by_f0_stats で CHI/MOT に割り当てる。
+
+メモリは (chunk_sec + 2*overlap_sec) 秒分の波形と、録音全体のフレーム系列
+（20ms ごとに float32 × 3）だけで済む。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_buffer import AudioBuffer
+from prosody import HOP_SEC, ProsodyTrack, compute_prosody_track, context_frames
+
+
+@dataclass
+class Window:
+    index: int
+    buf: AudioBuffer   # 窓の波形（ネイティブ SR、モノラル）
+    offset: float      # 窓の先頭の絶対時刻（秒）
+    core_start: float  # この窓が担当する区間（絶対時刻）
+    core_end: float
+
+
+def audio_info(path: str) -> Tuple[int, int]:
+    """(ネイティブ SR, 総サンプル数)。ヘッダだけ読む。"""
+    import soundfile as sf
+
+    info = sf.info(path)
+    return int(info.samplerate), int(info.frames)
+
+
+def iter_windows(path: str, chunk_sec: float = 300.0, overlap_sec: float = 15.0) -> Iterator[Window]:
+    """
+    重なり付きの窓を順に読み込む。窓の境界は hop（20ms）の整数倍にそろえるので、
+    窓ごとのフレーム系列をずれなく連結できる。
+    """
+    import soundfile as sf
+
+    sr, n = audio_info(path)
+    hop = int(sr * HOP_SEC)
+    chunk = max(1, int(round(chunk_sec * sr / hop))) * hop
+    # プロソディ系列をつなぎ目でも一括計算と同値にするため、最低でも窓長ぶんの文脈は取る
+    overlap = max(context_frames(hop), int(np.ceil(overlap_sec * sr / hop))) * hop
+
+    with sf.SoundFile(path) as f:
+        for k, c0 in enumerate(range(0, n, chunk)):
+            c1 = min(n, c0 + chunk)
+            w0, w1 = max(0, c0 - overlap), min(n, c1 + overlap)
+            f.seek(w0)
+            y = f.read(w1 - w0, dtype="float32", always_2d=True)
+            y = y.mean(axis=1) if y.shape[1] > 1 else y[:, 0]  # librosa.to_mono と同じ（チャンネル平均）
+            yield Window(
+                index=k,
+                buf=AudioBuffer(np.ascontiguousarray(y, dtype=np.float32), sr, path=None),
+                offset=w0 / sr,
+                core_start=c0 / sr,
+                core_end=c1 / sr,
+            )
+
+
+def align_window_speakers(diar: List[Dict], by_f0: bool = True) -> List[Dict]:
+    """窓内の S1/S2 を並べ替える（by_f0: F0 中央値が高い方を S1 / それ以外: 発話時間が長い方を S1）。"""
+    def score(lab: str) -> float:
+        segs = [d for d in diar if d.get("speaker") == lab]
+        if by_f0:
+            f0 = [float(d.get("f0", 0.0)) for d in segs if float(d.get("f0", 0.0)) > 0]
+            return float(np.median(f0)) if f0 else 0.0
+        return sum(float(d["end"]) - float(d["start"]) for d in segs)
+
+    if score("S2") > score("S1"):
+        swap = {"S1": "S2", "S2": "S1"}
+        return [{**d, "speaker": swap.get(d.get("speaker"), d.get("speaker"))} for d in diar]
+    return diar
+
+
+def _label_stats(diar: List[Dict]) -> Dict[str, Tuple[float, float]]:
+    """窓内ラベルごとの (有声区間の F0 中央値（無声のみなら 0）, 発話時間)。"""
+    out: Dict[str, Tuple[float, float]] = {}
+    for lab in sorted({d.get("speaker") for d in diar if d.get("speaker") is not None}):
+        segs = [d for d in diar if d.get("speaker") == lab]
+        f0 = [float(d.get("f0", 0.0)) for d in segs if float(d.get("f0", 0.0)) > 0]
+        dur = sum(float(d["end"]) - float(d["start"]) for d in segs)
+        out[lab] = (float(np.median(f0)) if f0 else 0.0, dur)
+    return out
+
+
+def align_speakers(diars: List[List[Dict]], by_f0: bool = True) -> List[List[Dict]]:
+    """
+    窓ごとのラベルを録音全体の話者クラスタに対応づけ直す。
+
+    2 話者がともに有声の窓から、F0 の高い側 / 低い側のクラスタ中心（発話時間で重み付けした
+    F0 中央値の平均）を求め、各窓の有声ラベルを中心との距離で割り当てる（2 話者の窓は
+    距離の和が小さい方の対応）。無声のラベルは窓内で空いている方のクラスタに回す。
+    そのような窓が 1 つもない（録音全体で 2 話者の F0 が取れない）場合は窓内の順位に戻す。
+    """
+    stats = [_label_stats(d) for d in diars]
+    hi: List[Tuple[float, float]] = []
+    lo: List[Tuple[float, float]] = []
+    for st in stats:
+        voiced = sorted(((f, dur) for f, dur in st.values() if f > 0), reverse=True)
+        if len(voiced) >= 2:
+            hi.append(voiced[0])
+            lo.append(voiced[-1])
+    if not hi:
+        return [align_window_speakers(d, by_f0=by_f0) for d in diars]
+
+    def centroid(xs: List[Tuple[float, float]]) -> float:
+        f, w = np.array([x[0] for x in xs]), np.array([max(1e-6, x[1]) for x in xs])
+        return float(np.sum(f * w) / np.sum(w))
+
+    centers = {"hi": centroid(hi), "lo": centroid(lo)}
+
+    maps: List[Dict[str, str]] = []
+    for st in stats:
+        voiced = [lab for lab, (f, _) in st.items() if f > 0]
+        m: Dict[str, str] = {}
+        if len(voiced) >= 2:
+            a, b = voiced[0], voiced[1]
+            keep = abs(st[a][0] - centers["hi"]) + abs(st[b][0] - centers["lo"])
+            swap = abs(st[a][0] - centers["lo"]) + abs(st[b][0] - centers["hi"])
+            m[a], m[b] = ("hi", "lo") if keep <= swap else ("lo", "hi")
+        elif voiced:
+            lab = voiced[0]
+            m[lab] = min(centers, key=lambda c: abs(st[lab][0] - centers[c]))
+        for lab in st:
+            if lab not in m:
+                free = [c for c in ("hi", "lo") if c not in m.values()]
+                m[lab] = free[0] if free else "hi"
+        maps.append(m)
+
+    if by_f0:
+        names = {"hi": "S1", "lo": "S2"}
+    else:
+        total = {"hi": 0.0, "lo": 0.0}
+        for st, m in zip(stats, maps):
+            for lab, (_, dur) in st.items():
+                total[m[lab]] += dur
+        names = {"hi": "S1", "lo": "S2"} if total["hi"] >= total["lo"] else {"hi": "S2", "lo": "S1"}
+
+    return [
+        [{**d, "speaker": names[m[d["speaker"]]]} if d.get("speaker") in m else d for d in diar]
+        for diar, m in zip(diars, maps)
+    ]
+
+
+def stitch_diarization(parts: List[Tuple[Window, List[Dict]]], join_gap: float = 0.05) -> List[Dict]:
+    """窓ごとのダイアライズ結果をコア区間にクリップして連結し、つなぎ目の同話者区間を結合する。"""
+    out: List[Dict] = []
+    for w, diar in parts:
+        for d in sorted(diar, key=lambda d: float(d["start"])):
+            s0 = max(w.core_start, float(d["start"]) + w.offset)
+            s1 = min(w.core_end, float(d["end"]) + w.offset)
+            if s1 <= s0:
+                continue
+            seg = {**d, "start": s0, "end": s1}
+            prev = out[-1] if out else None
+            if (
+                prev is not None
+                and prev["speaker"] == seg["speaker"]
+                and abs(prev["end"] - w.core_start) < 1e-6
+                and s0 - prev["end"] <= join_gap
+            ):
+                # つなぎ目で切れた区間を結合（f0 / rms は長さで重み付け平均）
+                l0, l1 = prev["end"] - prev["start"], s1 - s0
+                for k in ("f0", "rms"):
+                    prev[k] = (float(prev.get(k, 0.0)) * l0 + float(seg.get(k, 0.0)) * l1) / max(1e-9, l0 + l1)
+                prev["end"] = s1
+            else:
+                out.append(seg)
+    return out
+
+
+def stitch_asr(parts: List[Tuple[Window, List[Dict]]], max_overlap_ratio: float = 0.5) -> List[Dict]:
+    """中点がコア区間に入る ASR セグメントを採用し、直前の採用分と大きく重なる重複を捨てる。"""
+    out: List[Dict] = []
+    for w, segs in parts:
+        for s in segs:
+            s0, s1 = float(s["start"]) + w.offset, float(s["end"]) + w.offset
+            mid = 0.5 * (s0 + s1)
+            if not (w.core_start <= mid < w.core_end):
+                continue
+            if out:
+                ol = max(0.0, min(out[-1]["end"], s1) - max(out[-1]["start"], s0))
+                if ol > max_overlap_ratio * max(1e-6, s1 - s0):
+                    continue
+            out.append({**s, "start": s0, "end": s1})
+    return out
+
+
+def analyze_stream(
+    path: str,
+    diarize: Callable[[AudioBuffer], List[Dict]],
+    transcribe: Callable[[AudioBuffer], List[Dict]],
+    chunk_sec: float = 300.0,
+    overlap_sec: float = 15.0,
+    by_f0: bool = True,
+    log: Optional[Callable[[str], None]] = print,
+) -> Tuple[List[Dict], List[Dict], ProsodyTrack, float]:
+    """
+    窓ごとにダイアライズ・ASR・プロソディ系列を計算して縫い合わせる。
+
+    戻り値: (diar, asr, track, duration_sec)。diar / asr の時刻は録音先頭からの絶対時刻。
+    ダイアライズが空の窓は、コア区間全体を S1 として仮置きする（一括解析の失敗時と同じ扱い）。
+    """
+    sr, n = audio_info(path)
+    hop = int(sr * HOP_SEC)
+    n_frames = 1 + n // hop
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    rms = np.zeros(n_frames, dtype=np.float32)
+    onset = np.zeros(n_frames, dtype=np.float32)
+
+    diar_parts: List[Tuple[Window, List[Dict]]] = []
+    asr_parts: List[Tuple[Window, List[Dict]]] = []
+
+    for w in iter_windows(path, chunk_sec=chunk_sec, overlap_sec=overlap_sec):
+        if log:
+            log(f"[stream] window {w.index}: {w.core_start:.1f}–{w.core_end:.1f}s")
+
+        tr = compute_prosody_track(w.buf.y, sr)
+        g0 = int(round(w.offset * sr)) // hop
+        a, b = int(round(w.core_start * sr)) // hop, min(n_frames, int(round(w.core_end * sr)) // hop)
+        if w.core_end * sr >= n:
+            b = n_frames
+        f0[a:b] = tr.f0[a - g0:b - g0]
+        rms[a:b] = tr.rms[a - g0:b - g0]
+        onset[a:b] = tr.onset[a - g0:b - g0]
+
+        diar = diarize(w.buf) or [
+            {"start": 0.0, "end": w.buf.duration, "f0": 0.0, "rms": 0.0, "speaker": "S1"}
+        ]
+        diar_parts.append((w, diar))
+        asr_parts.append((w, transcribe(w.buf)))
+
+    # 窓ごとのラベルは全窓が揃ってから録音全体の話者クラスタに対応づける
+    aligned = align_speakers([d for _, d in diar_parts], by_f0=by_f0)
+    diar_parts = [(w, d) for (w, _), d in zip(diar_parts, aligned)]
+
+    track = ProsodyTrack(sr=sr, hop_length=hop, n_samples=n, f0=f0, rms=rms, onset=onset)
+    return stitch_diarization(diar_parts), stitch_asr(asr_parts), track, n / sr if sr else 0.0
+
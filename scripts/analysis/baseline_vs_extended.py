@@ -17,15 +17,20 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import sys
 import warnings
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import KFold
-from sklearn.preprocessing import StandardScaler
+
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import run_permutation_test  # noqa: E402
 
 # ── Feature sets ─────────────────────────────────────────────────────
 CLASSICAL_FEATURES = [
@@ -57,56 +62,6 @@ NOVEL_FEATURES = [
 ALL_FEATURES = CLASSICAL_FEATURES + NOVEL_FEATURES  # 19
 
 
-# ── Core functions (same logic as permutation_test_ridge_fixedalpha.py) ──
-def pearsonr(a, b) -> float:
-    """Pearson correlation coefficient (NaN-safe)."""
-    a = np.asarray(a, float)
-    b = np.asarray(b, float)
-    a = a - a.mean()
-    b = b - b.mean()
-    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
-    return float((a * b).sum() / den) if den != 0 else float("nan")
-
-
-def cv_ridge_r(X, y, folds, seed, alpha):
-    """5-fold CV Ridge regression, return mean Pearson r."""
-    kf = KFold(n_splits=folds, shuffle=True, random_state=seed)
-    rs = []
-    for tr, te in kf.split(X):
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
-
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
-
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
-
-
-def run_permutation_test(X, y, folds, seed, alpha, n_perm):
-    """Run Ridge CV + permutation test. Return (r_obs, p_value)."""
-    r_obs = cv_ridge_r(X, y, folds, seed, alpha)
-
-    rng = np.random.default_rng(seed)
-    r_perm = np.empty(n_perm, float)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        r_perm[i] = cv_ridge_r(X, yp, folds, seed, alpha)
-        if (i + 1) % 500 == 0:
-            print(f"    perm {i + 1}/{n_perm} done")
-
-    p_val = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
-    return r_obs, p_val
-
-
 # ── Main ─────────────────────────────────────────────────────────────
 def main():
     ap = argparse.ArgumentParser(
@@ -172,7 +127,8 @@ def main():
         .to_numpy(dtype=float)
     )
     r_baseline, p_baseline = run_permutation_test(
-        X_baseline, y, args.cv_folds, args.seed, args.alpha, args.n_perm
+        X_baseline, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+        verbose=True,
     )
     print(f"  r_baseline = {r_baseline:.3f}, p = {p_baseline:.4f}")
 
@@ -192,7 +148,8 @@ def main():
             .to_numpy(dtype=float)
         )
         r_extended, p_extended = run_permutation_test(
-            X_extended, y, args.cv_folds, args.seed, args.alpha, args.n_perm
+            X_extended, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+            verbose=True,
         )
         delta_r = r_extended - r_baseline
         print(f"  r_extended = {r_extended:.3f}, p = {p_extended:.4f}")
@@ -14,6 +14,13 @@ After all iterations: compute mean, SD, 2.5th percentile, 97.5th
 percentile for each feature.  ci_excludes_zero = True if ci_lower > 0
 OR ci_upper < 0.
 
+The default ``batched`` engine stacks a block of resamples into a 3-D
+array, does the per-resample median imputation and standardization with
+NumPy, and solves all Ridge normal equations with one batched
+``np.linalg.solve``.  The resample indices come from the same RNG stream
+as the ``sklearn`` engine (one SimpleImputer/StandardScaler/Ridge per
+resample), so both give the same coefficients up to float rounding.
+
 Usage:
     python scripts/analysis/bootstrap_variance.py \
         --xy_parquet artifacts/analysis/datasets/cejc_home2_hq1_XY_Conly_sonnet.parquet \
@@ -61,6 +68,62 @@ NOVEL_FEATURES = [
 
 ALL_FEATURES = CLASSICAL_FEATURES + NOVEL_FEATURES  # 19
 
+ENGINES = ("batched", "sklearn")
+BOOT_BLOCK = 500  # resamples per 3-D stack (bounds memory at ~BOOT_BLOCK×N×p)
+
+
+# ── Batched Ridge engine ─────────────────────────────────────────────
+def batched_ridge_coefs(
+    X_raw: np.ndarray,
+    y: np.ndarray,
+    idx: np.ndarray,
+    alpha: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit median-impute → standardize → Ridge on every resample in *idx*.
+
+    Args:
+        X_raw: (N, p) feature matrix, may contain NaN.
+        y: (N,) target.
+        idx: (B, N) bootstrap row indices.
+        alpha: Ridge regularisation parameter.
+
+    Returns:
+        (coefs, ok): coefs is (B, p); ok marks resamples that could be fit.
+        A resample fails when a feature is entirely NaN in it (SimpleImputer
+        would drop the column) or the solve yields non-finite values.
+    """
+    Xb = X_raw[idx]  # (B, N, p)
+    yb = y[idx]      # (B, N)
+
+    # Median imputation, only for columns that have missing values at all
+    ok = np.ones(len(idx), dtype=bool)
+    nan_cols = np.flatnonzero(np.isnan(X_raw).any(axis=0))
+    if len(nan_cols):
+        sub = Xb[:, :, nan_cols]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN slices
+            med = np.nanmedian(sub, axis=1)  # (B, n_nan_cols)
+        ok &= ~np.isnan(med).any(axis=1)
+        Xb[:, :, nan_cols] = np.where(np.isnan(sub), med[:, None, :], sub)
+
+    # StandardScaler: population SD, near-constant columns keep scale 1
+    mu = Xb.mean(axis=1, keepdims=True)
+    sd = Xb.std(axis=1, keepdims=True)
+    sd = np.where(sd < 10 * np.finfo(float).eps, 1.0, sd)
+    Xs = (Xb - mu) / sd
+
+    # Ridge with intercept: centre X and y, solve (XcᵀXc + αI) β = Xcᵀyc
+    Xc = Xs - Xs.mean(axis=1, keepdims=True)
+    yc = yb - yb.mean(axis=1, keepdims=True)
+    XcT = Xc.transpose(0, 2, 1)
+    gram = XcT @ Xc  # (B, p, p)
+    gram[:, np.arange(gram.shape[1]), np.arange(gram.shape[1])] += alpha
+    rhs = XcT @ yc[..., None]  # (B, p, 1)
+    coefs = np.linalg.solve(gram, rhs)[..., 0]
+
+    ok &= np.isfinite(coefs).all(axis=1)
+    return coefs, ok
+
 
 # ── Core testable function ───────────────────────────────────────────
 def run_bootstrap_variance(
@@ -70,6 +133,7 @@ def run_bootstrap_variance(
     alpha: float = 100.0,
     n_boot: int = 500,
     seed: int = 42,
+    engine: str = "batched",
 ) -> pd.DataFrame:
     """Run bootstrap variance analysis on Ridge regression coefficients.
 
@@ -87,6 +151,8 @@ def run_bootstrap_variance(
         alpha: Ridge regularisation parameter.
         n_boot: Number of bootstrap iterations.
         seed: Random seed.
+        engine: ``"batched"`` (3-D NumPy stack + batched solve) or
+            ``"sklearn"`` (one SimpleImputer/StandardScaler/Ridge per resample).
 
     Returns:
         DataFrame with columns: feature, coef_mean, coef_sd, ci_lower,
@@ -95,7 +161,11 @@ def run_bootstrap_variance(
 
     Raises:
         KeyError: If any *feature_cols* are missing from *df*.
+        ValueError: If *engine* is unknown.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (expected one of {ENGINES})")
+
     # ── Validate feature columns ─────────────────────────────────────
     missing = [c for c in feature_cols if c not in df.columns]
     if missing:
@@ -122,34 +192,51 @@ def run_bootstrap_variance(
     n_failed = 0
 
     rng = np.random.default_rng(seed)
-    for i in range(n_boot):
-        try:
-            # Sample WITH replacement
-            idx = rng.integers(0, n_samples, size=n_samples)
-            X_boot = X_raw[idx]
-            y_boot = y[idx]
-
-            # Impute + Scale
-            imp = SimpleImputer(strategy="median")
-            X_boot = imp.fit_transform(X_boot)
-
-            sc = StandardScaler()
-            X_boot = sc.fit_transform(X_boot)
-
-            # Fit Ridge on full bootstrap sample
-            model = Ridge(alpha=alpha, random_state=seed)
-            model.fit(X_boot, y_boot)
-            coef_matrix.append(model.coef_.copy())
-        except Exception as exc:
-            n_failed += 1
-            if n_failed <= 5:
-                warnings.warn(
-                    f"Bootstrap iteration {i + 1} failed: {exc}"
-                )
-            continue
-
-        if (i + 1) % 100 == 0:
-            print(f"    boot {i + 1}/{n_boot} done")
+    if engine == "batched":
+        done = 0
+        while done < n_boot:
+            b = min(BOOT_BLOCK, n_boot - done)
+            idx = rng.integers(0, n_samples, size=(b, n_samples))
+            coefs, ok_b = batched_ridge_coefs(X_raw, y, idx, alpha)
+            coef_matrix.extend(coefs[ok_b])
+            for j in np.flatnonzero(~ok_b):
+                n_failed += 1
+                if n_failed <= 5:
+                    warnings.warn(
+                        f"Bootstrap iteration {done + j + 1} failed: "
+                        "all-NaN feature or non-finite coefficients"
+                    )
+            done += b
+            print(f"    boot {done}/{n_boot} done")
+    else:
+        for i in range(n_boot):
+            try:
+                # Sample WITH replacement
+                idx = rng.integers(0, n_samples, size=n_samples)
+                X_boot = X_raw[idx]
+                y_boot = y[idx]
+
+                # Impute + Scale
+                imp = SimpleImputer(strategy="median")
+                X_boot = imp.fit_transform(X_boot)
+
+                sc = StandardScaler()
+                X_boot = sc.fit_transform(X_boot)
+
+                # Fit Ridge on full bootstrap sample
+                model = Ridge(alpha=alpha, random_state=seed)
+                model.fit(X_boot, y_boot)
+                coef_matrix.append(model.coef_.copy())
+            except Exception as exc:
+                n_failed += 1
+                if n_failed <= 5:
+                    warnings.warn(
+                        f"Bootstrap iteration {i + 1} failed: {exc}"
+                    )
+                continue
+
+            if (i + 1) % 100 == 0:
+                print(f"    boot {i + 1}/{n_boot} done")
 
     n_valid = len(coef_matrix)
     if n_failed > 0:
@@ -202,6 +289,9 @@ def main():
     ap.add_argument("--alpha", type=float, default=100.0, help="Ridge alpha")
     ap.add_argument("--n_boot", type=int, default=500, help="Bootstrap iterations")
     ap.add_argument("--seed", type=int, default=42, help="Random seed")
+    ap.add_argument("--engine", choices=ENGINES, default="batched",
+                    help="batched = NumPy 3-D stack + batched solve; "
+                    "sklearn = one Ridge fit per resample")
     ap.add_argument("--out_dir", required=True, help="Output directory")
     args = ap.parse_args()
 
@@ -221,7 +311,7 @@ def main():
     print(f"\n{'='*60}")
     print(f"  Bootstrap variance analysis")
     print(f"  y_col={args.y_col}, N features={len(ALL_FEATURES)}")
-    print(f"  alpha={args.alpha}, n_boot={args.n_boot}, seed={args.seed}")
+    print(f"  alpha={args.alpha}, n_boot={args.n_boot}, seed={args.seed}, engine={args.engine}")
     print(f"{'='*60}")
 
     result = run_bootstrap_variance(
@@ -231,6 +321,7 @@ def main():
         alpha=args.alpha,
         n_boot=args.n_boot,
         seed=args.seed,
+        engine=args.engine,
     )
 
     if result.empty:
@@ -14,15 +14,20 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import sys
 import warnings
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import KFold
-from sklearn.preprocessing import StandardScaler
+
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import run_permutation_test  # noqa: E402
 
 # ── Constants ────────────────────────────────────────────────────────
 TRAITS = ["O", "C", "E", "A", "N"]
@@ -52,38 +57,6 @@ DEFAULT_EXCLUDE: set[str] = {
 }
 
 
-# ── Core functions (same logic as permutation_test_ridge_fixedalpha.py) ──
-def pearsonr(a, b) -> float:
-    a = np.asarray(a, float)
-    b = np.asarray(b, float)
-    a = a - a.mean()
-    b = b - b.mean()
-    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
-    return float((a * b).sum() / den) if den != 0 else float("nan")
-
-
-def cv_ridge_r(X, y, folds, seed, alpha):
-    kf = KFold(n_splits=folds, shuffle=True, random_state=seed)
-    rs = []
-    for tr, te in kf.split(X):
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
-
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
-
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
-
-
 # ── Data loading ─────────────────────────────────────────────────────
 def load_trait_scores(items_dir: str, trait: str, teachers: list[str]) -> pd.DataFrame:
     """Load trait scores from all available teachers and average across them.
@@ -253,20 +226,12 @@ def main():
         y = y[ok]
         print(f"  Features: {X.shape[1]} cols, {X.shape[0]} samples")
 
-        # 4. Observed r
-        r_obs = cv_ridge_r(X, y, args.cv_folds, args.seed, args.alpha)
+        # 4-5. Observed r + permutation test
+        r_obs, p_val = run_permutation_test(
+            X, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+            verbose=True,
+        )
         print(f"  r_obs = {r_obs:.3f}")
-
-        # 5. Permutation test
-        rng = np.random.default_rng(args.seed)
-        r_perm = np.empty(args.n_perm, float)
-        for i in range(args.n_perm):
-            yp = rng.permutation(y)
-            r_perm[i] = cv_ridge_r(X, yp, args.cv_folds, args.seed, args.alpha)
-            if (i + 1) % 500 == 0:
-                print(f"    perm {i+1}/{args.n_perm} done")
-
-        p_val = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (args.n_perm + 1.0)
         print(f"  p(|r|) = {p_val:.4f}  (n_perm={args.n_perm})")
 
         # 6. Write permutation.log
@@ -331,15 +296,9 @@ def main():
             ok = ~np.isnan(y)
             X, y = X[ok], y[ok]
 
-            r_obs = cv_ridge_r(X, y, args.cv_folds, args.seed, args.alpha)
-
-            rng = np.random.default_rng(args.seed)
-            r_perm = np.empty(args.n_perm, float)
-            for i in range(args.n_perm):
-                yp = rng.permutation(y)
-                r_perm[i] = cv_ridge_r(X, yp, args.cv_folds, args.seed, args.alpha)
-
-            p_val = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (args.n_perm + 1.0)
+            r_obs, p_val = run_permutation_test(
+                X, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+            )
             print(f"  {trait}: r_obs={r_obs:.3f}, p={p_val:.4f}")
 
             # Write per-teacher permutation.log
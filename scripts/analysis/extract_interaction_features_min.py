@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import argparse, math, re
+from dataclasses import dataclass
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -24,12 +25,15 @@ def is_question(text: str) -> bool:
     return bool(_Q_END_RE.search(tail))
 
 def sfp_group(text: str) -> str:
+    return sfp_group_with(text, _SFP_NE_RE, _SFP_YO_RE)
+
+def sfp_group_with(text: str, ne_re: re.Pattern, yo_re: re.Pattern) -> str:
     t=norm_text(text)
     if not t: return "NONE"
     tail=re.sub(r"[。．\.！!、,「」\"\'\s]+$","",t)
     q=is_question(tail)
-    if _SFP_NE_RE.search(tail): return "NE_Q" if q else "NE"
-    if _SFP_YO_RE.search(tail): return "YO"
+    if ne_re.search(tail): return "NE_Q" if q else "NE"
+    if yo_re.search(tail): return "YO"
     return "OTHER"
 
 _HEAD_TOKEN_RE = re.compile(r'^[\s、。,.!?！？「」（）()\[\]{}"\'\-]*([A-Za-z0-9]+|[ぁ-んァ-ヶ一-龠]+)')
@@ -60,9 +64,10 @@ def jaccard(a:set,b:set)->float:
 
 def entropy_from_tokens(tokens):
     if len(tokens)==0: return float("nan")
-    toks=[t if t else "<EMPTY>" for t in tokens]
-    s=pd.Series(toks)
-    p=s.value_counts(normalize=True)
+    toks=np.array([t if t else "<EMPTY>" for t in tokens],dtype=object)
+    # counts in descending order, as Series.value_counts(normalize=True) sums them
+    counts=np.sort(np.unique(toks,return_counts=True)[1])[::-1]
+    p=counts/counts.sum()
     return float(-(p*np.log2(p)).sum())
 
 RE_ETO=re.compile(r"(えっと|えと)")
@@ -83,23 +88,74 @@ def q_stats(x):
     return (float(arr.mean()),float(np.quantile(arr,0.5)),float(np.quantile(arr,0.9)))
 
 
-def extract_features(
-    utterances_df: pd.DataFrame,
-    target_pairs: set | None,
-    gap_tol: float = 0.05,
-) -> pd.DataFrame:
-    """Extract interaction features from utterances DataFrame.
+# ── Prepared (condition-independent) intermediates ──────────────────
+@dataclass(frozen=True)
+class ExtractionCondition:
+    """One extraction setting. ``None`` lexicons use the module-level
+    YESNO_PREFIXES / _SFP_NE_RE / _SFP_YO_RE at evaluation time."""
 
-    Args:
-        utterances_df: DataFrame with columns conversation_id, speaker_id, text,
-                       start_time, end_time.
-        target_pairs: Set of (conversation_id, speaker_id) tuples to process,
-                      or None to process all.
-        gap_tol: Minimum gap duration (seconds) to count as a pause/gap.
+    gap_tol: float = 0.05
+    yesno_prefixes: tuple | None = None
+    sfp_ne_re: re.Pattern | None = None
+    sfp_yo_re: re.Pattern | None = None
 
-    Returns:
-        DataFrame with one row per (conversation_id, speaker_id) pair.
-    """
+
+@dataclass
+class ConversationPairs:
+    """Speaker-switch pairs of one conversation (indices into the prepared arrays)."""
+
+    conv_id: str
+    total_time: float
+    resp_idx: np.ndarray
+    prev_idx: np.ndarray
+    lex: np.ndarray  # bigram Jaccard per pair
+    drift: np.ndarray
+    gaps: np.ndarray  # resp start - prev end
+    speakers: list  # [(speaker_id, pair mask, own utterance indices)], target-filtered
+
+
+@dataclass
+class PreparedUtterances:
+    """Everything extract_features needs that does not depend on gap_tol or on
+    the YES/NO and NE/YO lexicons. Build once with ``prepare_utterances`` and
+    evaluate any number of ``ExtractionCondition``s on it."""
+
+    texts: list  # distinct texts
+    codes: np.ndarray  # utterance -> index into texts
+    start: np.ndarray
+    end: np.ndarray
+    tf: dict  # per-utterance text features (see _text_table)
+    convs: list  # [ConversationPairs]
+
+
+def _text_table(uniq: list) -> dict:
+    """Condition-independent features of each distinct text (parsed once)."""
+    fill = [count_fillers(t) for t in uniq]
+    return {
+        "is_question": np.array([is_question(t) for t in uniq], dtype=bool),
+        "first_token": np.array([first_token(t) for t in uniq], dtype=object),
+        "is_aizuchi": np.array([is_aizuchi(t) for t in uniq], dtype=np.int64),
+        "is_oir": np.array([is_oir(t) for t in uniq], dtype=np.int64),
+        "fill_eto": np.array([f["eto"] for f in fill], dtype=np.int64),
+        "fill_e": np.array([f["e"] for f in fill], dtype=np.int64),
+        "fill_ano": np.array([f["ano"] for f in fill], dtype=np.int64),
+        "text_len": np.array([len(re.sub(r"\s+", "", t)) for t in uniq], dtype=np.int64),
+    }
+
+
+def _finite_max(x: np.ndarray) -> float:
+    x = x[~np.isnan(x)]
+    return float(x.max()) if x.size else float("nan")
+
+
+def _finite_min(x: np.ndarray) -> float:
+    x = x[~np.isnan(x)]
+    return float(x.min()) if x.size else float("nan")
+
+
+def prepare_utterances(utterances_df: pd.DataFrame, target_pairs: set | None) -> PreparedUtterances:
+    """Sort utterances, parse every distinct text once and build the
+    speaker-switch pairs (with bigram Jaccard) of every conversation."""
     utt = utterances_df.copy()
     for c in ["conversation_id", "speaker_id"]:
         utt[c] = utt[c].astype(str)
@@ -112,143 +168,224 @@ def extract_features(
         utt["end_time"] = np.nan
 
     if target_pairs is not None:
-        utt = utt[utt["conversation_id"].isin({c for c, _ in target_pairs})].copy()
-
-    utt["sfp_group"] = utt["text"].map(sfp_group)
-    utt["is_question"] = utt["text"].map(is_question)
+        utt = utt[utt["conversation_id"].isin({c for c, _ in target_pairs})]
 
     sort_cols = ["conversation_id", "start_time", "end_time"]
     utt = utt.sort_values(sort_cols, kind="mergesort")
 
-    rows = []
-    for conv_id, u in utt.groupby("conversation_id", sort=False):
-        u = u.copy()
-        total_time = float(u["end_time"].max() - u["start_time"].min()) if not u["start_time"].isna().all() else float("nan")
-        prev = u.shift(1)
-        mask = (u["speaker_id"] != prev["speaker_id"]) & prev["speaker_id"].notna()
-        pairs = pd.DataFrame({
-            "conversation_id": conv_id,
-            "prev_speaker_id": prev.loc[mask, "speaker_id"].astype(str).values,
-            "resp_speaker_id": u.loc[mask, "speaker_id"].astype(str).values,
-            "prev_text": prev.loc[mask, "text"].values,
-            "resp_text": u.loc[mask, "text"].values,
-            "prev_sfp_group": prev.loc[mask, "sfp_group"].values,
-            "prev_is_question": prev.loc[mask, "is_question"].values,
-            "prev_end": prev.loc[mask, "end_time"].values,
-            "resp_start": u.loc[mask, "start_time"].values,
-        })
-        if len(pairs) == 0:
+    conv = utt["conversation_id"].to_numpy(dtype=object)
+    spk = utt["speaker_id"].to_numpy(dtype=object)
+    st = utt["start_time"].to_numpy(dtype=float)
+    en = utt["end_time"].to_numpy(dtype=float)
+    codes, uniq = pd.factorize(utt["text"].to_numpy(dtype=object))
+    uniq = list(uniq)
+    tf = {k: v[codes] for k, v in _text_table(uniq).items()}
+    bigrams = np.empty(len(uniq), dtype=object)
+    bigrams[:] = [char_bigrams(t) for t in uniq]
+
+    convs = []
+    bounds = np.r_[0, np.flatnonzero(conv[1:] != conv[:-1]) + 1, len(conv)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if a == b:
+            continue
+        conv_id = conv[a]
+        s_spk, s_st, s_en = spk[a:b], st[a:b], en[a:b]
+        total_time = float(_finite_max(s_en) - _finite_min(s_st)) if not np.isnan(s_st).all() else float("nan")
+        r = np.flatnonzero(s_spk[1:] != s_spk[:-1]) + 1
+        if r.size == 0:
             continue
-        pairs["resp_first_token"] = pairs["resp_text"].map(first_token)
-        pairs["resp_is_aizuchi"] = pairs["resp_text"].map(is_aizuchi).astype(int)
-        pairs["resp_is_yesno"] = pairs["resp_text"].map(is_yesno).astype(int)
-        pairs["resp_is_oir"] = pairs["resp_text"].map(is_oir).astype(int)
-        prev_bg = pairs["prev_text"].map(char_bigrams)
-        resp_bg = pairs["resp_text"].map(char_bigrams)
-        pairs["lex_overlap"] = [jaccard(a, b) for a, b in zip(prev_bg, resp_bg)]
-        pairs["topic_drift"] = 1.0 - pairs["lex_overlap"]
-
-        for spk, p in pairs.groupby("resp_speaker_id", sort=False):
-            key = (conv_id, spk)
-            if target_pairs is not None and key not in target_pairs:
+        p = r - 1
+
+        lex = np.array([jaccard(x, y) for x, y in zip(bigrams[codes[a + p]], bigrams[codes[a + r]])], dtype=float)
+        resp_spk = s_spk[r]
+        speakers = []
+        for s in pd.unique(resp_spk):
+            if target_pairs is not None and (conv_id, s) not in target_pairs:
                 continue
+            speakers.append((s, resp_spk == s, a + np.flatnonzero(s_spk == s)))
+
+        convs.append(ConversationPairs(
+            conv_id=conv_id,
+            total_time=total_time,
+            resp_idx=a + r,
+            prev_idx=a + p,
+            lex=lex,
+            drift=1.0 - lex,
+            gaps=(s_st[r] - s_en[p]).astype(float),
+            speakers=speakers,
+        ))
 
-            n_pairs_total = int(len(p))
-            after_ne = p["prev_sfp_group"].isin(["NE", "NE_Q"])
-            after_yo = p["prev_sfp_group"].isin(["YO"])
-            after_q = p["prev_is_question"].astype(bool)
-
-            n_after_ne = int(after_ne.sum())
-            n_after_yo = int(after_yo.sum())
-            n_after_q = int(after_q.sum())
-
-            resp_ne_aiz = float(p.loc[after_ne, "resp_is_aizuchi"].mean()) if n_after_ne > 0 else float("nan")
-            resp_ne_ent = float(entropy_from_tokens(p.loc[after_ne, "resp_first_token"].tolist())) if n_after_ne > 0 else float("nan")
-            resp_yo_ent = float(entropy_from_tokens(p.loc[after_yo, "resp_first_token"].tolist())) if n_after_yo > 0 else float("nan")
-
-            ix_oir = float(p["resp_is_oir"].mean())
-            ix_yesno = float(p["resp_is_yesno"].mean())
-            ix_lex = float(np.nanmean(p["lex_overlap"].values))
-            ix_drift = float(np.nanmean(p["topic_drift"].values))
-
-            ix_oir_q = float(p.loc[after_q, "resp_is_oir"].mean()) if n_after_q > 0 else float("nan")
-            ix_yesno_q = float(p.loc[after_q, "resp_is_yesno"].mean()) if n_after_q > 0 else float("nan")
-
-            us = u[u["speaker_id"] == spk].copy()
-            if us.empty:
-                pg_speech_ratio = float("nan")
-                pause_mean = pause_p50 = pause_p90 = float("nan")
-                pause_variability = float("nan")
-                text_all = ""
-            else:
-                dur = (us["end_time"] - us["start_time"]).clip(lower=0.0)
-                speech_time = float(dur.sum())
-                pg_speech_ratio = float(speech_time / total_time) if total_time and not math.isnan(total_time) and total_time > 0 else float("nan")
-                us = us.sort_values(["start_time", "end_time"], kind="mergesort")
-                pauses = (us["start_time"].values[1:] - us["end_time"].values[:-1]).tolist()
-                pauses = [x for x in pauses if x is not None and not math.isnan(x) and x >= gap_tol]
-                pause_mean, pause_p50, pause_p90 = q_stats(pauses)
-                # PG_pause_variability: CV = std / mean (mean > 0, len >= 2)
-                if len(pauses) >= 2 and pause_mean > 0:
-                    pause_variability = float(np.std(pauses, ddof=1) / pause_mean)
-                else:
-                    pause_variability = float("nan")
-                text_all = "\n".join(us["text"].astype(str).tolist())
-
-            gaps = (p["resp_start"].values - p["prev_end"].values).astype(float)
-            overlap_rate = float((gaps < -gap_tol).mean()) if len(gaps) > 0 else float("nan")
-            gap_list = [float(g) for g in gaps if (not math.isnan(g)) and g >= gap_tol]
-            gap_mean, gap_p50, gap_p90 = q_stats(gap_list)
-
-            fill = count_fillers(text_all)
-            text_len = int(len(re.sub(r"\s+", "", text_all)))
-            fill_rate100 = float(fill["total"] / (text_len / 100.0)) if text_len > 0 else float("nan")
-            fill_has_any = float(np.mean([1 if count_fillers(t)["total"] > 0 else 0 for t in us["text"].astype(str).tolist()])) if not us.empty else float("nan")
-
-            rows.append({
-                "conversation_id": conv_id, "speaker_id": spk,
-                "n_pairs_total": n_pairs_total,
-                "n_pairs_after_NE": n_after_ne,
-                "n_pairs_after_YO": n_after_yo,
-                "IX_n_pairs": n_pairs_total,
-                "IX_n_pairs_after_question": n_after_q,
-
-                "RESP_NE_AIZUCHI_RATE": resp_ne_aiz,
-                "RESP_NE_ENTROPY": resp_ne_ent,
-                "RESP_YO_ENTROPY": resp_yo_ent,
-
-                "IX_oirmarker_rate": ix_oir,
-                "IX_yesno_rate": ix_yesno,
-                "IX_lex_overlap_mean": ix_lex,
-                "IX_topic_drift_mean": ix_drift,
-                "IX_oirmarker_after_question_rate": ix_oir_q,
-                "IX_yesno_after_question_rate": ix_yesno_q,
-
-                "PG_total_time": total_time,
-                "PG_speech_ratio": pg_speech_ratio,
-                "PG_pause_mean": pause_mean,
-                "PG_pause_p50": pause_p50,
-                "PG_pause_p90": pause_p90,
-                "PG_pause_variability": pause_variability,
-                "PG_resp_gap_mean": gap_mean,
-                "PG_resp_gap_p50": gap_p50,
-                "PG_resp_gap_p90": gap_p90,
-                "PG_overlap_rate": overlap_rate,
-                "PG_resp_overlap_rate": overlap_rate,
-
-                "FILL_text_len": text_len,
-                "FILL_cnt_total": int(fill["total"]),
-                "FILL_cnt_eto": int(fill["eto"]),
-                "FILL_cnt_e": int(fill["e"]),
-                "FILL_cnt_ano": int(fill["ano"]),
-                "FILL_rate_per_100chars": fill_rate100,
-                "FILL_has_any": fill_has_any,
-            })
-
-    out = pd.DataFrame(rows)
+    return PreparedUtterances(texts=uniq, codes=codes, start=st, end=en, tf=tf, convs=convs)
+
+
+# ── Per-condition kernel ─────────────────────────────────────────────
+def _conversation_rows(c: ConversationPairs, prep: PreparedUtterances, sfp_u: np.ndarray, yesno_u: np.ndarray, gap_tol: float):
+    """Feature rows for every (target) responding speaker of one conversation.
+
+    ``sfp_u`` / ``yesno_u`` are the lexicon-dependent labels per distinct text.
+    """
+    st, en, tf = prep.start, prep.end, prep.tf
+    r, p = c.resp_idx, c.prev_idx
+    total_time = c.total_time
+    prev_sfp = sfp_u[prep.codes[p]]
+    prev_q = tf["is_question"][p]
+    resp_ft = tf["first_token"][r]
+    resp_aiz = tf["is_aizuchi"][r]
+    resp_yesno = yesno_u[prep.codes[r]]
+    resp_oir = tf["is_oir"][r]
+
+    rows = []
+    for s, sel, us in c.speakers:
+        n_pairs_total = int(sel.sum())
+        after_ne = np.isin(prev_sfp[sel], ["NE", "NE_Q"])
+        after_yo = prev_sfp[sel] == "YO"
+        after_q = prev_q[sel]
+
+        n_after_ne = int(after_ne.sum())
+        n_after_yo = int(after_yo.sum())
+        n_after_q = int(after_q.sum())
+
+        aiz, yesno, oir, ft = resp_aiz[sel], resp_yesno[sel], resp_oir[sel], resp_ft[sel]
+        resp_ne_aiz = float(aiz[after_ne].mean()) if n_after_ne > 0 else float("nan")
+        resp_ne_ent = float(entropy_from_tokens(ft[after_ne].tolist())) if n_after_ne > 0 else float("nan")
+        resp_yo_ent = float(entropy_from_tokens(ft[after_yo].tolist())) if n_after_yo > 0 else float("nan")
+
+        ix_oir = float(oir.mean())
+        ix_yesno = float(yesno.mean())
+        ix_lex = float(np.nanmean(c.lex[sel]))
+        ix_drift = float(np.nanmean(c.drift[sel]))
+
+        ix_oir_q = float(oir[after_q].mean()) if n_after_q > 0 else float("nan")
+        ix_yesno_q = float(yesno[after_q].mean()) if n_after_q > 0 else float("nan")
+
+        # speaker's own utterances (already in (start, end) order)
+        dur = np.clip(en[us] - st[us], 0.0, None)
+        speech_time = float(np.nansum(dur))
+        pg_speech_ratio = float(speech_time / total_time) if total_time and not math.isnan(total_time) and total_time > 0 else float("nan")
+        pauses = st[us][1:] - en[us][:-1]
+        pauses = pauses[~np.isnan(pauses) & (pauses >= gap_tol)]
+        pause_mean, pause_p50, pause_p90 = q_stats(pauses)
+        # PG_pause_variability: CV = std / mean (mean > 0, len >= 2)
+        if len(pauses) >= 2 and pause_mean > 0:
+            pause_variability = float(np.std(pauses, ddof=1) / pause_mean)
+        else:
+            pause_variability = float("nan")
+
+        gaps = c.gaps[sel]
+        overlap_rate = float((gaps < -gap_tol).mean()) if len(gaps) > 0 else float("nan")
+        gap_mean, gap_p50, gap_p90 = q_stats(gaps[~np.isnan(gaps) & (gaps >= gap_tol)])
+
+        # fillers never span utterances, so per-utterance counts add up
+        eto, e, ano = int(tf["fill_eto"][us].sum()), int(tf["fill_e"][us].sum()), int(tf["fill_ano"][us].sum())
+        fill_total = eto + e + ano
+        text_len = int(tf["text_len"][us].sum())
+        fill_rate100 = float(fill_total / (text_len / 100.0)) if text_len > 0 else float("nan")
+        has_any = (tf["fill_eto"][us] + tf["fill_e"][us] + tf["fill_ano"][us]) > 0
+        fill_has_any = float(np.mean(has_any.astype(int)))
+
+        rows.append({
+            "conversation_id": c.conv_id, "speaker_id": s,
+            "n_pairs_total": n_pairs_total,
+            "n_pairs_after_NE": n_after_ne,
+            "n_pairs_after_YO": n_after_yo,
+            "IX_n_pairs": n_pairs_total,
+            "IX_n_pairs_after_question": n_after_q,
+
+            "RESP_NE_AIZUCHI_RATE": resp_ne_aiz,
+            "RESP_NE_ENTROPY": resp_ne_ent,
+            "RESP_YO_ENTROPY": resp_yo_ent,
+
+            "IX_oirmarker_rate": ix_oir,
+            "IX_yesno_rate": ix_yesno,
+            "IX_lex_overlap_mean": ix_lex,
+            "IX_topic_drift_mean": ix_drift,
+            "IX_oirmarker_after_question_rate": ix_oir_q,
+            "IX_yesno_after_question_rate": ix_yesno_q,
+
+            "PG_total_time": total_time,
+            "PG_speech_ratio": pg_speech_ratio,
+            "PG_pause_mean": pause_mean,
+            "PG_pause_p50": pause_p50,
+            "PG_pause_p90": pause_p90,
+            "PG_pause_variability": pause_variability,
+            "PG_resp_gap_mean": gap_mean,
+            "PG_resp_gap_p50": gap_p50,
+            "PG_resp_gap_p90": gap_p90,
+            "PG_overlap_rate": overlap_rate,
+            "PG_resp_overlap_rate": overlap_rate,
+
+            "FILL_text_len": text_len,
+            "FILL_cnt_total": fill_total,
+            "FILL_cnt_eto": eto,
+            "FILL_cnt_e": e,
+            "FILL_cnt_ano": ano,
+            "FILL_rate_per_100chars": fill_rate100,
+            "FILL_has_any": fill_has_any,
+        })
+    return rows
+
+
+def evaluate_conditions(prep: PreparedUtterances, conditions: list[ExtractionCondition]) -> list[pd.DataFrame]:
+    """Feature DataFrames for each condition, reusing one PreparedUtterances.
+
+    Only the lexicon-dependent labels (SFP group, YES/NO) are recomputed per
+    condition, over distinct texts and only when the lexicon differs.
+    """
+    label_cache: dict = {}
+    out = []
+    for cond in conditions:
+        ne_re = cond.sfp_ne_re if cond.sfp_ne_re is not None else _SFP_NE_RE
+        yo_re = cond.sfp_yo_re if cond.sfp_yo_re is not None else _SFP_YO_RE
+        prefixes = tuple(cond.yesno_prefixes if cond.yesno_prefixes is not None else YESNO_PREFIXES)
+
+        sfp_key = ("sfp", ne_re.pattern, ne_re.flags, yo_re.pattern, yo_re.flags)
+        if sfp_key not in label_cache:
+            label_cache[sfp_key] = np.array([sfp_group_with(t, ne_re, yo_re) for t in prep.texts], dtype=object)
+        yesno_key = ("yesno", prefixes)
+        if yesno_key not in label_cache:
+            label_cache[yesno_key] = np.array([starts_with_any(t, prefixes) for t in prep.texts], dtype=np.int64)
+
+        rows = []
+        for c in prep.convs:
+            rows.extend(_conversation_rows(c, prep, label_cache[sfp_key], label_cache[yesno_key], cond.gap_tol))
+        out.append(pd.DataFrame(rows))
     return out
 
 
+def extract_features_multi(
+    utterances_df: pd.DataFrame,
+    target_pairs: set | None,
+    conditions: list[ExtractionCondition],
+) -> list[pd.DataFrame]:
+    """``extract_features`` for several conditions with one pass of text processing."""
+    return evaluate_conditions(prepare_utterances(utterances_df, target_pairs), conditions)
+
+
+def extract_features(
+    utterances_df: pd.DataFrame,
+    target_pairs: set | None,
+    gap_tol: float = 0.05,
+) -> pd.DataFrame:
+    """Extract interaction features from utterances DataFrame.
+
+    Utterances are sorted once; every text is parsed once (labels, bigrams,
+    filler counts), and each conversation is then reduced by a NumPy kernel
+    over its sorted arrays (``_conversation_rows``). To evaluate several
+    gap_tol values or lexicons, use ``extract_features_multi``.
+
+    Args:
+        utterances_df: DataFrame with columns conversation_id, speaker_id, text,
+                       start_time, end_time.
+        target_pairs: Set of (conversation_id, speaker_id) tuples to process,
+                      or None to process all.
+        gap_tol: Minimum gap duration (seconds) to count as a pause/gap.
+
+    Returns:
+        DataFrame with one row per (conversation_id, speaker_id) pair.
+    """
+    return extract_features_multi(utterances_df, target_pairs, [ExtractionCondition(gap_tol=gap_tol)])[0]
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--utterances_parquet", required=True)
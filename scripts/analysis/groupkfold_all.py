@@ -16,14 +16,20 @@ from __future__ import annotations
 import argparse
 import glob
 import re
+import sys
 import time
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import GroupKFold, KFold
-from sklearn.preprocessing import StandardScaler
+
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import run_permutation_test as run_perm  # noqa: E402
 
 ALL_FEATURES = [
     "PG_speech_ratio", "PG_pause_mean", "PG_pause_p50", "PG_pause_p90",
@@ -36,51 +42,6 @@ ALL_FEATURES = [
 ]
 
 
-def pearsonr(a, b) -> float:
-    a = np.asarray(a, float)
-    b = np.asarray(b, float)
-    a = a - a.mean()
-    b = b - b.mean()
-    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
-    return float((a * b).sum() / den) if den != 0 else float("nan")
-
-
-def cv_ridge_r(X, y, splits, seed, alpha, groups=None):
-    if groups is not None:
-        kf = GroupKFold(n_splits=splits)
-        split_iter = kf.split(X, y, groups)
-    else:
-        kf = KFold(n_splits=splits, shuffle=True, random_state=seed)
-        split_iter = kf.split(X)
-
-    rs = []
-    for tr, te in split_iter:
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
-
-
-def run_perm(X, y, splits, seed, alpha, n_perm, groups=None):
-    r_obs = cv_ridge_r(X, y, splits, seed, alpha, groups)
-    rng = np.random.default_rng(seed)
-    r_perm = np.empty(n_perm, float)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        r_perm[i] = cv_ridge_r(X, yp, splits, seed, alpha, groups)
-    p = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
-    return r_obs, p
-
-
 def parse_trait_teacher(path: str):
     stem = path.split("/")[-1].replace(".parquet", "")
     m = re.search(r"_XY_(\w+)only_(.+)$", stem)
@@ -98,6 +59,9 @@ def main():
     ap.add_argument("--cv_folds", type=int, default=5)
     ap.add_argument("--n_perm", type=int, default=1000)
     ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--n_jobs", type=int, default=None,
+                    help="Permutation worker processes (-1 = all cores); "
+                    "omit for the original single RNG stream")
     args = ap.parse_args()
 
     meta = pd.read_csv(args.metadata_tsv, sep="\t")
@@ -132,8 +96,10 @@ def main():
         print(f"[{i+1}/{len(files)}] {trait} × {teacher} (N={len(y)})")
 
         t0 = time.time()
-        r_kf, p_kf = run_perm(X, y, args.cv_folds, args.seed, args.alpha, args.n_perm, groups=None)
-        r_gkf, p_gkf = run_perm(X, y, args.cv_folds, args.seed, args.alpha, args.n_perm, groups=groups)
+        r_kf, p_kf = run_perm(X, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+                              groups=None, n_jobs=args.n_jobs)
+        r_gkf, p_gkf = run_perm(X, y, args.cv_folds, args.seed, args.alpha, args.n_perm,
+                                groups=groups, n_jobs=args.n_jobs)
         elapsed = time.time() - t0
 
         delta_r = r_gkf - r_kf
@@ -15,14 +15,20 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import sys
 import time
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import GroupKFold, KFold
-from sklearn.preprocessing import StandardScaler
+
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import run_permutation_test as run_permutation  # noqa: E402
 
 # 19 explanatory features (same as confound_analysis.py)
 ALL_FEATURES = [
@@ -36,57 +42,6 @@ ALL_FEATURES = [
 ]
 
 
-def pearsonr(a, b) -> float:
-    a = np.asarray(a, float)
-    b = np.asarray(b, float)
-    a = a - a.mean()
-    b = b - b.mean()
-    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
-    return float((a * b).sum() / den) if den != 0 else float("nan")
-
-
-def cv_ridge_r(X, y, splits, seed, alpha, groups=None):
-    """CV Ridge regression with optional GroupKFold."""
-    if groups is not None:
-        kf = GroupKFold(n_splits=splits)
-        split_iter = kf.split(X, y, groups)
-    else:
-        kf = KFold(n_splits=splits, shuffle=True, random_state=seed)
-        split_iter = kf.split(X)
-
-    rs = []
-    for tr, te in split_iter:
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
-
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
-
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
-
-
-def run_permutation(X, y, splits, seed, alpha, n_perm, groups=None):
-    r_obs = cv_ridge_r(X, y, splits, seed, alpha, groups)
-
-    rng = np.random.default_rng(seed)
-    r_perm = np.empty(n_perm, float)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        r_perm[i] = cv_ridge_r(X, yp, splits, seed, alpha, groups)
-
-    p = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
-    return r_obs, p
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--xy_parquet", required=True)
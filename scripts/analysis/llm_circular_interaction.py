@@ -30,6 +30,11 @@ Usage:
         --seed 42 \\
         --out_dir artifacts/analysis/results/circular_interaction
 
+    # Batched Step 4 (one JSON request per dialogue instead of one per item):
+    python scripts/analysis/llm_circular_interaction.py \\
+        --model_id anthropic.claude-sonnet-4-20250514-v1:0 \\
+        --scoring batch
+
 Requirements: 7.1, 7.2, 7.3, 7.4, 7.5, 7.7
 """
 from __future__ import annotations
@@ -38,7 +43,10 @@ import argparse
 import json
 import logging
 import os
+import re
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, dataclass
 from pathlib import Path
 
@@ -46,6 +54,14 @@ import boto3
 import numpy as np
 from botocore.config import Config
 
+# ── Sibling imports ──────────────────────────────────────────────────
+# llm_cache.py lives in scripts/ (not a package); add it to sys.path.
+_SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+if str(_SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPTS_DIR))
+
+from llm_cache import LLMCache, default_cache, set_default_cache  # noqa: E402
+
 # ── Logging ──────────────────────────────────────────────────────────
 logging.basicConfig(
     level=logging.INFO,
@@ -124,6 +140,9 @@ SCALE = [
 ]
 S2I = {s: i for i, s in enumerate(SCALE)}  # 0..4
 
+# Step 4 scoring modes: one request per item, or one JSON request per dialogue
+SCORING_MODES = ("item", "batch")
+
 
 # ── Data classes ─────────────────────────────────────────────────────
 
@@ -227,6 +246,26 @@ Very Accurate
 
 Do not include any explanation, punctuation, or additional text. Return only the exact phrase from the list above."""
 
+PROMPT_PERSONALITY_ESTIMATION_BATCH = """あなたのタスクは、以下に示す参加者の日常会話テキストを根拠として、IPIP-NEO-120 の質問項目に回答することです。
+あなた自身がこの会話の話者Aになりきって、その人の性格特性が反映されるように答えてください。
+推論される性格特性に基づいて判断し、会話内容が示す傾向や行動をよく考えてください。
+
+以下の各質問について、最も適切な選択肢を次から1つだけ選んでください（必ず下の英語の文言をそのまま使ってください）:
+Very Inaccurate
+Moderately Inaccurate
+Neither Accurate Nor Inaccurate
+Moderately Accurate
+Very Accurate
+
+IPIP-NEO-120 questions to answer:
+{items_block}
+
+Participant's conversation:
+{transcript}
+
+Return only a JSON object of this form, with one entry per question above and no other text:
+{{"answers": [{{"item_id": <item_id>, "answer": "<exact phrase>"}}, ...]}}"""
+
 
 # ── Bedrock API helpers ──────────────────────────────────────────────
 
@@ -260,6 +299,46 @@ def _normalize_choice(text: str) -> str | None:
     return None
 
 
+def _format_items_block(items: list[dict]) -> str:
+    """Render items as ``[item_id] statement`` lines for the batch prompt."""
+    return "\n".join(f"[{it['item_id']}] {it['text']}" for it in items)
+
+
+def _parse_batch_answers(text: str, items: list[dict]) -> dict[int, str | None]:
+    """Parse a batch-scoring JSON response into ``{item_id: choice}``.
+
+    Accepts ``{"answers": [{"item_id": .., "answer": ..}, ...]}`` or a flat
+    ``{"<item_id>": "<answer>"}`` mapping. Items that are missing or whose
+    answer fails :func:`_normalize_choice` map to ``None``.
+    """
+    out: dict[int, str | None] = {int(it["item_id"]): None for it in items}
+    m = re.search(r"\{.*\}", text or "", flags=re.DOTALL)
+    if not m:
+        return out
+    try:
+        obj = json.loads(m.group(0))
+    except ValueError:
+        return out
+    if not isinstance(obj, dict):
+        return out
+
+    raw: dict[str, object] = {}
+    answers = obj.get("answers")
+    if isinstance(answers, list):
+        for a in answers:
+            if isinstance(a, dict) and "item_id" in a:
+                raw[str(a.get("item_id")).strip()] = a.get("answer")
+    elif isinstance(answers, dict):
+        raw = {str(k).strip(): v for k, v in answers.items()}
+    else:
+        raw = {str(k).strip(): v for k, v in obj.items()}
+
+    for item_id in out:
+        v = raw.get(str(item_id))
+        out[item_id] = _normalize_choice(v) if isinstance(v, str) else None
+    return out
+
+
 def _resolve_inference_profile(model_id: str, region: str) -> str:
     """Resolve a bare model ID to an inference profile ID if needed.
 
@@ -304,9 +383,15 @@ def call_bedrock(
     temperature: float = 0.7,
     seed: int | None = None,
     region: str = REGION,
+    cache: LLMCache | None = None,
 ) -> str:
     """Call Bedrock converse API with retry logic.
 
+    Responses are served from / stored in the shared LLM response cache
+    (``llm_cache.default_cache()`` unless ``cache`` is given), keyed on the
+    resolved model ID, prompt, temperature, max_tokens and seed. Sampled
+    calls (temperature > 0) bypass the cache unless it has ``cache_sampled``.
+
     Args:
         client: boto3 bedrock-runtime client.
         model_id: Bedrock model identifier (bare or inference profile).
@@ -315,6 +400,7 @@ def call_bedrock(
         temperature: Sampling temperature.
         seed: Random seed for reproducibility (model-dependent).
         region: AWS region (used to resolve inference profile prefix).
+        cache: Response cache (default: process-wide shared cache).
 
     Returns:
         Generated text response.
@@ -323,7 +409,27 @@ def call_bedrock(
         RuntimeError: If all retries are exhausted.
     """
     resolved_model_id = _resolve_inference_profile(model_id, region)
+    cache = cache if cache is not None else default_cache()
+    return cache.get_or_call(
+        lambda: _converse_with_retry(client, resolved_model_id, prompt, max_tokens, temperature, seed),
+        model_id=resolved_model_id,
+        system="",
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        extra={"seed": int(seed)} if seed is not None else None,
+    )
+
 
+def _converse_with_retry(
+    client,
+    resolved_model_id: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    seed: int | None,
+) -> str:
+    """Uncached Bedrock converse call; retries empty responses and API errors."""
     # Some models (e.g. Claude Sonnet 4) do not support the seed parameter
     # in additionalModelRequestFields.  Only pass seed for models known to
     # accept it (currently none of the Anthropic models do).
@@ -375,6 +481,21 @@ def call_bedrock(
 
 # ── Mock data for dry-run mode ───────────────────────────────────────
 
+def _mock_item_choice(seed: int, item_id: int, label: str) -> str:
+    """Deterministic mock answer for one item (same draw in per-item and batch mode)."""
+    rng = np.random.default_rng(seed + item_id + hash(label) % 10000)
+    return SCALE[int(rng.choice([0, 1, 2, 3, 4]))]
+
+
+def _mock_batch_response(items: list[dict], seed: int, label: str) -> str:
+    """Mock batch-scoring JSON response built from :func:`_mock_item_choice`."""
+    answers = [
+        {"item_id": it["item_id"], "answer": _mock_item_choice(seed, it["item_id"], label)}
+        for it in items
+    ]
+    return json.dumps({"answers": answers}, ensure_ascii=False)
+
+
 def _generate_mock_dialogue(c_level: str, seed: int) -> str:
     """Generate a mock dialogue for dry-run testing."""
     rng = np.random.default_rng(seed)
@@ -502,6 +623,10 @@ class CircularInteractionPipeline:
         out_dir: Output directory for results.
         dry_run: If True, use mock data instead of API calls.
         region: AWS region for Bedrock (default: ap-northeast-1).
+        scoring: "item" (one request per IPIP item) or "batch" (all items of
+            the trait in one JSON request, per-item fallback for unparsable
+            answers).
+        max_workers: Dialogue variants scored concurrently in Step 4.
     """
 
     def __init__(
@@ -512,6 +637,8 @@ class CircularInteractionPipeline:
         out_dir: str = "artifacts/analysis/results/circular_interaction",
         dry_run: bool = False,
         region: str = REGION,
+        scoring: str = "item",
+        max_workers: int = 6,
     ):
         self.model_id = model_id
         self.target_feature = target_feature
@@ -519,6 +646,11 @@ class CircularInteractionPipeline:
         self.out_dir = Path(out_dir)
         self.dry_run = dry_run
         self.region = region
+        self.scoring = scoring
+        self.max_workers = max(1, int(max_workers))
+
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring}. Available: {list(SCORING_MODES)}")
 
         # Validate target feature
         if target_feature not in FEATURE_CANDIDATES:
@@ -540,6 +672,7 @@ class CircularInteractionPipeline:
         self.manipulated_increase_low: str | None = None
         self.manipulated_decrease_low: str | None = None
         self.scores: dict[str, float] = {}
+        self.item_fallbacks: dict[str, list[int]] = {}
 
     def _get_client(self):
         """Lazily initialize Bedrock client."""
@@ -715,12 +848,62 @@ class CircularInteractionPipeline:
 
     # ── Step 4: Personality estimation ───────────────────────────────
 
+    def _ask_item(self, item: dict, dialogue: str, label: str) -> str | None:
+        """Ask a single IPIP item; returns the normalized choice or None."""
+        if self.dry_run:
+            return _mock_item_choice(self.seed, item["item_id"], label)
+
+        prompt = PROMPT_PERSONALITY_ESTIMATION.format(
+            statement=item["text"],
+            transcript=dialogue,
+        )
+        response = call_bedrock(
+            self._get_client(),
+            self.model_id,
+            prompt,
+            max_tokens=128,
+            temperature=0.0,
+            seed=self.seed,
+            region=self.region,
+        )
+        choice = _normalize_choice(response)
+        if choice is None:
+            logger.warning(
+                "  Could not parse response for item %d: '%s'",
+                item["item_id"],
+                response[:100],
+            )
+        return choice
+
+    def _ask_batch(self, items: list[dict], dialogue: str, label: str) -> dict[int, str | None]:
+        """Ask all items in one structured-JSON request; unparsable items map to None."""
+        if self.dry_run:
+            response = _mock_batch_response(items, self.seed, label)
+        else:
+            prompt = PROMPT_PERSONALITY_ESTIMATION_BATCH.format(
+                items_block=_format_items_block(items),
+                transcript=dialogue,
+            )
+            response = call_bedrock(
+                self._get_client(),
+                self.model_id,
+                prompt,
+                max_tokens=64 + 32 * len(items),
+                temperature=0.0,
+                seed=self.seed,
+                region=self.region,
+            )
+        return _parse_batch_answers(response, items)
+
     def _estimate_single_score(
         self, dialogue: str, label: str
     ) -> float:
         """Estimate Big5 C score for a single dialogue.
 
         Uses IPIP-NEO-120 subset items and the virtual teacher protocol.
+        In "batch" scoring mode the transcript is sent once for all items;
+        only items whose answer fails ``_normalize_choice`` are re-asked
+        one by one.
 
         Args:
             dialogue: Conversation text to evaluate.
@@ -729,39 +912,30 @@ class CircularInteractionPipeline:
         Returns:
             Mean C score (0-4 scale).
         """
+        if self.scoring == "batch":
+            choices = self._ask_batch(C_ITEMS_SUBSET, dialogue, label)
+            fallback_ids = [item_id for item_id, c in choices.items() if c is None]
+            if fallback_ids:
+                logger.warning(
+                    "  %s: %d/%d batch answers unparsable; asking per item",
+                    label,
+                    len(fallback_ids),
+                    len(C_ITEMS_SUBSET),
+                )
+            for item in C_ITEMS_SUBSET:
+                if item["item_id"] in fallback_ids:
+                    choices[item["item_id"]] = self._ask_item(item, dialogue, label)
+            self.item_fallbacks[label] = fallback_ids
+        else:
+            choices = {
+                item["item_id"]: self._ask_item(item, dialogue, label)
+                for item in C_ITEMS_SUBSET
+            }
+
         scores = []
         for item in C_ITEMS_SUBSET:
-            if self.dry_run:
-                # Mock: generate plausible score
-                rng = np.random.default_rng(
-                    self.seed + item["item_id"] + hash(label) % 10000
-                )
-                raw_score = float(rng.choice([0, 1, 2, 3, 4]))
-            else:
-                prompt = PROMPT_PERSONALITY_ESTIMATION.format(
-                    statement=item["text"],
-                    transcript=dialogue,
-                )
-                client = self._get_client()
-                response = call_bedrock(
-                    client,
-                    self.model_id,
-                    prompt,
-                    max_tokens=128,
-                    temperature=0.0,
-                    seed=self.seed,
-                    region=self.region,
-                )
-                choice = _normalize_choice(response)
-                if choice is None:
-                    logger.warning(
-                        "  Could not parse response for item %d: '%s'",
-                        item["item_id"],
-                        response[:100],
-                    )
-                    raw_score = 2.0  # neutral fallback
-                else:
-                    raw_score = float(S2I[choice])
+            choice = choices[item["item_id"]]
+            raw_score = 2.0 if choice is None else float(S2I[choice])  # neutral fallback
 
             # Apply reverse scoring
             if item["reverse"] == 1:
@@ -805,12 +979,20 @@ class CircularInteractionPipeline:
             "low_decrease": self.manipulated_decrease_low,
         }
 
-        scores = {}
+        todo = {}
         for label, dialogue in dialogue_map.items():
             if dialogue is None:
                 logger.warning("  Skipping %s (no dialogue)", label)
                 continue
-            scores[label] = self._estimate_single_score(dialogue, label)
+            todo[label] = dialogue
+
+        self._get_client()  # create the shared client before fanning out
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                label: pool.submit(self._estimate_single_score, dialogue, label)
+                for label, dialogue in todo.items()
+            }
+            scores = {label: fut.result() for label, fut in futures.items()}
 
         self.scores = scores
         return scores
@@ -945,9 +1127,11 @@ class CircularInteractionPipeline:
                 "regression_coef_sign": self.regression_coef_sign,
                 "seed": self.seed,
                 "dry_run": self.dry_run,
+                "scoring": self.scoring,
             },
             "feature_info": self.feature_info,
             "scores": self.scores,
+            "item_fallbacks": self.item_fallbacks,
             "results": [asdict(r) for r in results],
         }
 
@@ -1065,6 +1249,12 @@ class CircularInteractionPipeline:
         # Step 6
         self.report_results(results)
 
+        if not self.dry_run:
+            stats = default_cache().stats()
+            logger.info(
+                "LLM cache: %d hits, %d misses (%s)",
+                stats["hits"], stats["misses"], stats["path"] or "disabled",
+            )
         logger.info("Pipeline complete. Results saved to %s", self.out_dir)
         return results
 
@@ -1142,8 +1332,43 @@ def main():
         default=REGION,
         help=f"AWS region for Bedrock (default: {REGION})",
     )
+    ap.add_argument(
+        "--scoring",
+        default="item",
+        choices=list(SCORING_MODES),
+        help=(
+            "Step 4 scoring: 'item' = one request per IPIP item (default), "
+            "'batch' = all items in one JSON request per dialogue"
+        ),
+    )
+    ap.add_argument(
+        "--max_workers",
+        type=int,
+        default=6,
+        help="Dialogue variants scored concurrently in Step 4 (default: 6)",
+    )
+    ap.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        dest="no_llm_cache",
+        help="Always call Bedrock; do not read/write the shared LLM response cache",
+    )
+    ap.add_argument(
+        "--llm-cache-sampled",
+        action="store_true",
+        dest="llm_cache_sampled",
+        help=(
+            "Also replay cached responses for sampled calls (temperature > 0: "
+            "dialogue generation / manipulation). Default: those always call Bedrock"
+        ),
+    )
     args = ap.parse_args()
 
+    if args.no_llm_cache:
+        set_default_cache(LLMCache(None))
+    elif args.llm_cache_sampled:
+        default_cache().cache_sampled = True
+
     pipeline = CircularInteractionPipeline(
         model_id=args.model_id,
         target_feature=args.target_feature,
@@ -1151,6 +1376,8 @@ def main():
         out_dir=args.out_dir,
         dry_run=args.dry_run,
         region=args.region,
+        scoring=args.scoring,
+        max_workers=args.max_workers,
     )
 
     results = pipeline.run()
@@ -12,6 +12,12 @@ coefficients.  The p-value for each feature is:
 
     p = (count(|β_perm[i]| >= |β_obs[i]|) + 1) / (n_perm + 1)
 
+Because X is fixed across permutations, the default ``batched`` engine
+solves (XcᵀXc + αI) once and obtains every permuted coefficient vector as
+a single matrix product with the (N × n_perm) block of permuted y.  The
+``sklearn`` engine keeps the original one-Ridge-per-permutation loop for
+cross-checking; both consume the RNG identically.
+
 Usage:
     python scripts/analysis/permutation_coef_test.py \
         --xy_parquet artifacts/analysis/datasets/cejc_home2_hq1_XY_Conly_sonnet.parquet \
@@ -21,6 +27,7 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import sys
 import warnings
 from pathlib import Path
 
@@ -30,6 +37,14 @@ from sklearn.impute import SimpleImputer
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import PERM_BLOCK, permuted_targets, ridge_coef_operator  # noqa: E402
+
 # ── Feature sets ─────────────────────────────────────────────────────
 CLASSICAL_FEATURES = [
     "PG_speech_ratio",
@@ -59,6 +74,8 @@ NOVEL_FEATURES = [
 
 ALL_FEATURES = CLASSICAL_FEATURES + NOVEL_FEATURES  # 19
 
+ENGINES = ("batched", "sklearn")
+
 
 # ── Core testable function ───────────────────────────────────────────
 def run_permutation_coef_test(
@@ -68,6 +85,7 @@ def run_permutation_coef_test(
     alpha: float = 100.0,
     n_perm: int = 5000,
     seed: int = 42,
+    engine: str = "batched",
 ) -> pd.DataFrame:
     """Run permutation test on Ridge regression coefficients.
 
@@ -84,6 +102,8 @@ def run_permutation_coef_test(
         alpha: Ridge regularisation parameter.
         n_perm: Number of permutation rounds.
         seed: Random seed.
+        engine: ``"batched"`` (closed-form, one solve for all permutations)
+            or ``"sklearn"`` (one ``Ridge.fit`` per permutation).
 
     Returns:
         DataFrame with columns: feature, coef_obs, p_value, significant.
@@ -91,7 +111,11 @@ def run_permutation_coef_test(
 
     Raises:
         KeyError: If any *feature_cols* are missing from *df*.
+        ValueError: If *engine* is unknown.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (expected one of {ENGINES})")
+
     # ── Validate feature columns ─────────────────────────────────────
     missing = [c for c in feature_cols if c not in df.columns]
     if missing:
@@ -128,13 +152,24 @@ def run_permutation_coef_test(
     count_ge = np.zeros(n_feat, dtype=int)
 
     rng = np.random.default_rng(seed)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(X, yp)
-        count_ge += (np.abs(m.coef_) >= np.abs(beta_obs)).astype(int)
-        if (i + 1) % 500 == 0:
-            print(f"    perm {i + 1}/{n_perm} done")
+    if engine == "batched":
+        A = ridge_coef_operator(X, alpha)  # (n_features, N)
+        abs_obs = np.abs(beta_obs)[:, None]
+        done = 0
+        while done < n_perm:
+            b = min(PERM_BLOCK, n_perm - done)
+            beta_perm = A @ permuted_targets(y, rng, b)  # (n_features, b)
+            count_ge += (np.abs(beta_perm) >= abs_obs).sum(axis=1)
+            done += b
+            print(f"    perm {done}/{n_perm} done")
+    else:
+        for i in range(n_perm):
+            yp = rng.permutation(y)
+            m = Ridge(alpha=alpha, random_state=seed)
+            m.fit(X, yp)
+            count_ge += (np.abs(m.coef_) >= np.abs(beta_obs)).astype(int)
+            if (i + 1) % 500 == 0:
+                print(f"    perm {i + 1}/{n_perm} done")
 
     p_values = (count_ge + 1.0) / (n_perm + 1.0)
 
@@ -160,6 +195,9 @@ def main():
     ap.add_argument("--cv_folds", type=int, default=5, help="CV folds (unused, kept for CLI compat)")
     ap.add_argument("--n_perm", type=int, default=5000, help="Permutation rounds")
     ap.add_argument("--seed", type=int, default=42, help="Random seed")
+    ap.add_argument("--engine", choices=ENGINES, default="batched",
+                    help="batched = closed-form solve for all permutations; "
+                    "sklearn = one Ridge fit per permutation")
     ap.add_argument("--out_dir", required=True, help="Output directory")
     args = ap.parse_args()
 
@@ -179,7 +217,7 @@ def main():
     print(f"\n{'='*60}")
     print(f"  Permutation coefficient test")
     print(f"  y_col={args.y_col}, N features={len(ALL_FEATURES)}")
-    print(f"  alpha={args.alpha}, n_perm={args.n_perm}, seed={args.seed}")
+    print(f"  alpha={args.alpha}, n_perm={args.n_perm}, seed={args.seed}, engine={args.engine}")
     print(f"{'='*60}")
 
     result = run_permutation_coef_test(
@@ -189,6 +227,7 @@ def main():
         alpha=args.alpha,
         n_perm=args.n_perm,
         seed=args.seed,
+        engine=args.engine,
     )
 
     if result.empty:
@@ -2,39 +2,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import argparse
+import sys
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import KFold
-from sklearn.preprocessing import StandardScaler
-
-def pearsonr(a, b) -> float:
-    a=np.asarray(a,float); b=np.asarray(b,float)
-    a=a-a.mean(); b=b-b.mean()
-    den=np.sqrt((a*a).sum())*np.sqrt((b*b).sum())
-    return float((a*b).sum()/den) if den!=0 else float("nan")
-
-def cv_ridge_r(X, y, folds, seed, alpha):
-    kf = KFold(n_splits=folds, shuffle=True, random_state=seed)
-    rs=[]
-    for tr, te in kf.split(X):
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
 
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
 
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
+from ridge_cv_core import run_permutation_test  # noqa: E402
 
 def main():
     ap=argparse.ArgumentParser()
@@ -68,15 +48,8 @@ def main():
     X = X[ok]
     y = y[ok]
 
-    r_obs=cv_ridge_r(X,y,args.cv_folds,args.seed,args.alpha)
-
-    rng=np.random.default_rng(args.seed)
-    r_perm=np.empty(args.n_perm,float)
-    for i in range(args.n_perm):
-        yp=rng.permutation(y)
-        r_perm[i]=cv_ridge_r(X,yp,args.cv_folds,args.seed,args.alpha)
+    r_obs,p=run_permutation_test(X,y,args.cv_folds,args.seed,args.alpha,args.n_perm)
 
-    p=(np.sum(np.abs(r_perm)>=abs(r_obs))+1.0)/(args.n_perm+1.0)
     print(f"alpha={args.alpha}")
     print(f"r_obs={r_obs:.3f}")
     print(f"p(|r|)={p:.4f}  (n_perm={args.n_perm})")
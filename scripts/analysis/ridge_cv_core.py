@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Shared Ridge CV + permutation test core (fold-cached).
+
+All permutation scripts in this directory score the same model: per fold,
+median imputation → StandardScaler → Ridge(alpha), evaluated by the mean
+Pearson r between held-out y and predictions.  The fold splits and X never
+change across permutations, only y does, so everything that depends on X
+is computed once per fold:
+
+    Xtr, Xte  = scaler(imputer(X))            (sklearn, fitted on train)
+    A         = (XcᵀXc + αI)⁻¹Xcᵀ             Xc = Xtr - mean(Xtr)
+    H         = (Xte - mean(Xtr)) A           (n_test × n_train hat matrix)
+    ŷ         = H ytr + mean(ytr)
+
+which is exactly ``Ridge(alpha, fit_intercept=True).fit(Xtr, ytr)
+.predict(Xte)``.  A block of permuted targets (N × B) is then scored with
+one matrix product per fold.
+
+Permutations are drawn with ``rng.permutation`` in the same order as the
+original per-permutation loops, so r_obs and p are unchanged for a seed.
+
+With ``n_jobs`` set, permutations are instead sharded into fixed blocks of
+``SEED_BLOCK``, block k drawing from ``SeedSequence(seed).spawn(...)[k]``,
+and the blocks are scored in a process pool.  The block layout does not
+depend on the worker count, so p is bit-identical for any ``n_jobs``.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import GroupKFold, KFold
+from sklearn.preprocessing import StandardScaler
+
+PERM_BLOCK = 1000  # permutations per vectorized pass (bounds Y_perm memory)
+SEED_BLOCK = 250  # permutations per independently seeded shard (n_jobs mode)
+
+
+# ── Basic helpers ────────────────────────────────────────────────────
+def pearsonr(a, b) -> float:
+    """Pearson correlation coefficient (NaN-safe)."""
+    a = np.asarray(a, float)
+    b = np.asarray(b, float)
+    a = a - a.mean()
+    b = b - b.mean()
+    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
+    return float((a * b).sum() / den) if den != 0 else float("nan")
+
+
+def pearsonr_cols(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Column-wise ``pearsonr`` for two (n × k) arrays (NaN where undefined)."""
+    a = A - A.mean(axis=0)
+    b = B - B.mean(axis=0)
+    den = np.sqrt((a * a).sum(axis=0)) * np.sqrt((b * b).sum(axis=0))
+    num = (a * b).sum(axis=0)
+    out = np.full(num.shape, np.nan)
+    nz = den != 0
+    out[nz] = num[nz] / den[nz]
+    return out
+
+
+def ridge_coef_operator(X: np.ndarray, alpha: float) -> np.ndarray:
+    """Return A = (XcᵀXc + αI)⁻¹Xcᵀ so that β = A @ y for any target y.
+
+    Matches ``Ridge(alpha, fit_intercept=True)``: X is column-centred, and
+    since Xcᵀ1 = 0 the intercept never needs to be removed from y.
+    """
+    Xc = X - X.mean(axis=0)
+    gram = Xc.T @ Xc
+    gram[np.diag_indices_from(gram)] += alpha
+    return np.linalg.solve(gram, Xc.T)
+
+
+def permuted_targets(y: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    """Draw *n* permutations of *y* as columns of an (N × n) block.
+
+    Consumes *rng* exactly like ``n`` successive ``rng.permutation(y)`` calls.
+    """
+    idx = np.empty((len(y), n), dtype=np.intp)
+    for j in range(n):
+        idx[:, j] = rng.permutation(len(y))
+    return y[idx]
+
+
+def cv_splits(X, y, folds, seed, groups=None):
+    """KFold(shuffle, seed) splits, or GroupKFold when *groups* is given."""
+    if groups is not None:
+        return list(GroupKFold(n_splits=folds).split(X, y, groups))
+    return list(KFold(n_splits=folds, shuffle=True, random_state=seed).split(X))
+
+
+# ── Fold cache ───────────────────────────────────────────────────────
+@dataclass
+class FoldOperator:
+    """Precomputed y-independent pieces of one CV fold."""
+
+    train_idx: np.ndarray
+    test_idx: np.ndarray
+    hat: np.ndarray  # (n_test, n_train)
+
+
+def precompute_folds(X, y, folds, seed, alpha, groups=None) -> list[FoldOperator]:
+    """Fit imputer/scaler and build the Ridge hat matrix for every fold."""
+    X = np.asarray(X, float)
+    ops: list[FoldOperator] = []
+    for tr, te in cv_splits(X, y, folds, seed, groups):
+        imp = SimpleImputer(strategy="median")
+        Xtr = imp.fit_transform(X[tr])
+        Xte = imp.transform(X[te])
+
+        sc = StandardScaler()
+        Xtr = sc.fit_transform(Xtr)
+        Xte = sc.transform(Xte)
+
+        A = ridge_coef_operator(Xtr, alpha)
+        hat = (Xte - Xtr.mean(axis=0)) @ A
+        ops.append(FoldOperator(train_idx=tr, test_idx=te, hat=hat))
+    return ops
+
+
+def score_folds(ops: list[FoldOperator], Y: np.ndarray) -> np.ndarray:
+    """Mean fold Pearson r for each column of *Y* (N × k) → shape (k,)."""
+    Y = np.asarray(Y, float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    rs = np.empty((len(ops), Y.shape[1]))
+    for f, op in enumerate(ops):
+        Ytr = Y[op.train_idx]
+        Yte = Y[op.test_idx]
+        Yh = op.hat @ Ytr + Ytr.mean(axis=0)
+        rs[f] = pearsonr_cols(Yte, Yh)
+    return rs.mean(axis=0)
+
+
+# ── Sharded multi-process scheduler ──────────────────────────────────
+_WORKER_STATE: dict = {}
+
+
+def _init_worker(ops: list[FoldOperator], y: np.ndarray) -> None:
+    _WORKER_STATE["ops"] = ops
+    _WORKER_STATE["y"] = y
+
+
+def _score_seeded_block(ops, y, seed_seq: np.random.SeedSequence, n: int) -> np.ndarray:
+    rng = np.random.default_rng(seed_seq)
+    return score_folds(ops, permuted_targets(y, rng, n))
+
+
+def _worker_score_block(task: tuple[np.random.SeedSequence, int]) -> np.ndarray:
+    seed_seq, n = task
+    return _score_seeded_block(_WORKER_STATE["ops"], _WORKER_STATE["y"], seed_seq, n)
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Map ``n_jobs`` to a worker count (-1 → all cores, like sklearn)."""
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def sharded_permutation_scores(
+    ops: list[FoldOperator],
+    y: np.ndarray,
+    seed: int,
+    n_perm: int,
+    n_jobs: int,
+    *,
+    verbose: bool = False,
+) -> np.ndarray:
+    """Score *n_perm* block-seeded permutations of *y*, using *n_jobs* processes."""
+    sizes = [min(SEED_BLOCK, n_perm - s) for s in range(0, n_perm, SEED_BLOCK)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    workers = min(resolve_n_jobs(n_jobs), max(1, len(tasks)))
+
+    if workers == 1:
+        blocks = (_score_seeded_block(ops, y, s, n) for s, n in tasks)
+        return _collect_blocks(blocks, n_perm, verbose)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(ops, y),
+    ) as ex:
+        return _collect_blocks(ex.map(_worker_score_block, tasks), n_perm, verbose)
+
+
+def _collect_blocks(blocks, n_perm: int, verbose: bool) -> np.ndarray:
+    r_perm = np.empty(n_perm, float)
+    done = 0
+    for block in blocks:
+        r_perm[done:done + len(block)] = block
+        done += len(block)
+        if verbose:
+            print(f"    perm {done}/{n_perm} done")
+    return r_perm
+
+
+# ── Public API ───────────────────────────────────────────────────────
+def cv_ridge_r(X, y, folds, seed, alpha, groups=None) -> float:
+    """CV Ridge regression, return mean Pearson r across folds."""
+    ops = precompute_folds(X, y, folds, seed, alpha, groups)
+    return float(score_folds(ops, y)[0])
+
+
+def run_permutation_test(
+    X, y, folds, seed, alpha, n_perm, groups=None, *,
+    n_jobs: int | None = None,
+    verbose: bool = False,
+):
+    """Run Ridge CV + permutation test. Return (r_obs, p_value).
+
+    p = (count(|r_perm| >= |r_obs|) + 1) / (n_perm + 1).  With ``n_jobs=None``
+    permutations come from a single ``np.random.default_rng(seed)`` stream
+    (identical to the original scripts) and are scored in blocks of
+    ``PERM_BLOCK``.  With an integer ``n_jobs`` they are block-seeded and
+    scored by ``sharded_permutation_scores``; p then depends only on seed,
+    not on the worker count.
+    """
+    y = np.asarray(y, float)
+    ops = precompute_folds(X, y, folds, seed, alpha, groups)
+    r_obs = float(score_folds(ops, y)[0])
+
+    if n_jobs is not None:
+        r_perm = sharded_permutation_scores(ops, y, seed, n_perm, n_jobs, verbose=verbose)
+    else:
+        rng = np.random.default_rng(seed)
+        r_perm = np.empty(n_perm, float)
+        done = 0
+        while done < n_perm:
+            b = min(PERM_BLOCK, n_perm - done)
+            r_perm[done:done + b] = score_folds(ops, permuted_targets(y, rng, b))
+            done += b
+            if verbose:
+                print(f"    perm {done}/{n_perm} done")
+
+    p_val = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
+    return r_obs, float(p_val)
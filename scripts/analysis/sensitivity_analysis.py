@@ -37,13 +37,18 @@ if str(_SCRIPT_DIR) not in sys.path:
     sys.path.insert(0, str(_SCRIPT_DIR))
 
 import extract_interaction_features_min as eim  # noqa: E402
-from extract_interaction_features_min import extract_features  # noqa: E402
+from extract_interaction_features_min import (  # noqa: E402
+    ExtractionCondition,
+    PreparedUtterances,
+    evaluate_conditions,
+    prepare_utterances,
+)
 from ensemble_permutation import (  # noqa: E402
     DEFAULT_EXCLUDE,
     TEACHERS,
-    cv_ridge_r,
     load_trait_scores,
 )
+from ridge_cv_core import run_permutation_test  # noqa: E402
 
 # ── Constants ────────────────────────────────────────────────────────
 GAP_TOL_CONDITIONS: list[float] = [0.05, 0.1, 0.2, 0.3, 0.5, 1.0]
@@ -64,18 +69,14 @@ def _run_permutation(
     n_perm: int = DEFAULT_N_PERM,
     seed: int = DEFAULT_SEED,
     cv_folds: int = DEFAULT_CV_FOLDS,
+    n_jobs: int | None = None,
 ) -> tuple[float, float]:
-    """Run Ridge CV + permutation test, return (r_obs, p_value)."""
-    r_obs = cv_ridge_r(X, y, cv_folds, seed, alpha)
-
-    rng = np.random.default_rng(seed)
-    r_perm = np.empty(n_perm, float)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        r_perm[i] = cv_ridge_r(X, yp, cv_folds, seed, alpha)
+    """Run Ridge CV + permutation test, return (r_obs, p_value).
 
-    p_val = float((np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0))
-    return r_obs, p_val
+    ``n_jobs`` switches to the block-seeded process-pool scheduler (see
+    ridge_cv_core); ``None`` keeps the original single RNG stream.
+    """
+    return run_permutation_test(X, y, cv_folds, seed, alpha, n_perm, n_jobs=n_jobs)
 
 
 def _prepare_Xy(
@@ -99,6 +100,29 @@ def _prepare_Xy(
     return X[ok], y[ok], feat_cols
 
 
+def _target_pairs(base_features_df: pd.DataFrame) -> set[tuple[str, str]]:
+    """(conversation_id, speaker_id) pairs of the base feature set."""
+    return set(zip(
+        base_features_df["conversation_id"].astype(str),
+        base_features_df["speaker_id"].astype(str),
+    ))
+
+
+def _extract_conditions(
+    utterances_df: pd.DataFrame,
+    target_pairs: set[tuple[str, str]],
+    conditions: list[ExtractionCondition],
+    prepared: PreparedUtterances | None,
+) -> list[pd.DataFrame]:
+    """Feature DataFrames per condition; text processing runs at most once."""
+    if prepared is None:
+        prepared = prepare_utterances(utterances_df, target_pairs)
+    return [
+        df.replace([np.inf, -np.inf], np.nan)
+        for df in evaluate_conditions(prepared, conditions)
+    ]
+
+
 # ── gap_tol sensitivity ─────────────────────────────────────────────
 def run_gap_tol_sensitivity(
     utterances_df: pd.DataFrame,
@@ -110,11 +134,14 @@ def run_gap_tol_sensitivity(
     n_perm: int = DEFAULT_N_PERM,
     seed: int = DEFAULT_SEED,
     cv_folds: int = DEFAULT_CV_FOLDS,
+    n_jobs: int | None = None,
+    prepared: PreparedUtterances | None = None,
 ) -> list[dict]:
     """Run gap_tol sensitivity analysis.
 
-    For each gap_tol value, re-extract features and run Ridge + Permutation
-    test against ensemble Big5 trait scores.
+    Features for all gap_tol values are evaluated from one prepared
+    intermediate (texts are parsed once), then each is run through Ridge +
+    Permutation test against ensemble Big5 trait scores.
 
     Args:
         utterances_df: Raw utterances DataFrame.
@@ -125,14 +152,15 @@ def run_gap_tol_sensitivity(
         n_perm: Number of permutation rounds.
         seed: Random seed.
         cv_folds: Number of CV folds.
+        n_jobs: Permutation worker processes (None = single RNG stream).
+        prepared: Output of prepare_utterances for the same target_pairs
+            (shared across runners by run_analysis("all")); built here if None.
 
     Returns:
         List of dicts with keys: analysis_type, condition, trait, r_obs, p_value.
     """
     # Derive target_pairs from base features
-    target_pairs: set[tuple[str, str]] = set()
-    for _, row in base_features_df[["conversation_id", "speaker_id"]].iterrows():
-        target_pairs.add((str(row["conversation_id"]), str(row["speaker_id"])))
+    target_pairs = _target_pairs(base_features_df)
 
     # Load ensemble trait scores once
     scores_df = load_trait_scores(items_dir, trait, TEACHERS)
@@ -140,14 +168,14 @@ def run_gap_tol_sensitivity(
     exclude = set(DEFAULT_EXCLUDE) | {"trait_score"}
 
     results: list[dict] = []
+    feat_dfs = _extract_conditions(
+        utterances_df, target_pairs,
+        [ExtractionCondition(gap_tol=g) for g in GAP_TOL_CONDITIONS], prepared,
+    )
 
-    for gap_tol in GAP_TOL_CONDITIONS:
+    for gap_tol, feat_df in zip(GAP_TOL_CONDITIONS, feat_dfs):
         print(f"\n--- gap_tol = {gap_tol} ---")
 
-        # Re-extract features with this gap_tol
-        feat_df = extract_features(utterances_df, target_pairs, gap_tol=gap_tol)
-        feat_df = feat_df.replace([np.inf, -np.inf], np.nan)
-
         if feat_df.empty:
             warnings.warn(f"gap_tol={gap_tol}: no features extracted")
             results.append({
@@ -164,6 +192,7 @@ def run_gap_tol_sensitivity(
 
         r_obs, p_val = _run_permutation(
             X, y, alpha=alpha, n_perm=n_perm, seed=seed, cv_folds=cv_folds,
+            n_jobs=n_jobs,
         )
         print(f"  r_obs = {r_obs:.3f}, p = {p_val:.4f}")
 
@@ -193,12 +222,14 @@ def run_yesno_list_sensitivity(
     n_perm: int = DEFAULT_N_PERM,
     seed: int = DEFAULT_SEED,
     cv_folds: int = DEFAULT_CV_FOLDS,
+    n_jobs: int | None = None,
+    prepared: PreparedUtterances | None = None,
 ) -> list[dict]:
     """Run YES/NO prefix list sensitivity analysis.
 
     Compare narrow list (5 items) vs broad list (current 17 items) by
-    monkey-patching YESNO_PREFIXES in extract_interaction_features_min,
-    re-extracting features, and running Ridge + Permutation test.
+    evaluating features with each YES/NO prefix list (only the YES/NO label
+    is recomputed) and running Ridge + Permutation test.
 
     Args:
         utterances_df: Raw utterances DataFrame.
@@ -209,14 +240,15 @@ def run_yesno_list_sensitivity(
         n_perm: Number of permutation rounds.
         seed: Random seed.
         cv_folds: Number of CV folds.
+        n_jobs: Permutation worker processes (None = single RNG stream).
+        prepared: Output of prepare_utterances for the same target_pairs
+            (shared across runners by run_analysis("all")); built here if None.
 
     Returns:
         List of dicts with keys: analysis_type, condition, trait, r_obs, p_value.
     """
     # Derive target_pairs from base features
-    target_pairs: set[tuple[str, str]] = set()
-    for _, row in base_features_df[["conversation_id", "speaker_id"]].iterrows():
-        target_pairs.add((str(row["conversation_id"]), str(row["speaker_id"])))
+    target_pairs = _target_pairs(base_features_df)
 
     # Load ensemble trait scores once
     scores_df = load_trait_scores(items_dir, trait, TEACHERS)
@@ -229,20 +261,15 @@ def run_yesno_list_sensitivity(
     ]
 
     results: list[dict] = []
-    original_prefixes = eim.YESNO_PREFIXES
+    feat_dfs = _extract_conditions(
+        utterances_df, target_pairs,
+        [ExtractionCondition(gap_tol=0.05, yesno_prefixes=tuple(pl)) for _, pl in conditions],
+        prepared,
+    )
 
-    for cond_name, prefix_list in conditions:
+    for (cond_name, prefix_list), feat_df in zip(conditions, feat_dfs):
         print(f"\n--- yesno_list = {cond_name} ({len(prefix_list)} items) ---")
 
-        # Monkey-patch YESNO_PREFIXES for feature extraction
-        eim.YESNO_PREFIXES = prefix_list
-        try:
-            feat_df = extract_features(utterances_df, target_pairs, gap_tol=0.05)
-        finally:
-            eim.YESNO_PREFIXES = original_prefixes  # always restore
-
-        feat_df = feat_df.replace([np.inf, -np.inf], np.nan)
-
         if feat_df.empty:
             warnings.warn(f"yesno_list={cond_name}: no features extracted")
             results.append({
@@ -259,6 +286,7 @@ def run_yesno_list_sensitivity(
 
         r_obs, p_val = _run_permutation(
             X, y, alpha=alpha, n_perm=n_perm, seed=seed, cv_folds=cv_folds,
+            n_jobs=n_jobs,
         )
         print(f"  r_obs = {r_obs:.3f}, p = {p_val:.4f}")
 
@@ -303,6 +331,8 @@ def run_ne_yo_match_sensitivity(
     n_perm: int = DEFAULT_N_PERM,
     seed: int = DEFAULT_SEED,
     cv_folds: int = DEFAULT_CV_FOLDS,
+    n_jobs: int | None = None,
+    prepared: PreparedUtterances | None = None,
 ) -> list[dict]:
     """Run NE/YO matching method sensitivity analysis.
 
@@ -311,8 +341,8 @@ def run_ne_yo_match_sensitivity(
       - "1char":  single-char match (末尾「ね」/「よ」のみ)
       - "2char":  two-char-aware patterns
 
-    Monkey-patches eim._SFP_NE_RE / eim._SFP_YO_RE, re-extracts features,
-    and runs Ridge + Permutation test for each condition.
+    Evaluates features with each NE/YO pattern pair (only the SFP label is
+    recomputed) and runs Ridge + Permutation test for each condition.
 
     Args:
         utterances_df: Raw utterances DataFrame.
@@ -323,14 +353,15 @@ def run_ne_yo_match_sensitivity(
         n_perm: Number of permutation rounds.
         seed: Random seed.
         cv_folds: Number of CV folds.
+        n_jobs: Permutation worker processes (None = single RNG stream).
+        prepared: Output of prepare_utterances for the same target_pairs
+            (shared across runners by run_analysis("all")); built here if None.
 
     Returns:
         List of dicts with keys: analysis_type, condition, trait, r_obs, p_value.
     """
     # Derive target_pairs from base features
-    target_pairs: set[tuple[str, str]] = set()
-    for _, row in base_features_df[["conversation_id", "speaker_id"]].iterrows():
-        target_pairs.add((str(row["conversation_id"]), str(row["speaker_id"])))
+    target_pairs = _target_pairs(base_features_df)
 
     # Load ensemble trait scores once
     scores_df = load_trait_scores(items_dir, trait, TEACHERS)
@@ -338,25 +369,20 @@ def run_ne_yo_match_sensitivity(
     exclude = set(DEFAULT_EXCLUDE) | {"trait_score"}
 
     results: list[dict] = []
-    original_ne_re = eim._SFP_NE_RE
-    original_yo_re = eim._SFP_YO_RE
+    feat_dfs = _extract_conditions(
+        utterances_df, target_pairs,
+        [
+            ExtractionCondition(gap_tol=0.05, sfp_ne_re=ne_re, sfp_yo_re=yo_re)
+            for _, ne_re, yo_re in NE_YO_CONDITIONS
+        ],
+        prepared,
+    )
 
-    for cond_name, ne_re, yo_re in NE_YO_CONDITIONS:
+    for (cond_name, ne_re, yo_re), feat_df in zip(NE_YO_CONDITIONS, feat_dfs):
         print(f"\n--- ne_yo_match = {cond_name} ---")
         print(f"  NE pattern: {ne_re.pattern}")
         print(f"  YO pattern: {yo_re.pattern}")
 
-        # Monkey-patch _SFP_NE_RE / _SFP_YO_RE for feature extraction
-        eim._SFP_NE_RE = ne_re
-        eim._SFP_YO_RE = yo_re
-        try:
-            feat_df = extract_features(utterances_df, target_pairs, gap_tol=0.05)
-        finally:
-            eim._SFP_NE_RE = original_ne_re  # always restore
-            eim._SFP_YO_RE = original_yo_re
-
-        feat_df = feat_df.replace([np.inf, -np.inf], np.nan)
-
         if feat_df.empty:
             warnings.warn(f"ne_yo_match={cond_name}: no features extracted")
             results.append({
@@ -373,6 +399,7 @@ def run_ne_yo_match_sensitivity(
 
         r_obs, p_val = _run_permutation(
             X, y, alpha=alpha, n_perm=n_perm, seed=seed, cv_folds=cv_folds,
+            n_jobs=n_jobs,
         )
         print(f"  r_obs = {r_obs:.3f}, p = {p_val:.4f}")
 
@@ -401,6 +428,8 @@ def run_alpha_sensitivity(
     n_perm: int = DEFAULT_N_PERM,
     seed: int = DEFAULT_SEED,
     cv_folds: int = DEFAULT_CV_FOLDS,
+    n_jobs: int | None = None,
+    prepared: PreparedUtterances | None = None,
 ) -> list[dict]:
     """Run Ridge regularization strength (alpha) sensitivity analysis.
 
@@ -410,8 +439,9 @@ def run_alpha_sensitivity(
     model exactly, so the sweep quantifies how r_obs / p_value shift with
     regularization strength.
 
-    Note: the ``alpha`` keyword argument is ignored here (the sweep defines its
-    own alpha grid); it is accepted only for a uniform runner signature.
+    Note: the ``alpha`` and ``prepared`` keyword arguments are ignored here
+    (the sweep defines its own alpha grid and does not re-extract); they are
+    accepted only for a uniform runner signature.
     """
     # Load ensemble trait scores once
     scores_df = load_trait_scores(items_dir, trait, TEACHERS)
@@ -427,6 +457,7 @@ def run_alpha_sensitivity(
         print(f"\n--- alpha = {a} ---")
         r_obs, p_val = _run_permutation(
             X, y, alpha=a, n_perm=n_perm, seed=seed, cv_folds=cv_folds,
+            n_jobs=n_jobs,
         )
         print(f"  r_obs = {r_obs:.3f}, p = {p_val:.4f}")
         results.append({
@@ -457,6 +488,11 @@ def run_analysis(
 ) -> list[dict]:
     """Dispatch to the appropriate sensitivity analysis runner."""
     if analysis_type == "all":
+        # Text processing for gap_tol / yesno_list / ne_yo_match runs once.
+        if utterances_df is not None and kwargs.get("prepared") is None:
+            kwargs["prepared"] = prepare_utterances(
+                utterances_df, _target_pairs(base_features_df),
+            )
         all_results: list[dict] = []
         for atype in ANALYSIS_RUNNERS:
             all_results.extend(
@@ -504,6 +540,12 @@ def main():
     ap.add_argument("--n_perm", type=int, default=DEFAULT_N_PERM, help="Permutation rounds")
     ap.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
     ap.add_argument("--cv_folds", type=int, default=DEFAULT_CV_FOLDS, help="CV folds")
+    ap.add_argument(
+        "--n_jobs", type=int, default=None,
+        help="Permutation worker processes (-1 = all cores). Omit to keep the "
+             "original single RNG stream; any value gives identical p-values "
+             "regardless of worker count",
+    )
     ap.add_argument("--out_dir", required=True, help="Output directory")
     args = ap.parse_args()
 
@@ -537,6 +579,7 @@ def main():
         n_perm=args.n_perm,
         seed=args.seed,
         cv_folds=args.cv_folds,
+        n_jobs=args.n_jobs,
     )
 
     # Write output
@@ -10,8 +10,8 @@ Compare Ridge regression performance across three stages:
 Each stage uses Ridge (α=100) + 5-fold subject-wise CV + Permutation test.
 Δr between adjacent stages is computed.
 
-Reuses cv_ridge_r / run_permutation_test logic from confound_analysis.py
-and baseline_vs_extended.py.
+Uses the shared fold-cached run_permutation_test from ridge_cv_core.py
+(same logic as confound_analysis.py and baseline_vs_extended.py).
 
 Usage:
     python scripts/analysis/three_stage_ridge.py \
@@ -23,15 +23,20 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import sys
 import warnings
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import KFold
-from sklearn.preprocessing import StandardScaler
+
+# ── Sibling imports ──────────────────────────────────────────────────
+# Scripts in this directory are not a package; add parent to sys.path.
+_SCRIPT_DIR = Path(__file__).resolve().parent
+if str(_SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPT_DIR))
+
+from ridge_cv_core import run_permutation_test  # noqa: E402
 
 # ── Feature sets ─────────────────────────────────────────────────────
 DEMOGRAPHICS = ["confound_gender", "confound_age"]  # 2
@@ -65,56 +70,6 @@ NOVEL_FEATURES = [
 ALL_FEATURES = CLASSICAL_FEATURES + NOVEL_FEATURES  # 19
 
 
-# ── Core functions (reused from confound_analysis.py / baseline_vs_extended.py) ──
-def pearsonr(a, b) -> float:
-    """Pearson correlation coefficient (NaN-safe)."""
-    a = np.asarray(a, float)
-    b = np.asarray(b, float)
-    a = a - a.mean()
-    b = b - b.mean()
-    den = np.sqrt((a * a).sum()) * np.sqrt((b * b).sum())
-    return float((a * b).sum() / den) if den != 0 else float("nan")
-
-
-def cv_ridge_r(X, y, folds, seed, alpha):
-    """5-fold CV Ridge regression, return mean Pearson r."""
-    kf = KFold(n_splits=folds, shuffle=True, random_state=seed)
-    rs = []
-    for tr, te in kf.split(X):
-        Xtr, Xte = X[tr], X[te]
-        ytr, yte = y[tr], y[te]
-
-        imp = SimpleImputer(strategy="median")
-        Xtr = imp.fit_transform(Xtr)
-        Xte = imp.transform(Xte)
-
-        sc = StandardScaler()
-        Xtr = sc.fit_transform(Xtr)
-        Xte = sc.transform(Xte)
-
-        m = Ridge(alpha=alpha, random_state=seed)
-        m.fit(Xtr, ytr)
-        yh = m.predict(Xte)
-        rs.append(pearsonr(yte, yh))
-    return float(np.mean(rs))
-
-
-def run_permutation_test(X, y, folds, seed, alpha, n_perm):
-    """Run Ridge CV + permutation test. Return (r_obs, p_value)."""
-    r_obs = cv_ridge_r(X, y, folds, seed, alpha)
-
-    rng = np.random.default_rng(seed)
-    r_perm = np.empty(n_perm, float)
-    for i in range(n_perm):
-        yp = rng.permutation(y)
-        r_perm[i] = cv_ridge_r(X, yp, folds, seed, alpha)
-        if (i + 1) % 500 == 0:
-            print(f"    perm {i + 1}/{n_perm} done")
-
-    p_val = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
-    return r_obs, p_val
-
-
 # ── Metadata loading and confound preparation ────────────────────────
 def load_and_join_metadata(
     df: pd.DataFrame, metadata_tsv: str
@@ -212,6 +167,7 @@ def run_three_stage_analysis(
     seed: int = 42,
     trait: str = "unknown",
     teacher: str = "unknown",
+    n_jobs: int | None = None,
 ) -> pd.DataFrame:
     """Run three-stage Ridge regression analysis.
 
@@ -225,6 +181,7 @@ def run_three_stage_analysis(
         seed: Random seed.
         trait: Big5 trait name (for output).
         teacher: LLM teacher name (for output).
+        n_jobs: Permutation worker processes (None = single RNG stream).
 
     Returns:
         DataFrame with columns: trait, teacher, stage, n_features,
@@ -262,7 +219,9 @@ def run_three_stage_analysis(
             .apply(pd.to_numeric, errors="coerce")
             .to_numpy(dtype=float)
         )
-        r1, p1 = run_permutation_test(X1, y, cv_folds, seed, alpha, n_perm)
+        r1, p1 = run_permutation_test(
+            X1, y, cv_folds, seed, alpha, n_perm, n_jobs=n_jobs, verbose=True,
+        )
         print(f"  r_stage1 = {r1:.3f}, p = {p1:.4f}")
 
         results.append({
@@ -292,7 +251,9 @@ def run_three_stage_analysis(
         .apply(pd.to_numeric, errors="coerce")
         .to_numpy(dtype=float)
     )
-    r2, p2 = run_permutation_test(X2, y, cv_folds, seed, alpha, n_perm)
+    r2, p2 = run_permutation_test(
+        X2, y, cv_folds, seed, alpha, n_perm, n_jobs=n_jobs, verbose=True,
+    )
     print(f"  r_stage2 = {r2:.3f}, p = {p2:.4f}")
 
     delta_r_12 = float("nan")
@@ -331,7 +292,9 @@ def run_three_stage_analysis(
         .apply(pd.to_numeric, errors="coerce")
         .to_numpy(dtype=float)
     )
-    r3, p3 = run_permutation_test(X3, y, cv_folds, seed, alpha, n_perm)
+    r3, p3 = run_permutation_test(
+        X3, y, cv_folds, seed, alpha, n_perm, n_jobs=n_jobs, verbose=True,
+    )
     print(f"  r_stage3 = {r3:.3f}, p = {p3:.4f}")
 
     delta_r_23 = r3 - r2
@@ -368,6 +331,11 @@ def main():
     ap.add_argument("--cv_folds", type=int, default=5, help="CV folds")
     ap.add_argument("--n_perm", type=int, default=5000, help="Permutation rounds")
     ap.add_argument("--seed", type=int, default=42, help="Random seed")
+    ap.add_argument(
+        "--n_jobs", type=int, default=None,
+        help="Permutation worker processes (-1 = all cores); omit for the "
+        "original single RNG stream",
+    )
     ap.add_argument("--out_dir", required=True, help="Output directory")
     args = ap.parse_args()
 
@@ -402,6 +370,7 @@ def main():
         seed=args.seed,
         trait=trait,
         teacher=teacher,
+        n_jobs=args.n_jobs,
     )
 
     if result.empty:
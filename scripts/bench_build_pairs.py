@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_build_pairs.py
+
+Benchmark build_pairs (columnar) against build_pairs_rowloop (original) on a
+real utterances table, and check that both give the same pairs parquet.
+
+Usage
+  python scripts/bench_build_pairs.py \
+    --utterances s3://.../corpus=csj/utterances.parquet --region ap-northeast-1
+  python scripts/bench_build_pairs.py --utterances /tmp/csj_utterances.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from build_pragmatics_gold_from_utterances import (  # noqa: E402
+    build_pairs,
+    build_pairs_rowloop,
+    build_segments,
+    df_to_parquet_temp,
+    ensure_required_columns,
+    s3_download_to_temp,
+)
+
+
+def _timed(fn, *args, repeat: int = 1, **kwargs):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--utterances", required=True, help="local path or s3:// URI")
+    ap.add_argument("--region", default=None)
+    ap.add_argument("--loose-aizuchi", action="store_true")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--skip-rowloop", action="store_true", help="time build_pairs only")
+    args = ap.parse_args()
+
+    src = args.utterances
+    if src.startswith("s3://"):
+        src = s3_download_to_temp(src, region=args.region)
+    df_u = ensure_required_columns(pq.read_table(src).to_pandas())
+    seg, t_seg = _timed(build_segments, df_u)
+    print(f"utterances: {len(df_u):,}  segments: {len(seg):,}  (build_segments {t_seg:.2f}s)")
+
+    new, t_new = _timed(build_pairs, seg, args.loose_aizuchi, repeat=args.repeat)
+    print(f"build_pairs         : {t_new:8.3f}s  rows={len(new):,}")
+    if args.skip_rowloop:
+        return
+
+    old, t_old = _timed(build_pairs_rowloop, seg, args.loose_aizuchi, repeat=args.repeat)
+    print(f"build_pairs_rowloop : {t_old:8.3f}s  rows={len(old):,}")
+    print(f"speedup             : {t_old / max(t_new, 1e-9):8.1f}x")
+
+    pd.testing.assert_frame_equal(new, old)
+    s_new = pq.read_schema(df_to_parquet_temp(new))
+    s_old = pq.read_schema(df_to_parquet_temp(old))
+    if not s_new.equals(s_old, check_metadata=True):
+        raise SystemExit(f"parquet schema differs:\n{s_new}\nvs\n{s_old}")
+    print("OK: frames and parquet schema identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,7 +39,8 @@ import re
 import tempfile
 import unicodedata
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
 
 import boto3
 import numpy as np
@@ -132,7 +133,14 @@ def normalize_tail(text: str) -> str:
     """For SFP/question detection: strip bracket annotations and trailing punctuation."""
     if text is None:
         return ""
-    s = nfkc(str(text))
+    return _normalize_tail_n(nfkc(str(text)))
+
+
+# The *_n helpers below take text that is already NFKC-normalized (str), so
+# UtteranceClassifier can normalize once and share the result; the public
+# functions are thin wrappers that normalize first.
+
+def _normalize_tail_n(s: str) -> str:
     s = strip_angle_tags(s)
     s = _RE_AT_ANNOT.sub("", s)
     s = _RE_PARENS_ALL.sub(" ", s)
@@ -154,7 +162,11 @@ def is_none_like(text: str) -> bool:
     """
     if text is None:
         return False
-    raw = nfkc(str(text)).strip()
+    return _is_none_like_n(nfkc(str(text)))
+
+
+def _is_none_like_n(s: str) -> bool:
+    raw = s.strip()
     if not raw:
         return False
     if "<" not in raw:
@@ -170,10 +182,14 @@ def is_nonlex_like(text: str) -> bool:
     """
     if text is None:
         return False
-    s0 = nfkc(str(text)).strip()
+    return _is_nonlex_like_n(nfkc(str(text)))
+
+
+def _is_nonlex_like_n(s: str) -> bool:
+    s0 = s.strip()
     if not s0:
         return True
-    if is_none_like(s0):
+    if _is_none_like_n(s0):
         return False
 
     s = strip_angle_tags(s0).strip()
@@ -193,11 +209,14 @@ _RE_Q_TAIL = re.compile(r"(か|かな|かね|でしょう|でしょ|だろう|
 def is_question(text: str) -> bool:
     if text is None:
         return False
-    raw = nfkc(str(text)).strip()
-    raw = strip_angle_tags(raw)
+    return _is_question_n(nfkc(str(text)))
+
+
+def _is_question_n(s: str) -> bool:
+    raw = strip_angle_tags(s.strip())
     if _RE_Q_MARK.search(raw):
         return True
-    tail = normalize_tail(raw)
+    tail = _normalize_tail_n(raw)
     if not tail:
         return False
     return bool(_RE_Q_TAIL.search(tail))
@@ -213,20 +232,24 @@ def sfp_group(text: str) -> str:
     """
     if text is None:
         return "OTHER"
-    raw0 = nfkc(str(text)).strip()
+    return _sfp_group_n(nfkc(str(text)))
+
+
+def _sfp_group_n(s: str) -> str:
+    raw0 = s.strip()
     if not raw0:
         return "NONLEX"
 
-    if is_none_like(raw0):
+    if _is_none_like_n(raw0):
         return "NONE"
-    if is_nonlex_like(raw0):
+    if _is_nonlex_like_n(raw0):
         return "NONLEX"
 
-    tail = normalize_tail(raw0)
+    tail = _normalize_tail_n(raw0)
     if not tail:
         return "NONLEX"
 
-    q = is_question(raw0)
+    q = _is_question_n(raw0)
 
     # MON
     if tail.endswith("もん") or tail.endswith("もんね") or tail.endswith("もんねえ") or tail.endswith("もんねー"):
@@ -305,7 +328,10 @@ def norm_for_aizuchi(text: str) -> str:
     """
     if text is None:
         return ""
-    s = nfkc(str(text))
+    return _norm_for_aizuchi_n(nfkc(str(text)))
+
+
+def _norm_for_aizuchi_n(s: str) -> str:
     s = strip_angle_tags(s)
     s = _RE_AT_END.sub("", s)
 
@@ -343,13 +369,16 @@ def norm_for_aizuchi(text: str) -> str:
 def is_marker_only_nonlex(text: str) -> bool:
     if text is None:
         return False
-    raw = nfkc(str(text)).strip()
-    raw = strip_angle_tags(raw)
+    return _is_marker_only_nonlex_n(nfkc(str(text)))
+
+
+def _is_marker_only_nonlex_n(s: str) -> bool:
+    raw = strip_angle_tags(s.strip())
     raw = _RE_AT_END.sub("", raw)
     raw = _RE_TAIL_PUNCT.sub("", raw).strip()
     if not raw:
         return False
-    if is_none_like(raw):
+    if _is_none_like_n(raw):
         return False
     if _RE_HAS_JA.search(raw):
         return False
@@ -392,15 +421,19 @@ _RE_REPEAT = re.compile(
 def is_aizuchi(text: str, loose: bool = False) -> bool:
     if text is None:
         return False
+    return _is_aizuchi_n(nfkc(str(text)), loose=loose)
+
 
-    raw = nfkc(str(text)).strip()
+def _is_aizuchi_n(s: str, loose: bool = False, norm: Optional[str] = None) -> bool:
+    """*norm*: _norm_for_aizuchi_n(s.strip()) if already computed."""
+    raw = s.strip()
     if not raw:
         return False
 
-    if loose and is_marker_only_nonlex(raw):
+    if loose and _is_marker_only_nonlex_n(raw):
         return True
 
-    s = norm_for_aizuchi(raw)
+    s = norm if norm is not None else _norm_for_aizuchi_n(raw)
     if not s:
         return False
 
@@ -444,6 +477,67 @@ def first_token(text: str) -> str:
     return s.split(" ", 1)[0]
 
 
+# -----------------------------
+# Memoized classifier
+# -----------------------------
+
+class UtteranceLabels(NamedTuple):
+    is_question: bool
+    sfp_group: str
+    is_nonlex: bool
+    norm_aizuchi: str
+    first_token: str
+    is_aizuchi: bool
+
+
+_NONE_LABELS = UtteranceLabels(False, "OTHER", False, "", "", False)
+
+
+class UtteranceClassifier:
+    """
+    All per-utterance labels in one pass, memoized per distinct raw text.
+
+    NFKC is applied once per text and the normalized string is threaded
+    through the *_n helpers (the public label functions wrap the same helpers,
+    so results equal calling them one by one); the aizuchi normalization is
+    likewise computed once and shared by norm_aizuchi / first_token / is_aizuchi.
+    Backchannel-heavy corpora repeat the same short strings ("うん", "はい")
+    very often, so an LRU cache keyed on the raw string skips almost all
+    normalization work. is_aizuchi depends on --loose-aizuchi, which is
+    therefore fixed per instance.
+    """
+
+    def __init__(self, loose_aizuchi: bool = False, cache_size: Optional[int] = 1 << 18):
+        self.loose_aizuchi = bool(loose_aizuchi)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, text: Optional[str]) -> UtteranceLabels:
+        if text is None:
+            return _NONE_LABELS
+        raw = nfkc(str(text))
+        norm = _norm_for_aizuchi_n(raw)
+        return UtteranceLabels(
+            is_question=_is_question_n(raw),
+            sfp_group=_sfp_group_n(raw),
+            is_nonlex=_is_nonlex_like_n(raw),
+            norm_aizuchi=norm,
+            first_token=norm.split(" ", 1)[0] if norm else "",
+            # is_aizuchi normalizes the stripped text; reuse norm only when stripping is a no-op
+            is_aizuchi=_is_aizuchi_n(raw, loose=self.loose_aizuchi, norm=norm if raw == raw.strip() else None),
+        )
+
+    def cache_info(self):
+        return self.classify.cache_info()
+
+    def label_frame(self, texts: pd.Series) -> pd.DataFrame:
+        """Labels for a text column (classified once per distinct value, index preserved)."""
+        codes, uniq = pd.factorize(texts, use_na_sentinel=False)
+        labels = [self.classify(t) for t in uniq]
+        out = pd.DataFrame.from_records(labels, columns=UtteranceLabels._fields)
+        out = out.take(codes).set_index(texts.index)
+        return out.astype({"is_question": bool, "is_nonlex": bool, "is_aizuchi": bool})
+
+
 # -----------------------------
 # Core pipeline
 # -----------------------------
@@ -475,7 +569,8 @@ def ensure_required_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def build_segments(df_u: pd.DataFrame) -> pd.DataFrame:
+def build_segments(df_u: pd.DataFrame, classifier: Optional[UtteranceClassifier] = None) -> pd.DataFrame:
+    clf = classifier or UtteranceClassifier()
     df = df_u.copy()
 
     df["conversation_id"] = df["conversation_id"].astype(str)
@@ -506,8 +601,9 @@ def build_segments(df_u: pd.DataFrame) -> pd.DataFrame:
     if "end_time" not in df.columns:
         df["end_time"] = pd.NA
 
-    df["is_question"] = df["text"].map(is_question).astype(bool)
-    df["sfp_group"] = df["text"].map(sfp_group).astype("string")
+    labels = clf.label_frame(df["text"])
+    df["is_question"] = labels["is_question"].astype(bool)
+    df["sfp_group"] = labels["sfp_group"].astype("string")
 
     out_cols = [
         "conversation_id", "utt_index", "speaker_id",
@@ -517,7 +613,83 @@ def build_segments(df_u: pd.DataFrame) -> pd.DataFrame:
     return df[out_cols]
 
 
-def build_pairs(df_seg: pd.DataFrame, loose_aizuchi: bool) -> pd.DataFrame:
+PAIRS_COLUMNS = [
+    "conversation_id",
+    "prev_utt_index",
+    "prev_speaker_id",
+    "prev_text",
+    "prev_sfp_group",
+    "resp_utt_index",
+    "resp_speaker_id",
+    "resp_text",
+    "resp_first_token",
+    "resp_is_aizuchi",
+    "resp_is_question",
+]
+
+
+def build_pairs(
+    df_seg: pd.DataFrame,
+    loose_aizuchi: bool,
+    classifier: Optional[UtteranceClassifier] = None,
+) -> pd.DataFrame:
+    """
+    Speaker-switch pairs, built column-wise (shift + mask, no per-row access).
+
+    Conversations keep their first-appearance order and rows are stably
+    sorted by utt_index within each, exactly as the groupby/iloc loop in
+    build_pairs_rowloop; the text labels come from the (memoized)
+    UtteranceClassifier. Output is row- and dtype-identical to the loop.
+    """
+    clf = classifier or UtteranceClassifier(loose_aizuchi=loose_aizuchi)
+    if clf.loose_aizuchi != bool(loose_aizuchi):
+        raise ValueError("classifier.loose_aizuchi does not match loose_aizuchi")
+    if df_seg.empty:
+        return pd.DataFrame(columns=PAIRS_COLUMNS)
+
+    conv_code, _ = pd.factorize(df_seg["conversation_id"].astype(str))
+    utt_index = df_seg["utt_index"].to_numpy()
+    order = np.lexsort((utt_index, conv_code))  # stable, like mergesort
+
+    code = conv_code[order]
+    conv = df_seg["conversation_id"].astype(str).to_numpy(dtype=object)[order]
+    spk = df_seg["speaker_id"].astype(str).to_numpy(dtype=object)[order]
+    text = df_seg["text"].astype(str).to_numpy(dtype=object)[order]
+    sfp = df_seg["sfp_group"].astype(str).to_numpy(dtype=object)[order]
+    is_q = df_seg["is_question"].to_numpy()[order].astype(bool)
+    utt_index = utt_index[order].astype(np.int64)
+
+    switch = (code[1:] == code[:-1]) & (spk[1:] != spk[:-1])
+    resp = np.flatnonzero(switch) + 1
+    if len(resp) == 0:
+        return pd.DataFrame(columns=PAIRS_COLUMNS)
+    prev = resp - 1
+
+    r_text = text[resp]
+    labels = clf.label_frame(pd.Series(r_text))
+    r_first = labels["first_token"].to_numpy(dtype=object)
+    r_aiz = labels["is_aizuchi"].to_numpy(dtype=bool)
+
+    return pd.DataFrame(
+        {
+            "conversation_id": conv[resp],
+            "prev_utt_index": utt_index[prev],
+            "prev_speaker_id": spk[prev],
+            "prev_text": text[prev],
+            "prev_sfp_group": sfp[prev],
+            "resp_utt_index": utt_index[resp],
+            "resp_speaker_id": spk[resp],
+            "resp_text": r_text,
+            "resp_first_token": r_first,
+            "resp_is_aizuchi": r_aiz,
+            "resp_is_question": is_q[resp],
+        },
+        columns=PAIRS_COLUMNS,
+    )
+
+
+def build_pairs_rowloop(df_seg: pd.DataFrame, loose_aizuchi: bool) -> pd.DataFrame:
+    """Original row-by-row build_pairs (kept as parity reference and benchmark baseline)."""
     rows = []
     for cid, g in df_seg.groupby("conversation_id", sort=False):
         g2 = g.sort_values("utt_index", kind="mergesort").reset_index(drop=True)
@@ -545,21 +717,7 @@ def build_pairs(df_seg: pd.DataFrame, loose_aizuchi: bool) -> pd.DataFrame:
             )
 
     if not rows:
-        return pd.DataFrame(
-            columns=[
-                "conversation_id",
-                "prev_utt_index",
-                "prev_speaker_id",
-                "prev_text",
-                "prev_sfp_group",
-                "resp_utt_index",
-                "resp_speaker_id",
-                "resp_text",
-                "resp_first_token",
-                "resp_is_aizuchi",
-                "resp_is_question",
-            ]
-        )
+        return pd.DataFrame(columns=PAIRS_COLUMNS)
 
     return pd.DataFrame(rows)
 
@@ -777,8 +935,9 @@ def main() -> None:
     df_u = pq.read_table(src_path).to_pandas()
     df_u = ensure_required_columns(df_u)
 
-    seg = build_segments(df_u)
-    pairs = build_pairs(seg, loose_aizuchi=cfg.loose_aizuchi)
+    clf = UtteranceClassifier(loose_aizuchi=cfg.loose_aizuchi)
+    seg = build_segments(df_u, classifier=clf)
+    pairs = build_pairs(seg, loose_aizuchi=cfg.loose_aizuchi, classifier=clf)
     met_sfp = build_metrics_sfp(seg)
     met_resp = build_metrics_resp(pairs)
 
@@ -820,7 +979,7 @@ def main() -> None:
         print("pairs rows:", len(pairs))
         print("aizuchi rate:", aiz_rate)
 
-        resp_norm = pairs["resp_text"].astype(str).map(norm_for_aizuchi)
+        resp_norm = clf.label_frame(pairs["resp_text"].astype(str))["norm_aizuchi"]
         short_non = pairs[
             (pairs["resp_is_aizuchi"] == False)
             & (resp_norm.str.len() <= 4)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Feature Dose-Response 実験: LLM Big5採点オーケストレーター.
+
+run_scoring_dose.sh の置き換え。3特徴量 × 2条件（×0, ×3）× 4教師 × 5trait の
+ジョブ行列を1プロセスで組み立て、教師ごとのレーンを並行実行する
+（各教師＝別モデルなので、レート制限は教師ごとに独立）。
+
+- 出力済み（trait_scores.parquet が存在）のジョブはスキップ（--force で再実行）
+- 実行結果（ジョブごとの status / 所要時間 / エラー）を run manifest JSON に記録
+- --dry_run: score_big5_bedrock_v2.py を呼ばずにモックスコアを書き出す
+  （Bedrock なしで行列全体の所要時間を計測できる）
+
+×1 は既存結果を再利用するため採点不要。
+
+Usage:
+    # 全条件実行:
+    python scripts/dose_response/run_scoring_dose.py
+
+    # 特定の特徴量のみ:
+    python scripts/dose_response/run_scoring_dose.py --features FILL
+
+    # オフラインベンチマーク（モックスコア、1ジョブ0.2秒の疑似レイテンシ）:
+    python scripts/dose_response/run_scoring_dose.py --dry_run --dry_run_latency 0.2 \
+        --out_base /tmp/llm_scores_dry
+
+Requirements: 5.1, 5.2
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# ── ジョブ行列の既定値（run_scoring_dose.sh と同一） ──
+FEATURES = ["FILL", "YESNO", "OIR"]
+DOSE_LEVELS = [0, 3]  # ×1 は既存結果を再利用
+TRAITS = ["O", "C", "E", "A", "N"]
+TEACHERS = {
+    "sonnet4": "global.anthropic.claude-sonnet-4-20250514-v1:0",
+    "qwen3-235b": "qwen.qwen3-235b-a22b-2507-v1:0",
+    "deepseek-v3": "deepseek.v3-v1:0",
+    "gpt-oss-120b": "openai.gpt-oss-120b-1:0",
+}
+
+SCORER_SCRIPT = "scripts/big5/score_big5_bedrock_v2.py"
+TRAIT_SCORES_FILE = "trait_scores.parquet"
+
+
+@dataclass(frozen=True)
+class ScoringJob:
+    """1回の score_big5_bedrock_v2.py 実行に相当する採点ジョブ."""
+
+    feature: str
+    dose: int
+    teacher: str
+    model_id: str
+    trait: str
+    monologues_parquet: pathlib.Path
+    items_csv: pathlib.Path
+    out_dir: pathlib.Path
+
+    @property
+    def key(self) -> str:
+        return f"{self.feature}_x{self.dose}/{self.teacher}/{self.trait}"
+
+    @property
+    def out_parquet(self) -> pathlib.Path:
+        return self.out_dir / TRAIT_SCORES_FILE
+
+
+@dataclass
+class JobResult:
+    """ジョブの実行結果（manifest の1行）."""
+
+    key: str
+    feature: str
+    dose: int
+    teacher: str
+    trait: str
+    out_parquet: str
+    status: str  # ok / skipped_existing / missing_input / failed
+    elapsed_sec: float = 0.0
+    error: str = ""
+
+
+def build_jobs(
+    dose_dir: pathlib.Path,
+    items_dir: pathlib.Path,
+    out_base: pathlib.Path,
+    features: list[str] = FEATURES,
+    dose_levels: list[int] = DOSE_LEVELS,
+    teachers: dict[str, str] = TEACHERS,
+    traits: list[str] = TRAITS,
+) -> list[ScoringJob]:
+    """特徴量 × Dose × 教師 × trait のジョブ行列を run_scoring_dose.sh と同じ順序で返す."""
+    jobs: list[ScoringJob] = []
+    for feature in features:
+        for dose in dose_levels:
+            mono = dose_dir / f"monologues_dose_{feature}_x{dose}.parquet"
+            for teacher, model_id in teachers.items():
+                for trait in traits:
+                    out_dir = out_base / (
+                        f"dataset=cejc_home2_hq1_v1__items={trait}24"
+                        f"__teacher={teacher}__dose={feature}_x{dose}"
+                    )
+                    jobs.append(ScoringJob(
+                        feature=feature,
+                        dose=dose,
+                        teacher=teacher,
+                        model_id=model_id,
+                        trait=trait,
+                        monologues_parquet=mono,
+                        items_csv=items_dir / f"items_ipipneo120_ja_{trait}24.csv",
+                        out_dir=out_dir,
+                    ))
+    return jobs
+
+
+# ── 採点バックエンド ──
+
+class SubprocessBackend:
+    """score_big5_bedrock_v2.py をジョブごとに実行する（実採点）.
+
+    採点スクリプトの CLI がこのリポジトリで唯一安定したインターフェースのため、
+    プロセス起動はジョブ単位のまま。並行化は教師レーン単位で行う。
+    ログは各ジョブの out_dir/score.log に書き出す。
+    """
+
+    def __init__(self, scorer: str = SCORER_SCRIPT, max_retries: int = 5, python: str = sys.executable):
+        self.scorer = scorer
+        self.max_retries = max_retries
+        self.python = python
+
+    def command(self, job: ScoringJob) -> list[str]:
+        return [
+            self.python, self.scorer,
+            "--monologues_parquet", str(job.monologues_parquet),
+            "--items_csv", str(job.items_csv),
+            "--model_id", job.model_id,
+            "--out_dir", str(job.out_dir),
+            "--temperature", "0.0",
+            "--paper_strict",
+            "--max_retries", str(self.max_retries),
+        ]
+
+    def run(self, job: ScoringJob) -> None:
+        job.out_dir.mkdir(parents=True, exist_ok=True)
+        with open(job.out_dir / "score.log", "w", encoding="utf-8") as log:
+            subprocess.run(self.command(job), check=True, stdout=log, stderr=subprocess.STDOUT)
+
+
+class DryRunBackend:
+    """モックスコアを書き出す（Bedrock 呼び出しなし）.
+
+    スコアはジョブキーと話者から決定的に生成する（再実行で同一）。
+    latency_sec を与えると1ジョブごとに疑似レイテンシを入れる。
+    """
+
+    def __init__(self, latency_sec: float = 0.0):
+        self.latency_sec = latency_sec
+        self._lock = threading.Lock()
+        self._speakers: dict[pathlib.Path, pd.DataFrame] = {}
+
+    def _speaker_frame(self, path: pathlib.Path) -> pd.DataFrame:
+        with self._lock:
+            if path not in self._speakers:
+                self._speakers[path] = pd.read_parquet(path, columns=["conversation_id", "speaker_id"])
+            return self._speakers[path]
+
+    def run(self, job: ScoringJob) -> None:
+        spk = self._speaker_frame(job.monologues_parquet)
+        seed = int.from_bytes(hashlib.sha256(job.key.encode("utf-8")).digest()[:8], "little")
+        rng = np.random.default_rng(seed)
+        if self.latency_sec > 0:
+            time.sleep(self.latency_sec)
+        df = spk.copy()
+        df["trait"] = job.trait
+        df["model_id"] = job.model_id
+        df["trait_score"] = np.round(rng.uniform(1.0, 5.0, size=len(df)), 4)
+        job.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = job.out_parquet.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(job.out_parquet)
+
+
+# ── 実行 ──
+
+def _run_one(job: ScoringJob, backend, skip_existing: bool) -> JobResult:
+    res = JobResult(
+        key=job.key,
+        feature=job.feature,
+        dose=job.dose,
+        teacher=job.teacher,
+        trait=job.trait,
+        out_parquet=str(job.out_parquet),
+        status="ok",
+    )
+    if skip_existing and job.out_parquet.exists():
+        res.status = "skipped_existing"
+        return res
+    if not job.monologues_parquet.exists():
+        res.status = "missing_input"
+        res.error = f"{job.monologues_parquet} not found"
+        return res
+
+    t0 = time.perf_counter()
+    try:
+        backend.run(job)
+    except Exception as e:  # 1ジョブの失敗で行列全体を止めない
+        res.status = "failed"
+        res.error = f"{type(e).__name__}: {e}"
+    res.elapsed_sec = round(time.perf_counter() - t0, 3)
+    return res
+
+
+def run_jobs(
+    jobs: list[ScoringJob],
+    backend,
+    skip_existing: bool = True,
+    teacher_workers: int | None = None,
+) -> list[JobResult]:
+    """教師ごとのレーンを並行実行し、ジョブ順の結果リストを返す.
+
+    同一教師のジョブはレーン内で直列に実行する（モデルごとのレート制限を尊重）。
+    """
+    lanes: dict[str, list[int]] = {}
+    for i, job in enumerate(jobs):
+        lanes.setdefault(job.teacher, []).append(i)
+
+    results: list[JobResult | None] = [None] * len(jobs)
+    print_lock = threading.Lock()
+    done = [0]
+
+    def _lane(indices: list[int]) -> None:
+        for i in indices:
+            res = _run_one(jobs[i], backend, skip_existing)
+            results[i] = res
+            with print_lock:
+                done[0] += 1
+                print(
+                    f"[{done[0]}/{len(jobs)}] {res.key}: {res.status}"
+                    + (f" ({res.elapsed_sec:.1f}s)" if res.status in ("ok", "failed") else "")
+                    + (f" {res.error}" if res.error else ""),
+                    flush=True,
+                )
+
+    workers = teacher_workers or len(lanes) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fut in [pool.submit(_lane, idx) for idx in lanes.values()]:
+            fut.result()
+    return [r for r in results if r is not None]
+
+
+def write_manifest(
+    path: pathlib.Path,
+    results: list[JobResult],
+    config: dict,
+    started_at: str,
+    elapsed_sec: float,
+) -> None:
+    """Run manifest（設定・ジョブごとの結果・集計）を JSON で書き出す."""
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    manifest = {
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "elapsed_sec": round(elapsed_sec, 3),
+        "config": config,
+        "counts": counts,
+        "jobs": [asdict(r) for r in results],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _csv_list(s: str) -> list[str]:
+    return [x.strip() for x in s.split(",") if x.strip()]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """CLI引数をパースする."""
+    ap = argparse.ArgumentParser(description="Feature Dose-Response: LLM Big5 採点オーケストレーター")
+    ap.add_argument("--dose_dir", default="artifacts/dose_response", help="monologues_dose_*.parquet (default: %(default)s)")
+    ap.add_argument("--items_dir", default="artifacts/big5", help="items_ipipneo120_ja_*24.csv (default: %(default)s)")
+    ap.add_argument("--out_base", default="artifacts/big5/llm_scores", help="採点結果の出力先 (default: %(default)s)")
+    ap.add_argument("--features", default="ALL", help="カンマ区切り or ALL (default: %(default)s)")
+    ap.add_argument("--dose_levels", default="0,3", help="Dose Level一覧 (default: %(default)s)")
+    ap.add_argument("--teachers", default="ALL", help=f"カンマ区切り or ALL ({', '.join(TEACHERS)})")
+    ap.add_argument("--traits", default=",".join(TRAITS), help="(default: %(default)s)")
+    ap.add_argument("--teacher_workers", type=int, default=0, help="並行レーン数 (0=教師数)")
+    ap.add_argument("--max_retries", type=int, default=5, help="score_big5_bedrock_v2.py --max_retries")
+    ap.add_argument("--force", action="store_true", help="出力済みジョブも再実行する")
+    ap.add_argument("--manifest", default="", help="run manifest JSON (default: <out_base>/_runs/scoring_dose_<ts>.json)")
+    ap.add_argument("--dry_run", action="store_true", help="モックスコアを書き出す（Bedrock 呼び出しなし）")
+    ap.add_argument("--dry_run_latency", type=float, default=0.0, help="dry_run の1ジョブあたり疑似レイテンシ秒")
+    return ap.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> list[JobResult]:
+    """メインエントリポイント."""
+    args = parse_args(argv)
+
+    features = FEATURES if args.features == "ALL" else _csv_list(args.features)
+    unknown = sorted(set(features) - set(FEATURES))
+    if unknown:
+        raise SystemExit(f"unknown features: {unknown} (available: {FEATURES})")
+    teachers = TEACHERS if args.teachers == "ALL" else {t: TEACHERS[t] for t in _csv_list(args.teachers)}
+    dose_levels = [int(x) for x in _csv_list(args.dose_levels)]
+    traits = _csv_list(args.traits)
+
+    out_base = pathlib.Path(args.out_base)
+    jobs = build_jobs(
+        pathlib.Path(args.dose_dir), pathlib.Path(args.items_dir), out_base,
+        features=features, dose_levels=dose_levels, teachers=teachers, traits=traits,
+    )
+    backend = DryRunBackend(args.dry_run_latency) if args.dry_run else SubprocessBackend(max_retries=args.max_retries)
+
+    started_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    print("Feature Dose-Response: LLM Big5 採点開始")
+    print(f"  Jobs:   {len(jobs)} ({len(features)} features × {len(dose_levels)} doses × "
+          f"{len(teachers)} teachers × {len(traits)} traits)")
+    print(f"  Output: {out_base}")
+    print(f"  Mode:   {'dry_run' if args.dry_run else 'bedrock'}")
+
+    t0 = time.perf_counter()
+    results = run_jobs(jobs, backend, skip_existing=not args.force, teacher_workers=args.teacher_workers or None)
+    elapsed = time.perf_counter() - t0
+
+    ts = started_at.replace(":", "").replace("-", "")[:15]
+    manifest_path = pathlib.Path(args.manifest) if args.manifest else out_base / "_runs" / f"scoring_dose_{ts}.json"
+    config = {k: v for k, v in vars(args).items()}
+    config.update(features=features, teachers=teachers, dose_levels=dose_levels, traits=traits)
+    write_manifest(manifest_path, results, config, started_at, elapsed)
+
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    print("")
+    print(f"✓ Feature Dose-Response 採点完了 ({elapsed:.1f}s): {counts}")
+    print(f"  manifest: {manifest_path}")
+    print("  次のステップ: prepare_ensemble_dirs.py → ensemble_permutation.py → dose_response_report.py")
+    if counts.get("failed"):
+        raise SystemExit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,25 @@ SQLite(.db) -> Parquet(zstd) ETL for CEJC/CSJ (S3 <-> local tmp <-> S3)
   - CEJC: segLUU -> utterances
   - CSJ : segIPU -> utterances
 
+Streaming (bounded memory):
+- Rows are read with cursor.fetchmany(--batch-rows) straight into Arrow
+  RecordBatches and written through one ParquetWriter per part; no part is
+  ever materialized in pandas.
+- The Arrow schema of a table is fixed up front from the SQLite storage
+  classes actually present (one typeof() scan), so every part shares it.
+- Finished parts are uploaded by a bounded thread pool while the next part
+  is being read. The upload target is pluggable: s3://... (SSE-KMS) or a
+  local directory (tests / dry runs).
+
+Incremental (manifest):
+- {out_prefix}/corpus={corpus}/_manifest.json records the source .db
+  fingerprint (S3 ETag) and sha256, and per table the Arrow schema, row
+  count, max rowid and every part's rowid range, row count, content hash
+  and URI (plus the content hash of the canonical utterances table).
+- Re-runs skip the download entirely when the ETag is unchanged, skip
+  tables whose part hashes still match, rewrite only changed parts and
+  append new rowid ranges as new parts. --full-refresh ignores the manifest.
+
 IMPORTANT:
 - Your curated bucket policy explicitly DENIES PutObject unless SSE-KMS headers are present
   and the KMS key matches. Therefore, set env var:
@@ -16,15 +35,21 @@ IMPORTANT:
 """
 
 import argparse
+import hashlib
+import json
 import os
 import re
+import shutil
 import sqlite3
 import tempfile
 import sys
-from typing import List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 import boto3
 import pandas as pd
+from botocore.exceptions import ClientError
 import pyarrow as pa
 import pyarrow.parquet as pq
 
@@ -54,6 +79,27 @@ def s3_download_to_file(s3_uri: str, local_path: str) -> None:
     s3.download_file(b, k, local_path)
 
 
+def fetch_source_db(in_db: str, local_path: str) -> None:
+    """
+    Download (s3://...) or copy (local path) the source .db
+    """
+    if in_db.startswith("s3://"):
+        s3_download_to_file(in_db, local_path)
+    else:
+        shutil.copyfile(in_db, local_path)
+
+
+def source_fingerprint(in_db: str) -> str:
+    """
+    Cheap change detector that does not need the file: S3 ETag, or size+mtime locally
+    """
+    if in_db.startswith("s3://"):
+        b, k = parse_s3_uri(in_db)
+        return "etag:" + s3.head_object(Bucket=b, Key=k)["ETag"].strip('"')
+    st = os.stat(in_db)
+    return f"stat:{st.st_size}:{st.st_mtime_ns}"
+
+
 def _kms_extra_args_or_die() -> dict:
     """
     Build ExtraArgs for boto3 S3 upload to satisfy bucket policy that requires SSE-KMS headers.
@@ -82,6 +128,117 @@ def s3_upload_file(local_path: str, out_s3_uri: str) -> None:
     s3.upload_file(local_path, b, k, ExtraArgs=extra_args)
 
 
+# -----------------------------
+# Upload targets
+# -----------------------------
+class S3Target:
+    """
+    Upload parts under an s3:// prefix (SSE-KMS, see s3_upload_file).
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix.rstrip("/")
+
+    def uri(self, key: str) -> str:
+        return f"{self.prefix}/{key}"
+
+    def put(self, local_path: str, key: str) -> str:
+        out_uri = self.uri(key)
+        s3_upload_file(local_path, out_uri)
+        return out_uri
+
+    def get_text(self, key: str) -> Optional[str]:
+        b, k = parse_s3_uri(self.uri(key))
+        try:
+            obj = s3.get_object(Bucket=b, Key=k)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return obj["Body"].read().decode("utf-8")
+
+    def delete(self, key: str) -> None:
+        b, k = parse_s3_uri(self.uri(key))
+        s3.delete_object(Bucket=b, Key=k)
+
+
+class LocalDirTarget:
+    """
+    Copy parts under a local directory (stands in for S3 in tests / dry runs).
+    """
+
+    def __init__(self, root: str):
+        self.prefix = root.rstrip("/")
+
+    def uri(self, key: str) -> str:
+        return os.path.join(self.prefix, key)
+
+    def put(self, local_path: str, key: str) -> str:
+        out_path = self.uri(key)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        shutil.copyfile(local_path, out_path)
+        return out_path
+
+    def get_text(self, key: str) -> Optional[str]:
+        path = self.uri(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        path = self.uri(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def make_target(out_prefix: str):
+    """
+    s3://bucket/prefix -> S3Target, anything else -> LocalDirTarget
+    """
+    if out_prefix.startswith("s3://"):
+        return S3Target(out_prefix)
+    return LocalDirTarget(out_prefix)
+
+
+class PartUploader:
+    """
+    Upload finished parts in a bounded thread pool.
+
+    submit() blocks while max_pending parts are still on local disk, so
+    reading/writing the next part overlaps with uploads but temp disk usage
+    stays bounded. Temp files are removed once uploaded. close() waits and
+    returns the output URIs in submission order (re-raising upload errors).
+    """
+
+    def __init__(self, target, workers: int = 4, max_pending: Optional[int] = None):
+        self.target = target
+        self._ex = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * max(1, workers))
+        self._futures = []
+
+    def submit(self, local_path: str, key: str) -> None:
+        self._slots.acquire()
+        self._futures.append(self._ex.submit(self._put, local_path, key))
+
+    def _put(self, local_path: str, key: str) -> str:
+        try:
+            return self.target.put(local_path, key)
+        finally:
+            os.remove(local_path)
+            self._slots.release()
+
+    def close(self) -> List[str]:
+        self._ex.shutdown(wait=True)
+        return [f.result() for f in self._futures]
+
+    def __enter__(self) -> "PartUploader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._ex.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+
 # -----------------------------
 # SQLite helpers
 # -----------------------------
@@ -213,6 +370,158 @@ def write_parquet_chunk(df: pd.DataFrame, out_path: str) -> None:
     pq.write_table(table, out_path, compression="zstd")
 
 
+# -----------------------------
+# Streaming SQLite -> Arrow
+# -----------------------------
+_SQLITE_TO_ARROW = {
+    "integer": pa.int64(),
+    "real": pa.float64(),
+    "text": pa.string(),
+    "blob": pa.binary(),
+}
+
+
+def _sqlite_text(x):
+    """
+    _to_text for raw SQLite values (None stays None).
+    """
+    if x is None:
+        return None
+    if isinstance(x, _BYTES_TYPES):
+        return bytes(x).decode("utf-8", errors="replace")
+    return str(x)
+
+
+def infer_arrow_schema(
+    con: sqlite3.Connection, sql: str, cols: Sequence[str]
+) -> Tuple[pa.Schema, Set[str]]:
+    """
+    Arrow schema for the result of *sql* from the SQLite storage classes present
+    (one scan, constant memory). Returns (schema, columns needing stringify).
+      integer -> int64, real / integer+real -> float64, text -> string,
+      blob -> binary, NULL only or mixed with text/blob -> string
+    """
+    sel = ", ".join([f'group_concat(DISTINCT typeof("{c}"))' for c in cols])
+    row = con.execute(f"SELECT {sel} FROM ({sql})").fetchone()
+
+    fields = []
+    coerce: Set[str] = set()
+    for c, classes in zip(cols, row):
+        kinds = set((classes or "").split(",")) - {"", "null"}
+        if len(kinds) == 1:
+            typ = _SQLITE_TO_ARROW[kinds.pop()]
+        elif kinds == {"integer", "real"}:
+            typ = pa.float64()
+        else:
+            typ = pa.string()
+            if kinds:
+                coerce.add(c)
+        fields.append(pa.field(c, typ))
+    return pa.schema(fields), coerce
+
+
+def _rows_to_record_batch(
+    rows: List[tuple], schema: pa.Schema, coerce: Set[str], skip: int = 0
+) -> pa.RecordBatch:
+    columns = list(zip(*rows))[skip:]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name in coerce:
+            values = [_sqlite_text(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def stream_query_to_parquet(
+    con: sqlite3.Connection,
+    sql: str,
+    schema: pa.Schema,
+    coerce: Set[str],
+    out_path: str,
+    batch_rows: int = 50_000,
+    skip: int = 0,
+    constants: Optional[Dict[str, str]] = None,
+    hasher=None,
+) -> int:
+    """
+    Run *sql* and write its rows to *out_path* (zstd) via fetchmany batches.
+    The first *skip* selected columns are dropped (e.g. __rowid); *constants*
+    are appended as string columns. No file is created when the query
+    returns no rows. *hasher* (hashlib object) is fed every written row,
+    see _hash_rows. Returns the number of rows written.
+    """
+    constants = constants or {}
+    out_schema = schema
+    for k in constants:
+        out_schema = out_schema.append(pa.field(k, pa.string()))
+
+    cur = con.execute(sql)
+    writer = None
+    n = 0
+    try:
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            if hasher is not None:
+                _hash_rows(hasher, rows, skip)
+            batch = _rows_to_record_batch(rows, schema, coerce, skip=skip)
+            if constants:
+                arrays = batch.columns + [pa.array([v] * len(rows), pa.string()) for v in constants.values()]
+                batch = pa.RecordBatch.from_arrays(arrays, schema=out_schema)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, out_schema, compression="zstd")
+            writer.write_batch(batch)
+            n += len(rows)
+    finally:
+        cur.close()
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def _hash_rows(hasher, rows: List[tuple], skip: int = 0) -> None:
+    # one update per row, so the digest does not depend on fetchmany batching
+    for r in rows:
+        hasher.update(repr(r[skip:]).encode("utf-8", "surrogatepass"))
+        hasher.update(b"\n")
+
+
+def hash_query(con: sqlite3.Connection, sql: str, batch_rows: int = 50_000, skip: int = 0) -> Tuple[str, int]:
+    """
+    sha256 of the rows returned by *sql* (same digest as stream_query_to_parquet's
+    hasher), without writing anything. Returns (hexdigest, n_rows).
+    """
+    h = hashlib.sha256()
+    n = 0
+    cur = con.execute(sql)
+    try:
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            _hash_rows(h, rows, skip)
+            n += len(rows)
+    finally:
+        cur.close()
+    return h.hexdigest(), n
+
+
+def file_sha256(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(block), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+def _temp_parquet_path() -> str:
+    with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tf:
+        tmp_path = tf.name
+    os.remove(tmp_path)  # ParquetWriter creates it (only if rows exist)
+    return tmp_path
+
+
 # -----------------------------
 # Dump table -> partitioned parquet on S3
 # -----------------------------
@@ -223,79 +532,233 @@ def dump_table_to_parquet(
     corpus: str,
     chunk_rows: int = 500_000,
     max_parts: Optional[int] = None,
+    batch_rows: int = 50_000,
+    upload_workers: int = 4,
+    target=None,
 ) -> List[str]:
     """
-    Dump a SQLite table to S3 as multiple parquet parts.
+    Dump a SQLite table as multiple parquet parts (streaming, bounded memory).
     Output:
       {out_prefix_s3}/corpus={corpus}/table={table}/part-00000.parquet ...
+    Each part covers a rowid range of chunk_rows (empty ranges are skipped);
+    tables without rowid are split every chunk_rows rows.
+    *target* overrides the upload destination (default: make_target(out_prefix_s3)).
     Returns list of out uris.
     """
+    target = target or make_target(out_prefix_s3)
     cols = get_columns(con, table)
-    out_uris: List[str] = []
+    col_sql = ", ".join([f'"{c}"' for c in cols])
+    schema, coerce = infer_arrow_schema(con, f'SELECT {col_sql} FROM "{table}"', cols)
 
-    out_prefix = out_prefix_s3.rstrip("/")
+    def key(part: int) -> str:
+        return f"corpus={corpus}/table={table}/part-{part:05d}.parquet"
 
-    # Prefer rowid range chunking (stable and fast) if available
-    if has_rowid(con, table):
-        max_rowid = con.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    with PartUploader(target, workers=upload_workers) as up:
         part = 0
-        start = 0
+        # Prefer rowid range chunking (stable and fast) if available
+        if has_rowid(con, table):
+            max_rowid = con.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+            start = 0
+
+            while start < max_rowid:
+                end = min(start + chunk_rows, max_rowid)
+                tmp_path = _temp_parquet_path()
+                q = chunk_query_by_rowid(table, cols, start, end)
+                # skip=1 drops the internal __rowid helper column
+                n = stream_query_to_parquet(con, q, schema, coerce, tmp_path, batch_rows, skip=1)
+                start = end
+                if n == 0:
+                    continue
 
-        while start < max_rowid:
-            end = min(start + chunk_rows, max_rowid)
-            q = chunk_query_by_rowid(table, cols, start, end)
-            df = pd.read_sql_query(q, con)
+                up.submit(tmp_path, key(part))
+                part += 1
+
+                if max_parts is not None and part >= max_parts:
+                    break
+
+        else:
+            # No rowid: one cursor, rolled over to a new part every chunk_rows rows
+            cur = con.execute(f'SELECT {col_sql} FROM "{table}"')
+            while max_parts is None or part < max_parts:
+                tmp_path = _temp_parquet_path()
+                writer = None
+                n = 0
+                while n < chunk_rows:
+                    rows = cur.fetchmany(min(batch_rows, chunk_rows - n))
+                    if not rows:
+                        break
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                    writer.write_batch(_rows_to_record_batch(rows, schema, coerce))
+                    n += len(rows)
+                if writer is None:
+                    break
+                writer.close()
+                up.submit(tmp_path, key(part))
+                part += 1
+            cur.close()
+
+        return up.close()
 
-            if df.empty:
-                start = end
-                continue
 
-            # Remove internal rowid helper column if present
-            df = df.drop(columns=["__rowid"], errors="ignore")
+# -----------------------------
+# Incremental dump (manifest)
+# -----------------------------
+MANIFEST_VERSION = 1
 
-            with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tf:
-                tmp_path = tf.name
 
-            write_parquet_chunk(df, tmp_path)
+def manifest_key(corpus: str) -> str:
+    return f"corpus={corpus}/_manifest.json"
 
-            out_uri = f"{out_prefix}/corpus={corpus}/table={table}/part-{part:05d}.parquet"
-            s3_upload_file(tmp_path, out_uri)
-            os.remove(tmp_path)
 
-            out_uris.append(out_uri)
+def load_manifest(target, corpus: str) -> dict:
+    """
+    Previous run's manifest, or an empty one
+    """
+    text = target.get_text(manifest_key(corpus))
+    if text:
+        m = json.loads(text)
+        if m.get("manifest_version") == MANIFEST_VERSION:
+            return m
+    return {"manifest_version": MANIFEST_VERSION, "corpus": corpus, "source": {}, "tables": {}}
 
-            part += 1
-            start = end
 
-            if max_parts is not None and part >= max_parts:
-                break
+def save_manifest(target, corpus: str, manifest: dict) -> str:
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as tf:
+        json.dump(manifest, tf, ensure_ascii=False, indent=2, sort_keys=True)
+        tmp_path = tf.name
+    try:
+        return target.put(tmp_path, manifest_key(corpus))
+    finally:
+        os.remove(tmp_path)
 
-    else:
-        # Fallback: one-shot dump (ok for small tables)
-        df = pd.read_sql_query(f'SELECT * FROM "{table}"', con)
 
-        with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tf:
-            tmp_path = tf.name
+def _part_index(key: str) -> int:
+    m = re.search(r"part-(\d+)\.parquet$", key)
+    return int(m.group(1)) if m else -1
 
-        write_parquet_chunk(df, tmp_path)
 
-        out_uri = f"{out_prefix}/corpus={corpus}/table={table}/part-00000.parquet"
-        s3_upload_file(tmp_path, out_uri)
-        os.remove(tmp_path)
+def dump_table_incremental(
+    con: sqlite3.Connection,
+    table: str,
+    corpus: str,
+    target,
+    prev: Optional[dict] = None,
+    chunk_rows: int = 500_000,
+    max_parts: Optional[int] = None,
+    batch_rows: int = 50_000,
+    upload_workers: int = 4,
+) -> dict:
+    """
+    Dump *table* reusing the parts recorded in *prev* (its previous manifest entry).
+
+    rowid tables:
+      - every recorded rowid range is re-hashed; unchanged parts are kept,
+        changed ones are rewritten under the same key, emptied ones deleted
+      - rows beyond the recorded max_rowid are appended as new parts
+    tables without rowid, or a changed Arrow schema: full dump when the
+    content hash differs.
+    Returns the new manifest entry (entry["stats"] counts kept/rewritten/
+    appended/deleted parts).
+    """
+    cols = get_columns(con, table)
+    col_sql = ", ".join([f'"{c}"' for c in cols])
+    schema, coerce = infer_arrow_schema(con, f'SELECT {col_sql} FROM "{table}"', cols)
+    schema_sig = schema.to_string(show_schema_metadata=False)
+    stats = {"kept": 0, "rewritten": 0, "appended": 0, "deleted": 0}
+
+    def key(part: int) -> str:
+        return f"corpus={corpus}/table={table}/part-{part:05d}.parquet"
+
+    if not has_rowid(con, table):
+        digest, n = hash_query(con, f'SELECT {col_sql} FROM "{table}"', batch_rows)
+        if prev and prev.get("sha256") == digest and prev.get("schema") == schema_sig:
+            stats["kept"] = len(prev["parts"])
+            return {**prev, "stats": stats}
+        uris = dump_table_to_parquet(
+            con, table, target.prefix, corpus, chunk_rows=chunk_rows, max_parts=max_parts,
+            batch_rows=batch_rows, upload_workers=upload_workers, target=target,
+        )
+        parts = [{"key": key(i), "uri": u} for i, u in enumerate(uris)]
+        for p in (prev or {}).get("parts", [])[len(parts):]:
+            target.delete(p["key"])
+            stats["deleted"] += 1
+        stats["appended"] = len(parts)
+        return {"schema": schema_sig, "rows": n, "sha256": digest, "parts": parts, "stats": stats}
+
+    if prev and prev.get("schema") != schema_sig:
+        # schema changed: old parts cannot be mixed with new ones
+        for p in prev["parts"]:
+            target.delete(p["key"])
+            stats["deleted"] += 1
+        prev = None
+
+    max_rowid = con.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    prev_parts = (prev or {}).get("parts", [])
+    next_part = max([_part_index(p["key"]) for p in prev_parts], default=-1) + 1
+    parts: List[dict] = []
+
+    def write_range(start: int, end: int, k: str) -> Optional[dict]:
+        tmp_path = _temp_parquet_path()
+        h = hashlib.sha256()
+        q = chunk_query_by_rowid(table, cols, start, end)
+        n = stream_query_to_parquet(con, q, schema, coerce, tmp_path, batch_rows, skip=1, hasher=h)
+        if n == 0:
+            return None
+        up.submit(tmp_path, k)
+        return {"key": k, "uri": target.uri(k), "rowid_start": start, "rowid_end": end,
+                "rows": n, "sha256": h.hexdigest()}
+
+    with PartUploader(target, workers=upload_workers) as up:
+        for p in prev_parts:
+            q = chunk_query_by_rowid(table, cols, p["rowid_start"], p["rowid_end"])
+            digest, n = hash_query(con, q, batch_rows, skip=1)
+            if digest == p["sha256"]:
+                parts.append(p)
+                stats["kept"] += 1
+                continue
+            new = write_range(p["rowid_start"], p["rowid_end"], p["key"]) if n else None
+            if new is None:
+                target.delete(p["key"])
+                stats["deleted"] += 1
+            else:
+                parts.append(new)
+                stats["rewritten"] += 1
+
+        start = (prev or {}).get("max_rowid", 0)
+        while start < max_rowid:
+            if max_parts is not None and len(parts) >= max_parts:
+                break
+            end = min(start + chunk_rows, max_rowid)
+            new = write_range(start, end, key(next_part))
+            start = end
+            if new is None:
+                continue
+            parts.append(new)
+            next_part += 1
+            stats["appended"] += 1
+        covered = start
 
-        out_uris.append(out_uri)
+        up.close()
 
-    return out_uris
+    return {
+        "schema": schema_sig,
+        "rows": sum(p["rows"] for p in parts),
+        "max_rowid": covered,
+        "parts": parts,
+        "stats": stats,
+    }
 
 
 # -----------------------------
 # Canonical utterances builders
 # -----------------------------
-def build_utterances_cejc(con: sqlite3.Connection) -> pd.DataFrame:
-    """
-    CEJC: segLUU -> utterances
-    """
-    df = pd.read_sql_query(
+UTTERANCE_COLUMNS = ["conversation_id", "utterance_id", "speaker_id", "start_time", "end_time", "text"]
+
+# corpus -> (query, unit_type)
+UTTERANCE_QUERIES: Dict[str, Tuple[str, str]] = {
+    # CEJC: segLUU -> utterances
+    "cejc": (
         """
         SELECT
           conversationID AS conversation_id,
@@ -306,19 +769,11 @@ def build_utterances_cejc(con: sqlite3.Connection) -> pd.DataFrame:
           text          AS text
         FROM segLUU
         """,
-        con,
-    )
-    df["corpus"] = "cejc"
-    df["unit_type"] = "LUU"
-    return df
-
-
-def build_utterances_csj(con: sqlite3.Connection) -> pd.DataFrame:
-    """
-    CSJ: segIPU -> utterances
-    Speaker is not explicit; use Channel as speaker_id for now.
-    """
-    df = pd.read_sql_query(
+        "LUU",
+    ),
+    # CSJ: segIPU -> utterances
+    # Speaker is not explicit; use Channel as speaker_id for now.
+    "csj": (
         """
         SELECT
           TalkID     AS conversation_id,
@@ -329,13 +784,82 @@ def build_utterances_csj(con: sqlite3.Connection) -> pd.DataFrame:
           Text       AS text
         FROM segIPU
         """,
-        con,
-    )
+        "IPU",
+    ),
+}
+
+
+def build_utterances_cejc(con: sqlite3.Connection) -> pd.DataFrame:
+    """
+    CEJC: segLUU -> utterances
+    """
+    sql, unit_type = UTTERANCE_QUERIES["cejc"]
+    df = pd.read_sql_query(sql, con)
+    df["corpus"] = "cejc"
+    df["unit_type"] = unit_type
+    return df
+
+
+def build_utterances_csj(con: sqlite3.Connection) -> pd.DataFrame:
+    """
+    CSJ: segIPU -> utterances
+    Speaker is not explicit; use Channel as speaker_id for now.
+    """
+    sql, unit_type = UTTERANCE_QUERIES["csj"]
+    df = pd.read_sql_query(sql, con)
     df["corpus"] = "csj"
-    df["unit_type"] = "IPU"
+    df["unit_type"] = unit_type
     return df
 
 
+def stream_utterances_to_temp(
+    con: sqlite3.Connection,
+    corpus: str,
+    batch_rows: int = 50_000,
+    hasher=None,
+) -> Tuple[str, int]:
+    """
+    Stream the canonical utterances table into a local temp parquet.
+    *hasher* is fed every row (same digest as hash_query on the utterances SQL).
+    Returns (tmp_path, n_rows); no file is created when the table is empty.
+    """
+    sql, unit_type = UTTERANCE_QUERIES[corpus]
+    schema, coerce = infer_arrow_schema(con, sql, UTTERANCE_COLUMNS)
+    tmp_path = _temp_parquet_path()
+    n = stream_query_to_parquet(
+        con, sql, schema, coerce, tmp_path, batch_rows,
+        constants={"corpus": corpus, "unit_type": unit_type},
+        hasher=hasher,
+    )
+    return tmp_path, n
+
+
+def upload_utterances_parquet(target, corpus: str, tmp_path: str) -> str:
+    """Upload a temp parquet as {prefix}/corpus={corpus}/table=utterances/part-00000.parquet."""
+    with PartUploader(target, workers=1) as up:
+        up.submit(tmp_path, f"corpus={corpus}/table=utterances/part-00000.parquet")
+        return up.close()[0]
+
+
+def write_utterances_parquet(
+    con: sqlite3.Connection,
+    corpus: str,
+    out_prefix: str,
+    batch_rows: int = 50_000,
+    target=None,
+) -> Optional[str]:
+    """
+    Stream the canonical utterances table into a single parquet file
+    ({out_prefix}/corpus={corpus}/table=utterances/part-00000.parquet).
+    Returns the out uri, or None when the source table is empty.
+    """
+    target = target or make_target(out_prefix)
+    tmp_path, n = stream_utterances_to_temp(con, corpus, batch_rows)
+    if n == 0:
+        return None
+    return upload_utterances_parquet(target, corpus, tmp_path)
+
+
 def write_df_to_s3_parquet(df: pd.DataFrame, out_uri: str) -> None:
     with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as tf:
         tmp_path = tf.name
@@ -345,68 +869,146 @@ def write_df_to_s3_parquet(df: pd.DataFrame, out_uri: str) -> None:
 
 
 # -----------------------------
-# CLI
+# ETL run
 # -----------------------------
-def main() -> None:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--in-db-s3", required=True, help="s3://bucket/key to sqlite .db")
-    ap.add_argument("--corpus", required=True, choices=["cejc", "csj"], help="corpus id")
-    ap.add_argument("--out-s3-prefix", required=True, help="s3://bucket/prefix")
-    ap.add_argument(
-        "--dump-tables",
-        default="",
-        help="comma-separated table names to dump (optional). Example: infoSession,infoParticipant",
-    )
-    ap.add_argument("--chunk-rows", type=int, default=500_000)
-    ap.add_argument("--max-parts", type=int, default=0, help="0 means no limit; for debugging")
-    ap.add_argument("--build-utterances", action="store_true")
-    args = ap.parse_args()
+def run_etl(
+    in_db: str,
+    corpus: str,
+    target,
+    tables: Sequence[str],
+    build_utterances: bool = False,
+    chunk_rows: int = 500_000,
+    max_parts: Optional[int] = None,
+    batch_rows: int = 50_000,
+    upload_workers: int = 4,
+    full_refresh: bool = False,
+) -> dict:
+    """
+    Incremental ETL driven by the manifest. Returns the saved manifest.
+    """
+    manifest = load_manifest(target, corpus)
+    previous_tables = dict(manifest["tables"])
+    if full_refresh:
+        manifest["source"] = {}
+        manifest["tables"] = {}
+        manifest.pop("utterances", None)
 
-    # Fail fast if KMS env var missing (because bucket policy has explicit deny)
-    _ = _kms_extra_args_or_die()
+    def covered(m: dict) -> bool:
+        return all(t in m["tables"] for t in tables) and (not build_utterances or "utterances" in m)
 
-    out_prefix = args.out_s3_prefix.rstrip("/")
-    max_parts = None if args.max_parts == 0 else args.max_parts
+    fingerprint = source_fingerprint(in_db)
+    if manifest["source"].get("fingerprint") == fingerprint and covered(manifest):
+        print(f"[skip] source unchanged ({fingerprint}); nothing to do")
+        return manifest
 
     with tempfile.TemporaryDirectory() as d:
-        local_db = os.path.join(d, f"{args.corpus}.db")
-        s3_download_to_file(args.in_db_s3, local_db)
+        local_db = os.path.join(d, f"{corpus}.db")
+        fetch_source_db(in_db, local_db)
+        db_sha = file_sha256(local_db)
+        if manifest["source"].get("sha256") == db_sha and covered(manifest):
+            print("[skip] source content unchanged (sha256); nothing to do")
+            manifest["source"]["fingerprint"] = fingerprint
+            save_manifest(target, corpus, manifest)
+            return manifest
 
         con = sqlite3.connect(local_db)
 
         # Validate tables
         available = set(list_tables(con))
-        tables: List[str] = []
-        if args.dump_tables.strip():
-            tables = [t.strip() for t in args.dump_tables.split(",") if t.strip()]
-
         for t in tables:
             if t not in available:
                 raise ValueError(f"Table not found: {t}")
 
         # Dump requested tables
         for t in tables:
-            dump_table_to_parquet(
-                con=con,
-                table=t,
-                out_prefix_s3=out_prefix,
-                corpus=args.corpus,
-                chunk_rows=args.chunk_rows,
+            entry = dump_table_incremental(
+                con, t, corpus, target,
+                prev=manifest["tables"].get(t),
+                chunk_rows=chunk_rows,
                 max_parts=max_parts,
+                batch_rows=batch_rows,
+                upload_workers=upload_workers,
             )
-
-        # Build canonical utterances
-        if args.build_utterances:
-            if args.corpus == "cejc":
-                u = build_utterances_cejc(con)
+            print(f"[table] {t}: rows={entry['rows']} {entry['stats']}")
+            manifest["tables"][t] = entry
+
+            # parts recorded before (e.g. ahead of --full-refresh) that no longer exist
+            keep = {p["key"] for p in entry["parts"]}
+            for p in (previous_tables.get(t) or {}).get("parts", []):
+                if p["key"] not in keep:
+                    target.delete(p["key"])
+
+        # Build canonical utterances (single file; rewritten only if its rows changed)
+        if build_utterances:
+            # one scan: hash while writing to a temp file, upload only if the digest changed
+            h = hashlib.sha256()
+            tmp_path, n = stream_utterances_to_temp(con, corpus, batch_rows, hasher=h)
+            digest = h.hexdigest()
+            prev_u = manifest.get("utterances") or {}
+            if prev_u.get("sha256") == digest:
+                if n:
+                    os.remove(tmp_path)
+                print("[utterances] unchanged")
             else:
-                u = build_utterances_csj(con)
-
-            out_uri = f"{out_prefix}/corpus={args.corpus}/table=utterances/part-00000.parquet"
-            write_df_to_s3_parquet(u, out_uri)
+                uri = upload_utterances_parquet(target, corpus, tmp_path) if n else None
+                manifest["utterances"] = {"uri": uri, "rows": n, "sha256": digest}
+                print(f"[utterances] wrote rows={n}")
 
         con.close()
 
+    manifest["source"] = {"uri": in_db, "fingerprint": fingerprint, "sha256": db_sha}
+    save_manifest(target, corpus, manifest)
+    return manifest
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in-db-s3", required=True, help="s3://bucket/key to sqlite .db (or a local path)")
+    ap.add_argument("--corpus", required=True, choices=["cejc", "csj"], help="corpus id")
+    ap.add_argument(
+        "--out-s3-prefix", required=True, help="s3://bucket/prefix (or a local directory)"
+    )
+    ap.add_argument(
+        "--dump-tables",
+        default="",
+        help="comma-separated table names to dump (optional). Example: infoSession,infoParticipant",
+    )
+    ap.add_argument("--chunk-rows", type=int, default=500_000)
+    ap.add_argument("--max-parts", type=int, default=0, help="0 means no limit; for debugging")
+    ap.add_argument("--batch-rows", type=int, default=50_000, help="rows per fetchmany / RecordBatch")
+    ap.add_argument("--upload-workers", type=int, default=4, help="parallel part uploads")
+    ap.add_argument("--build-utterances", action="store_true")
+    ap.add_argument("--full-refresh", action="store_true", help="ignore the manifest and dump everything")
+    args = ap.parse_args()
+
+    out_prefix = args.out_s3_prefix.rstrip("/")
+    target = make_target(out_prefix)
+
+    # Fail fast if KMS env var missing (because bucket policy has explicit deny)
+    if isinstance(target, S3Target):
+        _ = _kms_extra_args_or_die()
+    max_parts = None if args.max_parts == 0 else args.max_parts
+
+    tables: List[str] = []
+    if args.dump_tables.strip():
+        tables = [t.strip() for t in args.dump_tables.split(",") if t.strip()]
+
+    run_etl(
+        in_db=args.in_db_s3,
+        corpus=args.corpus,
+        target=target,
+        tables=tables,
+        build_utterances=args.build_utterances,
+        chunk_rows=args.chunk_rows,
+        max_parts=max_parts,
+        batch_rows=args.batch_rows,
+        upload_workers=args.upload_workers,
+        full_refresh=args.full_refresh,
+    )
+
 
 if __name__ == "__main__":
     main()
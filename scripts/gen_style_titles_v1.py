@@ -12,6 +12,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -19,6 +20,9 @@ try:
 except Exception:
     boto3 = None
 
+from label_journal import JsonlJournal
+from llm_cache import LLMCache, default_cache
+
 PREFERRED_KEY_COLS = [
     "dataset",
     "speaker_id",
@@ -35,6 +39,7 @@ PREFERRED_FEATURE_COLS = [
     "primary_label",
     "atypicality_v0",
     "prompt_features_used_json",
+    "top_contrib",
     "top_contrib_json",
     "used_features_json",
     "needs_more_context",
@@ -131,6 +136,13 @@ def utc_now_iso() -> str:
 
 
 def normalize_jsonable(v: Any) -> Any:
+    # parquet の list / struct 列（top_contrib など）は ndarray / dict で来る
+    if isinstance(v, np.ndarray):
+        return [normalize_jsonable(x) for x in v.tolist()]
+    if isinstance(v, (list, tuple)):
+        return [normalize_jsonable(x) for x in v]
+    if isinstance(v, dict):
+        return {k: normalize_jsonable(x) for k, x in v.items()}
     try:
         if pd.isna(v):
             return None
@@ -220,18 +232,44 @@ def extract_json_obj(text: str) -> dict[str, Any]:
 
 
 class BedrockTitleGenerator:
-    def __init__(self, region: str, model_id: str, temperature: float = 0.7, max_tokens: int = 300):
+    def __init__(
+        self,
+        region: str,
+        model_id: str,
+        temperature: float = 0.7,
+        max_tokens: int = 300,
+        cache: LLMCache | None = None,
+    ):
         if boto3 is None:
             raise RuntimeError("boto3 is required for Bedrock mode")
         self.model_id = model_id
         self.client = boto3.client("bedrock-runtime", region_name=region)
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.cache = cache if cache is not None else default_cache()
 
     def generate(self, payload: dict[str, Any]) -> LLMResult:
         user_prompt = USER_PROMPT_TEMPLATE.format(
             payload_json=json.dumps(payload, ensure_ascii=False, indent=2)
         )
+        raw_text = self.cache.get_or_call(
+            lambda: self._converse(user_prompt),
+            model_id=self.model_id,
+            system=SYSTEM_PROMPT,
+            prompt=user_prompt,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        obj = extract_json_obj(raw_text)
+        return LLMResult(
+            style_title=str(obj.get("style_title") or FALLBACK_TITLE),
+            style_title_reason=str(obj.get("style_title_reason") or "モデル応答から理由を抽出できませんでした。"),
+            style_title_confidence=float(obj.get("style_title_confidence") or 0.0),
+            style_title_prompt_features_used=[str(x) for x in (obj.get("style_title_prompt_features_used") or [])],
+            raw_text=raw_text,
+        )
+
+    def _converse(self, user_prompt: str) -> str:
         resp = self.client.converse(
             modelId=self.model_id,
             system=[{"text": SYSTEM_PROMPT}],
@@ -250,15 +288,7 @@ class BedrockTitleGenerator:
         for blk in resp.get("output", {}).get("message", {}).get("content", []):
             if "text" in blk:
                 texts.append(blk["text"])
-        raw_text = "\n".join(texts).strip()
-        obj = extract_json_obj(raw_text)
-        return LLMResult(
-            style_title=str(obj.get("style_title") or FALLBACK_TITLE),
-            style_title_reason=str(obj.get("style_title_reason") or "モデル応答から理由を抽出できませんでした。"),
-            style_title_confidence=float(obj.get("style_title_confidence") or 0.0),
-            style_title_prompt_features_used=[str(x) for x in (obj.get("style_title_prompt_features_used") or [])],
-            raw_text=raw_text,
-        )
+        return "\n".join(texts).strip()
 
 
 class DryRunTitleGenerator:
@@ -301,6 +331,15 @@ def main() -> None:
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--sleep-sec", type=float, default=0.0)
     ap.add_argument("--temperature", type=float, default=0.9)
+    ap.add_argument("--llm-cache", default="", help="response cache sqlite (default: $LLM_CACHE_PATH)")
+    ap.add_argument("--no-llm-cache", action="store_true", help="always call Bedrock")
+    ap.add_argument(
+        "--llm-cache-sampled",
+        action="store_true",
+        help="also replay cached responses when --temperature > 0 (default: sampled calls always hit Bedrock)",
+    )
+    ap.add_argument("--journal", type=Path, default=None, help="checkpoint JSONL (default: <output>.journal.jsonl)")
+    ap.add_argument("--checkpoint-every", type=int, default=20, help="append to the journal every N rows")
     args = ap.parse_args()
 
     df = pd.read_parquet(args.input)
@@ -312,65 +351,90 @@ def main() -> None:
     if not feature_cols:
         raise SystemExit("No usable feature columns found. Please inspect the input parquet first.")
 
+    journal_path = args.journal or Path(str(args.output) + ".journal.jsonl")
+    journal = JsonlJournal(
+        journal_path,
+        key_fields=key_cols or ["source_row_number"],
+        flush_every=args.checkpoint_every,
+        resume=args.resume,
+    )
     existing = load_existing_sidecar(args.output) if args.resume else None
-    completed_keys: set[tuple[Any, ...]] = set()
-    if existing is not None and key_cols:
-        completed_keys = set(tuple(x) for x in existing[key_cols].itertuples(index=False, name=None))
+    existing_rows: list[dict[str, Any]] = []
+    completed_keys: set[tuple[str, ...]] = set()
+    if existing is not None:
+        # rows from an earlier consolidated output that the journal does not supersede
+        for r in existing.to_dict(orient="records"):
+            key = journal.key_of({k: normalize_jsonable(r.get(k)) for k in journal.key_fields})
+            if key not in journal:
+                existing_rows.append(r)
+                completed_keys.add(key)
+    if journal.n_loaded:
+        print(f"resume: {journal.n_loaded} rows from journal {journal_path}", file=sys.stderr)
+
+    if args.no_llm_cache or args.dry_run:
+        cache = LLMCache(None)
+    elif args.llm_cache:
+        cache = LLMCache(args.llm_cache, cache_sampled=args.llm_cache_sampled)
+    else:
+        cache = default_cache()
+        if args.llm_cache_sampled:
+            cache.cache_sampled = True
 
     generator = DryRunTitleGenerator() if args.dry_run else BedrockTitleGenerator(
         region=args.region,
         model_id=args.model_id,
         temperature=args.temperature,
+        cache=cache,
     )
 
-    rows: list[dict[str, Any]] = []
-    if existing is not None:
-        rows.extend(existing.to_dict(orient="records"))
-
     processed = 0
-    for i, row in df.iterrows():
-        key = tuple(row[c] for c in key_cols) if key_cols else (i,)
-        if key in completed_keys:
-            continue
-
-        payload = build_payload(row, feature_cols)
-        record: dict[str, Any] = {c: normalize_jsonable(row[c]) for c in key_cols}
-        record["source_row_number"] = int(i)
-        record["style_title_model_id"] = generator.model_id
-        record["style_title_created_at"] = utc_now_iso()
-
-        try:
-            result = generator.generate(payload)
-            title = (result.style_title or "").strip() or FALLBACK_TITLE
-            reason = (result.style_title_reason or "").strip() or "モデル応答から理由を抽出できませんでした。"
-            confidence = min(max(float(result.style_title_confidence), 0.0), 1.0)
-            feature_names = result.style_title_prompt_features_used or list(payload.keys())
-        except Exception as e:
-            title = FALLBACK_TITLE
-            reason = f"style title generation failed: {type(e).__name__}: {e}"
-            confidence = 0.0
-            feature_names = list(payload.keys())
-
-        record["style_title"] = title
-        record["style_title_reason"] = reason
-        record["style_title_confidence"] = confidence
-        record["style_title_prompt_features_used_json"] = json.dumps(feature_names, ensure_ascii=False)
-        rows.append(record)
-        processed += 1
-
-        if processed % 20 == 0 or processed == 1:
-            out_df = pd.DataFrame(rows)
-            args.output.parent.mkdir(parents=True, exist_ok=True)
-            out_df.to_parquet(args.output, index=False)
-            print(f"checkpoint: wrote {len(out_df)} rows -> {args.output}", file=sys.stderr)
-
-        if args.sleep_sec > 0:
-            time.sleep(args.sleep_sec)
-
-    out_df = pd.DataFrame(rows)
+    try:
+        for i, row in df.iterrows():
+            record: dict[str, Any] = {c: normalize_jsonable(row[c]) for c in key_cols}
+            record["source_row_number"] = int(i)
+            key = journal.key_of(record)
+            if key in completed_keys or key in journal:
+                continue
+
+            payload = build_payload(row, feature_cols)
+            record["style_title_model_id"] = generator.model_id
+            record["style_title_created_at"] = utc_now_iso()
+
+            hits_before = cache.hits
+            try:
+                result = generator.generate(payload)
+                title = (result.style_title or "").strip() or FALLBACK_TITLE
+                reason = (result.style_title_reason or "").strip() or "モデル応答から理由を抽出できませんでした。"
+                confidence = min(max(float(result.style_title_confidence), 0.0), 1.0)
+                feature_names = result.style_title_prompt_features_used or list(payload.keys())
+            except Exception as e:
+                title = FALLBACK_TITLE
+                reason = f"style title generation failed: {type(e).__name__}: {e}"
+                confidence = 0.0
+                feature_names = list(payload.keys())
+
+            record["style_title"] = title
+            record["style_title_reason"] = reason
+            record["style_title_confidence"] = confidence
+            record["style_title_prompt_features_used_json"] = json.dumps(feature_names, ensure_ascii=False)
+            journal.append(record)
+            processed += 1
+
+            if processed % args.checkpoint_every == 0:
+                print(f"checkpoint: {len(journal.records())} rows -> {journal_path}", file=sys.stderr)
+
+            if args.sleep_sec > 0 and cache.hits == hits_before:
+                # pacing is for the API; skip it while replaying cached responses
+                time.sleep(args.sleep_sec)
+    finally:
+        journal.close()  # completed rows survive a crash / Ctrl-C
+
+    out_df = pd.DataFrame(existing_rows + journal.records())
     args.output.parent.mkdir(parents=True, exist_ok=True)
     out_df.to_parquet(args.output, index=False)
     print(f"DONE: wrote {len(out_df)} rows -> {args.output}")
+    if not args.dry_run:
+        print(f"llm cache: {cache.hits} hits, {cache.misses} misses ({cache.path or 'disabled'})")
     print(f"key_cols={key_cols}")
     print(f"feature_cols={feature_cols}")
 
@@ -23,6 +23,7 @@ IMPORTANT_COLS = [
     "primary_label",
     "atypicality_v0",
     "prompt_features_used_json",
+    "top_contrib",
     "pg",
     "ix",
     "fill",
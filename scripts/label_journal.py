@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+label_journal.py
+
+Append-only JSONL checkpoint journal for long LLM labeling jobs
+(phase3/label_outliers_with_bedrock_v0.py, gen_style_titles_v1.py).
+
+Completed records are appended every `flush_every` items (flush + fsync), so
+a crash loses at most one batch. On restart the journal is re-read, keys that
+are already present are skipped, and at the end the records are consolidated
+into the final parquet.
+
+A torn last line (crash mid-write) is dropped and truncated away on open.
+When a key appears more than once, the latest record wins.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Key = Tuple[str, ...]
+
+
+class JsonlJournal:
+    def __init__(
+        self,
+        path: str | Path,
+        key_fields: Sequence[str],
+        flush_every: int = 20,
+        resume: bool = True,
+    ):
+        self.path = Path(path)
+        self.key_fields = list(key_fields)
+        self.flush_every = max(1, int(flush_every))
+        self._records: Dict[Key, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._load()
+        else:
+            self.path.write_text("", encoding="utf-8")
+        self.n_loaded = len(self._records)
+
+    def key_of(self, record: Dict[str, Any]) -> Key:
+        return tuple(str(record.get(k)) for k in self.key_fields)
+
+    def _load(self) -> None:
+        good_end = 0
+        with self.path.open("rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n") or not isinstance(rec, dict):
+                    break
+                self._records[self.key_of(rec)] = rec
+                good_end += len(line)
+        if good_end < self.path.stat().st_size:
+            with self.path.open("r+b") as f:
+                f.truncate(good_end)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._records
+
+    def get(self, key: Key) -> Optional[Dict[str, Any]]:
+        return self._records.get(key)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records[self.key_of(record)] = record
+            self._pending.append(record)
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in self._pending)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def records(self, keys: Optional[Iterable[Key]] = None) -> List[Dict[str, Any]]:
+        """Journaled records (latest per key): all in journal order, or in the order of `keys`."""
+        if keys is None:
+            return list(self._records.values())
+        return [self._records[k] for k in keys if k in self._records]
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "JsonlJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+llm_cache.py
+
+Content-addressed on-disk cache for LLM (Bedrock) responses, shared by all
+scripts that call Bedrock:
+
+  - phase3/label_outliers_with_bedrock_v0.invoke_claude
+  - analysis/llm_circular_interaction.call_bedrock
+  - gen_style_titles_v1.BedrockTitleGenerator.generate
+  - paper_figs/relabel_add_used_examples_strict.call_bedrock
+
+The key is sha256 over (model_id, system, prompt, temperature, max_tokens)
+plus optional caller-specific extras (e.g. seed). Re-running a half-finished
+job with the same settings therefore re-sends nothing for completed items.
+
+Only deterministic calls (temperature 0) are cached by default. A call with
+temperature > 0 is a sample, and replaying it would turn a re-run of a
+sampling experiment into a copy of the previous draw, so such calls go
+straight to the model unless the cache was opened with ``cache_sampled=True``
+(or LLM_CACHE_SAMPLED=1 for the process-wide cache).
+
+Storage: one SQLite file (WAL mode, safe for threads and parallel processes).
+
+Environment
+  LLM_CACHE_PATH  default: artifacts/llm_cache/bedrock_responses.sqlite
+  LLM_CACHE       set to 0 / off / false to disable the cache
+  LLM_CACHE_SAMPLED  set to 1 / on / true to also cache temperature > 0 calls
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_CACHE_PATH = "artifacts/llm_cache/bedrock_responses.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def cache_key(
+    model_id: str,
+    system: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    parts: list[Any] = [str(model_id), system or "", prompt, float(temperature), int(max_tokens)]
+    if extra:
+        parts.append(extra)
+    blob = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite response cache with per-process hit/miss counters.
+
+    ``LLMCache(None)`` is a disabled cache: ``get_or_call`` always calls through
+    (and still counts misses), so callers never need a separate code path.
+    Calls with ``temperature > 0`` are treated the same way unless
+    ``cache_sampled`` is set.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, cache_sampled: bool = False):
+        self.path = str(path) if path else None
+        self.cache_sampled = bool(cache_sampled)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._con = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute(_SCHEMA)
+            self._con.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self._con is not None
+
+    def get(self, key: str) -> Optional[str]:
+        if self._con is None:
+            return None
+        with self._lock:
+            row = self._con.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str, model_id: str = "") -> None:
+        if self._con is None:
+            return
+        ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses (key, model_id, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model_id, response, ts),
+            )
+            self._con.commit()
+
+    def get_or_call(
+        self,
+        call: Callable[[], str],
+        *,
+        model_id: str,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        extra: Optional[Dict[str, Any]] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """Return the cached response, or run ``call()`` and store a non-empty result.
+
+        ``accept`` can veto storing a response (e.g. one that does not parse),
+        so a re-run asks the model again instead of replaying the bad answer.
+        A sampled call (``temperature > 0``) is neither read nor stored unless
+        ``cache_sampled`` is set.
+        """
+        if float(temperature) > 0.0 and not self.cache_sampled:
+            with self._lock:
+                self.misses += 1
+            return call()
+        key = cache_key(model_id, system, prompt, temperature, max_tokens, extra)
+        hit = self.get(key)
+        if hit is not None:
+            with self._lock:
+                self.hits += 1
+            return hit
+        with self._lock:
+            self.misses += 1
+        out = call()
+        if out and (accept is None or accept(out)):
+            self.put(key, out, model_id=str(model_id))
+        return out
+
+    def count(self) -> int:
+        if self._con is None:
+            return 0
+        with self._lock:
+            return int(self._con.execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses, "cache_sampled": self.cache_sampled}
+
+    def close(self) -> None:
+        if self._con is not None:
+            with self._lock:
+                self._con.close()
+                self._con = None
+
+
+_default: Optional[LLMCache] = None
+_default_lock = threading.Lock()
+
+
+def cache_disabled_by_env() -> bool:
+    return os.getenv("LLM_CACHE", "").strip().lower() in {"0", "off", "false", "no"}
+
+
+def sampled_cache_enabled_by_env() -> bool:
+    return os.getenv("LLM_CACHE_SAMPLED", "").strip().lower() in {"1", "on", "true", "yes"}
+
+
+def default_cache() -> LLMCache:
+    """Process-wide cache from LLM_CACHE / LLM_CACHE_PATH (created on first use)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = None if cache_disabled_by_env() else os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+            _default = LLMCache(path, cache_sampled=sampled_cache_enabled_by_env())
+        return _default
+
+
+def set_default_cache(cache: Optional[LLMCache]) -> None:
+    """Override the process-wide cache (CLI flags, tests). ``None`` resets to env config."""
+    global _default
+    with _default_lock:
+        _default = cache
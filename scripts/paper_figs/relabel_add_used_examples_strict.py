@@ -1,7 +1,10 @@
-import json, re, time, argparse
+import json, re, sys, time, argparse
 from pathlib import Path
 import boto3
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # scripts/ (llm_cache)
+from llm_cache import LLMCache, default_cache  # noqa: E402
+
 SYSTEM = "You are a careful research assistant. Output ONLY valid JSON. No markdown."
 
 FEAT_RE = re.compile(r"\b(?:PG|FILL|IX|RESP|CL)_[A-Za-z0-9_]+\b")
@@ -35,7 +38,14 @@ def violations(out_labels: dict, examples_present: bool):
             v.append(f"label[{i}] why mentions {missing} but missing from used_features")
     return v
 
-def call_bedrock(rt, model_id, prompt, max_tokens=900):
+def _parses(text: str) -> bool:
+    try:
+        extract_json(text)
+        return True
+    except Exception:
+        return False
+
+def call_bedrock(rt, model_id, prompt, max_tokens=900, cache=None):
     body = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": max_tokens,
@@ -43,8 +53,16 @@ def call_bedrock(rt, model_id, prompt, max_tokens=900):
         "system": SYSTEM,
         "messages": [{"role":"user","content":[{"type":"text","text":prompt}]}],
     }
-    resp = rt.invoke_model(modelId=model_id, body=json.dumps(body))
-    txt = json.loads(resp["body"].read())["content"][0]["text"]
+
+    def _invoke():
+        resp = rt.invoke_model(modelId=model_id, body=json.dumps(body))
+        return json.loads(resp["body"].read())["content"][0]["text"]
+
+    cache = cache if cache is not None else default_cache()
+    txt = cache.get_or_call(
+        _invoke, model_id=model_id, system=SYSTEM, prompt=prompt,
+        temperature=0, max_tokens=max_tokens, accept=_parses,
+    )
     return extract_json(txt)
 
 def build_prompt(row, max_examples=10):
@@ -113,8 +131,12 @@ def main():
     ap.add_argument("--max_retries", type=int, default=3)
     ap.add_argument("--max_examples", type=int, default=10)
     ap.add_argument("--sleep", type=float, default=0.2)
+    ap.add_argument("--llm_cache", default="", help="response cache sqlite (default: $LLM_CACHE_PATH)")
+    ap.add_argument("--no_llm_cache", action="store_true", help="always call Bedrock")
     args = ap.parse_args()
 
+    cache = LLMCache(None) if args.no_llm_cache else LLMCache(args.llm_cache) if args.llm_cache else default_cache()
+
     rt = boto3.client("bedrock-runtime", region_name=args.region)
 
     rows = [json.loads(x) for x in Path(args.in_jsonl).read_text(encoding="utf-8").splitlines() if x.strip()]
@@ -128,14 +150,15 @@ def main():
             ex_ids = [ex.get("example_id") for ex in examples[:args.max_examples] if ex.get("example_id")]
 
             prompt = build_prompt(row, max_examples=args.max_examples)
-            out_labels = call_bedrock(rt, args.model_id, prompt)
+            misses_before = cache.misses
+            out_labels = call_bedrock(rt, args.model_id, prompt, cache=cache)
 
             vios = violations(out_labels, ex_present)
             tries = 0
             while vios and tries < args.max_retries:
                 tries += 1
                 fix_prompt = build_fix_prompt(out_labels, vios, ex_ids)
-                out_labels = call_bedrock(rt, args.model_id, fix_prompt)
+                out_labels = call_bedrock(rt, args.model_id, fix_prompt, cache=cache)
                 vios = violations(out_labels, ex_present)
 
             if vios:
@@ -146,10 +169,11 @@ def main():
 
             row["labels"] = out_labels
             f.write(json.dumps(row, ensure_ascii=False) + "\n")
-            if args.sleep:
+            if args.sleep and cache.misses > misses_before:  # no pacing while replaying the cache
                 time.sleep(args.sleep)
 
     print("wrote:", outp, "rows:", len(rows))
+    print("llm cache:", cache.stats())
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,35 @@
 # scripts/phase3/build_speaker_features.py
+"""
+metrics（hive パーティション corpus=/table=）から speaker_session 単位の特徴量を作る。
+
+以前は table ごとに集約クエリを作って FULL OUTER JOIN し、pandas に載せてから
+フィルタ・書き出し（S3 は aws s3 cp 経由）していた。ここでは
+  - read_parquet('<root>/**/*.parquet', hive_partitioning=true) を直接読み、
+    WHERE "table" IN (...) でパーティションを刈り込む（ローカルも S3 も同じ）
+  - metrics_sfp / metrics_resp の重み付き平均・合計を FILTER 付き集約で
+    1 回の GROUP BY（1 スキャン）にまとめて横持ちにする
+  - 分母フィルタも SQL 内で行い、COPY ... TO で parquet に直接書き出す（S3 も httpfs で直接）
+ので、pandas に全行を載せることはない。出力の列名・列順・値は従来と同じ。
+"""
 from __future__ import annotations
 
 import argparse
 import json
 import os
-import re
 import subprocess
+import sys
 import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import duckdb
-import pandas as pd
+
+S3_REGION = "ap-northeast-1"
+TABLES = [
+    # (table 値, 列 prefix, 重み列の候補)
+    ("metrics_sfp", "sfp__", ["n_utt", "n_valid"]),
+    ("metrics_resp", "resp__", ["n_pairs_total", "n_valid"]),
+]
 
 
 def is_s3(path: str) -> bool:
@@ -33,26 +51,20 @@ def qident(name: str) -> str:
     return '"' + name.replace('"', '""') + '"'
 
 
-def list_local_parquet_files(root_dir: str) -> List[str]:
-    root = Path(root_dir)
-    files = sorted([str(p) for p in root.rglob("*.parquet") if p.is_file()])
-    if not files:
-        raise RuntimeError(f"No parquet files found under: {root_dir}")
-    return files
-
-
 def build_source_sql(metrics_path: str) -> str:
+    """
+    metrics を読む read_parquet(...)。ディレクトリはファイルを列挙せず glob で渡し、
+    hive パーティション列（corpus / table）へのフィルタをファイル単位の刈り込みに使わせる。
+    """
     p = metrics_path.rstrip("/")
 
     if p.endswith(".parquet"):
         return f"read_parquet('{escape_sql_str(p)}', union_by_name=true, hive_partitioning=true)"
 
-    if is_s3(p):
-        return f"read_parquet('{escape_sql_str(p)}/**/*.parquet', union_by_name=true, hive_partitioning=true)"
+    if not is_s3(p) and next(Path(p).rglob("*.parquet"), None) is None:
+        raise RuntimeError(f"No parquet files found under: {metrics_path}")
 
-    files = list_local_parquet_files(p)
-    items = ",".join([f"'{escape_sql_str(f)}'" for f in files])
-    return f"read_parquet([{items}], union_by_name=true, hive_partitioning=true)"
+    return f"read_parquet('{escape_sql_str(p)}/**/*.parquet', union_by_name=true, hive_partitioning=true)"
 
 
 def pick_weight_col(cols: List[str], candidates: List[str]) -> Optional[str]:
@@ -62,159 +74,232 @@ def pick_weight_col(cols: List[str], candidates: List[str]) -> Optional[str]:
     return None
 
 
-def build_agg_sql(
+def build_table_selects(
     table_value: str,
     prefix: str,
     cols: List[str],
     weight_col: Optional[str],
-) -> str:
-    # ★ speaker_session で集約するため conversation_id を group key に追加
-    group_cols = ["corpus", "conversation_id", "speaker_id"]
+) -> Tuple[List[str], List[str], Dict[str, str]]:
+    """
+    1 つの table 値ぶんの (集約式, 出力式, 出力列名 → 集約の内部名) を返す。
+
+    集約式は FILTER (WHERE "table" = table_value) 付きで、全 table をまとめた
+    1 つの GROUP BY に並べる。該当行が無いグループでは従来の FULL OUTER JOIN と
+    同じく NULL になるよう、table_name / rows__count は行数で場合分けする。
+
+    集約は内部名（__<prefix>a<k>）で持ち、出力時に列名を付ける。重み列が n_* のときは
+    従来どおり SUM(COALESCE(w, 0)) と SUM(w) の両方が同名で出るので、後者は
+    従来の結果と同じく <name>_1 として出す。
+    """
+    f = f"FILTER (WHERE {qident('table')} = '{escape_sql_str(table_value)}')"
+    n_rows = qident(f"__{prefix}rows")
 
     # weight: NULL安全
     w = "1"
     if weight_col:
         w = f"COALESCE({qident(weight_col)}, 0)"
 
-    selects = [
-        "corpus",
-        "conversation_id",
-        "speaker_id",
-        f"'{escape_sql_str(table_value)}' AS {prefix}table_name",
-    ]
+    aggs = [f"COUNT(*) {f} AS {n_rows}"]
+    outs = [f"CASE WHEN {n_rows} > 0 THEN '{escape_sql_str(table_value)}' END AS {prefix}table_name"]
+    names: Dict[str, str] = {}
+    used = {f"{prefix}table_name"}
+
+    def add(expr: str, name: str) -> None:
+        internal = qident(f"__{prefix}a{len(aggs)}")
+        aggs.append(f"{expr} AS {internal}")
+        out_name, k = name, 0
+        while out_name in used:
+            k += 1
+            out_name = f"{name}_{k}"
+        used.add(out_name)
+        names.setdefault(name, internal)
+        outs.append(f"{internal} AS {qident(out_name)}")
 
     # 合計分母（後でフィルタに使う）
     if weight_col:
-        selects.append(f"SUM({w}) AS {prefix}{weight_col}__sum")
+        add(f"SUM({w}) {f}", f"{prefix}{weight_col}__sum")
     else:
-        selects.append(f"COUNT(*) AS {prefix}rows__count")
+        used.add(f"{prefix}rows__count")
+        outs.append(f"CASE WHEN {n_rows} > 0 THEN {n_rows} END AS {prefix}rows__count")
 
-    exclude = set(group_cols + ["utt_id", "turn_id"])
+    # ★ speaker_session で集約するため conversation_id も group key
+    exclude = {"corpus", "conversation_id", "speaker_id", "utt_id", "turn_id", "table"}
     for c in cols:
         if c in exclude:
             continue
-        if c in ["corpus", "conversation_id", "speaker_id", "table"]:
-            continue
 
         qc = qident(c)
 
         if c.startswith("rate_") or c == "coverage":
-            selects.append(f"SUM({qc} * {w}) / NULLIF(SUM({w}), 0) AS {prefix}{c}__wmean")
+            add(f"SUM({qc} * {w}) {f} / NULLIF(SUM({w}) {f}, 0)", f"{prefix}{c}__wmean")
         elif c.startswith("n_"):
-            selects.append(f"SUM({qc}) AS {prefix}{c}__sum")
+            add(f"SUM({qc}) {f}", f"{prefix}{c}__sum")
         else:
             # v1と同様：控えめに平均
-            selects.append(f"AVG({qc}) AS {prefix}{c}__avg")
+            add(f"AVG({qc}) {f}", f"{prefix}{c}__avg")
 
-    select_sql = ",\n  ".join(selects)
-    group_sql = ", ".join(group_cols)
+    return aggs, outs, names
 
+
+def build_features_sql(
+    cols: List[str],
+    weights: List[Optional[str]],
+    min_n_utt: int = 0,
+    min_n_pairs_total: int = 0,
+) -> str:
+    """全 table の集約を 1 スキャンで行い、speaker_session ごとに 1 行へ横持ちする SQL。"""
+    aggs: List[str] = []
+    outs: List[str] = []
+    names: Dict[str, str] = {}
+    for (table_value, prefix, _), weight_col in zip(TABLES, weights):
+        a, o, n = build_table_selects(table_value, prefix, cols, weight_col)
+        aggs += a
+        outs += o
+        names.update(n)
+
+    tables_sql = ", ".join(f"'{escape_sql_str(t)}'" for t, _, _ in TABLES)
+    where = []
+    if min_n_utt > 0:
+        where.append(f"n_utt_total >= {int(min_n_utt)}")
+    if min_n_pairs_total > 0:
+        where.append(f"n_pairs_total >= {int(min_n_pairs_total)}")
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    agg_sql = ",\n        ".join(aggs)
+    out_sql = ",\n      ".join(outs)
     return f"""
-    SELECT
-      {select_sql}
-    FROM source
-    WHERE {qident('table')} = '{escape_sql_str(table_value)}'
-    GROUP BY {group_sql}
+    WITH agg AS (
+      SELECT
+        corpus,
+        conversation_id,
+        speaker_id,
+        {agg_sql}
+      FROM source
+      WHERE {qident('table')} IN ({tables_sql})
+      GROUP BY corpus, conversation_id, speaker_id
+    ),
+    joined AS (
+      SELECT
+        corpus AS dataset,
+        conversation_id,
+        speaker_id AS speaker_side,
+
+        -- downstream互換：speaker_id をユニークIDにする（conversation_id:speaker_side）
+        CASE
+          WHEN conversation_id IS NULL THEN speaker_id
+          ELSE conversation_id || ':' || speaker_id
+        END AS speaker_id,
+
+        -- totals (フィルタ用)
+        COALESCE({names.get("sfp__n_utt__sum", "NULL")}, 0) AS n_utt_total,
+        COALESCE({names.get("resp__n_pairs_total__sum", "NULL")}, 0) AS n_pairs_total,
+
+        {out_sql}
+      FROM agg
+    )
+    SELECT * FROM joined
+    {where_sql}
+    ORDER BY dataset, conversation_id, speaker_side
     """
 
 
-def main():
+def configure_s3(con: duckdb.DuckDBPyConnection, kms_key_arn: Optional[str]) -> bool:
+    """
+    httpfs を有効にする。AWS の認証チェーン（+ KMS キー）で S3 シークレットを作れたら True。
+    作れない環境では従来どおり region だけ設定し（環境変数の認証情報を使う）、False を返す。
+    """
+    con.execute("INSTALL httpfs; LOAD httpfs;")
+    opts = ["TYPE S3", "PROVIDER CREDENTIAL_CHAIN", f"REGION '{S3_REGION}'"]
+    if kms_key_arn:
+        opts.append(f"KMS_KEY_ID '{escape_sql_str(kms_key_arn)}'")
+    try:
+        con.execute(f"CREATE OR REPLACE SECRET phase3_s3 ({', '.join(opts)})")
+        return True
+    except duckdb.Error as e:
+        print(f"[warn] S3 secret not created ({e}); using s3_region only", file=sys.stderr)
+        con.execute(f"SET s3_region='{S3_REGION}';")
+        return False
+
+
+def copy_to_parquet(con: duckdb.DuckDBPyConnection, query: str, out_path: str) -> int:
+    """COPY (query) TO out_path で parquet に書き、書いた行数を返す。"""
+    row = con.execute(f"COPY ({query}) TO '{escape_sql_str(out_path)}' (FORMAT PARQUET)").fetchone()
+    return int(row[0]) if row else 0
+
+
+def write_parquet(
+    con: duckdb.DuckDBPyConnection,
+    query: str,
+    out_path: str,
+    kms_key_arn: Optional[str],
+    s3_direct: bool,
+) -> int:
+    """
+    結果を parquet に書き出す。S3 へは httpfs で直接書く。
+    直接書けない（シークレットが無い・書き込み失敗）ときだけ一時ファイル + aws s3 cp にフォールバックする。
+    """
+    if not is_s3(out_path):
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        return copy_to_parquet(con, query, out_path)
+
+    if s3_direct:
+        try:
+            return copy_to_parquet(con, query, out_path)
+        except duckdb.Error as e:
+            print(f"[warn] direct S3 write failed ({e}); falling back to aws s3 cp", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as td:
+        local_out = str(Path(td) / "speaker_features.parquet")
+        n = copy_to_parquet(con, query, local_out)
+        aws_s3_cp(local_out, out_path, kms_key_arn)
+    return n
+
+
+def main(argv: Optional[List[str]] = None):
     ap = argparse.ArgumentParser()
-    ap.add_argument("--metrics", required=True, help="metrics parquet dir/file (local preferred)")
+    ap.add_argument("--metrics", required=True, help="metrics parquet dir/file (local or s3://, hive corpus=/table=)")
     ap.add_argument("--out", required=True, help="output parquet (s3:// or local)")
     ap.add_argument("--min_n_utt", type=int, default=0, help="min SUM(n_utt) for metrics_sfp (0 disables)")
     ap.add_argument("--min_n_pairs_total", type=int, default=0, help="min SUM(n_pairs_total) for metrics_resp (0 disables)")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     con = duckdb.connect(database=":memory:")
+    kms = os.environ.get("S3_KMS_KEY_ARN")
 
-    if is_s3(args.metrics):
-        con.execute("INSTALL httpfs; LOAD httpfs;")
-        con.execute("SET s3_region='ap-northeast-1';")
+    s3_direct = False
+    if is_s3(args.metrics) or is_s3(args.out):
+        s3_direct = configure_s3(con, kms)
 
     source_sql = build_source_sql(args.metrics)
     con.execute(f"CREATE TEMP VIEW source AS SELECT * FROM {source_sql}")
 
-    # 必須列チェック（hive_partitioningで corpus/table が入る前提）
-    cols_all = con.execute("SELECT * FROM source LIMIT 1").df().columns.tolist()
+    # 必須列チェック（hive_partitioningで corpus/table が入る前提）。スキーマ（フッタ）だけ読む
+    cols_all = [r[0] for r in con.execute("DESCRIBE SELECT * FROM source").fetchall()]
     for need in ["corpus", "table", "conversation_id", "speaker_id"]:
         if need not in cols_all:
             raise RuntimeError(f"Missing required col: {need}. got={cols_all[:80]}")
 
-    # ---- table=metrics_sfp ----
-    sfp_sample = con.execute(
-        f"SELECT * FROM source WHERE {qident('table')}='metrics_sfp' LIMIT 1"
-    ).df()
-    if len(sfp_sample) == 0:
-        raise RuntimeError("No rows for table=metrics_sfp")
-    sfp_cols = list(sfp_sample.columns)
-    sfp_weight = pick_weight_col(sfp_cols, ["n_utt", "n_valid"])
-    sfp_agg = build_agg_sql("metrics_sfp", "sfp__", sfp_cols, sfp_weight)
-
-    # ---- table=metrics_resp ----
-    resp_sample = con.execute(
-        f"SELECT * FROM source WHERE {qident('table')}='metrics_resp' LIMIT 1"
-    ).df()
-    if len(resp_sample) == 0:
-        raise RuntimeError("No rows for table=metrics_resp")
-    resp_cols = list(resp_sample.columns)
-    resp_weight = pick_weight_col(resp_cols, ["n_pairs_total", "n_valid"])
-    resp_agg = build_agg_sql("metrics_resp", "resp__", resp_cols, resp_weight)
-
-    con.execute(f"CREATE TEMP VIEW sfp AS {sfp_agg}")
-    con.execute(f"CREATE TEMP VIEW resp AS {resp_agg}")
-
-    # ---- join (speaker_session key: corpus + conversation_id + speaker_id) ----
-    join_sql = f"""
-    WITH joined AS (
-      SELECT
-        COALESCE(sfp.corpus, resp.corpus) AS dataset,
-        COALESCE(sfp.conversation_id, resp.conversation_id) AS conversation_id,
-        COALESCE(sfp.speaker_id, resp.speaker_id) AS speaker_side,
-
-        -- downstream互換：speaker_id をユニークIDにする（conversation_id:speaker_side）
-        CASE
-          WHEN COALESCE(sfp.conversation_id, resp.conversation_id) IS NULL THEN COALESCE(sfp.speaker_id, resp.speaker_id)
-          ELSE COALESCE(sfp.conversation_id, resp.conversation_id) || ':' || COALESCE(sfp.speaker_id, resp.speaker_id)
-        END AS speaker_id,
-
-        -- totals (フィルタ用)
-        COALESCE(sfp.sfp__n_utt__sum, 0) AS n_utt_total,
-        COALESCE(resp.resp__n_pairs_total__sum, 0) AS n_pairs_total,
-
-        sfp.* EXCLUDE (corpus, conversation_id, speaker_id),
-        resp.* EXCLUDE (corpus, conversation_id, speaker_id)
-      FROM sfp
-      FULL OUTER JOIN resp
-        ON sfp.corpus = resp.corpus
-       AND sfp.conversation_id = resp.conversation_id
-       AND sfp.speaker_id = resp.speaker_id
-    )
-    SELECT * FROM joined
-    """
-
-    df = con.execute(join_sql).df()
-
-    # ---- filter by denominators ----
-    if args.min_n_utt > 0:
-        df = df[df["n_utt_total"] >= args.min_n_utt]
-    if args.min_n_pairs_total > 0:
-        df = df[df["n_pairs_total"] >= args.min_n_pairs_total]
+    # パーティション列だけを見る（データ列は読まない）
+    tables_sql = ", ".join(f"'{escape_sql_str(t)}'" for t, _, _ in TABLES)
+    present = {
+        r[0] for r in con.execute(
+            f"SELECT DISTINCT {qident('table')} FROM source WHERE {qident('table')} IN ({tables_sql})"
+        ).fetchall()
+    }
+    for table_value, _, _ in TABLES:
+        if table_value not in present:
+            raise RuntimeError(f"No rows for table={table_value}")
+
+    # union_by_name なので列集合は table 共通（従来の LIMIT 1 サンプルと同じ）
+    weights = [pick_weight_col(cols_all, cands) for _, _, cands in TABLES]
+    query = build_features_sql(cols_all, weights, args.min_n_utt, args.min_n_pairs_total)
 
     out_path = args.out
-    kms = os.environ.get("S3_KMS_KEY_ARN")
-
-    if is_s3(out_path):
-        with tempfile.TemporaryDirectory() as td:
-            local_out = str(Path(td) / "speaker_features.parquet")
-            df.to_parquet(local_out, index=False)
-            aws_s3_cp(local_out, out_path, kms)
-    else:
-        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
-        df.to_parquet(out_path, index=False)
+    n_rows = write_parquet(con, query, out_path, kms, s3_direct)
 
+    sfp_weight, resp_weight = weights
     print(json.dumps({
-        "rows": int(len(df)),
+        "rows": n_rows,
         "out": out_path,
         "sfp_weight": sfp_weight,
         "resp_weight": resp_weight,
@@ -226,4 +311,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
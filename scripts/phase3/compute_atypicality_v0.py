@@ -1,4 +1,18 @@
 # scripts/phase3/compute_atypicality_v0.py
+"""
+speaker_features から dataset ごとの逸脱度（RMS of z）を計算する。
+
+dataset 単位で特徴量行列をまとめて標準化し（列ごとのループなし）、
+行ごとの |z| 上位 topk は np.argpartition で取り出す。寄与特徴は JSON 文字列ではなく
+Arrow の list<struct<feature, z, abs_z, value>> 列 top_contrib として保存するので、
+下流は pd.read_parquet だけで dict のリストとして読める（行ごとの json.loads 不要）。
+
+--reference を指定すると、dataset ごとの基準統計（特徴ごとの center / scale と
+p99 閾値）を小さな parquet に保存する。2 回目以降はその基準を固定したまま
+入力行だけを採点するので、新しいセッション分の features を渡せば O(新規行) で済み、
+既存話者のスコアも動かない。基準を作り直すときは --refit を付ける。
+基準に無い dataset が入力に現れたときは、その dataset だけ入力から基準を作って追記する。
+"""
 from __future__ import annotations
 
 import argparse
@@ -6,11 +20,15 @@ import json
 import os
 import subprocess
 import tempfile
+import warnings
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 def is_s3(path: str) -> bool:
@@ -33,30 +51,169 @@ def read_any(path: str) -> pd.DataFrame:
     return pd.read_parquet(path)
 
 
-def robust_center_scale(col: np.ndarray) -> tuple[float, float]:
-    """median/MAD -> robust std. all-NaN 安全."""
-    v = col[np.isfinite(col)]
-    if v.size == 0:
-        return 0.0, 1.0
-    med = float(np.median(v))
-    mad = float(np.median(np.abs(v - med)))
-    sd = 1.4826 * mad
-    if not np.isfinite(sd) or sd == 0.0:
-        sd = float(np.std(v))
-    if not np.isfinite(sd) or sd == 0.0:
-        sd = 1.0
-    return med, sd
-
-
-def z_center_scale(col: np.ndarray) -> tuple[float, float]:
-    v = col[np.isfinite(col)]
-    if v.size == 0:
-        return 0.0, 1.0
-    mu = float(np.mean(v))
-    sd = float(np.std(v))
-    if not np.isfinite(sd) or sd == 0.0:
-        sd = 1.0
-    return mu, sd
+def exists_any(path: str) -> bool:
+    if is_s3(path):
+        r = subprocess.run(["aws", "s3", "ls", path], capture_output=True, text=True)
+        return r.returncode == 0 and bool(r.stdout.strip())
+    return Path(path).exists()
+
+
+def write_any(table: pa.Table, path: str, kms_key_arn: Optional[str]) -> None:
+    if is_s3(path):
+        with tempfile.TemporaryDirectory() as td:
+            local_out = str(Path(td) / Path(path).name)
+            pq.write_table(table, local_out)
+            aws_s3_cp(local_out, path, kms_key_arn)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, path)
+
+
+CONTRIB_TYPE = pa.list_(pa.struct([
+    ("feature", pa.string()),
+    ("z", pa.float64()),
+    ("abs_z", pa.float64()),
+    ("value", pa.float64()),
+]))
+
+
+def center_scale(X: np.ndarray, scaler: str = "robust_z") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    列ごとの (center, scale) を行列のまま求める。非有限値は無視し、全 NaN 列は (0, 1)。
+      robust_z: median / 1.4826*MAD（MAD=0 なら std、それも 0 なら 1）
+      zscore  : mean / std（0 なら 1）
+    """
+    V = np.where(np.isfinite(X), X, np.nan)
+    n_finite = np.isfinite(V).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 全 NaN 列
+        std = np.nanstd(V, axis=0)
+        if scaler == "robust_z":
+            center = np.nanmedian(V, axis=0)
+            scale = 1.4826 * np.nanmedian(np.abs(V - center), axis=0)
+            bad = ~np.isfinite(scale) | (scale == 0.0)
+            scale = np.where(bad, std, scale)
+        else:
+            center = np.nanmean(V, axis=0)
+            scale = std
+
+    scale = np.where(~np.isfinite(scale) | (scale == 0.0), 1.0, scale)
+    empty = n_finite == 0
+    center = np.where(empty, 0.0, center)
+    scale = np.where(empty, 1.0, scale)
+    return center.astype(float), scale.astype(float)
+
+
+def score_matrix(X: np.ndarray, centers: np.ndarray, scales: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(Z, RMS(z))。RMS は有限な z だけで取り、全 NaN 行は NaN。"""
+    Z = (X - centers) / scales
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        score = np.sqrt(np.nanmean(Z ** 2, axis=1))
+    return Z, score
+
+
+def top_contrib_array(X: np.ndarray, Z: np.ndarray, feat_cols: List[str], topk: int) -> pa.ListArray:
+    """
+    行ごとに |z| 上位 topk の寄与を list<struct<feature, z, abs_z, value>> で返す。
+
+    np.argpartition で k 番目の |z| を求めて上位 topk 列を選び、その topk 個だけを
+    (|z| 降順, 列順) で並べる。|z| が有限でない列は含めない。
+    """
+    n, p = Z.shape
+    k = max(0, min(int(topk), p))
+    if n == 0 or k == 0:
+        return pa.array([[] for _ in range(n)], type=CONTRIB_TYPE)
+
+    absz = np.abs(Z)
+    key = np.where(np.isfinite(absz), absz, -1.0)
+    if k < p:
+        # k 番目の値 thr より大きい列 + thr と同値の列を列順に必要数だけ（境界の同値も列順で決める）
+        kth = np.argpartition(-key, k - 1, axis=1)[:, k - 1]
+        thr = key[np.arange(n), kth][:, None]
+        gt, eq = key > thr, key == thr
+        need = k - gt.sum(axis=1, keepdims=True)
+        sel = gt | (eq & (np.cumsum(eq, axis=1) <= need))
+        idx = np.nonzero(sel)[1].reshape(n, k)
+    else:
+        idx = np.tile(np.arange(p), (n, 1))
+    # 上位 k 個の中で |z| 降順、同値は列順（安定ソート）
+    order = np.argsort(-np.take_along_axis(key, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+
+    rows = np.broadcast_to(np.arange(n)[:, None], (n, k))
+    keep = np.isfinite(absz[rows, idx])
+    offsets = np.concatenate([[0], np.cumsum(keep.sum(axis=1))]).astype(np.int32)
+
+    r, j = rows[keep], idx[keep]
+    val = X[r, j]
+    names = pa.DictionaryArray.from_arrays(pa.array(j.astype(np.int32)), pa.array(feat_cols, type=pa.string()))
+    structs = pa.StructArray.from_arrays(
+        [
+            names.cast(pa.string()),
+            pa.array(Z[r, j], type=pa.float64()),
+            pa.array(absz[r, j], type=pa.float64()),
+            pa.array(val, type=pa.float64(), mask=~np.isfinite(val)),
+        ],
+        fields=list(CONTRIB_TYPE.value_type),
+    )
+    return pa.ListArray.from_arrays(pa.array(offsets), structs)
+
+
+REFERENCE_COLUMNS = [
+    "dataset", "feature", "center", "scale", "scaler", "p99_threshold", "n_fit", "fitted_at",
+]
+
+
+def fit_reference(df: pd.DataFrame, feat_cols: List[str], scaler: str) -> pd.DataFrame:
+    """
+    dataset ごとの基準統計（1 行 = dataset × feature）。
+    p99_threshold は基準データ自身のスコア（有限値）の 99 パーセンタイル（無ければ NaN）。
+    """
+    fitted_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    parts = []
+    for dataset, g in df.groupby("dataset", dropna=False, sort=True):
+        X = g[feat_cols].to_numpy(dtype=float)
+        centers, scales = center_scale(X, scaler)
+        _, score = score_matrix(X, centers, scales)
+        x = score[np.isfinite(score)]
+        parts.append(pd.DataFrame({
+            "dataset": dataset,
+            "feature": feat_cols,
+            "center": centers,
+            "scale": scales,
+            "scaler": scaler,
+            "p99_threshold": float(np.percentile(x, 99)) if x.size else np.nan,
+            "n_fit": int(len(g)),
+            "fitted_at": fitted_at,
+        }))
+    if not parts:
+        return pd.DataFrame(columns=REFERENCE_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[REFERENCE_COLUMNS]
+
+
+def score_dataset(g: pd.DataFrame, ref: pd.DataFrame, topk: int) -> pa.Table:
+    """1 dataset ぶんの行を、その dataset の基準（ref の行、特徴順）で採点する。"""
+    feats = ref["feature"].tolist()
+    missing = [c for c in feats if c not in g.columns]
+    if missing:
+        raise RuntimeError(f"features missing reference columns {missing[:10]}; rerun with --refit")
+
+    X = g[feats].to_numpy(dtype=float)
+    Z, score = score_matrix(X, ref["center"].to_numpy(dtype=float), ref["scale"].to_numpy(dtype=float))
+    thr = float(ref["p99_threshold"].iloc[0])
+    with np.errstate(invalid="ignore"):
+        flags = score >= thr  # NaN（スコア・閾値とも）は False
+
+    return pa.table({
+        "dataset": pa.array(g["dataset"].astype(object), type=pa.string(), from_pandas=True),
+        "speaker_id": pa.array(g["speaker_id"].astype(object), type=pa.string(), from_pandas=True),
+        "n_utt_total": _int_or_null(g, "n_utt_total"),
+        "n_pairs_total": _int_or_null(g, "n_pairs_total"),
+        "atypicality_v0": pa.array(score, type=pa.float64(), mask=~np.isfinite(score)),
+        "top_contrib": top_contrib_array(X, Z, feats, topk),
+        "is_outlier_p99": pa.array(flags, type=pa.bool_()),
+    })
 
 
 def pick_feature_cols(df: pd.DataFrame) -> List[str]:
@@ -78,13 +235,25 @@ def pick_feature_cols(df: pd.DataFrame) -> List[str]:
     return []
 
 
-def main():
+def _int_or_null(g: pd.DataFrame, col: str) -> pa.Array:
+    if col not in g.columns:
+        return pa.nulls(len(g), type=pa.int64())
+    v = pd.to_numeric(g[col], errors="coerce").to_numpy(dtype=float)
+    ok = np.isfinite(v)
+    return pa.array(np.where(ok, v, 0).astype(np.int64), type=pa.int64(), mask=~ok)
+
+
+def main(argv: Optional[List[str]] = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--features", required=True, help="speaker_features.parquet (s3:// or local)")
     ap.add_argument("--out", required=True, help="output parquet (s3:// or local)")
     ap.add_argument("--topk", type=int, default=10)
-    ap.add_argument("--scaler", choices=["zscore", "robust_z"], default="robust_z")
-    args = ap.parse_args()
+    ap.add_argument("--scaler", choices=["zscore", "robust_z"], default=None,
+                    help="default: robust_z (or the scaler stored in --reference)")
+    ap.add_argument("--reference", default="",
+                    help="per-dataset reference parquet (s3:// or local); if it exists, score against it as frozen")
+    ap.add_argument("--refit", action="store_true", help="rebuild --reference from --features")
+    args = ap.parse_args(argv)
 
     df = read_any(args.features)
 
@@ -94,98 +263,60 @@ def main():
     if "speaker_id" not in df.columns:
         raise RuntimeError(f"features must include 'speaker_id' column. got cols={list(df.columns)[:50]}")
 
-    feat_cols = pick_feature_cols(df)
-    if len(feat_cols) == 0:
-        raise RuntimeError(
-            "No feature columns found. Expected numeric columns ending with "
-            "__wmean (preferred) or __mean or __avg."
-        )
-
-    out_rows = []
-    for dataset, g in df.groupby("dataset", dropna=False):
-        g = g.copy()
+    def _feature_cols() -> List[str]:
+        cols = pick_feature_cols(df)
+        if len(cols) == 0:
+            raise RuntimeError(
+                "No feature columns found. Expected numeric columns ending with "
+                "__wmean (preferred) or __mean or __avg."
+            )
+        return cols
 
-        X = g[feat_cols].to_numpy(dtype=float)
-
-        centers = np.zeros(X.shape[1], dtype=float)
-        scales = np.ones(X.shape[1], dtype=float)
+    kms = os.environ.get("S3_KMS_KEY_ARN")
 
-        for j in range(X.shape[1]):
-            col = X[:, j]
-            if args.scaler == "robust_z":
-                mu, sd = robust_center_scale(col)
-            else:
-                mu, sd = z_center_scale(col)
-            centers[j] = mu
-            scales[j] = sd
+    # ---- 基準統計: 固定（既存の --reference）or 入力から作る ----
+    frozen = bool(args.reference) and not args.refit and exists_any(args.reference)
+    if frozen:
+        ref = read_any(args.reference)
+        ref_scalers = set(ref["scaler"].dropna().astype(str))
+        scaler = args.scaler or (ref_scalers.pop() if len(ref_scalers) == 1 else "robust_z")
+        if ref_scalers - {scaler}:
+            raise RuntimeError(f"reference scaler {sorted(ref_scalers)} != --scaler {scaler}; rerun with --refit")
+        known = set(ref["dataset"].tolist())
+        new_ds = df[~df["dataset"].isin(known)]
+        fitted = sorted(str(x) for x in new_ds["dataset"].unique().tolist())
+        if fitted:
+            ref = pd.concat([ref, fit_reference(new_ds, _feature_cols(), scaler)], ignore_index=True)
+    else:
+        scaler = args.scaler or "robust_z"
+        ref = fit_reference(df, _feature_cols(), scaler)
+        fitted = sorted(str(x) for x in ref["dataset"].unique().tolist())
 
-        Z = (X - centers) / scales
-        # RMS(z)
-        score = np.sqrt(np.nanmean(Z ** 2, axis=1))
+    if args.reference and fitted:
+        write_any(pa.Table.from_pandas(ref, preserve_index=False), args.reference, kms)
 
-        for i in range(len(g)):
-            zrow = Z[i, :]
-            absz = np.abs(zrow)
-
-            top_idx = np.argsort(-np.nan_to_num(absz, nan=-1.0))[: args.topk]
-
-            contrib = []
-            for j in top_idx:
-                if not np.isfinite(absz[j]):
-                    continue
-                val = X[i, j]
-                contrib.append(
-                    {
-                        "feature": feat_cols[j],
-                        "z": float(zrow[j]) if np.isfinite(zrow[j]) else None,
-                        "abs_z": float(absz[j]),
-                        "value": float(val) if np.isfinite(val) else None,
-                    }
-                )
-
-            rec = {
-                "dataset": dataset,
-                "speaker_id": g.iloc[i]["speaker_id"],
-                "n_utt_total": int(g.iloc[i]["n_utt_total"]) if "n_utt_total" in g.columns and pd.notna(g.iloc[i]["n_utt_total"]) else None,
-                "n_pairs_total": int(g.iloc[i]["n_pairs_total"]) if "n_pairs_total" in g.columns and pd.notna(g.iloc[i]["n_pairs_total"]) else None,
-                "atypicality_v0": float(score[i]) if np.isfinite(score[i]) else None,
-                "top_contrib_json": json.dumps(contrib, ensure_ascii=False),
-            }
-            out_rows.append(rec)
-
-    out = pd.DataFrame(out_rows)
-
-    # datasetごとのp99
-    out["is_outlier_p99"] = False
-    for dataset, g in out.groupby("dataset", dropna=False):
-        x = g["atypicality_v0"].to_numpy(dtype=float)
-        x = x[np.isfinite(x)]
-        if x.size == 0:
-            continue
-        thr = float(np.nanpercentile(x, 99))
-        out.loc[g.index, "is_outlier_p99"] = out.loc[g.index, "atypicality_v0"] >= thr
+    # ---- 採点（入力行だけ） ----
+    refs: Dict[object, pd.DataFrame] = {k: r for k, r in ref.groupby("dataset", dropna=False, sort=False)}
+    parts = [score_dataset(g, refs[dataset], args.topk) for dataset, g in df.groupby("dataset", dropna=False, sort=True)]
+    out = pa.concat_tables(parts) if parts else pa.table({})
 
-    kms = os.environ.get("S3_KMS_KEY_ARN")
-    if is_s3(args.out):
-        with tempfile.TemporaryDirectory() as td:
-            local_out = str(Path(td) / "atypicality_v0.parquet")
-            out.to_parquet(local_out, index=False)
-            aws_s3_cp(local_out, args.out, kms)
-    else:
-        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
-        out.to_parquet(args.out, index=False)
+    write_any(out, args.out, kms)
 
+    feat_cols = ref["feature"].drop_duplicates().tolist()
     print(json.dumps(
         {
-            "rows": int(len(out)),
+            "rows": int(out.num_rows),
             "out": args.out,
-            "datasets": sorted([str(x) for x in out["dataset"].unique().tolist()]),
-            "scaler": args.scaler,
+            "datasets": sorted(str(x) for x in df["dataset"].unique().tolist()),
+            "scaler": scaler,
             "topk": args.topk,
             "n_features": len(feat_cols),
             "feature_suffix_used": ("__wmean" if any(c.endswith("__wmean") for c in feat_cols)
                                    else "__mean" if any(c.endswith("__mean") for c in feat_cols)
                                    else "__avg"),
+            "reference": args.reference or None,
+            "reference_mode": "frozen" if frozen else "fit",
+            "reference_fitted_datasets": fitted,
         },
         ensure_ascii=False,
         indent=2,
@@ -3,22 +3,38 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import math
 import os
+import random
 import re
 import subprocess
+import sys
 import tempfile
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import boto3
 from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
 import duckdb
+import numpy as np
 import pandas as pd
 
+# llm_cache.py lives in scripts/ (scripts are not a package)
+_SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+if str(_SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(_SCRIPTS_DIR))
+
+from label_journal import JsonlJournal  # noqa: E402
+from llm_cache import LLMCache, default_cache, set_default_cache  # noqa: E402
+
 # =========================
 # Config (Bedrock Claude)
 # =========================
@@ -31,11 +47,30 @@ TEMPERATURE = float(os.getenv("TEMPERATURE", "0.2"))
 
 S3_KMS_KEY_ARN = os.getenv("S3_KMS_KEY_ARN", "").strip()
 
-bedrock_runtime = boto3.client(
-    "bedrock-runtime",
-    region_name=AWS_REGION,
-    config=Config(connect_timeout=10, read_timeout=300, retries={"max_attempts": 10, "mode": "adaptive"}),
-)
+# optional: point at a local stub server (throughput benchmarks / tests)
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL", "").strip() or None
+
+
+def make_bedrock_client(
+    endpoint_url: Optional[str] = None,
+    max_pool_connections: int = 10,
+    max_retries: int = 10,
+    retry_mode: str = "adaptive",
+):
+    return boto3.client(
+        "bedrock-runtime",
+        region_name=AWS_REGION,
+        endpoint_url=endpoint_url,
+        config=Config(
+            connect_timeout=10,
+            read_timeout=300,
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": max_retries, "mode": retry_mode},  # botocore: retries, not total
+        ),
+    )
+
+
+bedrock_runtime = make_bedrock_client(BEDROCK_ENDPOINT_URL)
 # =========================
 # JSON helpers
 # =========================
@@ -168,7 +203,7 @@ def _build_extra_blocks(row: Dict[str, Any]) -> tuple[str, List[str]]:
 # =========================
 # Bedrock invoke
 # =========================
-def invoke_claude(system: str, user: str, max_tokens: int, temperature: float) -> str:
+def _invoke_model_text(client: Any, model_id: str, system: str, user: str, max_tokens: int, temperature: float) -> str:
     body = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": max_tokens,
@@ -177,8 +212,8 @@ def invoke_claude(system: str, user: str, max_tokens: int, temperature: float) -
         "system": system,
     }
 
-    resp = bedrock_runtime.invoke_model(
-        modelId=MODEL_ID,
+    resp = client.invoke_model(
+        modelId=model_id,
         body=json.dumps(body).encode("utf-8"),
         accept="application/json",
         contentType="application/json",
@@ -194,6 +229,140 @@ def invoke_claude(system: str, user: str, max_tokens: int, temperature: float) -
     return "\n".join(texts).strip()
 
 
+def invoke_claude(
+    system: str,
+    user: str,
+    max_tokens: int,
+    temperature: float,
+    client: Any = None,
+    model_id: Optional[str] = None,
+    cache: Optional[LLMCache] = None,
+) -> str:
+    model_id = model_id or MODEL_ID
+    return (cache if cache is not None else default_cache()).get_or_call(
+        lambda: _invoke_model_text(client or bedrock_runtime, model_id, system, user, max_tokens, temperature),
+        model_id=model_id,
+        system=system,
+        prompt=user,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+
+
+# =========================
+# Concurrent invoke (rate limit + retry)
+# =========================
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+
+def _is_retryable(e: BaseException) -> bool:
+    if isinstance(e, ClientError):
+        return str(e.response.get("Error", {}).get("Code") or "") in RETRYABLE_ERROR_CODES
+    return isinstance(e, (BotoConnectionError, HTTPClientError))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/sec, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        # reserve a token now (the balance may go negative) and sleep off the debt outside the lock,
+        # so concurrent callers queue up at exactly 1/rate spacing
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+class BedrockInvoker:
+    """invoke_claude with a shared rate limit and jittered retry on throttling.
+
+    Retries use "full jitter" backoff: sleep ~ U(0, min(cap, base * 2**attempt)).
+    Non-retryable errors and the last failed attempt are re-raised to the caller.
+    Cache hits (if a cache is given) skip both the rate limit and the API call.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        model_id: Optional[str] = None,
+        rate_per_sec: float = 0.0,
+        burst: Optional[float] = None,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+        cache: Optional[LLMCache] = None,
+    ):
+        self.client = client
+        self.cache = cache if cache is not None else LLMCache(None)
+        self.model_id = model_id or MODEL_ID
+        self.bucket = TokenBucket(rate_per_sec, burst, sleep=sleep) if rate_per_sec > 0 else None
+        self.max_retries = int(max_retries)
+        self.backoff_base = float(backoff_base)
+        self.backoff_cap = float(backoff_cap)
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+
+    def _backoff(self, attempt: int) -> float:
+        hi = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        with self._lock:
+            return self._rng.uniform(0.0, hi)
+
+    def __call__(self, system: str, user: str, max_tokens: int, temperature: float) -> str:
+        return self.cache.get_or_call(
+            lambda: self._call_with_retry(system, user, max_tokens, temperature),
+            model_id=self.model_id,
+            system=system,
+            prompt=user,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+    def _call_with_retry(self, system: str, user: str, max_tokens: int, temperature: float) -> str:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self._lock:
+                self.calls += 1
+            try:
+                return _invoke_model_text(
+                    self.client or bedrock_runtime, self.model_id, system, user, max_tokens, temperature,
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+
+
 # =========================
 # Label schema
 # =========================
@@ -267,6 +436,8 @@ class ExamplesIndex:
     dataset_col: str
     metric_col: str
     text_col: str
+    # DuckDB connections are not safe for concurrent queries from worker threads
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
 
 def _guess_col(cols: List[str], candidates: List[str]) -> Optional[str]:
@@ -339,7 +510,8 @@ def fetch_examples(
           AND (CAST({ex.metric_col} AS VARCHAR) = ? OR CAST({ex.metric_col} AS VARCHAR) LIKE ?)
         LIMIT ?
         """
-        rows = ex.con.execute(q, [dataset, mk, f"%{mk}%", per_key]).df()
+        with ex.lock:
+            rows = ex.con.execute(q, [dataset, mk, f"%{mk}%", per_key]).df()
         for _, r in rows.iterrows():
             key = (str(r["metric"]), str(r["text"])[:80])
             if key in seen:
@@ -354,18 +526,22 @@ def fetch_examples(
 # =========================
 # Core labeling
 # =========================
-def _extract_top_features(top_contrib_json: Any, topn: int = 6) -> List[Dict[str, Any]]:
-    if top_contrib_json is None:
+def _extract_top_features(top_contrib: Any, topn: int = 6) -> List[Dict[str, Any]]:
+    """
+    寄与特徴を取り出す。top_contrib（parquet の list<struct>: dict の配列）をそのまま使い、
+    旧形式の top_contrib_json（JSON 文字列、CSV 経由）のときだけ json.loads する。
+    """
+    if top_contrib is None:
         return []
 
     obj = None
-    if isinstance(top_contrib_json, str):
+    if isinstance(top_contrib, str):
         try:
-            obj = json.loads(top_contrib_json)
+            obj = json.loads(top_contrib)
         except Exception:
             obj = None
-    elif isinstance(top_contrib_json, list):
-        obj = top_contrib_json
+    elif isinstance(top_contrib, (list, tuple, np.ndarray)):
+        obj = list(top_contrib)
 
     feats: List[Dict[str, Any]] = []
     for it in (obj or []):
@@ -390,6 +566,30 @@ def _extract_top_features(top_contrib_json: Any, topn: int = 6) -> List[Dict[str
     return feats[:topn]
 
 
+def _row_top_contrib(row: Dict[str, Any]) -> Any:
+    """
+    行の寄与特徴を返す。top_contrib（parquet の list<struct>）を優先し、
+    文字列で来た場合（CSV 経由）は JSON として読めるときだけ使う。
+    読めなければ top_contrib_json にフォールバックし、それも無ければ ValueError
+    （CSV に書き出した top_contrib は Python の repr で JSON ではないため）。
+    """
+    native = row.get("top_contrib")
+    if native is not None and not isinstance(native, (str, float)):
+        return native
+    if isinstance(native, str):
+        try:
+            return json.loads(native)
+        except ValueError:
+            legacy = row.get("top_contrib_json")
+            if isinstance(legacy, str):
+                return legacy
+            raise ValueError(
+                f"top_contrib is not JSON (speaker_id={row.get('speaker_id')}); "
+                "pass a parquet (atypicality_v0 / select_outliers_v0.py output) as --outliers_csv, or provide top_contrib_json"
+            )
+    return row.get("top_contrib_json")
+
+
 def _filter_used_features(requested: Any, top_features: List[Dict[str, Any]]) -> List[str]:
     allowed = {d["feature"] for d in top_features if "feature" in d}
     out: List[str] = []
@@ -402,12 +602,13 @@ def _filter_used_features(requested: Any, top_features: List[Dict[str, Any]]) ->
 def label_one(
     row: Dict[str, Any],
     examples_index: Optional[ExamplesIndex],
+    invoke: Callable[..., str] = invoke_claude,
 ) -> Dict[str, Any]:
     dataset = str(row.get("dataset") or row.get("corpus") or "")
     speaker_id = str(row.get("speaker_id") or "")
     score = row.get("atypicality_v0")
 
-    top_features = _extract_top_features(row.get("top_contrib_json"), topn=6)
+    top_features = _extract_top_features(_row_top_contrib(row), topn=6)
     metric_keys = [_metric_key_from_feature(d["feature"]) for d in top_features if d.get("feature")]
     examples = fetch_examples(examples_index, dataset, metric_keys, per_key=2, max_total=6)
 
@@ -432,7 +633,7 @@ def label_one(
 
 
     try:
-        raw = invoke_claude(SYSTEM_PROMPT, user_prompt, max_tokens=MAX_TOKENS, temperature=TEMPERATURE)
+        raw = invoke(SYSTEM_PROMPT, user_prompt, max_tokens=MAX_TOKENS, temperature=TEMPERATURE)
         obj = _parse_json_lenient(raw)
         if not obj:
             return {
@@ -510,6 +711,103 @@ def label_one(
         }
 
 
+def label_rows(
+    rows: List[Dict[str, Any]],
+    examples_index: Optional[ExamplesIndex],
+    invoke: Callable[..., str] = invoke_claude,
+    concurrency: int = 1,
+    model_id: Optional[str] = None,
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Label `rows` with up to `concurrency` requests in flight; output keeps input order.
+
+    `on_record` is called (serialized) with each record as soon as it completes.
+    """
+    n = len(rows)
+    done = [0]
+    lock = threading.Lock()
+
+    def _one(row: Dict[str, Any]) -> Dict[str, Any]:
+        rec = label_one(row, examples_index, invoke=invoke)
+        rec["model_id"] = model_id or MODEL_ID
+        rec["region"] = AWS_REGION
+        # ✅ timezone-aware UTC
+        rec["created_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        with lock:
+            done[0] += 1
+            print(
+                f"[labeling] {done[0]}/{n} dataset={rec['dataset']} speaker_id={rec['speaker_id']}"
+                f"{' (fallback)' if rec['fallback'] else ''}",
+                flush=True,
+            )
+            if on_record is not None:
+                on_record(rec)
+        return rec
+
+    if concurrency <= 1:
+        return [_one(r) for r in rows]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(_one, rows))
+
+
+JOURNAL_KEY_FIELDS = ["dataset", "speaker_id"]
+
+
+def _row_key(row: Dict[str, Any]) -> tuple:
+    # same normalization label_one applies to target.dataset / target.speaker_id
+    return (str(row.get("dataset") or row.get("corpus") or ""), str(row.get("speaker_id") or ""))
+
+
+def default_journal_path(out_path: str) -> str:
+    if out_path.startswith("s3://"):
+        tag = hashlib.sha1(out_path.encode("utf-8")).hexdigest()[:10]
+        return str(Path("artifacts/phase3/journal") / f"{Path(out_path).stem}.{tag}.journal.jsonl")
+    return out_path + ".journal.jsonl"
+
+
+def label_rows_resumable(
+    rows: List[Dict[str, Any]],
+    examples_index: Optional[ExamplesIndex],
+    journal: JsonlJournal,
+    invoke: Callable[..., str] = invoke_claude,
+    concurrency: int = 1,
+    model_id: Optional[str] = None,
+) -> tuple[List[Dict[str, Any]], int]:
+    """label_rows with an append-only journal: rows already journaled without
+    fallback are skipped; returns (records in input order, n_skipped)."""
+    keys = [_row_key(r) for r in rows]
+    done = {k for k in keys if k in journal and not journal.get(k).get("fallback")}
+    todo = [r for r, k in zip(rows, keys) if k not in done]
+    try:
+        label_rows(todo, examples_index, invoke=invoke, concurrency=concurrency, model_id=model_id, on_record=journal.append)
+    finally:
+        journal.flush()  # keep completed records even if the run dies here
+    return journal.records(keys), len(rows) - len(todo)
+
+
+def load_outliers(path: str) -> pd.DataFrame:
+    """
+    --outliers_csv を読む。parquet（select_outliers_v0.py の出力など）なら top_contrib は
+    list<struct> のまま読める。CSV は top_contrib_json（JSON 文字列）列がある場合だけ使える。
+    """
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)  # top_contrib は list<struct> のまま読める
+    else:
+        df = pd.read_csv(path)
+
+    if "dataset" not in df.columns and "corpus" in df.columns:
+        df["dataset"] = df["corpus"]
+
+    for col in ["dataset", "speaker_id", "atypicality_v0"]:
+        if col not in df.columns:
+            raise RuntimeError(f"outliers_csv must have '{col}' column")
+    if "top_contrib" not in df.columns and "top_contrib_json" not in df.columns:
+        raise RuntimeError("outliers_csv must have 'top_contrib' or 'top_contrib_json' column")
+    if len(df) and "top_contrib" in df.columns:
+        _row_top_contrib(df.iloc[0].to_dict())  # CSV の top_contrib（repr）は最初の行で検出して止める
+    return df
+
+
 def _require_kms_for_s3(out_path: str) -> None:
     if out_path.startswith("s3://") and not S3_KMS_KEY_ARN:
         raise RuntimeError("S3_KMS_KEY_ARN is required for s3:// output (bucket policy enforces SSE-KMS).")
@@ -517,39 +815,67 @@ def _require_kms_for_s3(out_path: str) -> None:
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--outliers_csv", required=True)
+    ap.add_argument("--outliers_csv", required=True, help="outliers CSV (top_contrib_json) or parquet (top_contrib)")
     ap.add_argument("--examples_dir", default="", help="optional local dir of analysis/v1/gold=v13/examples parquet")
     ap.add_argument("--out_parquet", required=True, help="local or s3:// output labels parquet")
     ap.add_argument("--limit", type=int, default=0, help="0=all")
+    ap.add_argument("--concurrency", type=int, default=4, help="max in-flight Bedrock requests")
+    ap.add_argument("--rate_per_sec", type=float, default=0.0, help="token-bucket request rate (0=unlimited)")
+    ap.add_argument("--burst", type=float, default=0.0, help="token-bucket capacity (0=max(1, rate))")
+    ap.add_argument("--max_retries", type=int, default=6, help="retries on throttling / transient errors")
+    ap.add_argument("--endpoint_url", default=BEDROCK_ENDPOINT_URL or "", help="override Bedrock endpoint (local stub)")
+    ap.add_argument("--llm_cache", default="", help="response cache sqlite (default: $LLM_CACHE_PATH or artifacts/llm_cache/...)")
+    ap.add_argument("--no_llm_cache", action="store_true", help="always call Bedrock (do not read/write the cache)")
+    ap.add_argument("--journal", default="", help="checkpoint JSONL (default: <out_parquet>.journal.jsonl)")
+    ap.add_argument("--checkpoint_every", type=int, default=20, help="append to the journal every N records")
+    ap.add_argument("--resume", action="store_true", help="skip rows already in the journal (else start a new one)")
     args = ap.parse_args()
 
     _require_kms_for_s3(args.out_parquet)
 
-    df = pd.read_csv(args.outliers_csv)
-
-    if "dataset" not in df.columns and "corpus" in df.columns:
-        df["dataset"] = df["corpus"]
-
-    for col in ["dataset", "speaker_id", "atypicality_v0", "top_contrib_json"]:
-        if col not in df.columns:
-            raise RuntimeError(f"outliers_csv must have '{col}' column")
+    df = load_outliers(args.outliers_csv)
 
     if args.limit and args.limit > 0:
         df = df.head(args.limit).copy()
 
     examples_index = build_examples_index(args.examples_dir) if args.examples_dir else None
 
-    rows: List[Dict[str, Any]] = []
-    for i, (_, r) in enumerate(df.iterrows(), start=1):
-        ds = str(r.get("dataset") or r.get("corpus") or "")
-        sp = str(r.get("speaker_id") or "")
-        print(f"[labeling] {i}/{len(df)} dataset={ds} speaker_id={sp}", flush=True)
-        rec = label_one(r.to_dict(), examples_index)
-        rec["model_id"] = MODEL_ID
-        rec["region"] = AWS_REGION
-        # ✅ timezone-aware UTC
-        rec["created_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        rows.append(rec)
+    concurrency = max(1, args.concurrency)
+    # BedrockInvoker owns rate limiting + throttling retries; botocore's adaptive limiter would stack on top
+    client = make_bedrock_client(
+        args.endpoint_url or None,
+        max_pool_connections=max(10, concurrency),
+        max_retries=1,
+        retry_mode="standard",
+    )
+    if args.no_llm_cache:
+        set_default_cache(LLMCache(None))
+    elif args.llm_cache:
+        set_default_cache(LLMCache(args.llm_cache))
+    cache = default_cache()
+    # ラベル付けは注釈パス（TEMPERATURE=0.2 既定）でサンプリング実験ではないので、再実行時は応答を再生する
+    cache.cache_sampled = True
+
+    invoker = BedrockInvoker(
+        client=client,
+        cache=cache,
+        rate_per_sec=args.rate_per_sec,
+        burst=args.burst or None,
+        max_retries=args.max_retries,
+    )
+
+    journal_path = args.journal or default_journal_path(args.out_parquet)
+    journal = JsonlJournal(
+        journal_path, JOURNAL_KEY_FIELDS, flush_every=args.checkpoint_every, resume=args.resume,
+    )
+    print(f"[journal] {journal_path} (resumed records: {journal.n_loaded})", flush=True)
+
+    t0 = time.perf_counter()
+    records = [r.to_dict() for _, r in df.iterrows()]
+    rows, n_skipped = label_rows_resumable(
+        records, examples_index, journal, invoke=invoker, concurrency=concurrency,
+    )
+    elapsed = time.perf_counter() - t0
 
     out_df = pd.DataFrame(rows)
 
@@ -574,6 +900,13 @@ def main():
                 "model_id": MODEL_ID,
                 "region": AWS_REGION,
                 "used_examples": bool(examples_index is not None),
+                "concurrency": concurrency,
+                "resumed_rows": n_skipped,
+                "journal": journal_path,
+                "api_calls": invoker.calls,
+                "retries": invoker.retries,
+                "llm_cache": cache.stats(),
+                "elapsed_sec": round(elapsed, 1),
             },
             ensure_ascii=False,
             indent=2,
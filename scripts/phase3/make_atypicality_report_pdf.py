@@ -92,7 +92,7 @@ def main():
             "- scaler: robust_z (median/MAD) if generated as default",
             "",
             "Output columns:",
-            "  dataset, speaker_id, role, n_rows, atypicality_v0, top_contrib_json, is_outlier_p99",
+            "  dataset, speaker_id, role, n_rows, atypicality_v0, top_contrib, is_outlier_p99",
         ]
         fig.text(0.08, 0.90, "\n".join(txt), ha="left", va="top", fontsize=11)
         fig.text(
@@ -167,6 +167,12 @@ def main():
                 top["atypicality_v0"] = top["atypicality_v0"].astype(float).map(lambda v: f"{v:.6g}")
             if "is_outlier_p99" in top.columns:
                 top["is_outlier_p99"] = top["is_outlier_p99"].astype(bool).map(lambda b: "True" if b else "False")
+            if "top_contrib" in top.columns:
+                # list<struct> 列は dict の配列として読めるので、そのまま上位特徴名を並べる
+                top["top_features"] = top["top_contrib"].map(
+                    lambda v: ", ".join(d["feature"] for d in list(v)[:2]) if v is not None else ""
+                )
+                cols.append("top_features")
 
             ax2 = fig.add_axes([0.06, 0.06, 0.88, 0.86])
             ax2.axis("off")
@@ -193,7 +199,7 @@ def main():
         page_title(fig, "How to use v0 (next)")
         tips = [
             "1) Pick outliers (p99 or top-N) per dataset.",
-            "2) For each outlier, inspect top_contrib_json (features with largest |z|).",
+            "2) For each outlier, inspect top_contrib (features with largest |z|).",
             "3) Then go to analysis/v1/gold=v13/examples and sample representative turns.",
             "4) (Phase3-2) LLM labeling: add functional labels (repair/question/backchannel/topic-shift etc.)",
         ]
@@ -9,12 +9,16 @@ set -euo pipefail
 : "${MODEL_ID:=global.anthropic.claude-opus-4-5-20251101-v1:0}"
 : "${MAX_TOKENS:=1400}"
 : "${TEMPERATURE:=0.2}"
+: "${CONCURRENCY:=4}"
+: "${RATE_PER_SEC:=0}"
+: "${LOCAL_DIR:=artifacts/phase3}"
+: "${TOPK_PER_DATASET:=0}"   # 0 = is_outlier_p99 の全行
+: "${OUTLIERS_ENRICH:=}"     # 任意: (dataset, speaker_id) で足す列（Phase4 pause/gap など）の CSV / parquet
 
 export AWS_REGION MODEL_ID MAX_TOKENS TEMPERATURE
 
 AN_V13="${ANALYSIS_OUT}/gold=v13"
 
-LOCAL_DIR="artifacts/phase3"
 EX_DIR="${LOCAL_DIR}/examples_v13"
 mkdir -p "${EX_DIR}" docs/report
 
@@ -28,20 +32,33 @@ aws s3 sync "${AN_V13}/examples" "${EX_DIR}" --exclude "*" --include "*.parquet"
 N_EX="$(find "${EX_DIR}" -type f -name "*.parquet" | wc -l | tr -d ' ')"
 echo "examples parquet files: ${N_EX}"
 
-OUTLIERS_CSV="${LOCAL_DIR}/outliers_v0_topK.csv"
-if [[ ! -f "${OUTLIERS_CSV}" ]]; then
-  echo "ERROR: missing ${OUTLIERS_CSV}"
-  exit 2
+# top_contrib は list<struct> なので CSV を経由させず、outliers も parquet で渡す
+SCORES_LOCAL="${LOCAL_DIR}/atypicality_v0.parquet"   # run_phase3_v0.sh がダウンロードする
+: "${OUTLIERS:=${LOCAL_DIR}/outliers_v0_topK.parquet}"
+if [[ ! -f "${OUTLIERS}" ]]; then
+  if [[ ! -f "${SCORES_LOCAL}" ]]; then
+    echo "ERROR: missing ${OUTLIERS} and ${SCORES_LOCAL} (run scripts/phase3/run_phase3_v0.sh first)"
+    exit 2
+  fi
+  echo "== [0.5] Select outliers from ${SCORES_LOCAL} =="
+  python scripts/phase3/select_outliers_v0.py \
+    --scores "${SCORES_LOCAL}" \
+    --out "${OUTLIERS}" \
+    --topk_per_dataset "${TOPK_PER_DATASET}" \
+    ${OUTLIERS_ENRICH:+--enrich "${OUTLIERS_ENRICH}"}
 fi
+echo "outliers: ${OUTLIERS}"
 
 LABELS_S3="${AN_V13}/labels/labels_v0.parquet"
 LABELS_LOCAL="${LOCAL_DIR}/labels_v0.parquet"
 
 echo "== [1] Run labeling (writes to S3; SSE-KMS enforced) =="
 python scripts/phase3/label_outliers_with_bedrock_v0.py \
-  --outliers_csv "${OUTLIERS_CSV}" \
+  --outliers_csv "${OUTLIERS}" \
   --examples_dir "${EX_DIR}" \
-  --out_parquet "${LABELS_S3}"
+  --out_parquet "${LABELS_S3}" \
+  --concurrency "${CONCURRENCY}" \
+  --rate_per_sec "${RATE_PER_SEC}"
 
 echo "== [2] Download labels and build HTML report =="
 aws s3 cp "${LABELS_S3}" "${LABELS_LOCAL}"
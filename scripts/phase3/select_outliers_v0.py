@@ -0,0 +1,102 @@
+# scripts/phase3/select_outliers_v0.py
+"""
+atypicality_v0.parquet から LLM ラベリング対象の outlier 行を選び、parquet で書き出す。
+
+top_contrib は list<struct> のまま（Arrow の take で行を選ぶだけ）なので、CSV を経由して
+Python の repr に化けることがない。出力はそのまま
+label_outliers_with_bedrock_v0.py --outliers_csv に渡せる。
+
+  - 既定では is_outlier_p99 の行だけを対象にし（--all で全行）、dataset ごとに
+    atypicality_v0 の降順で並べて --topk_per_dataset 件（0=全件）を残す。
+  - --enrich に CSV / parquet を渡すと、(dataset, speaker_id) で左結合して列を足す
+    （Phase4 の pause/gap 列など）。スコア側の列（top_contrib* / atypicality_v0 /
+    is_outlier_p99）は enrich 側からは取らない。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+KEY_COLS = ["dataset", "speaker_id"]
+SCORE_COLS = {"top_contrib", "top_contrib_json", "atypicality_v0", "is_outlier_p99"}
+
+
+def read_table_any(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def select_rows(scores: pd.DataFrame, topk_per_dataset: int = 0, only_outliers: bool = True) -> np.ndarray:
+    """選んだ行の位置（dataset 昇順 → atypicality_v0 降順）。"""
+    df = scores[KEY_COLS + ["atypicality_v0"]].copy()
+    df["_pos"] = np.arange(len(df))
+    if only_outliers and "is_outlier_p99" in scores.columns:
+        df = df[scores["is_outlier_p99"].fillna(False).astype(bool).to_numpy()]
+    df = df.sort_values(["dataset", "atypicality_v0", "speaker_id"], ascending=[True, False, True], na_position="last")
+    if topk_per_dataset > 0:
+        df = df.groupby("dataset", dropna=False, sort=False).head(topk_per_dataset)
+    return df["_pos"].to_numpy()
+
+
+def enrich_table(table: pa.Table, enrich: pd.DataFrame) -> pa.Table:
+    """(dataset, speaker_id) で左結合した enrich 側の列を末尾に足す。"""
+    if "dataset" not in enrich.columns and "corpus" in enrich.columns:
+        enrich = enrich.rename(columns={"corpus": "dataset"})
+    missing = [c for c in KEY_COLS if c not in enrich.columns]
+    if missing:
+        raise RuntimeError(f"enrich must have {missing} column(s)")
+    extra = [c for c in enrich.columns if c not in KEY_COLS and c not in SCORE_COLS and c not in table.column_names]
+    keys = table.select(KEY_COLS).to_pandas()
+    right = enrich[KEY_COLS + extra].drop_duplicates(KEY_COLS, keep="first")
+    merged = keys.merge(right, on=KEY_COLS, how="left")
+    for c in extra:
+        table = table.append_column(c, pa.Array.from_pandas(merged[c]))
+    return table
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scores", required=True, help="atypicality_v0.parquet (local)")
+    ap.add_argument("--out", required=True, help="output parquet (local)")
+    ap.add_argument("--topk_per_dataset", type=int, default=0, help="0=all selected rows")
+    ap.add_argument("--all", action="store_true", help="rank all rows, not only is_outlier_p99")
+    ap.add_argument("--enrich", default="", help="CSV / parquet with extra columns keyed on (dataset, speaker_id)")
+    args = ap.parse_args(argv)
+
+    if not args.out.endswith(".parquet"):
+        raise RuntimeError("--out must be a .parquet (top_contrib is list<struct> and does not survive CSV)")
+
+    table = pq.read_table(args.scores)
+    for c in KEY_COLS + ["atypicality_v0"]:
+        if c not in table.column_names:
+            raise RuntimeError(f"scores must have '{c}' column")
+
+    pos = select_rows(table.select(
+        [c for c in KEY_COLS + ["atypicality_v0", "is_outlier_p99"] if c in table.column_names]
+    ).to_pandas(), args.topk_per_dataset, only_outliers=not args.all)
+    out = table.take(pa.array(pos, type=pa.int64()))
+    if args.enrich:
+        out = enrich_table(out, read_table_any(args.enrich))
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(out, args.out)
+
+    print(json.dumps({
+        "scores": args.scores,
+        "out": args.out,
+        "rows": int(out.num_rows),
+        "per_dataset": {str(k): int(v) for k, v in pd.Series(out.column("dataset").to_pylist()).value_counts().sort_index().items()},
+        "enrich": args.enrich or None,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
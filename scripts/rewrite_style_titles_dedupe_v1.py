@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 import boto3
+import numpy as np
 import pandas as pd
 
 KEY_COLS = ["dataset", "speaker_id", "conversation_id"]
@@ -18,6 +19,7 @@ FEATURE_COLS = [
     "primary_label",
     "atypicality_v0",
     "prompt_features_used_json",
+    "top_contrib",
     "top_contrib_json",
     "used_features_json",
     "needs_more_context",
@@ -52,6 +54,13 @@ def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 def normalize(v):
+    # parquet の list / struct 列（top_contrib など）は ndarray / dict で来る
+    if isinstance(v, np.ndarray):
+        return [normalize(x) for x in v.tolist()]
+    if isinstance(v, (list, tuple)):
+        return [normalize(x) for x in v]
+    if isinstance(v, dict):
+        return {k: normalize(x) for k, x in v.items()}
     try:
         if pd.isna(v):
             return None
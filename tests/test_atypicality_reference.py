@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Persisted per-dataset reference for compute_atypicality_v0 (frozen scoring / --refit)."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+
+import compute_atypicality_v0 as cav  # noqa: E402
+
+
+def _features(datasets, n=120, p=8, seed=0, shift=0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for ds in datasets:
+        X = rng.normal(shift, 1.0, size=(n, p))
+        X[rng.random((n, p)) < 0.05] = np.nan
+        df = pd.DataFrame(X, columns=[f"resp__rate_{j}__wmean" for j in range(p)])
+        df.insert(0, "dataset", ds)
+        df.insert(1, "speaker_id", [f"{ds}_{seed}_{i}:L" for i in range(n)])
+        df["n_utt_total"] = rng.integers(1, 100, n)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _run(tmp_path, df, name, *extra):
+    src = tmp_path / f"{name}.features.parquet"
+    out = tmp_path / f"{name}.scores.parquet"
+    df.to_parquet(src, index=False)
+    cav.main(["--features", str(src), "--out", str(out), *extra])
+    return pd.read_parquet(out)
+
+
+def test_reference_roundtrip_matches_full_fit(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    base = _features(["csj", "cejc"])
+    plain = _run(tmp_path, base, "plain")
+    fitted = _run(tmp_path, base, "fit", "--reference", str(ref))
+
+    r = pd.read_parquet(ref)
+    assert list(r.columns) == cav.REFERENCE_COLUMNS
+    assert len(r) == 2 * 8
+    assert (r.groupby("dataset")["p99_threshold"].nunique() == 1).all()
+    pd.testing.assert_frame_equal(plain, fitted)
+
+    # 同じ入力を固定基準で採点しても結果は同じ
+    frozen = _run(tmp_path, base, "frozen", "--reference", str(ref))
+    pd.testing.assert_frame_equal(plain, frozen)
+
+
+def test_new_batch_scored_against_frozen_reference(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    base = _features(["csj", "cejc"], seed=0)
+    base_scores = _run(tmp_path, base, "base", "--reference", str(ref))
+    ref_before = pd.read_parquet(ref)
+
+    batch = _features(["csj"], n=15, seed=1, shift=3.0)
+    scores = _run(tmp_path, batch, "batch", "--reference", str(ref))
+
+    # 基準は変わらず、新規行だけが基準の center / scale で採点される
+    pd.testing.assert_frame_equal(pd.read_parquet(ref), ref_before)
+    assert len(scores) == len(batch)
+    r = ref_before[ref_before["dataset"] == "csj"]
+    X = batch[r["feature"].tolist()].to_numpy(dtype=float)
+    _, want = cav.score_matrix(X, r["center"].to_numpy(), r["scale"].to_numpy())
+    np.testing.assert_allclose(scores["atypicality_v0"].to_numpy(dtype=float), want)
+    # シフトした新規バッチは固定閾値でほぼ全員 outlier になる（再フィットなら 1% 程度）
+    assert scores["is_outlier_p99"].mean() > 0.5
+
+    # 既存話者を混ぜても既存話者のスコアは動かない
+    mixed = _run(tmp_path, pd.concat([base, batch], ignore_index=True), "mixed", "--reference", str(ref))
+    old = mixed[mixed["speaker_id"].isin(base["speaker_id"])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        old.sort_values("speaker_id").reset_index(drop=True),
+        base_scores.sort_values("speaker_id").reset_index(drop=True),
+    )
+
+
+def test_refit_rebuilds_reference(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    _run(tmp_path, _features(["csj"], seed=0), "a", "--reference", str(ref))
+    before = pd.read_parquet(ref)
+
+    shifted = _features(["csj"], seed=2, shift=5.0)
+    refit = _run(tmp_path, shifted, "b", "--reference", str(ref), "--refit")
+    after = pd.read_parquet(ref)
+
+    assert not np.allclose(before["center"], after["center"])
+    assert refit["is_outlier_p99"].mean() < 0.05
+
+
+def test_unknown_dataset_is_fitted_and_appended(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    _run(tmp_path, _features(["csj"]), "a", "--reference", str(ref))
+    csj_before = pd.read_parquet(ref)
+
+    _run(tmp_path, _features(["nanami"], seed=3), "b", "--reference", str(ref))
+    after = pd.read_parquet(ref)
+
+    assert sorted(after["dataset"].unique()) == ["csj", "nanami"]
+    pd.testing.assert_frame_equal(after[after["dataset"] == "csj"].reset_index(drop=True), csj_before)
+
+
+def test_scaler_mismatch_requires_refit(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    df = _features(["csj"])
+    _run(tmp_path, df, "a", "--reference", str(ref), "--scaler", "zscore")
+    # 保存された scaler を引き継ぐ
+    _run(tmp_path, df, "b", "--reference", str(ref))
+    with pytest.raises(RuntimeError, match="--refit"):
+        _run(tmp_path, df, "c", "--reference", str(ref), "--scaler", "robust_z")
+
+
+def test_missing_reference_feature_requires_refit(tmp_path):
+    ref = tmp_path / "ref.parquet"
+    df = _features(["csj"])
+    _run(tmp_path, df, "a", "--reference", str(ref))
+    with pytest.raises(RuntimeError, match="--refit"):
+        _run(tmp_path, df.drop(columns=["resp__rate_3__wmean"]), "b", "--reference", str(ref))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Vectorized atypicality scoring vs. the legacy per-row loop, and list<struct> top_contrib readers."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import compute_atypicality_v0 as cav  # noqa: E402
+
+
+# ---- legacy reference (column loop + per-row argsort + JSON) ----
+
+def _legacy_center_scale(col, scaler):
+    v = col[np.isfinite(col)]
+    if v.size == 0:
+        return 0.0, 1.0
+    if scaler == "robust_z":
+        med = float(np.median(v))
+        sd = 1.4826 * float(np.median(np.abs(v - med)))
+        if not np.isfinite(sd) or sd == 0.0:
+            sd = float(np.std(v))
+        if not np.isfinite(sd) or sd == 0.0:
+            sd = 1.0
+        return med, sd
+    mu, sd = float(np.mean(v)), float(np.std(v))
+    return mu, (sd if np.isfinite(sd) and sd != 0.0 else 1.0)
+
+
+def _legacy_score(df, feat_cols, topk, scaler):
+    rows = []
+    for dataset, g in df.groupby("dataset", dropna=False):
+        X = g[feat_cols].to_numpy(dtype=float)
+        cs = [_legacy_center_scale(X[:, j], scaler) for j in range(X.shape[1])]
+        Z = (X - np.array([c for c, _ in cs])) / np.array([s for _, s in cs])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            score = np.sqrt(np.nanmean(Z ** 2, axis=1))
+        for i in range(len(g)):
+            absz = np.abs(Z[i])
+            top = np.argsort(-np.nan_to_num(absz, nan=-1.0), kind="stable")[:topk]
+            contrib = [
+                {"feature": feat_cols[j], "z": float(Z[i, j]), "abs_z": float(absz[j]),
+                 "value": float(X[i, j]) if np.isfinite(X[i, j]) else None}
+                for j in top if np.isfinite(absz[j])
+            ]
+            rows.append({
+                "dataset": dataset,
+                "speaker_id": g.iloc[i]["speaker_id"],
+                "atypicality_v0": float(score[i]) if np.isfinite(score[i]) else None,
+                "top_contrib_json": json.dumps(contrib),
+            })
+    out = pd.DataFrame(rows)
+    out["is_outlier_p99"] = False
+    for _, g in out.groupby("dataset", dropna=False):
+        x = g["atypicality_v0"].to_numpy(dtype=float)
+        x = x[np.isfinite(x)]
+        if x.size:
+            out.loc[g.index, "is_outlier_p99"] = out.loc[g.index, "atypicality_v0"] >= float(np.nanpercentile(x, 99))
+    return out
+
+
+def _features(n=400, p=14, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    X = rng.standard_t(4, size=(n, p))
+    X[rng.random((n, p)) < 0.1] = np.nan
+    X[:, 3] = 1.0                      # MAD=0 かつ std=0 → scale 1
+    X[: n // 2, 5] = np.nan            # 片方の dataset で全 NaN 列
+    X[7, :] = np.nan                   # 全 NaN 行 → score NaN
+    df = pd.DataFrame(X, columns=[f"sfp__rate_{j}__wmean" for j in range(p)])
+    df.insert(0, "dataset", np.where(np.arange(n) < n // 2, "csj", "cejc"))
+    df.insert(1, "speaker_id", [f"c{i}:L" for i in range(n)])
+    df["n_utt_total"] = rng.integers(0, 100, n)
+    df["n_pairs_total"] = rng.integers(0, 50, n)
+    return df
+
+
+@pytest.mark.parametrize("scaler", ["robust_z", "zscore"])
+@pytest.mark.parametrize("topk", [3, 10, 50])
+def test_matches_legacy_loop(tmp_path, scaler, topk):
+    df = _features()
+    src = tmp_path / "features.parquet"
+    df.to_parquet(src, index=False)
+    out = tmp_path / "scores.parquet"
+
+    cav.main(["--features", str(src), "--out", str(out), "--topk", str(topk), "--scaler", scaler])
+
+    got = pd.read_parquet(out)
+    want = _legacy_score(df, cav.pick_feature_cols(df), topk, scaler)
+
+    assert got["speaker_id"].tolist() == want["speaker_id"].tolist()
+    np.testing.assert_allclose(
+        got["atypicality_v0"].to_numpy(dtype=float), want["atypicality_v0"].to_numpy(dtype=float), rtol=1e-12
+    )
+    assert got["is_outlier_p99"].tolist() == want["is_outlier_p99"].tolist()
+    for native, legacy in zip(got["top_contrib"], want["top_contrib_json"]):
+        legacy = json.loads(legacy)
+        native = list(native)
+        assert [d["feature"] for d in native] == [d["feature"] for d in legacy]
+        for a, b in zip(native, legacy):
+            assert a["z"] == pytest.approx(b["z"], rel=1e-12)
+            assert a["abs_z"] == pytest.approx(b["abs_z"], rel=1e-12)
+            assert a["value"] == b["value"]
+
+
+def test_top_contrib_is_list_of_struct(tmp_path):
+    df = _features(n=50)
+    src, out = tmp_path / "f.parquet", tmp_path / "s.parquet"
+    df.to_parquet(src, index=False)
+    cav.main(["--features", str(src), "--out", str(out), "--topk", "4"])
+
+    field = pq.read_schema(out).field("top_contrib")
+    assert field.type == cav.CONTRIB_TYPE
+    rows = pd.read_parquet(out).set_index("speaker_id")
+    assert len(rows.loc["c7:L", "top_contrib"]) == 0        # 全 NaN 行
+    assert pd.isna(rows.loc["c7:L", "atypicality_v0"])
+    first = rows["top_contrib"].iloc[0]
+    assert isinstance(first[0], dict) and set(first[0]) == {"feature", "z", "abs_z", "value"}
+
+
+def test_center_scale_edge_columns():
+    X = np.array([[1.0, np.nan, 2.0, np.inf], [1.0, np.nan, 4.0, 1.0], [1.0, np.nan, 9.0, 3.0]])
+    c, s = cav.center_scale(X, "robust_z")
+    assert c.tolist() == [1.0, 0.0, 4.0, 2.0]
+    assert s[0] == 1.0 and s[1] == 1.0
+    assert s[2] == pytest.approx(1.4826 * 2.0)
+
+
+def test_label_outliers_reads_native_contrib():
+    import label_outliers_with_bedrock_v0 as lob
+
+    native = np.array([
+        {"feature": "a", "z": 1.0, "abs_z": 1.0, "value": 0.1},
+        {"feature": "b", "z": -3.0, "abs_z": 3.0, "value": None},
+    ], dtype=object)
+    feats = lob._extract_top_features(native)
+    assert [d["feature"] for d in feats] == ["b", "a"]
+    # 旧形式（CSV の JSON 文字列）も同じ結果
+    assert lob._extract_top_features(json.dumps(list(native))) == feats
+
+
+def test_style_title_payload_serializes_native_contrib():
+    import gen_style_titles_v1 as gst
+
+    v = np.array([{"feature": "a", "z": np.float64(1.5), "abs_z": 1.5, "value": float("nan")}], dtype=object)
+    got = gst.normalize_jsonable(v)
+    assert got == [{"feature": "a", "z": 1.5, "abs_z": 1.5, "value": None}]
+    json.dumps(got)
+
+
+def test_label_outliers_csv_top_contrib_is_not_silently_dropped(tmp_path):
+    import label_outliers_with_bedrock_v0 as lob
+
+    native = [{"feature": "a", "z": 2.0, "abs_z": 2.0, "value": 0.1}]
+    df = pd.DataFrame({"speaker_id": ["s1"], "top_contrib": [np.array(native, dtype=object)]})
+    df.to_csv(tmp_path / "o.csv", index=False)
+    row = pd.read_csv(tmp_path / "o.csv").iloc[0].to_dict()  # top_contrib は Python の repr
+
+    with pytest.raises(ValueError, match="top_contrib"):
+        lob._row_top_contrib(row)
+
+    # top_contrib_json があればそちらを使う
+    row["top_contrib_json"] = json.dumps(native)
+    assert [d["feature"] for d in lob._extract_top_features(lob._row_top_contrib(row))] == ["a"]
+    # JSON 文字列の top_contrib はそのまま読める
+    assert lob._row_top_contrib({"top_contrib": json.dumps(native)}) == native
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Tests for the audio_mvp batch CLI manifest handling."""
+from __future__ import annotations
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+from batch_analyze import read_manifest  # noqa: E402
+
+
+def test_plain_text_manifest(tmp_path):
+    m = tmp_path / "m.txt"
+    m.write_text("# sessions\na/s1.wav\n\nb/s2.mp3\nc/s1.wav\n", encoding="utf-8")
+    assert read_manifest(str(m), "out") == [
+        ("a/s1.wav", os.path.join("out", "s1")),
+        ("b/s2.mp3", os.path.join("out", "s2")),
+        ("c/s1.wav", os.path.join("out", "s1_2")),
+    ]
+
+
+def test_csv_manifest_with_optional_out(tmp_path):
+    m = tmp_path / "m.csv"
+    m.write_text("audio,out\nx/a.wav,custom/a\nx/b.wav,\n", encoding="utf-8")
+    assert read_manifest(str(m), "root") == [
+        ("x/a.wav", "custom/a"),
+        ("x/b.wav", os.path.join("root", "b")),
+    ]
+
+
+def test_empty_manifest(tmp_path):
+    m = tmp_path / "m.txt"
+    m.write_text("\n# nothing\n", encoding="utf-8")
+    assert read_manifest(str(m), "root") == []
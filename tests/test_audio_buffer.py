@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the decode-once AudioBuffer shared across audio_mvp stages."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+import diarize_fallback  # noqa: E402
+from audio_buffer import AudioBuffer, as_buffer  # noqa: E402
+from prosody import segment_prosody  # noqa: E402
+
+
+@pytest.fixture
+def wav(tmp_path):
+    sr = 22050
+    t = np.arange(int(sr * 3.0)) / sr
+    tone = np.where(t < 1.5, np.sin(2 * np.pi * 220 * t), 0.5 * np.sin(2 * np.pi * 330 * t))
+    stereo = np.stack([tone, 0.8 * tone], axis=1).astype(np.float32)
+    path = tmp_path / "s.wav"
+    sf.write(path, stereo, sr)
+    return str(path)
+
+
+def test_load_and_resample_match_librosa_load(wav):
+    buf = AudioBuffer.load(wav)
+    y, sr = librosa.load(wav, sr=None, mono=True)
+    assert buf.sr == sr and np.array_equal(buf.y, y)
+    assert buf.duration == pytest.approx(librosa.get_duration(y=y, sr=sr))
+
+    y16, _ = librosa.load(wav, sr=16000, mono=True)
+    assert np.allclose(buf.resampled(16000).y, y16, atol=1e-6)
+    assert buf.resampled(16000) is buf.resampled(16000)
+    assert buf.resampled(16000).resampled(buf.sr) is buf
+
+
+def test_npy_cache_is_memory_mapped(wav, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    first = AudioBuffer.load(wav, cache_dir=str(cache))
+    first.resampled(16000)
+    assert len(list(cache.glob("*.f32.npy"))) == 2
+
+    def no_decode(*a, **kw):
+        raise AssertionError("decoded again")
+
+    monkeypatch.setattr(librosa, "load", no_decode)
+    monkeypatch.setattr(librosa, "resample", no_decode)
+    again = AudioBuffer.load(wav, cache_dir=str(cache))
+    assert isinstance(again.y, np.memmap) and again.sr == first.sr
+    assert np.array_equal(again.y, first.y)
+    assert np.array_equal(again.resampled(16000).y, first.resampled(16000).y)
+
+
+def test_stages_accept_buffer_or_path(wav):
+    buf = as_buffer(wav)
+    assert as_buffer(buf) is buf
+    assert diarize_fallback.diarize_two_speakers(buf) == diarize_fallback.diarize_two_speakers(wav)
+    y, sr = librosa.load(wav, sr=None, mono=True)
+    assert segment_prosody(buf.y, buf.sr, 0.2, 1.2) == segment_prosody(y, sr, 0.2, 1.2)
+    assert len(buf.segment(0.5, 1.0)) == int(1.0 * buf.sr) - int(0.5 * buf.sr)
+    assert len(buf.segment(5.0, 6.0)) == 0
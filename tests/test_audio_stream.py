@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Tests for chunked streaming analysis of long recordings (audio_mvp/stream.py)."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+from audio_buffer import AudioBuffer  # noqa: E402
+from prosody import compute_prosody_track  # noqa: E402
+from stream import Window, align_speakers, analyze_stream, iter_windows, stitch_diarization  # noqa: E402
+
+SR = 16000
+UTTS = [(t, t + 1.5) for t in np.arange(0.2, 19.0, 2.0)]  # 絶対時刻の発話
+
+
+@pytest.fixture
+def wav(tmp_path):
+    t = np.arange(SR * 20) / SR
+    y = (0.5 * np.sin(2 * np.pi * (180 + 40 * np.sin(0.7 * t)) * t) * (0.6 + 0.4 * np.sin(3 * t))).astype(np.float32)
+    path = tmp_path / "long.wav"
+    sf.write(path, np.stack([y, 0.5 * y], axis=1), SR)
+    return str(path)
+
+
+def _windowed_asr(offset, duration):
+    return [
+        {"start": s - offset, "end": e - offset, "text": f"u{i}"}
+        for i, (s, e) in enumerate(UTTS)
+        if e > offset and s < offset + duration
+    ]
+
+
+def test_windows_cover_recording_with_overlap(wav):
+    path = wav
+    ws = list(iter_windows(path, chunk_sec=6.0, overlap_sec=1.0))
+    assert [(w.core_start, w.core_end) for w in ws] == [(0.0, 6.0), (6.0, 12.0), (12.0, 18.0), (18.0, 20.0)]
+    w = ws[1]
+    assert w.offset == pytest.approx(5.0)
+    np.testing.assert_array_equal(w.buf.y, AudioBuffer.load(path).y[5 * SR:13 * SR])
+
+
+def test_stream_matches_single_pass(wav):
+    path = wav
+    # 窓ごとに呼ばれる順（diarize → transcribe）で窓の先頭時刻を渡す
+    offsets = iter(w.offset for w in iter_windows(path, chunk_sec=6.0, overlap_sec=1.0))
+    seen = []
+
+    def diarize(buf):
+        seen.append(next(offsets))
+        return []
+
+    def transcribe(buf):
+        return _windowed_asr(seen[-1], buf.duration)
+
+    diar, asr, track, dur = analyze_stream(
+        path, diarize=diarize, transcribe=transcribe, chunk_sec=6.0, overlap_sec=1.0, log=None,
+    )
+    assert dur == pytest.approx(20.0)
+    # ダイアライズ失敗の窓は S1 の仮置きになり、つなぎ目で 1 区間に結合される
+    assert [(d["speaker"], d["start"], d["end"]) for d in diar] == [("S1", 0.0, pytest.approx(20.0))]
+    # 各発話はちょうど 1 回だけ、絶対時刻で採用される
+    assert [s["text"] for s in asr] == [f"u{i}" for i in range(len(UTTS))]
+    assert [(s["start"], s["end"]) for s in asr] == [pytest.approx(u) for u in UTTS]
+
+    full = compute_prosody_track(AudioBuffer.load(path).y, SR)
+    for name in ("f0", "rms", "onset"):
+        np.testing.assert_allclose(getattr(track, name), getattr(full, name), rtol=1e-5, atol=1e-5)
+
+
+def test_stitch_diarization_joins_same_speaker_across_cut():
+    buf = AudioBuffer(np.zeros(SR * 8, dtype=np.float32), SR)
+    w0 = Window(0, buf, offset=0.0, core_start=0.0, core_end=6.0)
+    w1 = Window(1, buf, offset=5.0, core_start=6.0, core_end=12.0)
+    parts = [
+        (w0, [{"start": 4.0, "end": 7.0, "speaker": "S1", "f0": 200.0, "rms": 0.1}]),
+        (w1, [
+            {"start": 0.5, "end": 2.0, "speaker": "S1", "f0": 300.0, "rms": 0.3},  # 5.5–7.0
+            {"start": 2.5, "end": 3.0, "speaker": "S2", "f0": 150.0, "rms": 0.2},
+        ]),
+    ]
+    out = stitch_diarization(parts)
+    assert [(d["speaker"], d["start"], d["end"]) for d in out] == [("S1", 4.0, 7.0), ("S2", 7.5, 8.0)]
+    assert out[0]["f0"] == pytest.approx((200 * 2 + 300 * 1) / 3)
+
+
+CHI_F0, MOT_F0 = 320.0, 190.0
+
+
+def _seg(start, end, f0, speaker):
+    return {"start": start, "end": end, "f0": f0, "rms": 0.1, "speaker": speaker}
+
+
+def test_single_speaker_window_joins_global_cluster():
+    diars = [
+        [_seg(0.0, 1.0, CHI_F0, "S1"), _seg(1.5, 3.0, MOT_F0, "S2")],
+        [_seg(0.0, 4.0, MOT_F0 + 5, "S1")],                           # 母親だけ（pyannote は S1）
+        [_seg(0.0, 1.0, MOT_F0 - 5, "S1"), _seg(2.0, 2.5, CHI_F0, "S2")],  # ラベルが逆順
+        [_seg(0.0, 2.0, CHI_F0 - 10, "S2")],                          # 子どもだけ（S2）
+    ]
+    got = [[(d["f0"], d["speaker"]) for d in w] for w in align_speakers(diars, by_f0=True)]
+    assert got == [
+        [(CHI_F0, "S1"), (MOT_F0, "S2")],
+        [(MOT_F0 + 5, "S2")],
+        [(MOT_F0 - 5, "S2"), (CHI_F0, "S1")],
+        [(CHI_F0 - 10, "S1")],
+    ]
+    # by_f0=False: 録音全体で発話時間の長い方（母親）が S1
+    by_dur = align_speakers(diars, by_f0=False)
+    assert {d["speaker"] for w in by_dur for d in w if d["f0"] < 250} == {"S1"}
+    assert {d["speaker"] for w in by_dur for d in w if d["f0"] > 250} == {"S2"}
+
+
+def test_stream_one_speaker_window_keeps_mother_label(wav):
+    # 窓ごとの（窓内相対時刻の）ダイアライズ: 2 番目の窓（コア 6–12s）は母親だけで、pyannote は S1 と付ける
+    per_window = iter([
+        [_seg(0.5, 2.0, CHI_F0, "S1"), _seg(3.0, 5.0, MOT_F0, "S2")],
+        [_seg(0.5, 7.5, MOT_F0, "S1")],
+        [_seg(1.5, 3.0, MOT_F0, "S2"), _seg(4.0, 6.0, CHI_F0, "S1")],
+        [_seg(1.2, 2.8, CHI_F0, "S1"), _seg(3.0, 3.9, MOT_F0, "S2")],
+    ])
+
+    def diarize(buf):
+        return next(per_window)
+
+    diar, _asr, _track, _dur = analyze_stream(
+        wav, diarize=diarize, transcribe=lambda buf: [], chunk_sec=6.0, overlap_sec=1.0, log=None,
+    )
+    mother = [d for d in diar if d["f0"] == pytest.approx(MOT_F0)]
+    child = [d for d in diar if d["f0"] == pytest.approx(CHI_F0)]
+    assert mother and child
+    assert {d["speaker"] for d in mother} == {"S2"}
+    assert {d["speaker"] for d in child} == {"S1"}
+    # 母親だけの窓のコア区間（6–12s）はまるごと S2
+    assert any(d["speaker"] == "S2" and d["start"] <= 6.0 and d["end"] >= 12.0 for d in diar)
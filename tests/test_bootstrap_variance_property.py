@@ -94,3 +94,20 @@ def test_bootstrap_variance_ci_correctness(df: pd.DataFrame) -> None:
             f"ci_lower={row['ci_lower']}, ci_upper={row['ci_upper']} "
             f"(expected {expected_excludes})"
         )
+
+
+@given(df=xy_dataframes())
+@settings(max_examples=5, deadline=None)
+def test_bootstrap_variance_batched_matches_sklearn(df: pd.DataFrame) -> None:
+    """batched engineは同一seedで従来のsklearnループと同じ統計量を返す（欠測あり）。"""
+    df = df.copy()
+    rng = np.random.default_rng(0)
+    for feat in ALL_FEATURES[:5]:
+        df.loc[rng.random(len(df)) < 0.1, feat] = np.nan
+
+    kwargs = dict(df=df, y_col="y", feature_cols=ALL_FEATURES,
+                  alpha=100.0, n_boot=120, seed=3)
+    batched = run_bootstrap_variance(engine="batched", **kwargs)
+    loop = run_bootstrap_variance(engine="sklearn", **kwargs)
+
+    pd.testing.assert_frame_equal(batched, loop, atol=1e-5, rtol=0)
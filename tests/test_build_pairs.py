@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Regression tests: columnar build_pairs vs the original row loop."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from build_pragmatics_gold_from_utterances import (
+    PAIRS_COLUMNS,
+    build_pairs,
+    build_pairs_rowloop,
+    build_segments,
+    df_to_parquet_temp,
+)
+
+_TEXTS = ["うん", "はい。", "そうですね", "行くの？", "えー", "<笑>", "なるほど", "ですよね", "(F あの)", "明日だよ"]
+
+
+def _make_utterances(n_conv: int = 6, n_utt: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for c in range(n_conv):
+        # same-speaker runs + a single-utterance conversation
+        n = 1 if c == n_conv - 1 else n_utt
+        spk = rng.choice(["A", "B", "C"], size=n, p=[0.45, 0.45, 0.1])
+        for i in range(n):
+            rows.append((f"conv{c:02d}", spk[i], float(i), float(i) + 0.5, _TEXTS[rng.integers(len(_TEXTS))]))
+    df = pd.DataFrame(rows, columns=["conversation_id", "speaker_id", "start_time", "end_time", "text"])
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)  # unsorted input
+
+
+@pytest.mark.parametrize("loose", [False, True])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_build_pairs_matches_rowloop(seed, loose):
+    seg = build_segments(_make_utterances(seed=seed))
+    new = build_pairs(seg, loose_aizuchi=loose)
+    old = build_pairs_rowloop(seg, loose_aizuchi=loose)
+    assert len(new) > 0
+    pd.testing.assert_frame_equal(new, old)
+
+
+def test_build_pairs_unsorted_segments_match_rowloop():
+    # build_pairs must not rely on build_segments' ordering
+    seg = build_segments(_make_utterances(seed=2)).sample(frac=1.0, random_state=3)
+    pd.testing.assert_frame_equal(build_pairs(seg, False), build_pairs_rowloop(seg, False))
+
+
+def test_build_pairs_parquet_schema_identical():
+    seg = build_segments(_make_utterances(seed=4))
+    s_new = pq.read_schema(df_to_parquet_temp(build_pairs(seg, False)))
+    s_old = pq.read_schema(df_to_parquet_temp(build_pairs_rowloop(seg, False)))
+    assert s_new.equals(s_old, check_metadata=True)
+
+
+@pytest.mark.parametrize("speakers", [[], ["A", "A", "A"]])
+def test_build_pairs_no_switch_returns_empty_columns(speakers):
+    utt = pd.DataFrame({
+        "conversation_id": ["c1"] * len(speakers),
+        "speaker_id": speakers,
+        "text": ["うん"] * len(speakers),
+    })
+    seg = build_segments(utt)
+    new = build_pairs(seg, False)
+    assert list(new.columns) == PAIRS_COLUMNS
+    pd.testing.assert_frame_equal(new, build_pairs_rowloop(seg, False))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Single-scan speaker feature build vs. the legacy per-table FULL OUTER JOIN."""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+
+import build_speaker_features as bsf  # noqa: E402
+
+
+# ---- legacy reference (per-table aggregate + FULL OUTER JOIN + pandas filter) ----
+
+def _legacy_agg_sql(table_value: str, prefix: str, cols: List[str], weight_col: Optional[str]) -> str:
+    q = bsf.qident
+    w = f"COALESCE({q(weight_col)}, 0)" if weight_col else "1"
+    selects = ["corpus", "conversation_id", "speaker_id", f"'{table_value}' AS {prefix}table_name"]
+    if weight_col:
+        selects.append(f"SUM({w}) AS {prefix}{weight_col}__sum")
+    else:
+        selects.append(f"COUNT(*) AS {prefix}rows__count")
+    for c in cols:
+        if c in ("corpus", "conversation_id", "speaker_id", "utt_id", "turn_id", "table"):
+            continue
+        if c.startswith("rate_") or c == "coverage":
+            selects.append(f"SUM({q(c)} * {w}) / NULLIF(SUM({w}), 0) AS {prefix}{c}__wmean")
+        elif c.startswith("n_"):
+            selects.append(f"SUM({q(c)}) AS {prefix}{c}__sum")
+        else:
+            selects.append(f"AVG({q(c)}) AS {prefix}{c}__avg")
+    return (
+        f"SELECT {', '.join(selects)} FROM source WHERE \"table\" = '{table_value}' "
+        "GROUP BY corpus, conversation_id, speaker_id"
+    )
+
+
+def _legacy_build(metrics: str, min_n_utt: int = 0, min_n_pairs_total: int = 0) -> pd.DataFrame:
+    con = duckdb.connect()
+    files = sorted(str(p) for p in Path(metrics).rglob("*.parquet"))
+    items = ",".join(f"'{f}'" for f in files)
+    con.execute(f"CREATE TEMP VIEW source AS SELECT * FROM read_parquet([{items}], union_by_name=true, hive_partitioning=true)")
+    cols = con.execute("SELECT * FROM source LIMIT 1").df().columns.tolist()
+    sfp_w = bsf.pick_weight_col(cols, ["n_utt", "n_valid"])
+    resp_w = bsf.pick_weight_col(cols, ["n_pairs_total", "n_valid"])
+    con.execute(f"CREATE TEMP VIEW sfp AS {_legacy_agg_sql('metrics_sfp', 'sfp__', cols, sfp_w)}")
+    con.execute(f"CREATE TEMP VIEW resp AS {_legacy_agg_sql('metrics_resp', 'resp__', cols, resp_w)}")
+    df = con.execute("""
+      SELECT
+        COALESCE(sfp.corpus, resp.corpus) AS dataset,
+        COALESCE(sfp.conversation_id, resp.conversation_id) AS conversation_id,
+        COALESCE(sfp.speaker_id, resp.speaker_id) AS speaker_side,
+        CASE
+          WHEN COALESCE(sfp.conversation_id, resp.conversation_id) IS NULL THEN COALESCE(sfp.speaker_id, resp.speaker_id)
+          ELSE COALESCE(sfp.conversation_id, resp.conversation_id) || ':' || COALESCE(sfp.speaker_id, resp.speaker_id)
+        END AS speaker_id,
+        COALESCE(sfp.sfp__n_utt__sum, 0) AS n_utt_total,
+        COALESCE(resp.resp__n_pairs_total__sum, 0) AS n_pairs_total,
+        sfp.* EXCLUDE (corpus, conversation_id, speaker_id),
+        resp.* EXCLUDE (corpus, conversation_id, speaker_id)
+      FROM sfp
+      FULL OUTER JOIN resp
+        ON sfp.corpus = resp.corpus AND sfp.conversation_id = resp.conversation_id AND sfp.speaker_id = resp.speaker_id
+    """).df()
+    if min_n_utt > 0:
+        df = df[df["n_utt_total"] >= min_n_utt]
+    if min_n_pairs_total > 0:
+        df = df[df["n_pairs_total"] >= min_n_pairs_total]
+    return df
+
+
+# ---- fixture: hive-partitioned corpus=/table= layout ----
+
+def _write_metrics(root, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    for corpus in ("csj", "cejc"):
+        convs = [f"{corpus}_{k:02d}" for k in range(6)]
+        sfp_rows, resp_rows = [], []
+        for conv in convs:
+            for spk in ("L", "R"):
+                for _ in range(int(rng.integers(1, 4))):
+                    if not (conv.endswith("05") and spk == "R"):  # resp のみの話者
+                        sfp_rows.append({
+                            "conversation_id": conv, "speaker_id": spk,
+                            "n_utt": int(rng.integers(0, 50)),
+                            "rate_ne": None if rng.random() < 0.2 else float(rng.random()),
+                            "coverage": float(rng.random()),
+                            "mean_len": float(rng.normal(10, 2)),
+                        })
+                    if not (conv.endswith("04") and spk == "L"):  # sfp のみの話者
+                        resp_rows.append({
+                            "conversation_id": conv, "speaker_id": spk,
+                            "n_pairs_total": int(rng.integers(0, 30)),
+                            "rate_backchannel": float(rng.random()),
+                            "gap_sec": float(rng.gamma(2.0, 0.3)),
+                        })
+        for table, rows in (("metrics_sfp", sfp_rows), ("metrics_resp", resp_rows)):
+            d = root / f"corpus={corpus}" / f"table={table}"
+            d.mkdir(parents=True)
+            pd.DataFrame(rows).to_parquet(d / "part-0.parquet", index=False)
+        # 重み列（n_utt / n_pairs_total）が全て NULL の話者: COALESCE した分母は 0、生の SUM は NULL
+        for table, w in (("metrics_sfp", "n_utt"), ("metrics_resp", "n_pairs_total")):
+            d = root / f"corpus={corpus}" / f"table={table}"
+            pd.DataFrame([
+                {"conversation_id": f"{corpus}_nullw", "speaker_id": "L", w: None, "coverage": 0.5},
+                {"conversation_id": f"{corpus}_nullw", "speaker_id": "L", w: None, "coverage": 0.7},
+            ]).astype({w: "Int64"}).to_parquet(d / "part-1.parquet", index=False)
+    # 対象外の table はパーティションごと読み飛ばされる
+    d = root / "corpus=csj" / "table=metrics_other"
+    d.mkdir(parents=True)
+    pd.DataFrame([{"conversation_id": "x", "speaker_id": "L", "n_utt": 999}]).to_parquet(d / "part-0.parquet", index=False)
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["dataset", "conversation_id", "speaker_side"]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("min_n_utt,min_n_pairs_total", [(0, 0), (20, 0), (0, 15), (10, 10)])
+def test_matches_legacy_join(tmp_path, min_n_utt, min_n_pairs_total):
+    metrics = tmp_path / "metrics"
+    _write_metrics(metrics)
+    out = tmp_path / "out" / "speaker_features.parquet"
+
+    bsf.main([
+        "--metrics", str(metrics), "--out", str(out),
+        "--min_n_utt", str(min_n_utt), "--min_n_pairs_total", str(min_n_pairs_total),
+    ])
+
+    got = pd.read_parquet(out)
+    want = _legacy_build(str(metrics), min_n_utt, min_n_pairs_total)
+
+    assert list(got.columns) == list(want.columns)
+    assert len(got) > 0
+    pd.testing.assert_frame_equal(_sorted(got), _sorted(want), check_dtype=False)
+
+
+def test_one_sided_speakers_keep_nulls(tmp_path):
+    metrics = tmp_path / "metrics"
+    _write_metrics(metrics)
+    out = tmp_path / "f.parquet"
+    bsf.main(["--metrics", str(metrics), "--out", str(out)])
+    df = pd.read_parquet(out).set_index("speaker_id")
+
+    resp_only = df.loc["csj_05:R"]
+    assert pd.isna(resp_only["sfp__table_name"]) and pd.isna(resp_only["sfp__n_utt__sum"])
+    assert resp_only["n_utt_total"] == 0
+    assert resp_only["resp__table_name"] == "metrics_resp"
+
+    sfp_only = df.loc["cejc_04:L"]
+    assert pd.isna(sfp_only["resp__table_name"]) and sfp_only["n_pairs_total"] == 0
+
+    null_w = df.loc["csj_nullw:L"]
+    assert null_w["sfp__n_utt__sum"] == 0 and pd.isna(null_w["sfp__n_utt__sum_1"])
+    assert null_w["resp__n_pairs_total__sum"] == 0 and pd.isna(null_w["resp__n_pairs_total__sum_1"])
+
+
+def test_single_aggregate_scan(tmp_path):
+    metrics = tmp_path / "metrics"
+    _write_metrics(metrics)
+    con = duckdb.connect()
+    con.execute(f"CREATE TEMP VIEW source AS SELECT * FROM {bsf.build_source_sql(str(metrics))}")
+    cols = [r[0] for r in con.execute("DESCRIBE SELECT * FROM source").fetchall()]
+    sql = bsf.build_features_sql(cols, ["n_utt", "n_pairs_total"])
+    plan = "\n".join(r[1] for r in con.execute(f"EXPLAIN {sql}").fetchall())
+    assert plan.count("Scanning Files:") == 1  # parquet スキャンは 1 回
+    assert "Scanning Files: 8/9" in plan       # table=metrics_other は刈り込まれる
+    assert "JOIN" not in plan
+
+
+def test_missing_table_raises(tmp_path):
+    metrics = tmp_path / "metrics"
+    d = metrics / "corpus=csj" / "table=metrics_sfp"
+    d.mkdir(parents=True)
+    pd.DataFrame([{"conversation_id": "c", "speaker_id": "L", "n_utt": 1}]).to_parquet(d / "p.parquet", index=False)
+    with pytest.raises(RuntimeError, match="metrics_resp"):
+        bsf.main(["--metrics", str(metrics), "--out", str(tmp_path / "o.parquet")])
+
+
+def test_empty_dir_raises(tmp_path):
+    with pytest.raises(RuntimeError, match="No parquet files"):
+        bsf.build_source_sql(str(tmp_path))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Tests for the streaming SQLite → Parquet ETL (local directory target)."""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import etl_sqlite_to_parquet as etl  # noqa: E402
+from etl_sqlite_to_parquet import (  # noqa: E402
+    LocalDirTarget,
+    PartUploader,
+    dump_table_to_parquet,
+    infer_arrow_schema,
+    load_manifest,
+    run_etl,
+    write_utterances_parquet,
+)
+
+
+@pytest.fixture
+def con(tmp_path):
+    con = sqlite3.connect(str(tmp_path / "src.db"))
+    con.execute("CREATE TABLE info (id INTEGER, name TEXT, housemate TEXT, score REAL, note TEXT)")
+    rows = []
+    for i in range(1, 26):
+        housemate = i if i % 3 == 0 else (b"\xe5\xa6\xbb" if i % 5 == 0 else "なし")  # int / bytes / text
+        score = i if i % 2 else i + 0.5  # integer + real
+        rows.append((i, f"p{i}", housemate, score, None))
+    con.executemany("INSERT INTO info VALUES (?, ?, ?, ?, ?)", rows)
+    con.execute("DELETE FROM info WHERE id BETWEEN 11 AND 20")  # empty rowid range
+    con.execute("CREATE TABLE kv (k TEXT PRIMARY KEY, v INTEGER) WITHOUT ROWID")
+    con.executemany("INSERT INTO kv VALUES (?, ?)", [(f"k{i:02d}", i) for i in range(7)])
+    con.execute(
+        "CREATE TABLE segIPU (TalkID TEXT, IPUID INTEGER, Channel TEXT, "
+        "StartTime REAL, EndTime REAL, Text TEXT)"
+    )
+    con.executemany(
+        "INSERT INTO segIPU VALUES (?, ?, ?, ?, ?, ?)",
+        [("T1", i, "LR"[i % 2], float(i), i + 0.8, "うん") for i in range(9)],
+    )
+    con.commit()
+    yield con
+    con.close()
+
+
+_real_hash_query = etl.hash_query
+
+
+def _read_parts(paths):
+    return pa.concat_tables([pq.read_table(p) for p in paths])
+
+
+def test_infer_arrow_schema_from_storage_classes(con):
+    schema, coerce = infer_arrow_schema(
+        con, "SELECT * FROM info", ["id", "name", "housemate", "score", "note"]
+    )
+    assert schema.types == [pa.int64(), pa.string(), pa.string(), pa.float64(), pa.string()]
+    assert coerce == {"housemate"}
+
+
+def test_dump_table_rowid_parts(con, tmp_path):
+    out = tmp_path / "out"
+    uris = dump_table_to_parquet(
+        con, "info", str(out), "csj", chunk_rows=10, batch_rows=3, upload_workers=2,
+    )
+    # rowid ranges (0,10] (10,20] (20,25]; the middle one is empty and skipped
+    assert [os.path.relpath(u, out) for u in uris] == [
+        "corpus=csj/table=info/part-00000.parquet",
+        "corpus=csj/table=info/part-00001.parquet",
+    ]
+    t = _read_parts(uris)
+    expected = con.execute("SELECT id, name, housemate, score FROM info ORDER BY rowid").fetchall()
+    assert t.column("id").to_pylist() == [r[0] for r in expected]
+    assert t.column("score").to_pylist() == [float(r[3]) for r in expected]
+    assert t.column("housemate").to_pylist() == [
+        h.decode("utf-8") if isinstance(h, bytes) else str(h) for _, _, h, _ in expected
+    ]
+    assert t.column("note").null_count == len(expected)
+    assert pq.read_schema(uris[0]).equals(pq.read_schema(uris[1]))
+
+
+def test_dump_table_without_rowid_rolls_parts(con, tmp_path):
+    uris = dump_table_to_parquet(
+        con, "kv", str(tmp_path / "out"), "csj", chunk_rows=3, batch_rows=2,
+    )
+    assert len(uris) == 3
+    assert [len(pq.read_table(u)) for u in uris] == [3, 3, 1]
+    assert _read_parts(uris).column("v").to_pylist() == list(range(7))
+
+
+def test_dump_table_max_parts(con, tmp_path):
+    uris = dump_table_to_parquet(con, "info", str(tmp_path / "out"), "csj", chunk_rows=5, max_parts=1)
+    assert len(uris) == 1
+    assert pq.read_table(uris[0]).column("id").to_pylist() == [1, 2, 3, 4, 5]
+
+
+def test_write_utterances_parquet_single_file(con, tmp_path):
+    uri = write_utterances_parquet(con, "csj", str(tmp_path / "out"), batch_rows=4)
+    assert uri.endswith("corpus=csj/table=utterances/part-00000.parquet")
+    t = pq.read_table(uri)
+    assert t.column_names == [
+        "conversation_id", "utterance_id", "speaker_id",
+        "start_time", "end_time", "text", "corpus", "unit_type",
+    ]
+    assert len(t) == 9
+    assert set(t.column("unit_type").to_pylist()) == {"IPU"}
+
+
+class _FailingTarget(LocalDirTarget):
+    def put(self, local_path, key):
+        raise OSError("upload failed")
+
+
+def test_part_uploader_reraises_and_cleans_temp(tmp_path):
+    src = tmp_path / "part.parquet"
+    src.write_bytes(b"x")
+    up = PartUploader(_FailingTarget(str(tmp_path / "out")), workers=1)
+    up.submit(str(src), "a/part-00000.parquet")
+    with pytest.raises(OSError):
+        up.close()
+    assert not src.exists()
+
+
+# ── Incremental manifest ─────────────────────────────────────────────
+def _run(tmp_path, **kw):
+    target = LocalDirTarget(str(tmp_path / "out"))
+    kw.setdefault("tables", ["info", "kv"])
+    return run_etl(
+        str(tmp_path / "src.db"), "csj", target,
+        build_utterances=True, chunk_rows=10, batch_rows=4, **kw,
+    )
+
+
+def _part_mtimes(manifest, table):
+    return {p["key"]: os.stat(p["uri"]).st_mtime_ns for p in manifest["tables"][table]["parts"]}
+
+
+def test_manifest_records_parts(con, tmp_path):
+    m = _run(tmp_path)
+    assert load_manifest(LocalDirTarget(str(tmp_path / "out")), "csj") == m
+    info = m["tables"]["info"]
+    assert info["rows"] == 15 and info["max_rowid"] == 25
+    assert [(p["rowid_start"], p["rowid_end"], p["rows"]) for p in info["parts"]] == [(0, 10, 10), (20, 25, 5)]
+    assert m["utterances"]["rows"] == 9
+    assert m["source"]["sha256"]
+
+
+def test_rerun_unchanged_source_writes_nothing(con, tmp_path, capsys):
+    m1 = _run(tmp_path)
+    before = _part_mtimes(m1, "info")
+    m2 = _run(tmp_path)
+    assert "[skip] source unchanged" in capsys.readouterr().out
+    assert _part_mtimes(m2, "info") == before
+
+    os.utime(tmp_path / "src.db")  # new fingerprint, same bytes
+    _run(tmp_path)
+    assert "source content unchanged" in capsys.readouterr().out
+
+
+def test_append_and_modify_touch_only_affected_parts(con, tmp_path):
+    m1 = _run(tmp_path)
+    con.executemany("INSERT INTO info VALUES (?, ?, ?, ?, ?)", [(i, f"p{i}", "なし", 1.5, None) for i in range(26, 38)])
+    con.execute("UPDATE info SET name = 'changed' WHERE id = 3")
+    con.commit()
+
+    m2 = _run(tmp_path)
+    stats = m2["tables"]["info"]["stats"]
+    assert stats == {"kept": 1, "rewritten": 1, "appended": 2, "deleted": 0}
+    assert m2["tables"]["kv"]["stats"]["kept"] == 1  # WITHOUT ROWID table unchanged
+    assert m2["tables"]["info"]["parts"][1] == m1["tables"]["info"]["parts"][1]
+    assert m2["utterances"] == m1["utterances"]
+
+    t = _read_parts([p["uri"] for p in m2["tables"]["info"]["parts"]])
+    expected = con.execute("SELECT id, name FROM info ORDER BY rowid").fetchall()
+    assert list(zip(t.column("id").to_pylist(), t.column("name").to_pylist())) == expected
+
+
+def test_emptied_range_part_is_deleted(con, tmp_path):
+    m1 = _run(tmp_path)
+    con.execute("DELETE FROM info WHERE id > 20")
+    con.commit()
+    m2 = _run(tmp_path)
+    assert m2["tables"]["info"]["stats"]["deleted"] == 1
+    assert not os.path.exists(m1["tables"]["info"]["parts"][1]["uri"])
+
+
+def test_utterances_hashed_while_written(con, tmp_path, monkeypatch):
+    m1 = _run(tmp_path)
+    uri = m1["utterances"]["uri"]
+    sql, _ = etl.UTTERANCE_QUERIES["csj"]
+    assert m1["utterances"]["sha256"] == etl.hash_query(con, sql)[0]  # same digest as before
+
+    con.execute("UPDATE info SET name = 'x' WHERE id = 1")  # utterances unchanged
+    con.commit()
+    before = os.stat(uri).st_mtime_ns
+    m2 = _run(tmp_path)
+    assert m2["utterances"] == m1["utterances"] and os.stat(uri).st_mtime_ns == before
+
+    # changed: the utterances query is scanned once (no separate hash pass)
+    con.execute("INSERT INTO segIPU VALUES ('T2', 0, 'L', 0.0, 0.5, 'はい')")
+    con.commit()
+    calls = []
+    real_stream = etl.stream_query_to_parquet
+
+    def spy(real):
+        def wrapper(c, q, *a, **k):
+            calls.append(q)
+            return real(c, q, *a, **k)
+        return wrapper
+
+    monkeypatch.setattr(etl, "hash_query", spy(_real_hash_query))
+    monkeypatch.setattr(etl, "stream_query_to_parquet", spy(real_stream))
+    m3 = _run(tmp_path)
+    assert calls.count(sql) == 1
+    assert m3["utterances"]["rows"] == 10
+    assert m3["utterances"]["sha256"] == _real_hash_query(con, sql)[0]
+    assert pq.read_table(uri).num_rows == 10
@@ -6,9 +6,26 @@ import numpy as np
 import pandas as pd
 import pytest
 
+import re
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "analysis"))
-from extract_interaction_features_min import extract_features
+import extract_interaction_features_min as eim
+from extract_interaction_features_min import (
+    ExtractionCondition,
+    char_bigrams,
+    count_fillers,
+    entropy_from_tokens,
+    extract_features,
+    extract_features_multi,
+    first_token,
+    is_aizuchi,
+    is_oir,
+    is_question,
+    is_yesno,
+    jaccard,
+    q_stats,
+    sfp_group,
+)
 
 
 def _make_utterances(rows):
@@ -126,3 +143,275 @@ class TestPGPauseVariability:
         # B has only 1 utterance, so no intra-speaker pauses
         row_b = result[result["speaker_id"] == "B"].iloc[0]
         assert math.isnan(row_b["PG_pause_variability"])
+
+
+# ── Reference implementation (copy of the pre-kernel function) ───────
+def _legacy_entropy_from_tokens(tokens):
+    if len(tokens)==0: return float("nan")
+    toks=[t if t else "<EMPTY>" for t in tokens]
+    s=pd.Series(toks)
+    p=s.value_counts(normalize=True)
+    return float(-(p*np.log2(p)).sum())
+
+
+def _legacy_extract_features(
+    utterances_df: pd.DataFrame,
+    target_pairs: set | None,
+    gap_tol: float = 0.05,
+) -> pd.DataFrame:
+    """Pre-kernel extract_features (groupby / re-filter / Series.map), verbatim."""
+    utt = utterances_df.copy()
+    for c in ["conversation_id", "speaker_id"]:
+        utt[c] = utt[c].astype(str)
+    utt["text"] = utt.get("text", "").fillna("").astype(str)
+    if "start_time" in utt.columns and "end_time" in utt.columns:
+        utt["start_time"] = utt["start_time"].astype(float)
+        utt["end_time"] = utt["end_time"].astype(float)
+    else:
+        utt["start_time"] = np.nan
+        utt["end_time"] = np.nan
+
+    if target_pairs is not None:
+        utt = utt[utt["conversation_id"].isin({c for c, _ in target_pairs})].copy()
+
+    utt["sfp_group"] = utt["text"].map(sfp_group)
+    utt["is_question"] = utt["text"].map(is_question)
+
+    sort_cols = ["conversation_id", "start_time", "end_time"]
+    utt = utt.sort_values(sort_cols, kind="mergesort")
+
+    rows = []
+    for conv_id, u in utt.groupby("conversation_id", sort=False):
+        u = u.copy()
+        total_time = float(u["end_time"].max() - u["start_time"].min()) if not u["start_time"].isna().all() else float("nan")
+        prev = u.shift(1)
+        mask = (u["speaker_id"] != prev["speaker_id"]) & prev["speaker_id"].notna()
+        pairs = pd.DataFrame({
+            "conversation_id": conv_id,
+            "prev_speaker_id": prev.loc[mask, "speaker_id"].astype(str).values,
+            "resp_speaker_id": u.loc[mask, "speaker_id"].astype(str).values,
+            "prev_text": prev.loc[mask, "text"].values,
+            "resp_text": u.loc[mask, "text"].values,
+            "prev_sfp_group": prev.loc[mask, "sfp_group"].values,
+            "prev_is_question": prev.loc[mask, "is_question"].values,
+            "prev_end": prev.loc[mask, "end_time"].values,
+            "resp_start": u.loc[mask, "start_time"].values,
+        })
+        if len(pairs) == 0:
+            continue
+        pairs["resp_first_token"] = pairs["resp_text"].map(first_token)
+        pairs["resp_is_aizuchi"] = pairs["resp_text"].map(is_aizuchi).astype(int)
+        pairs["resp_is_yesno"] = pairs["resp_text"].map(is_yesno).astype(int)
+        pairs["resp_is_oir"] = pairs["resp_text"].map(is_oir).astype(int)
+        prev_bg = pairs["prev_text"].map(char_bigrams)
+        resp_bg = pairs["resp_text"].map(char_bigrams)
+        pairs["lex_overlap"] = [jaccard(a, b) for a, b in zip(prev_bg, resp_bg)]
+        pairs["topic_drift"] = 1.0 - pairs["lex_overlap"]
+
+        for spk, p in pairs.groupby("resp_speaker_id", sort=False):
+            key = (conv_id, spk)
+            if target_pairs is not None and key not in target_pairs:
+                continue
+
+            n_pairs_total = int(len(p))
+            after_ne = p["prev_sfp_group"].isin(["NE", "NE_Q"])
+            after_yo = p["prev_sfp_group"].isin(["YO"])
+            after_q = p["prev_is_question"].astype(bool)
+
+            n_after_ne = int(after_ne.sum())
+            n_after_yo = int(after_yo.sum())
+            n_after_q = int(after_q.sum())
+
+            resp_ne_aiz = float(p.loc[after_ne, "resp_is_aizuchi"].mean()) if n_after_ne > 0 else float("nan")
+            resp_ne_ent = float(_legacy_entropy_from_tokens(p.loc[after_ne, "resp_first_token"].tolist())) if n_after_ne > 0 else float("nan")
+            resp_yo_ent = float(_legacy_entropy_from_tokens(p.loc[after_yo, "resp_first_token"].tolist())) if n_after_yo > 0 else float("nan")
+
+            ix_oir = float(p["resp_is_oir"].mean())
+            ix_yesno = float(p["resp_is_yesno"].mean())
+            ix_lex = float(np.nanmean(p["lex_overlap"].values))
+            ix_drift = float(np.nanmean(p["topic_drift"].values))
+
+            ix_oir_q = float(p.loc[after_q, "resp_is_oir"].mean()) if n_after_q > 0 else float("nan")
+            ix_yesno_q = float(p.loc[after_q, "resp_is_yesno"].mean()) if n_after_q > 0 else float("nan")
+
+            us = u[u["speaker_id"] == spk].copy()
+            if us.empty:
+                pg_speech_ratio = float("nan")
+                pause_mean = pause_p50 = pause_p90 = float("nan")
+                pause_variability = float("nan")
+                text_all = ""
+            else:
+                dur = (us["end_time"] - us["start_time"]).clip(lower=0.0)
+                speech_time = float(dur.sum())
+                pg_speech_ratio = float(speech_time / total_time) if total_time and not math.isnan(total_time) and total_time > 0 else float("nan")
+                us = us.sort_values(["start_time", "end_time"], kind="mergesort")
+                pauses = (us["start_time"].values[1:] - us["end_time"].values[:-1]).tolist()
+                pauses = [x for x in pauses if x is not None and not math.isnan(x) and x >= gap_tol]
+                pause_mean, pause_p50, pause_p90 = q_stats(pauses)
+                # PG_pause_variability: CV = std / mean (mean > 0, len >= 2)
+                if len(pauses) >= 2 and pause_mean > 0:
+                    pause_variability = float(np.std(pauses, ddof=1) / pause_mean)
+                else:
+                    pause_variability = float("nan")
+                text_all = "\n".join(us["text"].astype(str).tolist())
+
+            gaps = (p["resp_start"].values - p["prev_end"].values).astype(float)
+            overlap_rate = float((gaps < -gap_tol).mean()) if len(gaps) > 0 else float("nan")
+            gap_list = [float(g) for g in gaps if (not math.isnan(g)) and g >= gap_tol]
+            gap_mean, gap_p50, gap_p90 = q_stats(gap_list)
+
+            fill = count_fillers(text_all)
+            text_len = int(len(re.sub(r"\s+", "", text_all)))
+            fill_rate100 = float(fill["total"] / (text_len / 100.0)) if text_len > 0 else float("nan")
+            fill_has_any = float(np.mean([1 if count_fillers(t)["total"] > 0 else 0 for t in us["text"].astype(str).tolist()])) if not us.empty else float("nan")
+
+            rows.append({
+                "conversation_id": conv_id, "speaker_id": spk,
+                "n_pairs_total": n_pairs_total,
+                "n_pairs_after_NE": n_after_ne,
+                "n_pairs_after_YO": n_after_yo,
+                "IX_n_pairs": n_pairs_total,
+                "IX_n_pairs_after_question": n_after_q,
+
+                "RESP_NE_AIZUCHI_RATE": resp_ne_aiz,
+                "RESP_NE_ENTROPY": resp_ne_ent,
+                "RESP_YO_ENTROPY": resp_yo_ent,
+
+                "IX_oirmarker_rate": ix_oir,
+                "IX_yesno_rate": ix_yesno,
+                "IX_lex_overlap_mean": ix_lex,
+                "IX_topic_drift_mean": ix_drift,
+                "IX_oirmarker_after_question_rate": ix_oir_q,
+                "IX_yesno_after_question_rate": ix_yesno_q,
+
+                "PG_total_time": total_time,
+                "PG_speech_ratio": pg_speech_ratio,
+                "PG_pause_mean": pause_mean,
+                "PG_pause_p50": pause_p50,
+                "PG_pause_p90": pause_p90,
+                "PG_pause_variability": pause_variability,
+                "PG_resp_gap_mean": gap_mean,
+                "PG_resp_gap_p50": gap_p50,
+                "PG_resp_gap_p90": gap_p90,
+                "PG_overlap_rate": overlap_rate,
+                "PG_resp_overlap_rate": overlap_rate,
+
+                "FILL_text_len": text_len,
+                "FILL_cnt_total": int(fill["total"]),
+                "FILL_cnt_eto": int(fill["eto"]),
+                "FILL_cnt_e": int(fill["e"]),
+                "FILL_cnt_ano": int(fill["ano"]),
+                "FILL_rate_per_100chars": fill_rate100,
+                "FILL_has_any": fill_has_any,
+            })
+
+    out = pd.DataFrame(rows)
+    return out
+
+
+
+_TEXTS = [
+    "はい", "うん、そうですね", "ええっとー、あの", "行くの？", "だよね", "そうだよ",
+    "えー　まあ", "なるほど", "え？", "いいえ違う", "", "あのあの えっと", "OK です",
+    "今日は雨だね", "ですよね", "何？", "うーん",
+]
+
+
+def _random_utterances(seed: int, n_conv: int = 5, n_utt: int = 30) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for c in range(n_conv):
+        t = 0.0
+        for _ in range(n_utt if c else 1):  # conv 0: single utterance → no pairs
+            spk = f"S{rng.integers(0, 3)}"
+            t += float(rng.choice([-0.3, 0.0, 0.02, 0.1, 0.5, 1.2]))
+            start = round(t, 2)
+            end = round(start + float(rng.uniform(0.1, 2.0)), 2)
+            if rng.random() < 0.05:
+                start = np.nan  # missing timestamps
+            rows.append((f"c{c}", spk, start, end, _TEXTS[rng.integers(len(_TEXTS))]))
+            t = end
+    df = _make_utterances(rows)
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice:RuntimeWarning")
+class TestKernelMatchesReference:
+    """The single-pass kernel must reproduce the original output exactly."""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2, 3])
+    @pytest.mark.parametrize("gap_tol", [0.05, 0.3])
+    def test_identical_output(self, seed, gap_tol):
+        utt = _random_utterances(seed)
+        new = extract_features(utt, None, gap_tol=gap_tol)
+        ref = _legacy_extract_features(utt, None, gap_tol=gap_tol)
+        pd.testing.assert_frame_equal(new, ref, check_exact=True)
+
+    def test_identical_output_with_target_pairs(self):
+        utt = _random_utterances(5)
+        target = {("c1", "S0"), ("c2", "S1"), ("c3", "S2"), ("c9", "S0")}
+        new = extract_features(utt, target, gap_tol=0.05)
+        ref = _legacy_extract_features(utt, target, gap_tol=0.05)
+        pd.testing.assert_frame_equal(new, ref, check_exact=True)
+
+    def test_identical_output_without_timestamps(self):
+        utt = _random_utterances(6)[["conversation_id", "speaker_id", "text"]]
+        new = extract_features(utt, None, gap_tol=0.05)
+        ref = _legacy_extract_features(utt, None, gap_tol=0.05)
+        pd.testing.assert_frame_equal(new, ref, check_exact=True)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_entropy_matches_value_counts(self, seed):
+        rng = np.random.default_rng(seed)
+        vocab = ["はい", "うん", "", "そう", "えー", "OK"]
+        for n in (1, 2, 7, 40):
+            toks = [vocab[i] for i in rng.integers(0, len(vocab), n)]
+            assert entropy_from_tokens(toks) == _legacy_entropy_from_tokens(toks)
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice:RuntimeWarning")
+class TestMultiCondition:
+    """extract_features_multi == one legacy extraction per condition."""
+
+    NE_1CHAR = re.compile(r"ね$")
+    YO_1CHAR = re.compile(r"よ$")
+
+    def test_conditions_match_separate_extractions(self, monkeypatch):
+        utt = _random_utterances(7)
+        narrow = ("はい", "うん", "ええ", "いいえ", "いや")
+        conds = [
+            ExtractionCondition(gap_tol=0.05),
+            ExtractionCondition(gap_tol=0.5),
+            ExtractionCondition(gap_tol=0.05, yesno_prefixes=narrow),
+            ExtractionCondition(gap_tol=0.05, sfp_ne_re=self.NE_1CHAR, sfp_yo_re=self.YO_1CHAR),
+        ]
+        multi = extract_features_multi(utt, None, conds)
+
+        refs = [
+            _legacy_extract_features(utt, None, gap_tol=0.05),
+            _legacy_extract_features(utt, None, gap_tol=0.5),
+        ]
+        with monkeypatch.context() as m:
+            m.setattr(eim, "YESNO_PREFIXES", list(narrow))
+            refs.append(_legacy_extract_features(utt, None, gap_tol=0.05))
+        with monkeypatch.context() as m:
+            m.setattr(eim, "_SFP_NE_RE", self.NE_1CHAR)
+            m.setattr(eim, "_SFP_YO_RE", self.YO_1CHAR)
+            refs.append(_legacy_extract_features(utt, None, gap_tol=0.05))
+
+        for got, ref in zip(multi, refs):
+            pd.testing.assert_frame_equal(got, ref, check_exact=True)
+        assert not multi[2]["IX_yesno_rate"].equals(multi[0]["IX_yesno_rate"])
+
+    def test_text_processing_runs_once(self, monkeypatch):
+        utt = _random_utterances(8)
+        calls = {"n": 0}
+        orig = eim.count_fillers
+
+        def counting(t):
+            calls["n"] += 1
+            return orig(t)
+
+        monkeypatch.setattr(eim, "count_fillers", counting)
+        extract_features_multi(utt, None, [ExtractionCondition(gap_tol=g) for g in (0.05, 0.1, 0.2, 0.3)])
+        assert calls["n"] == utt["text"].nunique()
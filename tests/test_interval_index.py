@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Parity tests for the sorted-interval search used by audio_mvp speaker assignment."""
+from __future__ import annotations
+
+import os
+import sys
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+from intervals import IntervalIndex  # noqa: E402
+
+
+# ── legacy reference (assign_speaker_to_asr / clip_rows before IntervalIndex) ──
+def _overlap_len(a0, a1, b0, b1):
+    return max(0.0, min(a1, b1) - max(a0, b0))
+
+
+def legacy_best(s0, s1, diar):
+    best, best_ol = None, -1.0
+    for i, (d0, d1) in enumerate(diar):
+        ol = _overlap_len(s0, s1, d0, d1)
+        if ol > best_ol:
+            best_ol, best = ol, i
+    return best, best_ol
+
+
+def legacy_nearest(mid, diar):
+    return min(range(len(diar)), key=lambda i: abs(mid - 0.5 * (diar[i][0] + diar[i][1])))
+
+
+def legacy_clip(rows, w0, w1):
+    return [i for i, (s, e) in enumerate(rows) if min(e, w1) > max(s, w0)]
+
+
+_t = st.floats(min_value=0.0, max_value=600.0, allow_nan=False).map(lambda x: round(x, 2))
+_interval = st.tuples(_t, st.floats(min_value=-1.0, max_value=30.0).map(lambda x: round(x, 2))).map(
+    lambda p: (p[0], p[0] + p[1])
+)
+
+
+@settings(max_examples=300, deadline=None)
+@given(diar=st.lists(_interval, max_size=40), asr=st.lists(_interval, min_size=1, max_size=20))
+def test_best_overlap_and_nearest_match_linear_scan(diar, asr):
+    index = IntervalIndex([d[0] for d in diar], [d[1] for d in diar])
+    for s0, s1 in asr:
+        assert index.best_overlap(s0, s1) == legacy_best(s0, s1, diar)
+        if diar:
+            assert index.nearest_mid(0.5 * (s0 + s1)) == legacy_nearest(0.5 * (s0 + s1), diar)
+
+
+@settings(max_examples=200, deadline=None)
+@given(rows=st.lists(_interval, max_size=40), window=_interval)
+def test_overlapping_matches_clip_filter(rows, window):
+    index = IntervalIndex([r[0] for r in rows], [r[1] for r in rows])
+    assert index.overlapping(*window) == legacy_clip(rows, *window)
+
+
+def test_ties_prefer_earlier_interval():
+    # 同じ重なり・同じ中点なら元の順で先の区間
+    index = IntervalIndex([5.0, 0.0, 0.0], [6.0, 2.0, 2.0])
+    assert index.best_overlap(1.0, 3.0) == (1, 1.0)
+    assert index.best_overlap(10.0, 11.0) == (0, 0.0)  # 重ならなければ先頭
+    assert index.nearest_mid(1.0) == 1
+    assert IntervalIndex([], []).best_overlap(0.0, 1.0) == (None, -1.0)
+    assert index.count_starting_by(0.0) == 2
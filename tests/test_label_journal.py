@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Tests for the append-only labeling journal and resumable labeling runs."""
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+
+import gen_style_titles_v1 as gst  # noqa: E402
+import label_outliers_with_bedrock_v0 as lob  # noqa: E402
+from label_journal import JsonlJournal  # noqa: E402
+
+
+def test_journal_flushes_every_n_and_resumes(tmp_path):
+    path = tmp_path / "j.jsonl"
+    j = JsonlJournal(path, ["k"], flush_every=3)
+    for i in range(5):
+        j.append({"k": i, "v": i * 10})
+    assert len(path.read_text().splitlines()) == 3  # one full batch on disk
+    j.close()
+
+    j2 = JsonlJournal(path, ["k"])
+    assert j2.n_loaded == 5 and ("4",) in j2
+    assert [r["v"] for r in j2.records()] == [0, 10, 20, 30, 40]
+    assert [r["v"] for r in j2.records([("3",), ("9",), ("0",)])] == [30, 0]
+
+
+def test_journal_drops_torn_tail_and_latest_wins(tmp_path):
+    path = tmp_path / "j.jsonl"
+    path.write_text(
+        json.dumps({"k": "a", "v": 1}) + "\n" + json.dumps({"k": "a", "v": 2}) + "\n" + '{"k": "b", "v"',
+        encoding="utf-8",
+    )
+    j = JsonlJournal(path, ["k"], flush_every=1)
+    assert j.records() == [{"k": "a", "v": 2}]
+    j.append({"k": "b", "v": 3})
+    assert [json.loads(x) for x in path.read_text().splitlines()][-1] == {"k": "b", "v": 3}
+    assert JsonlJournal(path, ["k"]).records() == [{"k": "a", "v": 2}, {"k": "b", "v": 3}]
+
+
+def test_journal_without_resume_starts_over(tmp_path):
+    path = tmp_path / "j.jsonl"
+    path.write_text(json.dumps({"k": 1}) + "\n", encoding="utf-8")
+    assert JsonlJournal(path, ["k"], resume=False).n_loaded == 0
+    assert path.read_text() == ""
+
+
+# ── phase3 outlier labeling ─────────────────────────────────────────
+class _Client:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.prompts = []
+
+    def invoke_model(self, modelId, body, accept, contentType):
+        user = json.loads(body)["messages"][0]["content"]
+        self.prompts.append(user)
+        if any(f'"speaker_id": "{s}"' in user for s in self.fail_on):
+            raise RuntimeError("boom")
+        text = json.dumps({"labels": [{"label": "OTHER", "confidence": 0.3}], "summary": "ok"})
+        return {"body": io.BytesIO(json.dumps({"content": [{"type": "text", "text": text}]}).encode())}
+
+
+def _outliers(n):
+    return [
+        {"dataset": "cejc", "speaker_id": f"S{i}", "atypicality_v0": float(i), "top_contrib_json": "[]"}
+        for i in range(n)
+    ]
+
+
+def test_resumable_labeling_skips_done_and_retries_fallback(tmp_path):
+    path = tmp_path / "labels.parquet.journal.jsonl"
+    first = _Client(fail_on={"S2"})
+    with JsonlJournal(path, lob.JOURNAL_KEY_FIELDS, flush_every=2) as j:
+        rows, skipped = lob.label_rows_resumable(
+            _outliers(4), None, j, invoke=lob.BedrockInvoker(client=first), concurrency=2,
+        )
+    assert skipped == 0 and [r["fallback"] for r in rows] == [False, False, True, False]
+
+    second = _Client()
+    j = JsonlJournal(path, lob.JOURNAL_KEY_FIELDS, flush_every=2)
+    rows, skipped = lob.label_rows_resumable(
+        _outliers(6), None, j, invoke=lob.BedrockInvoker(client=second), concurrency=2,
+    )
+    assert skipped == 3
+    assert len(second.prompts) == 3  # S2 (fallback) + S4, S5
+    assert [r["speaker_id"] for r in rows] == [f"S{i}" for i in range(6)]
+    assert not any(r["fallback"] for r in rows)
+
+
+def test_default_journal_path():
+    assert lob.default_journal_path("out/labels.parquet") == "out/labels.parquet.journal.jsonl"
+    p = lob.default_journal_path("s3://bucket/x/labels_v0.parquet")
+    assert p.startswith("artifacts/phase3/journal/labels_v0.") and p.endswith(".journal.jsonl")
+
+
+# ── gen_style_titles_v1 crash + resume ──────────────────────────────
+def _run_titles(monkeypatch, inp, out, *extra):
+    monkeypatch.setattr(sys, "argv", ["gen_style_titles_v1.py", "--input", str(inp), "--output", str(out),
+                                      "--dry-run", "--checkpoint-every", "2", *extra])
+    gst.main()
+
+
+def test_gen_style_titles_resumes_after_crash(tmp_path, monkeypatch):
+    inp = tmp_path / "in.parquet"
+    out = tmp_path / "titles.parquet"
+    pd.DataFrame({
+        "dataset": ["csj"] * 7,
+        "speaker_id": [f"S{i}" for i in range(7)],
+        "summary": ["説明が丁寧"] * 7,
+        "atypicality_v0": [float(i) for i in range(7)],
+    }).to_parquet(inp)
+
+    calls = []
+    real = gst.DryRunTitleGenerator.generate
+
+    def crashing(self, payload):
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        calls.append(payload)
+        return real(self, payload)
+
+    monkeypatch.setattr(gst.DryRunTitleGenerator, "generate", crashing)
+    with pytest.raises(KeyboardInterrupt):
+        _run_titles(monkeypatch, inp, out)
+    assert not out.exists()
+    assert len((tmp_path / "titles.parquet.journal.jsonl").read_text().splitlines()) == 5
+
+    calls.clear()
+    monkeypatch.setattr(gst.DryRunTitleGenerator, "generate", real)
+    _run_titles(monkeypatch, inp, out, "--resume")
+    df = pd.read_parquet(out)
+    assert df["speaker_id"].tolist() == [f"S{i}" for i in range(7)]
+    assert df["source_row_number"].tolist() == list(range(7))
+
+    # a second --resume over the consolidated output adds nothing and duplicates nothing
+    _run_titles(monkeypatch, inp, out, "--resume")
+    assert pd.read_parquet(out)["speaker_id"].tolist() == [f"S{i}" for i in range(7)]
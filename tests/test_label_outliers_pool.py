@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Tests for the concurrent Bedrock labeling pool (fake client + local stub server)."""
+from __future__ import annotations
+
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+
+import label_outliers_with_bedrock_v0 as lob  # noqa: E402
+
+
+def _response_text(user: str) -> str:
+    target = json.loads(user.split("# target (outlier)\n", 1)[1].split("\n", 1)[0])
+    return json.dumps({
+        "labels": [{"label": "QUESTION", "confidence": 0.5, "why": target["speaker_id"]}],
+        "summary": f"summary-{target['speaker_id']}",
+        "needs_more_context": True,
+        "missing": [],
+    }, ensure_ascii=False)
+
+
+def _body(text: str) -> bytes:
+    return json.dumps({"content": [{"type": "text", "text": text}]}).encode("utf-8")
+
+
+def _throttle() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+class _FakeClient:
+    """invoke_model stand-in: random latency, throttles the first call of every prompt."""
+
+    def __init__(self, throttle_first: bool = True, seed: int = 0):
+        self.throttle_first = throttle_first
+        self.seen = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def invoke_model(self, modelId, body, accept, contentType):
+        req = json.loads(body)
+        user = req["messages"][0]["content"]
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            first = user not in self.seen
+            self.seen.add(user)
+            delay = self._rng.uniform(0.0, 0.01)
+        try:
+            time.sleep(delay)
+            if self.throttle_first and first:
+                raise _throttle()
+            return {"body": io.BytesIO(_body(_response_text(user)))}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _rows(n: int):
+    return [
+        {
+            "dataset": "csj",
+            "speaker_id": f"S{i:03d}",
+            "atypicality_v0": float(i),
+            "top_contrib_json": json.dumps([{"feature": "resp__rate", "z": 2.0, "abs_z": 2.0}]),
+        }
+        for i in range(n)
+    ]
+
+
+def test_label_rows_keeps_input_order_and_retries_throttling():
+    client = _FakeClient()
+    invoker = lob.BedrockInvoker(client=client, max_retries=3, sleep=lambda s: None)
+    out = lob.label_rows(_rows(24), None, invoke=invoker, concurrency=6)
+
+    assert [r["speaker_id"] for r in out] == [f"S{i:03d}" for i in range(24)]
+    assert [r["labels_text"] for r in out] == [f"summary-S{i:03d}" for i in range(24)]
+    assert not any(r["fallback"] for r in out)
+    assert invoker.calls == client.calls == 48
+    assert invoker.retries == 24
+    assert 1 < client.max_in_flight <= 6
+
+
+def test_label_rows_matches_sequential():
+    kw = dict(max_retries=3, sleep=lambda s: None)
+    seq = lob.label_rows(_rows(10), None, invoke=lob.BedrockInvoker(client=_FakeClient(), **kw), concurrency=1)
+    par = lob.label_rows(_rows(10), None, invoke=lob.BedrockInvoker(client=_FakeClient(), **kw), concurrency=4)
+    drop = {"created_at"}
+    assert [{k: v for k, v in r.items() if k not in drop} for r in seq] == \
+        [{k: v for k, v in r.items() if k not in drop} for r in par]
+
+
+def test_retries_exhausted_gives_fallback_row():
+    class _AlwaysThrottle:
+        def invoke_model(self, **kw):
+            raise _throttle()
+
+    sleeps = []
+    invoker = lob.BedrockInvoker(client=_AlwaysThrottle(), max_retries=4, backoff_base=1.0,
+                                 backoff_cap=3.0, sleep=sleeps.append, rng=random.Random(0))
+    out = lob.label_rows(_rows(1), None, invoke=invoker, concurrency=2)
+    assert out[0]["fallback"] and "ThrottlingException" in out[0]["error"]
+    assert invoker.calls == 5
+    # full jitter within min(cap, base * 2**attempt)
+    assert [s <= hi for s, hi in zip(sleeps, [1.0, 2.0, 3.0, 3.0])] == [True] * 4
+
+
+def test_non_retryable_error_is_not_retried():
+    class _Denied:
+        calls = 0
+
+        def invoke_model(self, **kw):
+            self.calls += 1
+            raise ClientError({"Error": {"Code": "AccessDeniedException", "Message": "no"}}, "InvokeModel")
+
+    client = _Denied()
+    invoker = lob.BedrockInvoker(client=client, max_retries=5, sleep=lambda s: None)
+    with pytest.raises(ClientError):
+        invoker("sys", "user", max_tokens=10, temperature=0.0)
+    assert client.calls == 1
+
+
+def test_token_bucket_paces_requests():
+    now = [0.0]
+
+    def sleep(s):
+        now[0] += s
+
+    bucket = lob.TokenBucket(rate=5.0, capacity=2.0, clock=lambda: now[0], sleep=sleep)
+    for _ in range(12):
+        bucket.acquire()
+    # 2 burst tokens, then one every 0.2s
+    assert now[0] == pytest.approx(10 * 0.2)
+
+
+# ── Local stub server via endpoint_url ───────────────────────────────
+class _StubHandler(BaseHTTPRequestHandler):
+    throttled = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        user = req["messages"][0]["content"]
+        with self.lock:
+            first = user not in self.throttled
+            self.throttled.add(user)
+        if first:
+            payload = json.dumps({"message": "Too many requests"}).encode()
+            self.send_response(429)
+            self.send_header("x-amzn-ErrorType", "ThrottlingException")
+        else:
+            payload = _body(_response_text(user))
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_injected_client_talks_to_stub_server(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = lob.make_bedrock_client(f"http://127.0.0.1:{server.server_port}", max_retries=0, retry_mode="standard")
+        invoker = lob.BedrockInvoker(client=client, max_retries=2, sleep=lambda s: None)
+        out = lob.label_rows(_rows(8), None, invoke=invoker, concurrency=4)
+    finally:
+        server.shutdown()
+    assert [r["labels_text"] for r in out] == [f"summary-S{i:03d}" for i in range(8)]
+    assert invoker.retries == 8
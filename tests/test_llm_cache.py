@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Tests for the shared on-disk LLM response cache and its Bedrock callers."""
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "paper_figs"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "analysis"))
+
+import label_outliers_with_bedrock_v0 as lob  # noqa: E402
+import llm_circular_interaction as lci  # noqa: E402
+import relabel_add_used_examples_strict as relabel  # noqa: E402
+from llm_cache import LLMCache, cache_key, default_cache, set_default_cache  # noqa: E402
+
+
+class _CountingCall:
+    def __init__(self, out="resp"):
+        self.out = out
+        self.n = 0
+
+    def __call__(self):
+        self.n += 1
+        return self.out
+
+
+_KW = dict(model_id="m", system="sys", prompt="p", temperature=0.0, max_tokens=100)
+
+
+def test_cache_key_depends_on_every_field():
+    base = cache_key("m", "s", "p", 0.0, 100)
+    assert cache_key("m", "s", "p", 0, 100) == base
+    variants = [
+        cache_key("m2", "s", "p", 0.0, 100),
+        cache_key("m", "s2", "p", 0.0, 100),
+        cache_key("m", "s", "p2", 0.0, 100),
+        cache_key("m", "s", "p", 0.2, 100),
+        cache_key("m", "s", "p", 0.0, 101),
+        cache_key("m", "s", "p", 0.0, 100, {"seed": 1}),
+    ]
+    assert len({base, *variants}) == 7
+
+
+def test_hits_and_misses_persist_across_instances(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    call = _CountingCall()
+    c1 = LLMCache(path)
+    assert c1.get_or_call(call, **_KW) == "resp"
+    assert c1.get_or_call(call, **_KW) == "resp"
+    assert (c1.hits, c1.misses, call.n) == (1, 1, 1)
+    c1.close()
+
+    c2 = LLMCache(path)  # a restarted job
+    assert c2.get_or_call(call, **_KW) == "resp"
+    assert (c2.hits, c2.misses, call.n) == (1, 0, 1)
+    assert c2.count() == 1
+
+
+@pytest.mark.parametrize("out, accept", [("", None), ("bad", lambda t: t == "good")])
+def test_empty_or_rejected_response_not_stored(tmp_path, out, accept):
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+    call = _CountingCall(out)
+    cache.get_or_call(call, accept=accept, **_KW)
+    cache.get_or_call(call, accept=accept, **_KW)
+    assert call.n == 2 and cache.count() == 0
+
+
+def test_disabled_cache_always_calls():
+    cache = LLMCache(None)
+    call = _CountingCall()
+    cache.get_or_call(call, **_KW)
+    cache.get_or_call(call, **_KW)
+    assert call.n == 2 and cache.misses == 2 and not cache.enabled
+
+
+def test_sampled_call_is_not_served_from_cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+    call = _CountingCall()
+    kw = {**_KW, "temperature": 0.9}
+    cache.get_or_call(call, **kw)
+    cache.get_or_call(call, **kw)
+    assert call.n == 2 and cache.hits == 0 and cache.count() == 0
+
+    # opt-in: 同じサンプルを再生してよい呼び出し元だけ
+    opted = LLMCache(str(tmp_path / "c.sqlite"), cache_sampled=True)
+    opted.get_or_call(call, **kw)
+    opted.get_or_call(call, **kw)
+    assert call.n == 3 and opted.hits == 1
+
+
+def test_default_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "env.sqlite"))
+    set_default_cache(None)
+    try:
+        assert default_cache().path == str(tmp_path / "env.sqlite")
+        assert not default_cache().cache_sampled
+        monkeypatch.setenv("LLM_CACHE_SAMPLED", "1")
+        set_default_cache(None)
+        assert default_cache().cache_sampled
+        monkeypatch.setenv("LLM_CACHE", "off")
+        set_default_cache(None)
+        assert not default_cache().enabled
+    finally:
+        set_default_cache(None)
+
+
+def test_concurrent_writers(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+
+    def work(i):
+        for j in range(20):
+            cache.get_or_call(lambda: f"r{j}", **{**_KW, "prompt": f"p{j}"})
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.count() == 20
+    assert cache.hits + cache.misses == 80
+
+
+# ── Callers ──────────────────────────────────────────────────────────
+class _FakeInvokeModel:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def invoke_model(self, **kw):
+        self.calls += 1
+        return {"body": io.BytesIO(json.dumps({"content": [{"type": "text", "text": self.text}]}).encode())}
+
+
+def _rows(n):
+    return [
+        {"dataset": "csj", "speaker_id": f"S{i}", "atypicality_v0": float(i), "top_contrib_json": "[]"}
+        for i in range(n)
+    ]
+
+
+def test_rerun_labeling_costs_zero_api_calls(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    client = _FakeInvokeModel(json.dumps({"labels": [], "summary": "ok"}))
+    # label_outliers の main() はキャッシュを cache_sampled で開く（TEMPERATURE=0.2）
+    first = lob.label_rows(
+        _rows(5), None, invoke=lob.BedrockInvoker(client=client, cache=LLMCache(path, cache_sampled=True)), concurrency=2
+    )
+    assert client.calls == 5
+
+    invoker = lob.BedrockInvoker(client=client, cache=LLMCache(path, cache_sampled=True))
+    again = lob.label_rows(_rows(5), None, invoke=invoker, concurrency=2)
+    assert client.calls == 5 and invoker.calls == 0
+    assert [r["labels_json"] for r in again] == [r["labels_json"] for r in first]
+
+
+def test_invoke_claude_uses_given_cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+    client = _FakeInvokeModel("hello")
+    for _ in range(3):
+        assert lob.invoke_claude("s", "u", 10, 0.0, client=client, cache=cache) == "hello"
+    assert client.calls == 1 and cache.hits == 2
+
+
+def test_relabel_call_bedrock_does_not_cache_unparseable(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+    bad = _FakeInvokeModel("no json here")
+    with pytest.raises(ValueError):
+        relabel.call_bedrock(bad, "m", "prompt", cache=cache)
+    assert cache.count() == 0
+
+    good = _FakeInvokeModel('{"labels": [{"label": "OTHER"}]}')
+    assert relabel.call_bedrock(good, "m", "prompt", cache=cache) == {"labels": [{"label": "OTHER"}]}
+    assert relabel.call_bedrock(good, "m", "prompt", cache=cache) == {"labels": [{"label": "OTHER"}]}
+    assert good.calls == 1
+
+
+def test_circular_sampled_generation_is_redrawn(tmp_path, monkeypatch):
+    draws = iter(["draw-1", "draw-2", "score"])
+    monkeypatch.setattr(lci, "_converse_with_retry", lambda *a, **k: next(draws))
+    set_default_cache(LLMCache(str(tmp_path / "c.sqlite")))
+    try:
+        # 対話生成（temperature 0.7）は毎回新しいサンプル
+        assert lci.call_bedrock(None, "m", "gen", temperature=0.7, seed=1) == "draw-1"
+        assert lci.call_bedrock(None, "m", "gen", temperature=0.7, seed=1) == "draw-2"
+        # 採点（temperature 0）はキャッシュから再生
+        assert lci.call_bedrock(None, "m", "score", temperature=0.0, seed=1) == "score"
+        assert lci.call_bedrock(None, "m", "score", temperature=0.0, seed=1) == "score"
+        assert default_cache().hits == 1
+    finally:
+        set_default_cache(None)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for batched IPIP item scoring in llm_circular_interaction (Step 4)."""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "analysis"))
+
+import llm_circular_interaction as lci  # noqa: E402
+from llm_cache import LLMCache, set_default_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _no_disk_cache():
+    set_default_cache(LLMCache(None))
+    yield
+    set_default_cache(None)
+
+
+def _pipeline(tmp_path, **kw):
+    kw.setdefault("dry_run", True)
+    p = lci.CircularInteractionPipeline(model_id="anthropic.test-v1:0", seed=7, out_dir=str(tmp_path), **kw)
+    p.generate_baseline_dialogue()
+    p.manipulate_feature()
+    return p
+
+
+def test_batch_scores_match_per_item_in_dry_run(tmp_path):
+    item = _pipeline(tmp_path, scoring="item").estimate_personality()
+    batch = _pipeline(tmp_path, scoring="batch").estimate_personality()
+    assert list(item) == list(batch) == [
+        "high_baseline", "high_increase", "high_decrease",
+        "low_baseline", "low_increase", "low_decrease",
+    ]
+    assert batch == item
+
+
+def test_unknown_scoring_mode_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        lci.CircularInteractionPipeline(model_id="m", out_dir=str(tmp_path), scoring="bulk")
+
+
+@pytest.mark.parametrize("text", [
+    '{"answers": [{"item_id": 5, "answer": "Very Accurate"}, {"item_id": 25, "answer": "moderately inaccurate."}]}',
+    'Sure:\n{"answers": {"5": "Very Accurate", "25": "Moderately Inaccurate"}}',
+    '{"5": "Very Accurate", "25": "Moderately Inaccurate", "45": "maybe"}',
+])
+def test_parse_batch_answers_forms(text):
+    items = lci.C_ITEMS_SUBSET[:3]
+    assert lci._parse_batch_answers(text, items) == {
+        5: "Very Accurate", 25: "Moderately Inaccurate", 45: None,
+    }
+
+
+@pytest.mark.parametrize("text", ["", "Very Accurate", "{not json}", None])
+def test_parse_batch_answers_garbage_is_all_none(text):
+    assert set(lci._parse_batch_answers(text, lci.C_ITEMS_SUBSET).values()) == {None}
+
+
+class _ConverseClient:
+    """Batch prompts get answers for all but `drop` items; single-item prompts get 'Very Accurate'."""
+
+    def __init__(self, drop=(), delay=0.0):
+        self.drop = set(drop)
+        self.delay = delay
+        self.batch_calls = 0
+        self.item_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def converse(self, modelId, messages, inferenceConfig, **kw):
+        prompt = messages[0]["content"][0]["text"]
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if "questions to answer" in prompt:
+                with self._lock:
+                    self.batch_calls += 1
+                ids = [int(x) for x in re.findall(r"^\[(\d+)\] ", prompt, flags=re.M)]
+                answers = [{"item_id": i, "answer": "Moderately Accurate"} for i in ids if i not in self.drop]
+                text = json.dumps({"answers": answers})
+            else:
+                with self._lock:
+                    self.item_calls.append(prompt)
+                text = "Very Accurate"
+            return {"output": {"message": {"content": [{"text": text}]}}}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_batch_falls_back_per_item_only_for_unparsable(tmp_path):
+    p = _pipeline(tmp_path, scoring="batch")
+    p.dry_run = False
+    p._client = client = _ConverseClient(drop={45, 90})
+    scores = p.estimate_personality()
+
+    assert client.batch_calls == 6
+    assert len(client.item_calls) == 2 * 6
+    assert p.item_fallbacks == {label: [45, 90] for label in scores}
+    # 45 is reverse-scored: Very Accurate(4) -> 0; 90 forward -> 4; others Moderately Accurate
+    expected = []
+    for it in lci.C_ITEMS_SUBSET:
+        raw = 4.0 if it["item_id"] in (45, 90) else 3.0
+        expected.append(4.0 - raw if it["reverse"] else raw)
+    assert list(scores.values()) == pytest.approx([sum(expected) / len(expected)] * 6)
+
+
+def test_variants_are_scored_concurrently(tmp_path):
+    p = _pipeline(tmp_path, scoring="batch", max_workers=6)
+    p.dry_run = False
+    p._client = client = _ConverseClient(delay=0.05)
+    p.estimate_personality()
+    assert client.max_in_flight > 1
+    assert client.item_calls == []
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Parity tests for the prefiltered short-text similarity used by echo/near-duplicate collapse."""
+from __future__ import annotations
+
+import os
+import sys
+from difflib import SequenceMatcher
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+from near_dup import ShortTextMatcher  # noqa: E402
+
+_text = st.text(alphabet="あいうえおはそうねーん12", max_size=14)
+_th = st.sampled_from([0.0, 0.5, 0.8, 0.9, 0.92, 1.0])
+
+
+@settings(max_examples=500, deadline=None)
+@given(texts=st.lists(_text, min_size=2, max_size=8), th=_th)
+def test_similar_matches_sequence_matcher(texts, th):
+    m = ShortTextMatcher(texts)
+    for i in range(len(texts)):
+        for j in range(len(texts)):
+            assert m.similar(i, j, th) == (SequenceMatcher(None, texts[i], texts[j]).ratio() >= th)
+
+
+def test_prefilter_skips_exact_ratio_for_dissimilar_pairs():
+    m = ShortTextMatcher(["はい", "そうなんだ", "はい", "うんうんうん"])
+    assert m.similar(0, 2, 0.92)
+    assert not m.similar(0, 1, 0.92)
+    assert not m.similar(0, 3, 0.92)
+    assert m.n_exact == 1
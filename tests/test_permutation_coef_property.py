@@ -79,3 +79,15 @@ def test_permutation_coef_output_completeness(df: pd.DataFrame) -> None:
     p_values = result["p_value"].to_numpy()
     assert (p_values >= 0.0).all(), f"p_value < 0 found: {p_values[p_values < 0]}"
     assert (p_values <= 1.0).all(), f"p_value > 1 found: {p_values[p_values > 1]}"
+
+
+@given(df=xy_dataframes())
+@settings(max_examples=5, deadline=None)
+def test_permutation_coef_batched_matches_sklearn_loop(df: pd.DataFrame) -> None:
+    """batched engineのp値は従来のRidgeループと同一seedで完全一致する。"""
+    kwargs = dict(df=df, y_col="y", feature_cols=ALL_FEATURES,
+                  alpha=100.0, n_perm=200, seed=7)
+    batched = run_permutation_coef_test(engine="batched", **kwargs)
+    loop = run_permutation_coef_test(engine="sklearn", **kwargs)
+
+    pd.testing.assert_frame_equal(batched, loop)
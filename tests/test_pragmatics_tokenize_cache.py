@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Tests for the memoized fugashi tokenization layer in audio_mvp/pragmatics_ja.py."""
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fugashi")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+import pragmatics_ja as pj  # noqa: E402
+
+UTTS = ["えっと、それは知らないよね？", "まあ好きだと思う", "えっと、それは知らないよね？", "", "あの犬かわいい"]
+
+
+def _fresh_parse(text):
+    out = []
+    for m in pj.Tagger()(text):
+        lem = m.feature.lemma if hasattr(m.feature, "lemma") and m.feature.lemma else m.surface
+        out.append({"surface": m.surface, "lemma": lem, "pos": getattr(m.feature, "pos1", "")})
+    return out
+
+
+def test_cached_tokenize_matches_fresh_parse():
+    pj.clear_tokenize_cache()
+    for u in UTTS:
+        assert pj.tokenize(u) == _fresh_parse(u)
+    assert pj.tokenize_batch(UTTS) == [_fresh_parse(u) for u in UTTS]
+
+
+def test_each_text_parsed_once_and_results_not_shared():
+    pj.clear_tokenize_cache()
+    batch = pj.tokenize_batch(UTTS)
+    assert pj.tokenize_cache_info().misses == len(set(UTTS))
+
+    pj.count_metrics(UTTS)  # make_pragmatics 相当: すべてキャッシュヒット
+    assert pj.tokenize_cache_info().misses == len(set(UTTS))
+
+    batch[0][0]["lemma"] = "changed"
+    assert pj.tokenize(UTTS[0])[0]["lemma"] != "changed"
+    assert batch[0] is not batch[2]
+
+
+def test_count_metrics_unchanged():
+    m = pj.count_metrics(UTTS)
+    assert m["n_utts"] == 5
+    assert m["question_rate"] == pytest.approx(2 / 5)
+    assert m["mental_per_100t"] > 0 and m["dm_per_100t"] > 0
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Tests for the recording-level prosody frame track (audio_mvp/prosody.py)."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "audio_mvp"))
+
+from audio_buffer import AudioBuffer  # noqa: E402
+from prosody import (  # noqa: E402
+    compute_prosody_track,
+    load_or_compute_track,
+    track_segment_f0_rms,
+    track_segment_prosody,
+)
+
+SR = 16000
+
+
+def _signal(sec=6.0):
+    t = np.arange(int(SR * sec)) / SR
+    y = np.where(t < sec / 2, np.sin(2 * np.pi * 220 * t), 0.3 * np.sin(2 * np.pi * 440 * t))
+    y = y * (0.6 + 0.4 * np.sin(2 * np.pi * 2.5 * t))
+    return y.astype(np.float32)
+
+
+def test_blocked_track_equals_single_pass():
+    y = _signal()
+    full = compute_prosody_track(y, SR, block_sec=1000)
+    blocked = compute_prosody_track(y, SR, block_sec=0.7)
+    assert len(full.f0) == 1 + len(y) // full.hop_length
+    for name in ("f0", "rms", "onset"):
+        np.testing.assert_array_equal(getattr(blocked, name), getattr(full, name))
+
+
+def test_segment_stats_from_track():
+    y = _signal()
+    tr = compute_prosody_track(y, SR)
+    lo = track_segment_prosody(tr, 0.5, 2.5)
+    hi = track_segment_prosody(tr, 3.5, 5.5)
+    assert lo["f0_mean"] == pytest.approx(220, rel=0.05)
+    assert hi["f0_mean"] == pytest.approx(440, rel=0.05)
+    assert lo["energy_mean"] > hi["energy_mean"]
+
+    assert track_segment_prosody(tr, 7.0, 8.0)["f0_mean"] == 0.0  # 録音外
+    f0_med, rms = track_segment_f0_rms(tr, 1.0, 1.005)  # hop より短い区間も最寄り 1 フレームで集計
+    assert f0_med == pytest.approx(220, rel=0.05) and rms > 0
+
+
+def test_track_cache_reused_until_audio_changes(tmp_path):
+    wav = tmp_path / "a.wav"
+    sf.write(wav, _signal(2.0), SR)
+    cache = tmp_path / "prosody_track.npz"
+
+    first = load_or_compute_track(AudioBuffer.load(str(wav)), str(cache))
+    mtime = cache.stat().st_mtime_ns
+    again = load_or_compute_track(AudioBuffer.load(str(wav)), str(cache))
+    assert cache.stat().st_mtime_ns == mtime
+    np.testing.assert_array_equal(again.f0, first.f0)
+
+    sf.write(wav, _signal(3.0), SR)
+    changed = load_or_compute_track(AudioBuffer.load(str(wav)), str(cache))
+    assert changed.n_samples == 3 * SR and len(changed.f0) > len(first.f0)
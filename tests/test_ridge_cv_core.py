@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Regression tests: fold-cached ridge_cv_core vs the original per-fold sklearn loop."""
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GroupKFold, KFold
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "analysis"))
+
+from ridge_cv_core import cv_ridge_r, pearsonr, run_permutation_test
+
+
+# ── Reference implementation (copy of the pre-refactor scripts) ──────
+def _legacy_cv_ridge_r(X, y, splits, seed, alpha, groups=None):
+    if groups is not None:
+        split_iter = GroupKFold(n_splits=splits).split(X, y, groups)
+    else:
+        split_iter = KFold(n_splits=splits, shuffle=True, random_state=seed).split(X)
+    rs = []
+    for tr, te in split_iter:
+        imp = SimpleImputer(strategy="median")
+        Xtr = imp.fit_transform(X[tr])
+        Xte = imp.transform(X[te])
+        sc = StandardScaler()
+        Xtr = sc.fit_transform(Xtr)
+        Xte = sc.transform(Xte)
+        m = Ridge(alpha=alpha, random_state=seed)
+        m.fit(Xtr, y[tr])
+        rs.append(pearsonr(y[te], m.predict(Xte)))
+    return float(np.mean(rs))
+
+
+def _legacy_run_perm(X, y, splits, seed, alpha, n_perm, groups=None):
+    r_obs = _legacy_cv_ridge_r(X, y, splits, seed, alpha, groups)
+    rng = np.random.default_rng(seed)
+    r_perm = np.empty(n_perm, float)
+    for i in range(n_perm):
+        r_perm[i] = _legacy_cv_ridge_r(X, rng.permutation(y), splits, seed, alpha, groups)
+    p = (np.sum(np.abs(r_perm) >= abs(r_obs)) + 1.0) / (n_perm + 1.0)
+    return r_obs, p
+
+
+def _make_xy(seed: int, n: int = 60, p: int = 19):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, p))
+    X[rng.random(X.shape) < 0.1] = np.nan  # exercise median imputation
+    X[:, 5] = 1.0  # constant column → scaler keeps scale 1
+    y = 0.4 * np.nan_to_num(X[:, 0]) + rng.standard_normal(n)
+    groups = rng.integers(0, 15, n)
+    return X, y, groups
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("use_groups", [False, True])
+def test_r_obs_and_p_unchanged(seed, use_groups):
+    X, y, groups = _make_xy(seed)
+    g = groups if use_groups else None
+    r_ref, p_ref = _legacy_run_perm(X, y, 5, seed, 100.0, 100, g)
+    r_new, p_new = run_permutation_test(X, y, 5, seed, 100.0, 100, g)
+    assert r_new == pytest.approx(r_ref, abs=1e-12)
+    assert p_new == p_ref
+
+
+@pytest.mark.parametrize("alpha", [0.1, 1.0, 100.0])
+def test_cv_ridge_r_matches_sklearn(alpha):
+    X, y, _ = _make_xy(7)
+    assert cv_ridge_r(X, y, 5, 42, alpha) == pytest.approx(
+        _legacy_cv_ridge_r(X, y, 5, 42, alpha), abs=1e-12,
+    )
+
+
+def test_constant_y_gives_nan_r():
+    X, _, _ = _make_xy(3)
+    y = np.ones(X.shape[0])
+    assert np.isnan(cv_ridge_r(X, y, 5, 0, 100.0))
+
+
+@pytest.mark.parametrize("use_groups", [False, True])
+def test_sharded_p_identical_across_worker_counts(use_groups):
+    X, y, groups = _make_xy(11)
+    g = groups if use_groups else None
+    # 601 permutations → uneven final shard
+    results = [
+        run_permutation_test(X, y, 5, 3, 100.0, 601, g, n_jobs=n_jobs)
+        for n_jobs in (1, 2, 3)
+    ]
+    assert results[0] == results[1] == results[2]
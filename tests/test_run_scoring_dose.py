@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for the dose-response scoring orchestrator (run_scoring_dose.py)."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "dose_response"))
+
+import run_scoring_dose as rsd  # noqa: E402
+
+
+@pytest.fixture
+def dose_dir(tmp_path):
+    d = tmp_path / "dose"
+    d.mkdir()
+    mono = pd.DataFrame({
+        "conversation_id": ["C1", "C1", "C2"],
+        "speaker_id": ["S1", "S2", "S3"],
+        "n_utt": [10, 12, 8],
+        "n_chars": [300, 320, 250],
+        "text": ["あ", "い", "う"],
+    })
+    for feature in rsd.FEATURES:
+        for dose in rsd.DOSE_LEVELS:
+            if (feature, dose) == ("OIR", 3):
+                continue  # 未生成の条件
+            mono.to_parquet(d / f"monologues_dose_{feature}_x{dose}.parquet", index=False)
+    return d
+
+
+def _main(tmp_path, dose_dir, *extra):
+    manifest = tmp_path / "manifest.json"
+    results = rsd.main([
+        "--dose_dir", str(dose_dir), "--items_dir", str(tmp_path / "items"),
+        "--out_base", str(tmp_path / "scores"), "--manifest", str(manifest), "--dry_run", *extra,
+    ])
+    return results, json.loads(manifest.read_text(encoding="utf-8"))
+
+
+def test_job_matrix_matches_shell_layout(tmp_path):
+    jobs = rsd.build_jobs(tmp_path / "dose", tmp_path / "items", tmp_path / "out")
+    assert len(jobs) == 3 * 2 * 4 * 5
+    assert len({j.key for j in jobs}) == len(jobs)
+    j = jobs[0]
+    assert (j.feature, j.dose, j.teacher, j.trait) == ("FILL", 0, "sonnet4", "O")
+    assert j.out_dir.name == "dataset=cejc_home2_hq1_v1__items=O24__teacher=sonnet4__dose=FILL_x0"
+    assert j.items_csv.name == "items_ipipneo120_ja_O24.csv"
+    assert j.monologues_parquet.name == "monologues_dose_FILL_x0.parquet"
+
+
+def test_subprocess_command_matches_shell_args(tmp_path):
+    job = rsd.build_jobs(tmp_path, tmp_path, tmp_path, features=["YESNO"], dose_levels=[3])[0]
+    cmd = rsd.SubprocessBackend(python="python").command(job)
+    assert cmd[:2] == ["python", "scripts/big5/score_big5_bedrock_v2.py"]
+    assert cmd[cmd.index("--model_id") + 1] == rsd.TEACHERS["sonnet4"]
+    assert "--paper_strict" in cmd and cmd[cmd.index("--max_retries") + 1] == "5"
+
+
+def test_dry_run_writes_scores_and_manifest(tmp_path, dose_dir):
+    results, manifest = _main(tmp_path, dose_dir)
+    assert len(results) == 120
+    assert manifest["counts"] == {"ok": 100, "missing_input": 20}
+    assert [r["key"] for r in manifest["jobs"]] == [r.key for r in results]
+
+    ok = [r for r in results if r.status == "ok"]
+    df = pd.read_parquet(ok[0].out_parquet)
+    assert list(df.columns) == ["conversation_id", "speaker_id", "trait", "model_id", "trait_score"]
+    assert df["trait_score"].between(1.0, 5.0).all()
+
+
+def test_rerun_skips_existing_outputs(tmp_path, dose_dir):
+    first, _ = _main(tmp_path, dose_dir, "--features", "FILL")
+    scores = pd.read_parquet(first[0].out_parquet)
+
+    _, manifest = _main(tmp_path, dose_dir, "--features", "FILL")
+    assert manifest["counts"] == {"skipped_existing": 40}
+
+    _, manifest = _main(tmp_path, dose_dir, "--features", "FILL", "--teachers", "qwen3-235b", "--force")
+    assert manifest["counts"] == {"ok": 10}
+    pd.testing.assert_frame_equal(pd.read_parquet(first[0].out_parquet), scores)
+
+
+class _SlowBackend:
+    def __init__(self, fail_key=None):
+        self.fail_key = fail_key
+        self.lock = threading.Lock()
+        self.active: dict[str, int] = {}
+        self.max_total = 0
+        self.max_per_teacher = 0
+
+    def run(self, job):
+        with self.lock:
+            self.active[job.teacher] = self.active.get(job.teacher, 0) + 1
+            self.max_total = max(self.max_total, sum(self.active.values()))
+            self.max_per_teacher = max(self.max_per_teacher, self.active[job.teacher])
+        try:
+            time.sleep(0.02)
+            if job.key == self.fail_key:
+                raise RuntimeError("throttled")
+        finally:
+            with self.lock:
+                self.active[job.teacher] -= 1
+
+
+def test_teachers_run_concurrently_and_failures_are_isolated(tmp_path, dose_dir):
+    jobs = rsd.build_jobs(dose_dir, tmp_path, tmp_path / "scores", features=["FILL"], dose_levels=[0])
+    backend = _SlowBackend(fail_key="FILL_x0/deepseek-v3/E")
+    results = rsd.run_jobs(jobs, backend)
+
+    assert backend.max_total > 1
+    assert backend.max_per_teacher == 1
+    assert [r.key for r in results] == [j.key for j in jobs]
+    failed = [r for r in results if r.status == "failed"]
+    assert [r.key for r in failed] == ["FILL_x0/deepseek-v3/E"]
+    assert "throttled" in failed[0].error
+    assert sum(r.status == "ok" for r in results) == 19
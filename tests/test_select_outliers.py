@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Outlier selection (select_outliers_v0) and the labeling runner's --outliers_csv input."""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "phase3"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import compute_atypicality_v0 as cav  # noqa: E402
+import label_outliers_with_bedrock_v0 as lob  # noqa: E402
+import select_outliers_v0 as sel  # noqa: E402
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def scores(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = []
+    for ds in ("csj", "cejc"):
+        X = rng.standard_t(3, size=(300, 6))
+        df = pd.DataFrame(X, columns=[f"resp__rate_{j}__wmean" for j in range(6)])
+        df.insert(0, "dataset", ds)
+        df.insert(1, "speaker_id", [f"{ds}_{i}:L" for i in range(300)])
+        frames.append(df)
+    src, out = tmp_path / "features.parquet", tmp_path / "atypicality_v0.parquet"
+    pd.concat(frames, ignore_index=True).to_parquet(src, index=False)
+    cav.main(["--features", str(src), "--out", str(out), "--topk", "4"])
+    return out
+
+
+def _enrich_csv(scores_path, path):
+    # 旧来の enrich CSV: スコア列ごと CSV に書き出されていて top_contrib は repr
+    df = pd.read_parquet(scores_path)
+    df["pause_mean"] = np.arange(len(df), dtype=float)
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_select_keeps_native_contrib_and_enriches(tmp_path, scores):
+    out = tmp_path / "outliers.parquet"
+    enrich = _enrich_csv(scores, tmp_path / "enrich.csv")
+    sel.main(["--scores", str(scores), "--out", str(out), "--topk_per_dataset", "2", "--enrich", str(enrich)])
+
+    assert pq.read_schema(out).field("top_contrib").type == cav.CONTRIB_TYPE
+    got = pd.read_parquet(out)
+    src = pd.read_parquet(scores)
+    want = (
+        src[src["is_outlier_p99"]]
+        .sort_values(["dataset", "atypicality_v0"], ascending=[True, False])
+        .groupby("dataset").head(2)
+    )
+    assert got["speaker_id"].tolist() == want["speaker_id"].tolist()
+    expected_pause = pd.read_csv(enrich).set_index("speaker_id").loc[got["speaker_id"], "pause_mean"]
+    assert got["pause_mean"].tolist() == expected_pause.tolist()
+    assert list(got.columns).count("top_contrib") == 1
+
+
+def test_select_rejects_csv_out(tmp_path, scores):
+    with pytest.raises(RuntimeError, match="parquet"):
+        sel.main(["--scores", str(scores), "--out", str(tmp_path / "o.csv")])
+
+
+def test_labeling_runner_passes_parquet_that_labeler_reads(tmp_path, scores):
+    local = tmp_path / "phase3"
+    local.mkdir()
+    shutil.copy(scores, local / "atypicality_v0.parquet")
+
+    # aws と Bedrock / レポート段はスタブ、選択スクリプトは本物の python で動かす
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls.txt"
+    (bin_dir / "aws").write_text("#!/usr/bin/env bash\nexit 0\n")
+    (bin_dir / "python").write_text(
+        "#!/usr/bin/env bash\n"
+        "case \"$1\" in\n"
+        "  *label_outliers_with_bedrock_v0.py|*make_labels_v0_report_html.py)\n"
+        f"    printf '%s\\n' \"$@\" >> '{calls}'; exit 0;;\n"
+        "esac\n"
+        f"exec '{sys.executable}' \"$@\"\n"
+    )
+    for f in bin_dir.iterdir():
+        f.chmod(0o755)
+
+    env = {
+        **os.environ,
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+        "OUT_GOLD": "s3://b/gold",
+        "ANALYSIS_OUT": "s3://b/analysis",
+        "S3_KMS_KEY_ARN": "arn:stub",
+        "LOCAL_DIR": str(local),
+    }
+    subprocess.run(["bash", "scripts/phase3/run_labeling_v0.sh"], cwd=REPO, env=env, check=True, capture_output=True)
+
+    args = calls.read_text().splitlines()
+    outliers = args[args.index("--outliers_csv") + 1]
+    assert outliers.endswith(".parquet")
+    df = lob.load_outliers(outliers)
+    src = pd.read_parquet(scores)
+    assert sorted(df["speaker_id"]) == sorted(src.loc[src["is_outlier_p99"], "speaker_id"])
+    for row in df.to_dict(orient="records"):
+        feats = lob._extract_top_features(lob._row_top_contrib(row))
+        assert feats and all("feature" in d for d in feats)
+
+
+def test_labeler_rejects_csv_exported_scores(tmp_path, scores):
+    csv = tmp_path / "outliers_v0_topK.csv"
+    pd.read_parquet(scores).to_csv(csv, index=False)
+    with pytest.raises(ValueError, match="select_outliers_v0"):
+        lob.load_outliers(str(csv))
@@ -136,3 +136,40 @@ class TestGapTolOutputFormat:
         assert len(GAP_TOL_CONDITIONS) == 6
         for gt in GAP_TOL_CONDITIONS:
             assert isinstance(gt, float)
+
+
+class TestSharedPreparation:
+    """run_analysis('all') parses utterance texts once for every runner."""
+
+    @pytest.mark.filterwarnings("ignore::RuntimeWarning")
+    def test_all_prepares_once(self, monkeypatch):
+        import sensitivity_analysis as sa
+
+        rng = np.random.default_rng(0)
+        rows = []
+        for c in range(12):
+            t = 0.0
+            for i in range(20):
+                spk = "AB"[i % 2] if rng.random() < 0.8 else "AB"[(i + 1) % 2]
+                rows.append((f"c{c}", spk, t, t + 1.0, ["はい", "そうだね", "えっと行くの？", "うん"][i % 4]))
+                t += 1.0 + float(rng.uniform(0, 0.6))
+        utt = _make_utterances(rows)
+        base = sa.eim.extract_features(utt, None, gap_tol=0.05)  # canonical feature set
+        scores = base[["conversation_id", "speaker_id"]].assign(
+            trait_score=rng.normal(size=len(base)),
+        )
+
+        calls = {"n": 0}
+        orig = sa.prepare_utterances
+
+        def counting(*args, **kwargs):
+            calls["n"] += 1
+            return orig(*args, **kwargs)
+
+        monkeypatch.setattr(sa, "prepare_utterances", counting)
+        monkeypatch.setattr(sa, "load_trait_scores", lambda *a, **k: scores)
+
+        results = run_analysis("all", utt, base, "/unused", n_perm=9, cv_folds=3)
+        assert calls["n"] == 1
+        assert {r["analysis_type"] for r in results} == set(ANALYSIS_RUNNERS)
+        assert len(results) == 6 + 2 + 3 + 5
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Property tests: UtteranceClassifier labels == the individual label functions."""
+from __future__ import annotations
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from build_pragmatics_gold_from_utterances import (
+    UtteranceClassifier,
+    build_segments,
+    first_token,
+    is_aizuchi,
+    is_nonlex_like,
+    is_question,
+    norm_for_aizuchi,
+    sfp_group,
+)
+
+_EXAMPLES = [
+    "うん", "はい。", "そうですね", "行くの？", "えー", "<笑>", "<FV><息>", "は<H>い",
+    "(F あの)", "(D そ)(F え)", "明日だよ", "そう|そ", "エ;ええ", "ですよねー", "うん うん",
+    "ｿｳﾃﾞｽﾈ", "もんねー", "だろ?", "いやー", "", "  ", "あ@", "<H",
+    " うん ", "そう@ほげ\n\n", "\u3000はい",
+]
+
+_ALPHABET = "うんはいそねよのなかもーえあ ()<>HF|;?？。、ｿｳﾃﾞ@息"
+
+
+def _reference(text, loose):
+    return (
+        is_question(text),
+        sfp_group(text),
+        is_nonlex_like(text),
+        norm_for_aizuchi(text),
+        first_token(text),
+        is_aizuchi(text, loose=loose),
+    )
+
+
+@pytest.mark.parametrize("loose", [False, True])
+@pytest.mark.parametrize("text", _EXAMPLES + [None])
+def test_classify_matches_label_functions(text, loose):
+    assert tuple(UtteranceClassifier(loose_aizuchi=loose).classify(text)) == _reference(text, loose)
+
+
+@settings(max_examples=300, deadline=None)
+@given(text=st.text(alphabet=_ALPHABET, max_size=12), loose=st.booleans())
+def test_classify_matches_label_functions_property(text, loose):
+    assert tuple(UtteranceClassifier(loose_aizuchi=loose).classify(text)) == _reference(text, loose)
+
+
+def test_label_frame_preserves_index_and_caches_distinct_texts():
+    texts = pd.Series(["うん", "はい", "うん", "行くの？", "うん"], index=[10, 3, 7, 1, 0])
+    clf = UtteranceClassifier()
+    labels = clf.label_frame(texts)
+    assert list(labels.index) == [10, 3, 7, 1, 0]
+    assert labels["sfp_group"].tolist() == [sfp_group(t) for t in texts]
+    assert labels["is_question"].dtype == bool
+    assert clf.cache_info().misses == 3
+
+    clf.label_frame(texts)
+    assert clf.cache_info().misses == 3
+
+
+def test_build_segments_labels_unchanged():
+    utt = pd.DataFrame({
+        "conversation_id": ["c1"] * len(_EXAMPLES),
+        "speaker_id": ["A", "B"] * (len(_EXAMPLES) // 2) + ["A"] * (len(_EXAMPLES) % 2),
+        "text": _EXAMPLES,
+    })
+    seg = build_segments(utt)
+    assert seg["is_question"].tolist() == [is_question(t) for t in seg["text"]]
+    assert seg["sfp_group"].tolist() == [sfp_group(t) for t in seg["text"]]
+    assert seg["sfp_group"].dtype == "string"
+
+
+def test_classify_normalizes_once_per_text(monkeypatch):
+    import build_pragmatics_gold_from_utterances as bp
+
+    calls = []
+    real = bp.nfkc
+    monkeypatch.setattr(bp, "nfkc", lambda x: (calls.append(x), real(x))[1])
+    clf = UtteranceClassifier(loose_aizuchi=True)
+    for t in ["うん", "行くの？", "(F あの)", "うん"]:
+        clf.classify(t)
+    assert calls == ["うん", "行くの？", "(F あの)"]